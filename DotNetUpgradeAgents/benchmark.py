@@ -0,0 +1,367 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, List, Optional
+
+try:
+    import resource # Unix only; peak RSS is reported as None elsewhere
+except ImportError:
+    resource = None
+
+from .core_components import LLMApiClient, logger
+from .stub_llm_server import StubLLMServer, StubLLMConfig
+from .tools import DependencyAnalyzerTool, VBToCSTool, ProjectUpgradeTool, ReportTool, ConversionManifest
+
+# Benchmark harness for the upgrade pipeline. Generates a synthetic solution, runs each tool (and optionally the
+# full crew flow) against the offline stub LLM server, and writes wall time, files/sec, peak RSS and LLM call
+# counts to a JSON file that can be compared across commits:
+#     python -m DotNetUpgradeAgents.benchmark --projects 20 --files-per-project 10 --output bench.json
+#     python -m DotNetUpgradeAgents.benchmark --projects 20 --files-per-project 10 --compare bench.json
+
+BENCHMARK_SCHEMA_VERSION = 1
+
+VB_FILE_TEMPLATE = """Imports System
+Imports System.Collections.Generic
+
+Namespace {namespace}
+    Public Class {class_name}
+        Private _items As New List(Of String)()
+
+        Public Property Name As String
+
+        Public Function Count() As Integer
+            Return _items.Count
+        End Function
+
+        Public Sub Add(item As String)
+            If Not String.IsNullOrEmpty(item) Then
+                _items.Add(item)
+            End If
+        End Sub
+    End Class
+End Namespace
+"""
+
+CS_FILE_TEMPLATE = """using System;
+using System.Collections.Generic;
+
+namespace {namespace}
+{{
+    public class {class_name}
+    {{
+        private readonly List<string> _items = new List<string>();
+
+        public string Name {{ get; set; }}
+
+        public int Count() => _items.Count;
+
+        public void Add(string item) => _items.Add(item);
+    }}
+}}
+"""
+
+PROJECT_TEMPLATE = """<Project ToolsVersion="15.0" xmlns="http://schemas.microsoft.com/developer/msbuild/2003">
+  <PropertyGroup>
+    <TargetFrameworkVersion>v4.7.2</TargetFrameworkVersion>
+    <RootNamespace>{namespace}</RootNamespace>
+    <AssemblyName>{project_name}</AssemblyName>
+  </PropertyGroup>
+  <ItemGroup>
+{package_references}  </ItemGroup>
+  <ItemGroup>
+{compile_items}  </ItemGroup>
+  <ItemGroup>
+{project_references}  </ItemGroup>
+</Project>
+"""
+
+
+def generate_synthetic_solution(root: str, projects: int = 10, files_per_project: int = 10, vb_ratio: float = 0.5,
+                                reference_fanout: int = 2, packages_per_project: int = 5, seed: int = 0) -> dict:
+    '''
+    Writes a synthetic solution under root: a .sln, and `projects` projects (.vbproj or .csproj, picked by vb_ratio)
+    with `files_per_project` source files each. Every project references up to `reference_fanout` earlier projects
+    (so the graph is acyclic) and `packages_per_project` NuGet packages. Returns the generated paths.
+    '''
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    solution = {"root": root, "solution_path": os.path.join(root, "Synthetic.sln"), "projects": [], "vb_files": [], "cs_files": []}
+    sln_lines = ["Microsoft Visual Studio Solution File, Format Version 12.00"]
+
+    for index in range(projects):
+        project_name = f"Project{index:04d}"
+        is_vb = rng.random() < vb_ratio
+        language_ext, project_ext = (".vb", ".vbproj") if is_vb else (".cs", ".csproj")
+        project_dir = os.path.join(root, project_name)
+        os.makedirs(project_dir, exist_ok=True)
+        namespace = f"Synthetic.{project_name}"
+
+        compile_items = ""
+        for file_index in range(files_per_project):
+            class_name = f"Type{file_index:04d}"
+            file_path = os.path.join(project_dir, class_name + language_ext)
+            template = VB_FILE_TEMPLATE if is_vb else CS_FILE_TEMPLATE
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(template.format(namespace=namespace, class_name=class_name))
+            solution["vb_files" if is_vb else "cs_files"].append(file_path)
+            compile_items += f'    <Compile Include="{class_name}{language_ext}" />\n'
+
+        package_references = "".join(
+            f'    <PackageReference Include="Synthetic.Package{rng.randrange(packages_per_project * 4):03d}" Version="{rng.randint(1, 12)}.{rng.randint(0, 9)}.0" />\n'
+            for _ in range(packages_per_project)
+        )
+        referenced = rng.sample(range(index), min(reference_fanout, index)) if index else []
+        project_references = "".join(
+            f'    <ProjectReference Include="..\\{solution["projects"][ref]["name"]}\\{os.path.basename(solution["projects"][ref]["path"])}" />\n'
+            for ref in sorted(referenced)
+        )
+
+        project_path = os.path.join(project_dir, project_name + project_ext)
+        with open(project_path, 'w', encoding='utf-8') as f:
+            f.write(PROJECT_TEMPLATE.format(namespace=namespace, project_name=project_name, package_references=package_references,
+                                            compile_items=compile_items, project_references=project_references))
+        solution["projects"].append({"name": project_name, "path": project_path, "language": "vb" if is_vb else "cs"})
+        sln_lines.append(f'Project("{{00000000-0000-0000-0000-000000000000}}") = "{project_name}", "{project_name}\\{project_name}{project_ext}", "{{{index:08X}-0000-0000-0000-000000000000}}"')
+        sln_lines.append("EndProject")
+
+    with open(solution["solution_path"], 'w', encoding='utf-8') as f:
+        f.write("\n".join(sln_lines) + "\n")
+    return solution
+
+
+def peak_rss_mb() -> Optional[float]:
+    '''Peak resident set size of this process so far, in MB (None where the resource module is unavailable).'''
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1) # bytes on macOS, KB on Linux
+
+
+class BenchmarkRunner:
+    '''Runs the pipeline stages against one synthetic solution and one stub LLM server, collecting a result per stage.'''
+    def __init__(self, solution: dict, server: StubLLMServer, target_framework: str = "net8.0"):
+        self.solution = solution
+        self.server = server
+        self.target_framework = target_framework
+        self.llm_client = LLMApiClient(endpoint=server.ollama_generate_url, ollama_model_name="stub")
+        self.results = []
+
+    def _measure(self, stage: str, files: int, work: Callable[[], List[str]]) -> dict:
+        llm_calls_before = self.server.stats()["requests"]
+        started = time.perf_counter()
+        errors = work()
+        wall_seconds = time.perf_counter() - started
+        result = {
+            "stage": stage,
+            "files": files,
+            "wall_seconds": round(wall_seconds, 4),
+            "files_per_second": round(files / wall_seconds, 2) if wall_seconds > 0 else None,
+            "llm_calls": self.server.stats()["requests"] - llm_calls_before,
+            "peak_rss_mb": peak_rss_mb(),
+            "errors": len(errors),
+        }
+        logger.info(f"Benchmark: {stage}: {result['wall_seconds']}s, {result['files_per_second']} files/s, {result['llm_calls']} LLM calls, {result['errors']} errors")
+        self.results.append(result)
+        return result
+
+    def run_dependency_analysis(self) -> dict:
+        tool = DependencyAnalyzerTool()
+        def work():
+            results = [tool._run(project["path"]) for project in self.solution["projects"]]
+            return [r for r in results if not isinstance(r, dict) or r.get("error") or r.get("analysis_errors")]
+        return self._measure("DependencyAnalyzerTool", len(self.solution["projects"]), work)
+
+    def run_vb_to_cs(self) -> dict:
+        tool = VBToCSTool(llm_client=self.llm_client)
+        def work():
+            results = [tool._run(vb_file) for vb_file in self.solution["vb_files"]]
+            return [r for r in results if not isinstance(r, str) or not r.startswith("Successfully converted")]
+        return self._measure("VBToCSTool", len(self.solution["vb_files"]), work)
+
+    def run_vb_to_cs_batch(self, incremental: bool = False) -> dict:
+        '''Batch conversion per VB project; from scratch, or (incremental=True) re-using the previous run's conversion manifests.'''
+        tool = VBToCSTool(llm_client=self.llm_client)
+        vb_projects = [project for project in self.solution["projects"] if project["language"] == "vb"]
+        if not incremental:
+            for project in vb_projects:
+                manifest_path = os.path.join(os.path.dirname(project["path"]), ConversionManifest.FILE_NAME)
+                if os.path.exists(manifest_path):
+                    os.remove(manifest_path)
+        def work():
+            manifests = [tool._run(project["path"]) for project in vb_projects]
+            return [entry for manifest in manifests for entry in manifest["files"] if entry["status"] == "failed"]
+        return self._measure("VBToCSTool.incremental" if incremental else "VBToCSTool.batch", len(self.solution["vb_files"]), work)
+
+    def run_project_upgrade(self) -> dict:
+        tool = ProjectUpgradeTool(llm_client=self.llm_client, build_after_upgrade=False) # No .NET SDK needed; the stub only rewrites XML
+        def work():
+            report = tool.upgrade_solution(self.solution["solution_path"], self.target_framework)
+            return report["errors"] + [entry for entry in report["projects"].values() if not entry["success"]]
+        return self._measure("ProjectUpgradeTool", len(self.solution["projects"]), work)
+
+    def run_report(self) -> dict:
+        tool = ReportTool()
+        details = {"solution": self.solution["solution_path"], "stages": list(self.results)}
+        def work():
+            with _working_directory(self.solution["root"]): # ReportTool writes into the current directory
+                result = tool._run(details, "json")
+            return [] if isinstance(result, str) and result.startswith("ReportTool: Successfully") else [result]
+        return self._measure("ReportTool", 1, work)
+
+    def run_crew(self) -> dict:
+        '''Full crew flow (analyze, upgrade, report) over the first project, with the agents' LLM pointed at the stub.'''
+        os.environ["OPENAI_API_KEY"] = os.environ.get("OPENAI_API_KEY") or "stub-key"
+        os.environ["OPENAI_BASE_URL"] = f"{self.server.base_url}/v1"
+        os.environ["OPENAI_API_BASE"] = f"{self.server.base_url}/v1"
+        from crewai import Crew, Process
+        from .agents import DotNetUpgradeAgents
+        from .tasks import DotNetUpgradeTasks
+
+        project_path = self.solution["projects"][0]["path"]
+        task_factory = DotNetUpgradeTasks()
+        agent_factory = DotNetUpgradeAgents()
+        task_analyze_deps = task_factory.analyze_dependencies_task(project_or_solution_file=project_path)
+        task_upgrade_framework = task_factory.upgrade_project_framework_task(
+            csproj_file_path=project_path, target_framework=self.target_framework,
+            git_branch_name=f"feature/upgrade_to_{self.target_framework.replace('.', '')}")
+        task_upgrade_framework.context = [task_analyze_deps]
+        task_generate_report = task_factory.generate_final_report_task(collected_upgrade_data={})
+        task_generate_report.context = [task_analyze_deps, task_upgrade_framework]
+        crew = Crew(
+            agents=[agent_factory.dependency_analyzer_agent(), agent_factory.upgrade_coordinator_agent(), agent_factory.reporting_agent()],
+            tasks=[task_analyze_deps, task_upgrade_framework, task_generate_report],
+            process=Process.sequential,
+            verbose=False
+        )
+        def work():
+            with _working_directory(self.solution["root"]), contextlib.redirect_stdout(io.StringIO()):
+                try:
+                    crew.kickoff()
+                except Exception as e:
+                    logger.error(f"Benchmark: Crew run failed: {e}")
+                    return [str(e)]
+            return []
+        return self._measure("Crew", 1, work)
+
+    def close(self):
+        self.llm_client.close()
+
+
+@contextlib.contextmanager
+def _working_directory(path: str):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(projects: int = 10, files_per_project: int = 10, vb_ratio: float = 0.5, reference_fanout: int = 2,
+                  packages_per_project: int = 5, latency: str = "fixed:0", tokens_per_second: float = 0.0,
+                  include_crew: bool = False, seed: int = 0, work_dir: Optional[str] = None) -> dict:
+    '''Generates a synthetic solution, runs every stage against a fresh stub LLM server and returns the results document.'''
+    config = {"projects": projects, "files_per_project": files_per_project, "vb_ratio": vb_ratio, "reference_fanout": reference_fanout,
+              "packages_per_project": packages_per_project, "latency": latency, "tokens_per_second": tokens_per_second,
+              "include_crew": include_crew, "seed": seed}
+    with tempfile.TemporaryDirectory(prefix="dotnet_upgrade_bench_", dir=work_dir) as root:
+        solution = generate_synthetic_solution(os.path.join(root, "Synthetic"), projects, files_per_project, vb_ratio,
+                                               reference_fanout, packages_per_project, seed)
+        with StubLLMServer(StubLLMConfig(latency=latency, tokens_per_second=tokens_per_second, seed=seed)) as server:
+            runner = BenchmarkRunner(solution, server)
+            # Tools may ask for human feedback; with stdin at EOF, HumanFeedback picks the first option.
+            stdin = sys.stdin
+            sys.stdin = io.StringIO("")
+            try:
+                runner.run_dependency_analysis()
+                runner.run_vb_to_cs()
+                runner.run_vb_to_cs_batch()
+                runner.run_vb_to_cs_batch(incremental=True)
+                runner.run_project_upgrade()
+                runner.run_report()
+                if include_crew:
+                    runner.run_crew()
+            finally:
+                sys.stdin = stdin
+                runner.close()
+            total_llm_calls = server.stats()["requests"]
+
+    return {
+        "schema_version": BENCHMARK_SCHEMA_VERSION,
+        "generated_at": datetime.now().isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "stages": runner.results,
+        "total_wall_seconds": round(sum(stage["wall_seconds"] for stage in runner.results), 4),
+        "total_llm_calls": total_llm_calls,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def compare_results(baseline: dict, current: dict) -> List[str]:
+    '''One line per stage: wall time and LLM calls of current versus baseline.'''
+    baseline_stages = {stage["stage"]: stage for stage in baseline.get("stages", [])}
+    lines = []
+    for stage in current["stages"]:
+        before = baseline_stages.get(stage["stage"])
+        if before is None:
+            lines.append(f"{stage['stage']}: {stage['wall_seconds']}s (no baseline)")
+            continue
+        change = (stage["wall_seconds"] - before["wall_seconds"]) / before["wall_seconds"] * 100 if before["wall_seconds"] else 0.0
+        lines.append(f"{stage['stage']}: {before['wall_seconds']}s -> {stage['wall_seconds']}s ({change:+.1f}%), "
+                     f"LLM calls {before['llm_calls']} -> {stage['llm_calls']}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the .NET upgrade pipeline on a synthetic solution against a stub LLM.")
+    parser.add_argument("--projects", type=int, default=10)
+    parser.add_argument("--files-per-project", type=int, default=10)
+    parser.add_argument("--vb-ratio", type=float, default=0.5, help="Fraction of projects written in VB.NET")
+    parser.add_argument("--reference-fanout", type=int, default=2, help="ProjectReferences per project")
+    parser.add_argument("--packages-per-project", type=int, default=5, help="PackageReferences per project")
+    parser.add_argument("--latency", default="fixed:0", help="Stub LLM latency, e.g. uniform:0.05,0.2")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Stub LLM output rate (0 = unthrottled)")
+    parser.add_argument("--crew", action="store_true", help="Also run the full crew flow")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.projects, args.files_per_project, args.vb_ratio, args.reference_fanout, args.packages_per_project,
+                            args.latency, args.tokens_per_second, args.crew, args.seed)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+    for stage in results["stages"]:
+        print(f"{stage['stage']:<24} {stage['wall_seconds']:>9.3f}s {str(stage['files_per_second']):>10} files/s "
+              f"{stage['llm_calls']:>6} LLM calls {str(stage['peak_rss_mb']):>8} MB peak RSS {stage['errors']:>4} errors")
+    print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        for line in compare_results(baseline, results):
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
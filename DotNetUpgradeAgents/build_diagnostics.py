@@ -0,0 +1,224 @@
+import os
+import re
+from typing import Dict, Iterable, List, Optional
+
+from .core_components import logger
+
+# Structured view of `dotnet build` output. MSBuild prints every diagnostic in its canonical format,
+# "origin(line,column): [subcategory] error|warning CODE: message [project::TargetFramework=tfm]", once per target
+# framework it builds and again in the closing summary. parse_build_output() reads those lines into BuildDiagnostic
+# objects, merging the copies of one diagnostic (same file, position, code and message) across target frameworks and
+# projects; group_diagnostics() then groups diagnostics by root cause (the missing type, assembly or package they
+# name), so one fix can be asked for per cause and the LLM gets the distinct errors with their source spans only.
+
+SOURCE_SPAN_CONTEXT_LINES = 3 # Lines shown above and below a diagnostic's line
+MAX_SPANS_PER_GROUP = 3 # Source spans included in the fix prompt per root cause
+MAX_LOCATIONS_PER_GROUP = 10 # Further locations of a root cause are only counted
+
+_DIAGNOSTIC_LINE = re.compile(
+    r"^\s*(?P<origin>.*?)(?:\((?P<line>\d+)(?:,(?P<column>\d+))?(?:,(?P<end_line>\d+),(?P<end_column>\d+))?\))?\s*:\s*"
+    r"(?:(?P<subcategory>[^:]*?)\s+)?(?P<severity>error|warning)\s*(?P<code>[A-Za-z]+\d+)?\s*:\s*(?P<message>.*?)"
+    r"(?:\s+\[(?P<project>[^\]]+)\])?\s*$", re.IGNORECASE)
+_TOOL_ORIGINS = {"msbuild", "csc", "vbc", "exec", "nuget", "dotnet"}
+_WINDOWS_ABSOLUTE = re.compile(r"^[A-Za-z]:[\\/]")
+_QUOTED = re.compile(r"'([^']+)'")
+
+# Diagnostic codes whose message names the missing type/namespace first -> description of that root cause
+_MISSING_TYPE_CODES = {"CS0246": "Missing type or namespace", "BC30002": "Missing type", "BC30466": "Missing namespace",
+                       "CS0103": "Unknown name", "BC30451": "Unknown name"}
+_PACKAGE_CODE = re.compile(r"^NU\d+$", re.IGNORECASE)
+_PACKAGE_NAME = re.compile(r"(?:Package|package)\s+'?([A-Za-z0-9_.\-]+)")
+
+
+class BuildDiagnostic:
+    '''One distinct build error or warning. projects/target_frameworks list every build it was reported for.'''
+    def __init__(self, severity: str, code: Optional[str], message: str, file: Optional[str] = None, line: Optional[int] = None,
+                 column: Optional[int] = None, origin: Optional[str] = None):
+        self.severity = severity
+        self.code = code
+        self.message = message
+        self.file = file
+        self.line = line
+        self.column = column
+        self.origin = origin # Tool that reported a diagnostic without a file, e.g. "CSC" or "MSBUILD"
+        self.projects: List[str] = []
+        self.target_frameworks: List[str] = []
+        self.occurrences = 0
+
+    @property
+    def project(self) -> Optional[str]:
+        return self.projects[0] if self.projects else None
+
+    @property
+    def key(self) -> tuple:
+        return (os.path.normcase(self.file or self.origin or ""), self.line, self.column, (self.code or "").upper(), self.message, self.severity)
+
+    def location(self, base_dir: Optional[str] = None) -> str:
+        name = self.file or self.origin or "(build)"
+        if self.file and base_dir:
+            relative = os.path.relpath(self.file, base_dir)
+            name = relative if not relative.startswith("..") else self.file
+        return f"{name}({self.line},{self.column})" if self.line is not None and self.column is not None else \
+            f"{name}({self.line})" if self.line is not None else name
+
+    def to_dict(self) -> dict:
+        return {"file": self.file, "line": self.line, "column": self.column, "code": self.code, "severity": self.severity,
+                "message": self.message, "project": self.project, "projects": self.projects,
+                "target_frameworks": self.target_frameworks, "occurrences": self.occurrences}
+
+
+def _is_file_origin(origin: str) -> bool:
+    '''Whether a diagnostic's origin is a file (rather than a tool such as CSC or MSBUILD).'''
+    return origin.lower() not in _TOOL_ORIGINS and ("/" in origin or "\\" in origin or "." in os.path.basename(origin))
+
+
+def _split_project(project: Optional[str]):
+    '''"App.csproj::TargetFramework=net8.0" -> ("App.csproj", "net8.0").'''
+    if not project:
+        return None, None
+    path, _, properties = project.partition("::")
+    match = re.search(r"TargetFramework=([^;\]]+)", properties)
+    return path.strip(), match.group(1).strip() if match else None
+
+
+def parse_build_output(output: str, base_dir: Optional[str] = None) -> List[BuildDiagnostic]:
+    '''
+    Distinct diagnostics in build output, in order of first appearance. Relative file paths are resolved against the
+    directory of the reporting project, else base_dir.
+    '''
+    diagnostics: Dict[tuple, BuildDiagnostic] = {}
+    for raw_line in output.splitlines():
+        match = _DIAGNOSTIC_LINE.match(raw_line)
+        if not match or not match.group("origin").strip():
+            continue
+        origin = match.group("origin").strip().strip("\"")
+        project, target_framework = _split_project(match.group("project"))
+        file_path = None
+        if _is_file_origin(origin):
+            file_path = origin
+            if not os.path.isabs(file_path) and not _WINDOWS_ABSOLUTE.match(file_path):
+                file_path = os.path.normpath(os.path.join(os.path.dirname(project) if project else (base_dir or ""), file_path))
+        diagnostic = BuildDiagnostic(
+            severity=match.group("severity").lower(),
+            code=(match.group("code") or "").upper() or None,
+            message=match.group("message").strip(),
+            file=file_path,
+            line=int(match.group("line")) if match.group("line") else None,
+            column=int(match.group("column")) if match.group("column") else None,
+            origin=None if file_path else origin,
+        )
+        existing = diagnostics.setdefault(diagnostic.key, diagnostic)
+        existing.occurrences += 1
+        if project and project not in existing.projects:
+            existing.projects.append(project)
+        if target_framework and target_framework not in existing.target_frameworks:
+            existing.target_frameworks.append(target_framework)
+    logger.debug(f"BuildDiagnostics: Parsed {len(diagnostics)} distinct diagnostics")
+    return list(diagnostics.values())
+
+
+def root_cause(diagnostic: BuildDiagnostic) -> str:
+    '''
+    What the diagnostic is about, so that diagnostics with one cause share it: the missing type/namespace (CS0246,
+    CS0234, BC30002...), the unreferenced assembly (CS0012), the package (NUxxxx) or the conflicting assembly (MSB3277);
+    otherwise the code and message.
+    '''
+    code = diagnostic.code or ""
+    names = _QUOTED.findall(diagnostic.message)
+    if code in _MISSING_TYPE_CODES and names:
+        return f"{_MISSING_TYPE_CODES[code]} '{names[0]}'"
+    if code == "CS0234" and len(names) >= 2: # The type or namespace name 'Web' does not exist in the namespace 'System'
+        return f"Missing type or namespace '{names[1]}.{names[0]}'"
+    if code == "CS0012" and len(names) >= 2: # The type 'X' is defined in an assembly that is not referenced ... assembly 'Y, ...'
+        return f"Missing assembly reference '{names[-1].split(',')[0]}'"
+    if _PACKAGE_CODE.match(code):
+        package = _PACKAGE_NAME.search(diagnostic.message)
+        if package:
+            return f"{code} package '{package.group(1).rstrip('.')}'"
+    if code == "MSB3277":
+        match = re.search(r'versions of "([^"]+)"', diagnostic.message)
+        if match:
+            return f"Assembly version conflict '{match.group(1)}'"
+    return f"{code or diagnostic.severity}: {diagnostic.message}"
+
+
+def group_diagnostics(diagnostics: Iterable[BuildDiagnostic]) -> List[dict]:
+    '''
+    Diagnostics grouped by root_cause(): [{"root_cause", "code", "severity", "count", "diagnostics", "files", "projects"}],
+    errors before warnings, then the most frequent cause first.
+    '''
+    groups: Dict[tuple, dict] = {}
+    for diagnostic in diagnostics:
+        cause = root_cause(diagnostic)
+        group = groups.setdefault((diagnostic.severity, cause), {"root_cause": cause, "code": diagnostic.code, "severity": diagnostic.severity,
+                                                                 "count": 0, "diagnostics": [], "files": [], "projects": []})
+        group["count"] += 1
+        group["diagnostics"].append(diagnostic)
+        if diagnostic.file and diagnostic.file not in group["files"]:
+            group["files"].append(diagnostic.file)
+        for project in diagnostic.projects:
+            if project not in group["projects"]:
+                group["projects"].append(project)
+    return sorted(groups.values(), key=lambda g: (g["severity"] != "error", -g["count"], g["root_cause"]))
+
+
+def summarize_build_output(output: str, base_dir: Optional[str] = None) -> dict:
+    '''{"errors", "warnings" (distinct counts), "groups" (as group_diagnostics, diagnostics as dicts)} for build output.'''
+    diagnostics = parse_build_output(output, base_dir)
+    groups = group_diagnostics(diagnostics)
+    return {
+        "errors": sum(1 for d in diagnostics if d.severity == "error"),
+        "warnings": sum(1 for d in diagnostics if d.severity == "warning"),
+        "groups": [dict(group, diagnostics=[d.to_dict() for d in group["diagnostics"]]) for group in groups],
+    }
+
+
+def source_span(diagnostic: BuildDiagnostic, context_lines: int = SOURCE_SPAN_CONTEXT_LINES) -> Optional[str]:
+    '''The lines around the diagnostic's line, each prefixed with its number; None if there is no readable source.'''
+    if not diagnostic.file or diagnostic.line is None or not os.path.isfile(diagnostic.file):
+        return None
+    try:
+        with open(diagnostic.file, "r", encoding="utf-8-sig", errors="replace") as f:
+            lines = f.read().splitlines()
+    except OSError as e:
+        logger.warning(f"BuildDiagnostics: Cannot read {diagnostic.file}: {e}")
+        return None
+    first = max(diagnostic.line - 1 - context_lines, 0)
+    last = min(diagnostic.line + context_lines, len(lines))
+    width = len(str(last))
+    return "\n".join(f"{number:>{width}}: {lines[number - 1]}" for number in range(first + 1, last + 1))
+
+
+def format_diagnostics_for_prompt(groups: List[dict], base_dir: Optional[str] = None, severity: str = "error",
+                                  max_spans_per_group: int = MAX_SPANS_PER_GROUP) -> str:
+    '''
+    The distinct diagnostics of the given severity, by root cause, each with its locations and the source spans of its
+    first locations (paths relative to base_dir). Spans of one file are shown once.
+    '''
+    sections = []
+    shown_spans = set()
+    for index, group in enumerate((g for g in groups if g["severity"] == severity), 1):
+        diagnostics = group["diagnostics"]
+        messages = list(dict.fromkeys(f"{d.code or d.severity}: {d.message}" for d in diagnostics))
+        lines = [f"{index}. {group['root_cause']} ({group['count']} location{'s' if group['count'] != 1 else ''})"]
+        lines.extend(f"   {message}" for message in messages[:3])
+        for diagnostic in diagnostics[:MAX_LOCATIONS_PER_GROUP]:
+            frameworks = f" [{', '.join(diagnostic.target_frameworks)}]" if diagnostic.target_frameworks else ""
+            lines.append(f"   at {diagnostic.location(base_dir)}{frameworks}")
+        if len(diagnostics) > MAX_LOCATIONS_PER_GROUP:
+            lines.append(f"   ... and {len(diagnostics) - MAX_LOCATIONS_PER_GROUP} more locations")
+        spans = 0
+        for diagnostic in diagnostics:
+            if spans >= max_spans_per_group:
+                break
+            span_key = (diagnostic.file, diagnostic.line)
+            if span_key in shown_spans:
+                continue
+            span = source_span(diagnostic)
+            if span is None:
+                continue
+            shown_spans.add(span_key)
+            spans += 1
+            lines.append(f"   --- {diagnostic.location(base_dir)} ---\n{span}")
+        sections.append("\n".join(lines))
+    return "\n\n".join(sections)
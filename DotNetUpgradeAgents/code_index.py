@@ -0,0 +1,304 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import subprocess
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .core_components import logger
+from .source_scanner import DEFAULT_SOURCE_EXTENSIONS, SKIPPED_DIRECTORIES, iter_source_files
+
+# Persistent, incremental index of a checkout's source and project files, stored in a SQLite file per checkout in a cache
+# directory (CODE_INDEX_DIR, default ~/.cache/dotnet_upgrade_agents/code_index), never in the checkout itself.
+# Per file it records size, mtime, content hash, language, and the namespaces, types and using/Imports it declares.
+# Updates only re-read files whose size or mtime changed. They find candidates with `git diff` against the commit
+# indexed last, plus untracked files and files that had uncommitted changes at the last update, or, outside git, with
+# a stat-only walk. Tools query the index for file lists instead of walking the tree themselves.
+
+INDEXED_EXTENSIONS = DEFAULT_SOURCE_EXTENSIONS + (".csproj", ".vbproj", ".fsproj", ".props", ".targets", ".sln")
+LANGUAGES = {".cs": "csharp", ".vb": "vb", ".csproj": "msbuild", ".vbproj": "msbuild", ".fsproj": "msbuild", ".props": "msbuild",
+             ".targets": "msbuild", ".sln": "solution", ".config": "config"}
+
+_CS_NAMESPACE = re.compile(r"^\s*namespace\s+(@?[\w.]+)", re.MULTILINE)
+_CS_USING = re.compile(r"^\s*(?:global\s+)?using\s+(?:static\s+)?(?:\w+\s*=\s*)?(@?[\w.]+)\s*;", re.MULTILINE)
+_CS_TYPE = re.compile(r"^[^\n/\"]*?\b(?:class|struct|interface|enum|record(?:[ \t]+(?:class|struct))?)[ \t]+(@?\w+)", re.MULTILINE)
+_VB_NAMESPACE = re.compile(r"^\s*Namespace\s+([\w.]+)", re.MULTILINE | re.IGNORECASE)
+_VB_IMPORTS = re.compile(r"^\s*Imports\s+(?:\w+\s*=\s*)?([\w.]+)", re.MULTILINE | re.IGNORECASE)
+_VB_TYPE = re.compile(r"^\s*(?:(?:Public|Private|Friend|Protected|Partial|MustInherit|NotInheritable|Shadows|Shared)\s+)*"
+                      r"(?:Class|Structure|Interface|Enum|Module)[ \t]+(\w+)", re.MULTILINE | re.IGNORECASE)
+
+
+def parse_declarations(text: str, language: str) -> Tuple[List[str], List[str], List[str]]:
+    '''(namespaces, types, usings) declared in C# or VB.NET source, found with line-anchored patterns (not a full parse).'''
+    if language == "csharp":
+        patterns = (_CS_NAMESPACE, _CS_TYPE, _CS_USING)
+    elif language == "vb":
+        patterns = (_VB_NAMESPACE, _VB_TYPE, _VB_IMPORTS)
+    else:
+        return [], [], []
+    return tuple(list(dict.fromkeys(match.lstrip("@") for match in pattern.findall(text))) for pattern in patterns)
+
+
+def default_index_path(root: str) -> str:
+    '''Where the index of root is stored: a file named after root's hash in CODE_INDEX_DIR or the user cache directory.'''
+    directory = os.getenv("CODE_INDEX_DIR") or os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+                                                            "dotnet_upgrade_agents", "code_index")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, hashlib.sha256(os.path.normcase(os.path.abspath(root)).encode("utf-8")).hexdigest()[:24] + ".sqlite3")
+
+
+def find_index_root(path: str) -> str:
+    '''The checkout root for path: the nearest ancestor holding .git, else path's own directory.'''
+    start = os.path.abspath(path if os.path.isdir(path) else os.path.dirname(os.path.abspath(path)))
+    current = start
+    while True:
+        if os.path.exists(os.path.join(current, ".git")):
+            return current
+        parent = os.path.dirname(current)
+        if parent == current:
+            return start
+        current = parent
+
+
+class CodeIndex:
+    '''
+    Index of the files under root with INDEXED_EXTENSIONS (build/tool folders skipped). Call update() to bring it up to
+    date; the first update reads every file, later ones only changed files. Paths are stored relative to root with "/".
+    The index is stored at path, by default in the cache directory (see default_index_path).
+    '''
+    FORMAT_VERSION = "1"
+
+    def __init__(self, root: str, path: Optional[str] = None, use_git: bool = True):
+        self.root = os.path.abspath(root)
+        self.path = path or default_index_path(self.root)
+        self.use_git = use_git
+        self.updated = False # Whether update() ran in this process
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False) # Access is serialized by self._lock
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            version = self._conn.execute("SELECT value FROM meta WHERE key = 'format_version'").fetchone()
+            if version is None or version[0] != self.FORMAT_VERSION:
+                for table in ("files", "symbols", "meta"):
+                    self._conn.execute(f"DROP TABLE IF EXISTS {table}")
+                self._conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+                self._conn.execute("INSERT INTO meta VALUES ('format_version', ?)", (self.FORMAT_VERSION,))
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, sha256 TEXT NOT NULL, "
+                "language TEXT NOT NULL, indexed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS symbols (path TEXT NOT NULL, kind TEXT NOT NULL, name TEXT NOT NULL)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS symbols_by_name ON symbols(kind, name)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS symbols_by_path ON symbols(path)")
+
+    # --- Updating ----------------------------------------------------------------------------------------------
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(os.path.join(self.root, path)), self.root).replace(os.sep, "/")
+
+    def contains(self, path: str) -> bool:
+        '''Whether path is root or under it.'''
+        return self._relative(path).split("/")[0] != ".."
+
+    def _is_indexable(self, relative_path: str) -> bool:
+        parts = relative_path.split("/")
+        return (parts[0] != ".." and relative_path.lower().endswith(INDEXED_EXTENSIONS)
+                and not any(part.lower() in SKIPPED_DIRECTORIES for part in parts[:-1]))
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    def _git(self, *args: str) -> Optional[str]:
+        try:
+            process = subprocess.run(["git", *args], cwd=self.root, capture_output=True, text=True, encoding="utf-8", check=False, timeout=60)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        return process.stdout if process.returncode == 0 else None
+
+    def _git_state(self) -> Optional[Tuple[str, List[str], List[str]]]:
+        '''
+        (HEAD commit, untracked non-ignored files under root, tracked files with uncommitted changes), or None outside a
+        git work tree.
+        '''
+        if not self.use_git:
+            return None
+        head = self._git("rev-parse", "--verify", "--quiet", "HEAD")
+        untracked = self._git("ls-files", "-z", "--others", "--exclude-standard")
+        dirty = self._git("diff", "-z", "--name-only", "--relative", "--no-renames", "HEAD", "--")
+        if head is None or untracked is None or dirty is None:
+            return None
+        return (head.strip(), [p for p in untracked.split("\0") if p and self._is_indexable(p)],
+                [p for p in dirty.split("\0") if p and self._is_indexable(p)])
+
+    def _git_candidates(self, indexed_head: str, untracked: List[str]) -> Optional[Set[str]]:
+        '''
+        Files that may differ from the index: changed since indexed_head (committed or not) or untracked, now or then.
+        Files that had uncommitted changes then are included too: reverted since, they no longer show up in the diff.
+        '''
+        changed = self._git("diff", "-z", "--name-only", "--relative", "--no-renames", indexed_head, "--")
+        if changed is None: # e.g. the indexed commit was garbage-collected after a rebase
+            return None
+        previously_untracked = json.loads(self._meta("git_untracked") or "[]")
+        previously_dirty = json.loads(self._meta("git_dirty") or "[]")
+        return {p for p in changed.split("\0") if p} | set(untracked) | set(previously_untracked) | set(previously_dirty)
+
+    def update(self, changed_paths: Optional[Iterable[str]] = None, full: bool = False) -> dict:
+        '''
+        Brings the index up to date and returns {"mode", "checked", "read", "removed", "elapsed_seconds"}.
+        changed_paths limits the update to those files (e.g. from a file watcher). Otherwise, an index that has
+        already been built is updated from `git diff` when root is in a git work tree, or from a stat-only walk.
+        full=True always walks (this also picks up changes to git-ignored files).
+        '''
+        started = time.monotonic()
+        with self._lock:
+            git_state = self._git_state() if changed_paths is None else None
+            indexed_head = self._meta("git_head")
+            candidates = None
+            if changed_paths is not None:
+                mode, candidates = "paths", {self._relative(p) for p in changed_paths}
+            elif git_state and indexed_head and not full:
+                candidates = self._git_candidates(indexed_head, git_state[1])
+                mode = "git"
+            if candidates is None:
+                mode = "scan"
+                candidates = {self._relative(p) for p in iter_source_files(self.root, INDEXED_EXTENSIONS)}
+                candidates |= {row[0] for row in self._conn.execute("SELECT path FROM files")} # Detects deletions
+
+            stats = {"mode": mode, "checked": 0, "read": 0, "removed": 0}
+            with self._conn:
+                for relative_path in sorted(p for p in candidates if self._is_indexable(p)):
+                    stats["checked"] += 1
+                    outcome = self._refresh(relative_path)
+                    if outcome:
+                        stats[outcome] += 1
+                if git_state:
+                    self._set_meta("git_head", git_state[0])
+                    self._set_meta("git_untracked", json.dumps(git_state[1]))
+                    self._set_meta("git_dirty", json.dumps(git_state[2]))
+            self.updated = True
+        stats["elapsed_seconds"] = round(time.monotonic() - started, 3)
+        logger.info(f"CodeIndex: Updated {self.root} ({stats['mode']}): checked {stats['checked']}, read {stats['read']}, removed {stats['removed']} in {stats['elapsed_seconds']}s")
+        return stats
+
+    def _refresh(self, relative_path: str) -> Optional[str]:
+        '''Re-indexes one file if its size or mtime changed. Returns "read", "removed" or None (unchanged).'''
+        full_path = os.path.join(self.root, relative_path.replace("/", os.sep))
+        row = self._conn.execute("SELECT size, mtime_ns, sha256 FROM files WHERE path = ?", (relative_path,)).fetchone()
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            stat = None
+        if stat is None or not os.path.isfile(full_path):
+            if row is None:
+                return None
+            self._conn.execute("DELETE FROM files WHERE path = ?", (relative_path,))
+            self._conn.execute("DELETE FROM symbols WHERE path = ?", (relative_path,))
+            return "removed"
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return None
+
+        try:
+            with open(full_path, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            logger.warning(f"CodeIndex: Cannot read {full_path}: {e}")
+            return None
+        sha256 = hashlib.sha256(data).hexdigest()
+        language = LANGUAGES.get(os.path.splitext(relative_path)[1].lower(), "markup")
+        self._conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                           (relative_path, stat.st_size, stat.st_mtime_ns, sha256, language, time.time()))
+        if row is None or row[2] != sha256: # A touched but unchanged file keeps its symbols
+            namespaces, types, usings = parse_declarations(data.decode("utf-8-sig", errors="replace"), language)
+            self._conn.execute("DELETE FROM symbols WHERE path = ?", (relative_path,))
+            self._conn.executemany("INSERT INTO symbols VALUES (?, ?, ?)",
+                                   [(relative_path, kind, name) for kind, names in (("namespace", namespaces), ("type", types), ("using", usings)) for name in names])
+        return "read"
+
+    # --- Queries -----------------------------------------------------------------------------------------------
+
+    def _absolute(self, relative_path: str) -> str:
+        return os.path.join(self.root, relative_path.replace("/", os.sep))
+
+    def files(self, extensions: Optional[Iterable[str]] = None, under: Optional[str] = None) -> List[str]:
+        '''Absolute paths of indexed files, sorted, optionally limited to extensions and to a directory under root.'''
+        extensions = tuple(e.lower() for e in extensions) if extensions else None
+        prefix = "" if under is None else self._relative(under).rstrip("/") + "/"
+        if prefix == "./":
+            prefix = ""
+        with self._lock:
+            rows = self._conn.execute("SELECT path FROM files WHERE substr(path, 1, ?) = ? ORDER BY path", (len(prefix), prefix)).fetchall()
+        return [self._absolute(path) for (path,) in rows if extensions is None or path.lower().endswith(extensions)]
+
+    def entry(self, path: str) -> Optional[dict]:
+        '''The indexed record for path: size, mtime_ns, sha256, language, namespaces, types and usings; None if not indexed.'''
+        relative_path = self._relative(path)
+        with self._lock:
+            row = self._conn.execute("SELECT size, mtime_ns, sha256, language FROM files WHERE path = ?", (relative_path,)).fetchone()
+            symbols = self._conn.execute("SELECT kind, name FROM symbols WHERE path = ? ORDER BY rowid", (relative_path,)).fetchall()
+        if row is None:
+            return None
+        entry = {"path": self._absolute(relative_path), "size": row[0], "mtime_ns": row[1], "sha256": row[2], "language": row[3],
+                 "namespaces": [], "types": [], "usings": []}
+        for kind, name in symbols:
+            entry[{"namespace": "namespaces", "type": "types", "using": "usings"}[kind]].append(name)
+        return entry
+
+    def _files_with_symbol(self, kind: str, name: str, include_children: bool) -> List[str]:
+        query = "SELECT DISTINCT path FROM symbols WHERE kind = ? AND (name = ? COLLATE NOCASE"
+        parameters = [kind, name]
+        if include_children:
+            query += " OR name LIKE ? ESCAPE '\\'"
+            parameters.append(name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + ".%")
+        with self._lock:
+            rows = self._conn.execute(query + ") ORDER BY path", parameters).fetchall()
+        return [self._absolute(path) for (path,) in rows]
+
+    def files_using(self, namespace: str, include_children: bool = True) -> List[str]:
+        '''Files with a using/Imports of namespace (or, by default, of a namespace nested in it). Case-insensitive.'''
+        return self._files_with_symbol("using", namespace, include_children)
+
+    def files_declaring(self, namespace: str, include_children: bool = True) -> List[str]:
+        return self._files_with_symbol("namespace", namespace, include_children)
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total_bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM files").fetchone()
+            languages = dict(self._conn.execute("SELECT language, COUNT(*) FROM files GROUP BY language ORDER BY language").fetchall())
+            git_head = self._meta("git_head")
+        return {"root": self.root, "files": count, "bytes": total_bytes, "languages": languages, "git_head": git_head}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_code_indexes: Dict[str, CodeIndex] = {}
+_code_indexes_lock = threading.Lock()
+
+
+def get_code_index(path: str, update: bool = True) -> CodeIndex:
+    '''
+    The process-wide CodeIndex for the checkout containing path (see find_index_root), brought up to date unless
+    update=False and it was already updated in this process. An index already open for a directory above path is reused, so the projects of a solution without
+    git share the solution's index. Tools share it, so after the first build each update only costs a `git diff` (or
+    stat walk) and the changed files; callers making many lookups in one run (e.g. per project of a solution) update
+    it once and pass update=False for the rest.
+    '''
+    root = find_index_root(path)
+    with _code_indexes_lock:
+        enclosing = [index for index in _code_indexes.values() if index.contains(root)]
+        if enclosing:
+            index = max(enclosing, key=lambda candidate: len(candidate.root)) # The innermost
+        else:
+            index = _code_indexes[os.path.normcase(root)] = CodeIndex(root)
+    if update or not index.updated:
+        index.update()
+    return index
@@ -1,60 +1,562 @@
 import logging
+import logging.handlers
 import requests
+from requests.adapters import HTTPAdapter
 from functools import wraps
-from datetime import datetime
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, List, Iterable, Iterator, Tuple
+from concurrent.futures import ThreadPoolExecutor, Future
+import asyncio
+import atexit
+import gzip
+import hashlib
 import os
 import json
+import queue
+import random
+import reprlib
+import shutil
+import sqlite3
+import threading
+import time
 
 # Existing logger for general application logs
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("DotNetUpgradeSystem") # General application logger
 
 # --- Dedicated LLM Interaction Logger ---
+# Records are handed to a queue and written by a background listener thread, so LLM round-trips never wait on file I/O.
+# Message formatting (including lazily serialized payloads) also happens on the listener thread.
+# LLM_INTERACTION_LOG_LEVEL (default: INFO) controls verbosity; full prompts, payloads and responses are only logged
+# (and serialized) at DEBUG. The log is written to LLM_INTERACTION_LOG_PATH (default: llm_interactions.log next to this
+# module). The file rotates at LLM_INTERACTION_LOG_MAX_BYTES, keeping LLM_INTERACTION_LOG_BACKUPS
+# old files, which are gzip-compressed when LLM_INTERACTION_LOG_COMPRESS=1.
+DEFAULT_LLM_INTERACTION_LOG_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_LLM_INTERACTION_LOG_BACKUPS = 5
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    '''QueueHandler that leaves formatting to the listener thread instead of formatting on the caller's thread.'''
+    def prepare(self, record):
+        return record
+
+def _gzip_rotator(source: str, dest: str):
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+class _LazyJSON:
+    '''Defers json.dumps until the log record is actually formatted (i.e. only when the level is enabled).'''
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        try:
+            return json.dumps(self.value)
+        except (TypeError, ValueError) as e:
+            return f"<unserializable: {e}>"
+
 llm_interaction_logger = logging.getLogger("LLMInteractions")
-llm_interaction_logger.setLevel(logging.DEBUG)
+llm_interaction_logger.setLevel(getattr(logging, (os.getenv("LLM_INTERACTION_LOG_LEVEL") or "INFO").upper(), logging.INFO))
 llm_interaction_logger.propagate = False
-log_file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_interactions.log")
+log_file_path = os.getenv("LLM_INTERACTION_LOG_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_interactions.log")
+llm_log_max_bytes = int(os.getenv("LLM_INTERACTION_LOG_MAX_BYTES") or DEFAULT_LLM_INTERACTION_LOG_MAX_BYTES)
+llm_log_backups = int(os.getenv("LLM_INTERACTION_LOG_BACKUPS") or DEFAULT_LLM_INTERACTION_LOG_BACKUPS)
 try:
 
-    llm_fh = logging.FileHandler(log_file_path, mode='a', encoding='utf-8')
+    llm_fh = logging.handlers.RotatingFileHandler(log_file_path, mode='a', maxBytes=llm_log_max_bytes, backupCount=llm_log_backups, encoding='utf-8', delay=True)
     logger.info(f"LLM interaction log will be saved to: {log_file_path}")
 except Exception as e:
     # Fallback if the above path is not writable for some reason
     fallback_log_path = "llm_interactions.log"
-    llm_fh = logging.FileHandler(fallback_log_path, mode='a', encoding='utf-8')
+    llm_fh = logging.handlers.RotatingFileHandler(fallback_log_path, mode='a', maxBytes=llm_log_max_bytes, backupCount=llm_log_backups, encoding='utf-8', delay=True)
     logger.warning(f"Could not create LLM log at preferred location {log_file_path} due to {e}. Using fallback: {fallback_log_path}")
 
+if os.getenv("LLM_INTERACTION_LOG_COMPRESS", "").lower() in ("1", "true", "yes"):
+    llm_fh.namer = lambda name: name + ".gz"
+    llm_fh.rotator = _gzip_rotator
+
 llm_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 llm_fh.setFormatter(llm_formatter)
-llm_interaction_logger.addHandler(llm_fh)
+llm_log_queue = queue.SimpleQueue()
+llm_interaction_logger.addHandler(_DeferredQueueHandler(llm_log_queue))
+llm_log_listener = logging.handlers.QueueListener(llm_log_queue, llm_fh, respect_handler_level=True)
+llm_log_listener.start()
+atexit.register(llm_log_listener.stop) # Drains queued records to the file on interpreter exit
 # --- End of New Logger Setup ---
 
-def log_error(func):
+DEFAULT_LOG_VALUE_MAX_CHARS = 200
+
+_log_repr = reprlib.Repr()
+_log_repr.maxstring = DEFAULT_LOG_VALUE_MAX_CHARS
+_log_repr.maxother = DEFAULT_LOG_VALUE_MAX_CHARS
+_log_repr.maxlist = _log_repr.maxtuple = _log_repr.maxdict = _log_repr.maxset = 10
+_log_repr.maxlevel = 3
+
+class _LazyRepr:
+    '''
+    Log argument that is only rendered if the record is actually emitted.
+    Strings and containers are truncated before they are stringified, so a multi-KB prompt or a large dict
+    costs no more to log than its first few hundred characters.
+    '''
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return _log_repr.repr(self.value)
+
+def log_error(func=None, *, sample_rate: Optional[float] = None, level: int = logging.INFO):
+    '''
+    Instruments a function: logs its start and completion (with truncated, lazily formatted arguments and result)
+    at `level`, and always logs exceptions at ERROR. Records carry structured fields in `extra`:
+    function, status ("ok"/"error"), elapsed_ms and, on failure, exception_type.
+    sample_rate (0..1, default LOG_SAMPLE_RATE or 1.0) logs only that fraction of successful calls.
+    Usable bare (@log_error) or with options (@log_error(sample_rate=0.1)).
+    When `level` is disabled, the only overhead is a level check and a timer.
+    '''
+    if func is None:
+        return lambda f: log_error(f, sample_rate=sample_rate, level=level)
+
+    function_name = func.__qualname__
+    rate = sample_rate if sample_rate is not None else float(os.getenv("LOG_SAMPLE_RATE") or 1.0)
+
     @wraps(func)
     def wrapper(*args, **kwargs):
-        class_name = ""
-        if args and hasattr(args[0], '__class__'):
-            class_name = args[0].__class__.__name__
-
-        logger.info(f"Running {class_name}.{func.__name__} with args: {args[1:]} and kwargs: {kwargs}")
+        log_call = logger.isEnabledFor(level) and (rate >= 1.0 or random.random() < rate)
+        if log_call:
+            # Leave out self/cls for methods
+            call_args = args[1:] if args and hasattr(args[0], func.__name__) else args
+            logger.log(level, "Running %s with args: %s and kwargs: %s", function_name, _LazyRepr(call_args), _LazyRepr(kwargs),
+                       extra={"function": function_name, "status": "started"})
+        started = time.perf_counter()
         try:
             result = func(*args, **kwargs)
-            logger.info(f"{class_name}.{func.__name__} completed successfully with result: {str(result)[:200]}...") # Log snippet of result
-            return result
         except Exception as e:
-            logger.error(f"{class_name}.{func.__name__} failed with error: {e}", exc_info=True)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            logger.error("%s failed after %.1f ms with error: %s", function_name, elapsed_ms, e, exc_info=True,
+                         extra={"function": function_name, "status": "error", "elapsed_ms": elapsed_ms, "exception_type": type(e).__name__})
             raise
+        if log_call:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            logger.log(level, "%s completed successfully in %.1f ms with result: %s", function_name, elapsed_ms, _LazyRepr(result),
+                       extra={"function": function_name, "status": "ok", "elapsed_ms": elapsed_ms})
+        return result
     return wrapper
 
+DEFAULT_LLM_POOL_SIZE = 10 # Keep-alive connections kept open per endpoint host
+DEFAULT_LLM_MAX_CONCURRENCY = 8 # In-flight requests allowed by AsyncLLMApiClient
+DEFAULT_LLM_CACHE_MAX_ENTRIES = 20000
+DEFAULT_LLM_CACHE_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_LLM_CACHE_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_LLM_STREAM_STALL_TIMEOUT = 60 # Seconds without a new token before a streaming request is cancelled
+DEFAULT_LLM_REQUEST_TIMEOUT = 180 # Per-attempt timeout; generous for local LLMs
+DEFAULT_LLM_REQUEST_DEADLINE = 600 # Overall budget for one request, including retries and backoff
+DEFAULT_LLM_MAX_RETRIES = 4
+DEFAULT_LLM_BACKOFF_BASE = 1.0
+DEFAULT_LLM_BACKOFF_MAX = 30.0
+DEFAULT_LLM_RATE_LIMIT = 20.0 # Requests per second per endpoint; adapted downwards on throttling
+DEFAULT_LLM_CIRCUIT_FAILURE_THRESHOLD = 5
+DEFAULT_LLM_CIRCUIT_RESET_SECONDS = 30.0
+DEFAULT_LLM_HEALTH_CHECK_INTERVAL = 30.0 # Seconds between background health checks when several endpoints are configured
+DEFAULT_LLM_ROUTING = "latency" # "latency" (latency-aware least-outstanding) or "least_outstanding"
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class LLMConfigurationError(Exception):
+    '''Raised internally when no configured endpoint can build a request; error_text is the "# ERROR: ..." string.'''
+    def __init__(self, error_text: str):
+        super().__init__(error_text)
+        self.error_text = error_text
+
+class LLMStreamError(Exception):
+    '''
+    Raised by LLMApiClient.stream_code when a streaming request fails or stalls.
+    error_text carries the same "# ERROR: ..." string generate_code would have returned.
+    '''
+    def __init__(self, error_text: str):
+        super().__init__(error_text)
+        self.error_text = error_text
+
+class LLMCompletionCache:
+    '''
+    Persistent, content-addressed cache of LLM completions, stored in a SQLite file.
+    Keys are a SHA-256 of (endpoint, model, max_tokens, prompt). Entries expire after ttl_seconds and the
+    least recently used ones are evicted once max_entries or max_bytes is exceeded.
+    '''
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None, max_bytes: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.path = path or os.getenv("LLM_CACHE_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.sqlite3")
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("LLM_CACHE_MAX_ENTRIES") or DEFAULT_LLM_CACHE_MAX_ENTRIES)
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("LLM_CACHE_MAX_BYTES") or DEFAULT_LLM_CACHE_MAX_BYTES)
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("LLM_CACHE_TTL_SECONDS") or DEFAULT_LLM_CACHE_TTL_SECONDS)
+
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "expired": 0, "evictions": 0}
+        cache_dir = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False) # Access is serialized by self._lock
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                "key TEXT PRIMARY KEY, completion TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS completions_last_access ON completions(last_access)")
+        logger.info(f"LLMCompletionCache: Using cache file {self.path} (max {self.max_entries} entries / {self.max_bytes} bytes, TTL {self.ttl_seconds}s).")
+
+    @staticmethod
+    def make_key(endpoint: str, model: str, max_tokens: int, prompt: str) -> str:
+        key_material = json.dumps([endpoint, model or "", max_tokens, prompt], ensure_ascii=False)
+        return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT completion, created_at FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            completion, created_at = row
+            with self._conn:
+                if now - created_at > self.ttl_seconds:
+                    self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                    self._stats["expired"] += 1
+                    self._stats["misses"] += 1
+                    return None
+                self._conn.execute("UPDATE completions SET last_access = ? WHERE key = ?", (now, key))
+            self._stats["hits"] += 1
+            return completion
+
+    def put(self, key: str, completion: str):
+        if completion is None or completion.startswith("# ERROR:"): # Failures are never cached
+            return
+        now = time.time()
+        size = len(completion.encode("utf-8"))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, completion, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, completion, size, now, now)
+            )
+            self._stats["stores"] += 1
+            self._evict()
+
+    def _evict(self):
+        # Caller holds self._lock inside a transaction
+        count, total_bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions").fetchone()
+        if count <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM completions ORDER BY last_access ASC").fetchall():
+            if count <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+            count -= 1
+            total_bytes -= size
+            self._stats["evictions"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total_bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions").fetchone()
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats.update({"entries": count, "bytes": total_bytes, "hit_rate": (stats["hits"] / lookups) if lookups else 0.0})
+        return stats
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM completions")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class LLMCircuitOpenError(requests.exceptions.RequestException):
+    '''Raised instead of sending a request while an endpoint's circuit breaker is open.'''
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    '''Parses a Retry-After header (delta-seconds or HTTP-date) into seconds to wait.'''
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+class AdaptiveRateLimiter:
+    '''
+    Token bucket whose refill rate adapts to the endpoint (AIMD): throttling halves the rate and honours
+    Retry-After by pausing the bucket, other errors shave the rate, and successes add it back step by step.
+    '''
+    def __init__(self, rate: float, burst: Optional[float] = None, min_rate: float = 0.1):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        '''Blocks until a request may be sent. Returns False if that would be after the monotonic deadline.'''
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def record_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+    def record_throttle(self, retry_after: Optional[float] = None):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * 0.5)
+            self._tokens = 0.0
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+
+    def record_error(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * 0.8)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"rate": self.rate, "max_rate": self.max_rate, "paused_for": max(self._paused_until - time.monotonic(), 0.0)}
+
+class CircuitBreaker:
+    '''
+    Per-endpoint circuit breaker. After failure_threshold consecutive failures the circuit opens and calls
+    fail fast for reset_timeout seconds; then a single probe request is let through (half-open) to decide
+    whether to close it again.
+    '''
+    def __init__(self, failure_threshold: int = DEFAULT_LLM_CIRCUIT_FAILURE_THRESHOLD, reset_timeout: float = DEFAULT_LLM_CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._probe_in_flight = False
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def cancel_probe(self):
+        '''Gives up the half-open probe slot without an outcome (the request was never sent), so the next request probes.'''
+        with self._lock:
+            if self.state == "half_open":
+                self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            if self.state == "half_open" or self._consecutive_failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(f"CircuitBreaker: Opening circuit after {self._consecutive_failures} consecutive failures; failing fast for {self.reset_timeout}s.")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+class SingleFlight:
+    '''
+    Collapses concurrent calls that share a key into one execution.
+    The first caller for a key runs the function; callers arriving while it is still running wait for
+    and share its result (or exception) instead of repeating the work.
+    '''
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._stats = {"executed": 0, "coalesced": 0}
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            future = self._in_flight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self._in_flight[key] = Future()
+                self._stats["executed"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._in_flight))
+
+class LLMEndpoint:
+    '''
+    One LLM backend in an LLMApiClient pool: URL, routing weight, optional model override,
+    and the live counters used for routing and reporting (outstanding requests, latency EWMA, errors, health).
+    '''
+    def __init__(self, url: str, weight: float = 1.0, model: Optional[str] = None):
+        self.url = url
+        self.weight = weight if weight and weight > 0 else 1.0
+        self.model = model or None
+        self.is_ollama_like = bool(url) and ("ollama" in url.lower() or "localhost:11434" in url)
+        self.healthy = True
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.latency_ewma = None # Seconds; None until the first response
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_spec(cls, spec) -> "LLMEndpoint":
+        '''Accepts an LLMEndpoint, a dict with url/weight/model, or a "url|weight|model" string.'''
+        if isinstance(spec, LLMEndpoint):
+            return spec
+        if isinstance(spec, dict):
+            return cls(spec["url"], float(spec.get("weight") or 1.0), spec.get("model"))
+        parts = [part.strip() for part in str(spec).split("|")]
+        weight = float(parts[1]) if len(parts) > 1 and parts[1] else 1.0
+        model = parts[2] if len(parts) > 2 and parts[2] else None
+        return cls(parts[0], weight, model)
+
+    def acquire(self):
+        with self._lock:
+            self.outstanding += 1
+
+    def release(self):
+        with self._lock:
+            self.outstanding = max(self.outstanding - 1, 0)
+
+    def record(self, latency: Optional[float], ok: bool):
+        with self._lock:
+            self.requests += 1
+            if ok:
+                self.consecutive_failures = 0
+            else:
+                self.failures += 1
+                self.consecutive_failures += 1
+            if latency is not None:
+                self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+
+    def score(self, routing: str) -> float:
+        '''Lower is better. Endpoints without a latency sample score 0 under "latency" so they get probed.'''
+        with self._lock:
+            load = self.outstanding + 1
+            if routing == "least_outstanding":
+                return load / self.weight
+            return load * (self.latency_ewma or 0.0) / self.weight
+
+    def health_url(self) -> str:
+        if self.is_ollama_like:
+            for suffix in ("/api/generate", "/api/chat"):
+                if self.url.endswith(suffix):
+                    return self.url[:-len(suffix)] + "/api/tags"
+            return self.url.rstrip('/') + "/api/tags"
+        return self.url
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "url": self.url,
+                "weight": self.weight,
+                "model": self.model,
+                "healthy": self.healthy,
+                "outstanding": self.outstanding,
+                "requests": self.requests,
+                "failures": self.failures,
+                "error_rate": (self.failures / self.requests) if self.requests else 0.0,
+                "latency_ewma_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None
+            }
+
 class LLMApiClient:
-    def __init__(self, api_key: str ="", endpoint: str="" , ollama_model_name: str = ""):
+    def __init__(self, api_key: str ="", endpoint: str="" , ollama_model_name: str = "", pool_size: Optional[int] = None, cache: Optional[LLMCompletionCache] = None, coalesce_requests: bool = True,
+                 endpoints: Optional[list] = None, routing: Optional[str] = None, health_check_interval: Optional[float] = None):
         env_api_key = os.getenv("LLM_API_KEY")
         env_endpoint = os.getenv("LLM_API_ENDPOINT")
+        env_endpoints = os.getenv("LLM_API_ENDPOINTS") # Comma-separated "url|weight|model" entries
         env_ollama_model = os.getenv("OLLAMA_MODEL")
+        env_pool_size = os.getenv("LLM_POOL_SIZE")
+        env_cache_path = os.getenv("LLM_CACHE_PATH")
 
         self.api_key = api_key if api_key is not None else env_api_key
         self.endpoint = endpoint if endpoint is not None else env_endpoint
         self.ollama_model = ollama_model_name if ollama_model_name is not None else env_ollama_model
+        if endpoints is None and not self.endpoint and env_endpoints:
+            endpoints = [spec for spec in env_endpoints.split(",") if spec.strip()]
+        if endpoints:
+            # Several backends: requests are spread across them and fail over between them.
+            self.endpoints = [LLMEndpoint.from_spec(spec) for spec in endpoints]
+            self.endpoint = self.endpoints[0].url # Primary endpoint, kept for single-endpoint code paths and logging
+        self.routing = routing or os.getenv("LLM_ROUTING") or DEFAULT_LLM_ROUTING
+        self.pool_size = pool_size if pool_size is not None else int(env_pool_size or DEFAULT_LLM_POOL_SIZE)
+        # The completion cache is opt-in: pass one explicitly or set LLM_CACHE_PATH.
+        self.cache = cache if cache is not None else (LLMCompletionCache(env_cache_path) if env_cache_path else None)
+        # Identical prompts issued concurrently (e.g. the same AssemblyInfo.vb in every project) share one upstream call.
+        self._single_flight = SingleFlight() if coalesce_requests else None
+
+        # Retry, rate limiting and circuit breaking, so unattended runs ride out 429/503/timeouts on their own
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES") or DEFAULT_LLM_MAX_RETRIES)
+        self.request_timeout = float(os.getenv("LLM_REQUEST_TIMEOUT") or DEFAULT_LLM_REQUEST_TIMEOUT)
+        self.request_deadline = float(os.getenv("LLM_REQUEST_DEADLINE") or DEFAULT_LLM_REQUEST_DEADLINE)
+        self.backoff_base = float(os.getenv("LLM_BACKOFF_BASE") or DEFAULT_LLM_BACKOFF_BASE)
+        self.backoff_max = float(os.getenv("LLM_BACKOFF_MAX") or DEFAULT_LLM_BACKOFF_MAX)
+        self.rate_limit = float(os.getenv("LLM_RATE_LIMIT") or DEFAULT_LLM_RATE_LIMIT)
+        self.circuit_failure_threshold = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD") or DEFAULT_LLM_CIRCUIT_FAILURE_THRESHOLD)
+        self.circuit_reset_seconds = float(os.getenv("LLM_CIRCUIT_RESET_SECONDS") or DEFAULT_LLM_CIRCUIT_RESET_SECONDS)
+        self._rate_limiters = {}
+        self._circuit_breakers = {}
+        self._resilience_lock = threading.Lock()
+        self._routing_lock = threading.Lock()
+
+        # One pooled, keep-alive session per client so consecutive prompts reuse the TCP/TLS connection
+        # instead of paying a fresh handshake for every file conversion or build-fix request.
+        self._http_adapter = HTTPAdapter(pool_connections=DEFAULT_LLM_POOL_SIZE, pool_maxsize=self.pool_size)
+        self.session = requests.Session()
+        self.session.mount("http://", self._http_adapter)
+        self.session.mount("https://", self._http_adapter)
 
         self.is_ollama_like_endpoint = self.endpoint and \
                                        ("ollama" in self.endpoint.lower() or "localhost:11434" in self.endpoint)
@@ -64,8 +566,10 @@ class LLMApiClient:
             self.endpoint = "MISSING_ENDPOINT" # Mark as missing
         elif self.is_ollama_like_endpoint and not self.ollama_model:
             logger.warning(f"LLMApiClient: Endpoint '{self.endpoint}' appears to be Ollama, but OLLAMA_MODEL environment variable is not set. Will default to 'mistral' if Ollama path is taken in generate_code.")
+        if not endpoints:
+            self.endpoints = [LLMEndpoint(self.endpoint, model=self.ollama_model)]
 
-        if not self.is_ollama_like_endpoint:
+        if any(not e.is_ollama_like for e in self.endpoints):
             if not self.api_key: # API Key is crucial if not Ollama
                 logger.warning("LLMApiClient: API Key for non-Ollama endpoint is not configured. LLM calls might fail or be restricted.")
                 self.api_key = "MISSING_API_KEY" # Mark as missing for clarity in generate_code
@@ -75,10 +579,277 @@ class LLMApiClient:
             logger.info(f"LLMApiClient: Configured for Ollama-like endpoint: {self.endpoint}. Model: {self.ollama_model or '(will use default)'}.")
             if self.api_key and self.api_key != "MISSING_API_KEY": # API key is set but looks like Ollama
                 logger.info("LLMApiClient: API key is set but will be ignored for Ollama calls, as Ollama typically doesn't use Bearer token auth.")
+        if len(self.endpoints) > 1:
+            logger.info(f"LLMApiClient: Balancing across {len(self.endpoints)} endpoints using '{self.routing}' routing: {[e.url for e in self.endpoints]}")
+
+        env_health_interval = os.getenv("LLM_HEALTH_CHECK_INTERVAL")
+        self.health_check_interval = health_check_interval if health_check_interval is not None else float(env_health_interval or DEFAULT_LLM_HEALTH_CHECK_INTERVAL)
+        self._health_stop = threading.Event()
+        self._health_thread = None
+        if len(self.endpoints) > 1 and self.health_check_interval > 0:
+            self._health_thread = threading.Thread(target=self._health_check_loop, name="llm-health-check", daemon=True)
+            self._health_thread.start()
+
+    def connection_stats(self) -> dict:
+        '''
+        Returns connection reuse counters for the pooled session.
+        Counts come from the urllib3 pools that are currently alive (one per endpoint host).
+        '''
+        requests_sent = 0
+        new_connections = 0
+        pools = self._http_adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            requests_sent += pool.num_requests
+            new_connections += pool.num_connections
+        return {
+            "pool_size": self.pool_size,
+            "requests": requests_sent,
+            "new_connections": new_connections,
+            "reused_connections": max(requests_sent - new_connections, 0)
+        }
+
+    def close(self):
+        self._health_stop.set()
+        self.session.close()
+
+    def check_endpoint_health(self):
+        '''
+        Probes every endpoint once (Ollama: GET /api/tags; others: GET on the URL, where any non-5xx answer
+        counts as reachable) and updates its healthy flag. Unhealthy endpoints only get traffic as a last resort.
+        '''
+        for endpoint in self.endpoints:
+            try:
+                response = self.session.get(endpoint.health_url(), timeout=5)
+                healthy = response.status_code < 500
+                response.close()
+            except requests.exceptions.RequestException:
+                healthy = False
+            if healthy != endpoint.healthy:
+                logger.warning(f"LLMApiClient: Endpoint {endpoint.url} is now {'healthy' if healthy else 'unhealthy'}.")
+            endpoint.healthy = healthy
+            if healthy:
+                endpoint.consecutive_failures = 0
+
+    def _health_check_loop(self):
+        while not self._health_stop.wait(self.health_check_interval):
+            self.check_endpoint_health()
+
+    def endpoint_stats(self) -> list:
+        '''Per-endpoint routing, latency and error statistics.'''
+        stats = []
+        for endpoint in self.endpoints:
+            endpoint_stats = endpoint.stats()
+            endpoint_stats["circuit_state"] = self._circuit_breaker_for(endpoint.url).state
+            stats.append(endpoint_stats)
+        return stats
+
+    def _select_endpoint(self, tried: set) -> Optional[LLMEndpoint]:
+        '''
+        Picks the endpoint for the next attempt: healthy endpoints whose circuit is not open and that have not
+        been tried in this round, lowest routing score first (random tie-break so idle endpoints share the load).
+        The chosen endpoint is reserved (acquire()) in the same step, so concurrent callers see each other's load.
+        '''
+        with self._routing_lock:
+            untried = [e for e in self.endpoints if e.url not in tried]
+            preferred = [e for e in untried if e.healthy and self._circuit_breaker_for(e.url).state != "open"]
+            candidates = preferred or untried
+            if not candidates:
+                return None
+            # Endpoints whose last attempt failed go to the back of the queue until they succeed again or pass a health check
+            endpoint = min(candidates, key=lambda e: (e.consecutive_failures > 0, e.score(self.routing), random.random()))
+            endpoint.acquire()
+            return endpoint
+
+    def _cache_identity(self) -> Tuple[str, str]:
+        '''
+        Endpoint and model strings for cache/coalescing keys; a pool is identified by all of its members, and each member
+        by the model it actually uses (its override, else the client's model).
+        '''
+        return "|".join(e.url for e in self.endpoints), "|".join(e.model or self.ollama_model or "" for e in self.endpoints)
+
+    def model_identity(self) -> str:
+        '''The model (or pool of models) this client generates with, for recording which model produced an output.'''
+        return self._cache_identity()[1] or ""
 
     @log_error
     def generate_code(self, prompt: str, max_tokens: int = 2048) -> str: # Increased default max_tokens
-        if not self.endpoint or self.endpoint == "MISSING_ENDPOINT":
+        if self.cache is None and self._single_flight is None:
+            return self._request_completion(prompt, max_tokens)
+
+        request_key = LLMCompletionCache.make_key(*self._cache_identity(), max_tokens, prompt)
+        if self.cache is not None:
+            cached_text = self.cache.get(request_key)
+            if cached_text is not None:
+                llm_interaction_logger.info(f"LLM Cache - Hit for key {request_key[:16]}")
+                return cached_text
+
+        if self._single_flight is None:
+            return self._request_and_cache(request_key, prompt, max_tokens)
+        return self._single_flight.do(request_key, self._request_and_cache, request_key, prompt, max_tokens)
+
+    def _request_and_cache(self, request_key: str, prompt: str, max_tokens: int) -> str:
+        generated_text = self._request_completion(prompt, max_tokens)
+        if self.cache is not None:
+            self.cache.put(request_key, generated_text) # put() skips "# ERROR:" responses
+        return generated_text
+
+    def coalescing_stats(self) -> dict:
+        '''Upstream calls made versus calls saved by sharing an identical in-flight request.'''
+        if self._single_flight is None:
+            return {"executed": 0, "coalesced": 0, "in_flight": 0}
+        return self._single_flight.stats()
+
+    def _rate_limiter_for(self, endpoint: str) -> AdaptiveRateLimiter:
+        with self._resilience_lock:
+            if endpoint not in self._rate_limiters:
+                self._rate_limiters[endpoint] = AdaptiveRateLimiter(self.rate_limit, burst=max(self.pool_size, 1))
+            return self._rate_limiters[endpoint]
+
+    def _circuit_breaker_for(self, endpoint: str) -> CircuitBreaker:
+        with self._resilience_lock:
+            if endpoint not in self._circuit_breakers:
+                self._circuit_breakers[endpoint] = CircuitBreaker(self.circuit_failure_threshold, self.circuit_reset_seconds)
+            return self._circuit_breakers[endpoint]
+
+    def resilience_stats(self) -> dict:
+        with self._resilience_lock:
+            endpoints = set(self._rate_limiters) | set(self._circuit_breakers)
+            return {
+                endpoint: {
+                    "circuit_state": self._circuit_breakers[endpoint].state if endpoint in self._circuit_breakers else "closed",
+                    **(self._rate_limiters[endpoint].stats() if endpoint in self._rate_limiters else {})
+                }
+                for endpoint in endpoints
+            }
+
+    def _backoff_delay(self, attempt: int) -> float:
+        # Full jitter: uniform in [0, min(cap, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _post_with_retries(self, prompt: str, max_tokens: int, stream: bool = False, timeout: Optional[float] = None):
+        '''
+        Sends the prompt to the best available endpoint through its rate limiter and circuit breaker.
+        Timeouts, connection errors and retryable statuses (429/5xx) fail over to the next untried endpoint
+        straight away; once every endpoint has been tried, the round is retried with jittered exponential
+        backoff until max_retries or request_deadline is reached.
+        Returns (response, endpoint, actual_endpoint). For streams the caller must release() the endpoint.
+        Raises the last requests exception, LLMCircuitOpenError, or LLMConfigurationError.
+        '''
+        timeout = timeout if timeout is not None else self.request_timeout
+        deadline = time.monotonic() + self.request_deadline
+        attempt = 0
+        tried = set()
+        sent_this_round = False
+        last_error = None
+        retry_after = None
+        configuration_error = None
+        circuit_open_error = None
+        while True:
+            endpoint = self._select_endpoint(tried)
+            if endpoint is None: # Every endpoint was tried this round: back off, then start a new round
+                if not sent_this_round: # Nothing could be sent at all: fail fast
+                    if circuit_open_error is not None:
+                        raise circuit_open_error
+                    raise LLMConfigurationError(configuration_error)
+                if attempt >= self.max_retries:
+                    raise last_error
+                delay = max(self._backoff_delay(attempt), retry_after or 0.0)
+                if time.monotonic() + delay >= deadline:
+                    raise last_error
+                attempt += 1
+                logger.warning(f"LLMApiClient: Attempt {attempt} failed on all endpoints ({last_error}). Retrying in {delay:.2f}s.")
+                llm_interaction_logger.warning(f"LLM Retry - Attempt {attempt} failed: {last_error}. Backing off {delay:.2f}s.")
+                time.sleep(delay)
+                tried.clear()
+                sent_this_round = False
+                retry_after = None
+                continue
+            tried.add(endpoint.url)
+
+            request = self._build_request(prompt, max_tokens, stream=stream, endpoint=endpoint)
+            if isinstance(request, str):
+                endpoint.release()
+                configuration_error = request
+                continue
+            actual_endpoint, headers, payload = request
+
+            breaker = self._circuit_breaker_for(endpoint.url)
+            if not breaker.allow_request():
+                endpoint.release()
+                circuit_open_error = LLMCircuitOpenError(f"Circuit breaker is open for {endpoint.url}; failing fast.")
+                continue
+            limiter = self._rate_limiter_for(endpoint.url)
+            if not limiter.acquire(deadline):
+                endpoint.release()
+                breaker.cancel_probe() # The deadline ran out, not the endpoint
+                raise requests.exceptions.Timeout(f"Request deadline of {self.request_deadline}s reached while waiting for the rate limiter.")
+
+            sent_this_round = True
+            response = None
+            release_endpoint = True # Except for a successful stream, which the caller releases
+            outcome_recorded = False
+            started = time.monotonic()
+            try:
+                try:
+                    response = self.session.post(
+                        actual_endpoint, # Use actual_endpoint which might be adjusted for /api/generate
+                        headers=headers,
+                        json=payload,
+                        stream=stream,
+                        timeout=max(min(timeout, deadline - time.monotonic()), 0.001)
+                    )
+                except requests.exceptions.RequestException as e:
+                    endpoint.record(None, ok=False)
+                    breaker.record_failure()
+                    limiter.record_error()
+                    outcome_recorded = True
+                    if not isinstance(e, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+                        raise # Not transient (e.g. an invalid URL): raised to the caller as-is
+                    last_error = e
+                else:
+                    endpoint.record(time.monotonic() - started, ok=response.ok)
+                    if response.status_code not in RETRYABLE_STATUS_CODES:
+                        breaker.record_success()
+                        limiter.record_success()
+                        outcome_recorded = True
+                        release_endpoint = not stream or not response.ok
+                        response.raise_for_status() # Non-retryable 4xx is raised to the caller as-is
+                        return response, endpoint, actual_endpoint
+                    endpoint_retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    retry_after = max(retry_after or 0.0, endpoint_retry_after or 0.0) or None
+                    if response.status_code in (429, 503):
+                        limiter.record_throttle(endpoint_retry_after)
+                    else:
+                        limiter.record_error()
+                    if response.status_code != 429: # A 429 means the endpoint is up, just busy
+                        breaker.record_failure()
+                    else:
+                        breaker.cancel_probe()
+                    outcome_recorded = True
+                    try:
+                        response.raise_for_status()
+                    except requests.exceptions.HTTPError as e:
+                        last_error = e
+                    response.close() # Release the connection back to the pool before retrying
+            finally:
+                if release_endpoint:
+                    endpoint.release()
+                if not outcome_recorded: # Interrupted before the endpoint answered: free the probe slot
+                    breaker.cancel_probe()
+
+            if len(self.endpoints) > 1:
+                logger.warning(f"LLMApiClient: Request to {endpoint.url} failed ({last_error}); failing over to the next endpoint.")
+
+    def _build_request(self, prompt: str, max_tokens: int, stream: bool = False, endpoint: Optional[LLMEndpoint] = None):
+        '''
+        Returns (actual_endpoint, headers, payload) for the given endpoint (default: the primary one),
+        or an "# ERROR: ..." string if the client is not configured for the call.
+        '''
+        endpoint = endpoint or self.endpoints[0]
+        if not endpoint.url or endpoint.url == "MISSING_ENDPOINT":
             error_msg = "LLMApiClient: Cannot make LLM call. API endpoint is not configured."
             logger.error(error_msg)
             llm_interaction_logger.error(error_msg)
@@ -86,18 +857,18 @@ class LLMApiClient:
 
         headers = {}
         payload = {}
-        actual_endpoint = self.endpoint
+        actual_endpoint = endpoint.url
 
-        llm_interaction_logger.info(f"LLM Request - Endpoint: {actual_endpoint}")
-        llm_interaction_logger.debug(f"LLM Request - Prompt (first 300 chars): {prompt[:300]}")
+        llm_interaction_logger.info("LLM Request - Endpoint: %s", actual_endpoint)
+        llm_interaction_logger.debug("LLM Request - Prompt (first 300 chars): %.300s", prompt)
 
-        if self.is_ollama_like_endpoint:
+        if endpoint.is_ollama_like:
             logger.info("LLMApiClient: Using Ollama-specific request structure.")
             llm_interaction_logger.info("LLM Request Type: Ollama")
 
             headers = {"Content-Type": "application/json"}
 
-            current_ollama_model = self.ollama_model
+            current_ollama_model = endpoint.model or self.ollama_model
             if not current_ollama_model:
                 current_ollama_model = "mistral"
                 logger.warning(f"LLMApiClient: OLLAMA_MODEL not set, defaulting to '{current_ollama_model}' for Ollama request.")
@@ -108,7 +879,7 @@ class LLMApiClient:
                 payload = {
                     "model": current_ollama_model,
                     "messages": [{"role": "user", "content": prompt}], # Chat completions format
-                    "stream": False
+                    "stream": stream
                 }
                 # Ollama's /api/chat doesn't use num_predict directly in options for max_tokens.
                 # It's more about the model's context window or specific chat parameters.
@@ -118,7 +889,7 @@ class LLMApiClient:
                 payload = {
                     "model": current_ollama_model,
                     "prompt": prompt,
-                    "stream": False
+                    "stream": stream
                 }
                 if max_tokens > 0: # Ollama uses num_predict in options for max output tokens for /generate
                     payload.setdefault("options", {})["num_predict"] = max_tokens
@@ -143,34 +914,25 @@ class LLMApiClient:
                 # Some APIs might require a "model" field here too, e.g. OpenAI
                 # "model": "gpt-3.5-turbo-instruct" # Example for OpenAI completions
             }
+            if stream:
+                payload["stream"] = True
 
-        try:
-            payload_str = json.dumps(payload)
-            llm_interaction_logger.debug(f"LLM Request - Payload: {payload_str}")
-        except Exception as e:
-            llm_interaction_logger.error(f"LLM Request - Failed to serialize payload for logging: {e}")
-        llm_interaction_logger.debug(f"LLM Request - Headers: {headers}")
+        if llm_interaction_logger.isEnabledFor(logging.DEBUG):
+            llm_interaction_logger.debug("LLM Request - Payload: %s", _LazyJSON(payload))
+            llm_interaction_logger.debug("LLM Request - Headers: %s", headers)
+        return actual_endpoint, headers, payload
+
+    def _request_completion(self, prompt: str, max_tokens: int) -> str:
         response = any
         try:
-            response = requests.post(
-                actual_endpoint, # Use actual_endpoint which might be adjusted for /api/generate
-                headers=headers,
-                json=payload,
-                timeout=180  # Increased timeout further for local LLMs
-            )
-            response.raise_for_status()
+            response, endpoint, actual_endpoint = self._post_with_retries(prompt, max_tokens)
             response_json = response.json()
 
-            llm_interaction_logger.info(f"LLM Response - Success (Status: {response.status_code})")
-            try:
-                response_json_str = json.dumps(response_json)
-                llm_interaction_logger.debug(f"LLM Response - Full JSON: {response_json_str}")
-            except Exception as e:
-                llm_interaction_logger.error(f"LLM Response - Failed to serialize successful JSON response for logging: {e}")
-                llm_interaction_logger.debug(f"LLM Response - Raw Text (if serialization failed): {response.text}")
+            llm_interaction_logger.info("LLM Response - Success (Status: %s)", response.status_code)
+            llm_interaction_logger.debug("LLM Response - Full JSON: %s", _LazyJSON(response_json))
 
             generated_text = any
-            if self.is_ollama_like_endpoint:
+            if endpoint.is_ollama_like:
                 if actual_endpoint.endswith("/api/chat"): # Ollama chat response
                     if "message" in response_json and "content" in response_json["message"]:
                         generated_text = response_json["message"]["content"]
@@ -195,22 +957,28 @@ class LLMApiClient:
                      generated_text = response_json["results"][0]["outputText"]
 
             if generated_text is None:
-                log_msg_detail = "Ollama path failed." if self.is_ollama_like_endpoint else "Generic path failed."
+                log_msg_detail = "Ollama path failed." if endpoint.is_ollama_like else "Generic path failed."
                 logger.error(f"LLMApiClient: Could not extract text from LLM response. {log_msg_detail} Response keys: {response_json.keys()}")
                 llm_interaction_logger.error(f"LLM Response - Text extraction failed. {log_msg_detail} Keys: {response_json.keys()}. Full JSON logged at DEBUG.")
                 return f"# ERROR: LLM_RESPONSE_PARSE_FAILED. Unknown response structure. JSON: {str(response_json)[:200]}"
 
             logger.info(f"LLMApiClient: Successfully received and parsed response. Output (first 100 chars): {str(generated_text)[:100]}") # Ensure generated_text is str
-            llm_interaction_logger.debug(f"LLM Response - Extracted text (first 100 chars): {str(generated_text)[:100]}")
+            llm_interaction_logger.debug("LLM Response - Extracted text (first 100 chars): %.100s", generated_text)
             return str(generated_text) # Ensure it's a string
 
+        except LLMConfigurationError as e:
+            return e.error_text
+        except LLMCircuitOpenError as e:
+            logger.error(f"LLMApiClient: {e}")
+            llm_interaction_logger.error(f"LLM Error - {e}")
+            return f"# ERROR: LLM_CIRCUIT_OPEN. {e}"
         except requests.exceptions.Timeout as e:
             error_message = f"Timeout: {e}"
             logger.error(f"LLMApiClient: API request timed out: {error_message}")
             llm_interaction_logger.error(f"LLM Error - {error_message}")
             return f"# ERROR: LLM_API_CALL_FAILED. {error_message}"
         except requests.exceptions.RequestException as e:
-            response_text = e.response.text if e.response else "No response body"
+            response_text = e.response.text if e.response is not None else "No response body"
             error_message = f"RequestException: {e}"
             logger.error(f"LLMApiClient: API request failed: {error_message}. Response body: {response_text}")
             llm_interaction_logger.error(f"LLM Error - {error_message}. Response: {response_text}")
@@ -227,6 +995,182 @@ class LLMApiClient:
             llm_interaction_logger.error(f"LLM Error - {error_message}", exc_info=True)
             return f"# ERROR: LLM_UNEXPECTED_ERROR. {error_message}"
 
+    def stream_code(self, prompt: str, max_tokens: int = 2048, stall_timeout: Optional[float] = None) -> Iterator[str]:
+        '''
+        Yields generated text chunks as the endpoint produces them (Ollama /api/generate and /api/chat NDJSON,
+        or "data: {...}" server-sent events with "choices"). Nothing is buffered or logged per chunk.
+        Raises LLMStreamError if the request fails or no token arrives for stall_timeout seconds.
+        '''
+        if stall_timeout is None:
+            stall_timeout = float(os.getenv("LLM_STREAM_STALL_TIMEOUT") or DEFAULT_LLM_STREAM_STALL_TIMEOUT)
+
+        request_key = None
+        if self.cache is not None:
+            request_key = LLMCompletionCache.make_key(*self._cache_identity(), max_tokens, prompt)
+            cached_text = self.cache.get(request_key)
+            if cached_text is not None:
+                llm_interaction_logger.info(f"LLM Cache - Hit for key {request_key[:16]} (stream)")
+                yield cached_text
+                return
+
+        collected_chunks = [] if self.cache is not None else None # Only kept when the result will be cached
+        total_chars = 0
+        endpoint = None
+        try:
+            # The read timeout doubles as a socket-level stall detector; the token clock below also catches
+            # endpoints that keep the connection busy (keep-alive comments, empty events) without producing text.
+            response, endpoint, actual_endpoint = self._post_with_retries(prompt, max_tokens, stream=True, timeout=stall_timeout)
+            with response:
+                llm_interaction_logger.info(f"LLM Stream - Started (Status: {response.status_code})")
+                last_token_at = time.monotonic()
+                for raw_line in response.iter_lines(chunk_size=None): # chunk_size=None hands over each transfer chunk as soon as it arrives
+                    if time.monotonic() - last_token_at > stall_timeout:
+                        raise LLMStreamError(f"# ERROR: LLM_STREAM_STALLED. No tokens received for {stall_timeout}s from {actual_endpoint}.")
+                    if not raw_line:
+                        continue
+                    text, done = self._parse_stream_line(raw_line.decode("utf-8") if isinstance(raw_line, bytes) else raw_line, endpoint, actual_endpoint)
+                    if text:
+                        last_token_at = time.monotonic()
+                        total_chars += len(text)
+                        if collected_chunks is not None:
+                            collected_chunks.append(text)
+                        yield text
+                    if done:
+                        break
+        except LLMConfigurationError as e:
+            raise LLMStreamError(e.error_text) from e
+        except LLMStreamError as e:
+            logger.error(f"LLMApiClient: {e.error_text}")
+            llm_interaction_logger.error(f"LLM Stream Error - {e.error_text}")
+            raise
+        except LLMCircuitOpenError as e:
+            error_text = f"# ERROR: LLM_CIRCUIT_OPEN. {e}"
+            logger.error(f"LLMApiClient: {e}")
+            llm_interaction_logger.error(f"LLM Stream Error - {error_text}")
+            raise LLMStreamError(error_text) from e
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            # requests reports a read timeout in the middle of iter_lines() as a ConnectionError
+            error_text = f"# ERROR: LLM_STREAM_STALLED. {e}"
+            logger.error(f"LLMApiClient: Streaming request stalled or lost its connection: {e}")
+            llm_interaction_logger.error(f"LLM Stream Error - {error_text}")
+            raise LLMStreamError(error_text) from e
+        except requests.exceptions.RequestException as e:
+            error_text = f"# ERROR: LLM_API_CALL_FAILED. RequestException: {e}"
+            logger.error(f"LLMApiClient: Streaming request failed: {e}")
+            llm_interaction_logger.error(f"LLM Stream Error - {error_text}")
+            raise LLMStreamError(error_text) from e
+        finally:
+            if endpoint is not None:
+                endpoint.release()
+
+        llm_interaction_logger.info(f"LLM Stream - Completed ({total_chars} chars)")
+        if collected_chunks is not None:
+            self.cache.put(request_key, "".join(collected_chunks))
+
+    def _parse_stream_line(self, line: str, endpoint: LLMEndpoint, actual_endpoint: str) -> Tuple[str, bool]:
+        '''Returns (text, done) for one line of a streamed response.'''
+        if line.startswith(":") or line.startswith("event:"): # SSE comments/keep-alives and event names
+            return "", False
+        if line.startswith("data:"):
+            line = line[len("data:"):].strip()
+            if line == "[DONE]":
+                return "", True
+        try:
+            event = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise LLMStreamError(f"# ERROR: LLM_RESPONSE_PARSE_FAILED. Invalid stream line: {line[:200]}") from e
+
+        if "error" in event:
+            raise LLMStreamError(f"# ERROR: LLM_API_CALL_FAILED. Stream error: {event['error']}")
+
+        if endpoint.is_ollama_like:
+            if actual_endpoint.endswith("/api/chat"):
+                text = (event.get("message") or {}).get("content") or ""
+            else:
+                text = event.get("response") or ""
+            return text, bool(event.get("done"))
+
+        choices = event.get("choices")
+        if isinstance(choices, list) and len(choices) > 0:
+            choice = choices[0]
+            text = (choice.get("delta") or {}).get("content") or choice.get("text") or ""
+            return text, False
+        return event.get("text") or event.get("generated_text") or "", bool(event.get("done"))
+
+_shared_llm_client = None
+_shared_llm_client_lock = threading.Lock()
+
+def get_shared_llm_client() -> LLMApiClient:
+    '''
+    Returns the process-wide default LLMApiClient (and its connection pool).
+    Tools that are not handed an explicit client use this one, so they all share the same keep-alive session.
+    '''
+    global _shared_llm_client
+    with _shared_llm_client_lock:
+        if _shared_llm_client is None:
+            _shared_llm_client = LLMApiClient()
+        return _shared_llm_client
+
+def run_coroutine_sync(coro):
+    '''
+    Runs a coroutine to completion from synchronous code.
+    If the calling thread already has a running event loop (e.g. inside an async crew), the coroutine
+    is run on a fresh loop in a helper thread instead of failing with "event loop is already running".
+    '''
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as helper:
+        return helper.submit(asyncio.run, coro).result()
+
+class AsyncLLMApiClient:
+    '''
+    Asyncio front-end for LLMApiClient with a bounded number of in-flight requests.
+    Each request still goes through LLMApiClient.generate_code (same payloads, parsing, logging and pooled
+    session), run on a dedicated worker thread; the semaphore caps how many are outstanding at once.
+    '''
+    def __init__(self, llm_client: Optional[LLMApiClient] = None, max_concurrency: Optional[int] = None):
+        env_max_concurrency = os.getenv("LLM_MAX_CONCURRENCY")
+        self.llm_client = llm_client if llm_client is not None else get_shared_llm_client()
+        self.max_concurrency = max_concurrency if max_concurrency is not None else int(env_max_concurrency or DEFAULT_LLM_MAX_CONCURRENCY)
+        if self.max_concurrency < 1:
+            raise ValueError(f"AsyncLLMApiClient: max_concurrency must be at least 1, got {self.max_concurrency}")
+        if self.max_concurrency > self.llm_client.pool_size:
+            logger.warning(f"AsyncLLMApiClient: max_concurrency ({self.max_concurrency}) exceeds the client pool size ({self.llm_client.pool_size}). Extra connections will not be kept alive; consider raising LLM_POOL_SIZE.")
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="llm-request")
+        self._semaphores = {} # asyncio.Semaphore is bound to one event loop, so keep one per loop
+        self._semaphores_lock = threading.Lock()
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._semaphores_lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                # Drop semaphores of loops that have finished (e.g. previous run_coroutine_sync calls)
+                self._semaphores = {l: sem for l, sem in self._semaphores.items() if not l.is_closed()}
+                semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+            return semaphore
+
+    async def agenerate_code(self, prompt: str, max_tokens: int = 2048) -> str:
+        async with self._get_semaphore():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self.llm_client.generate_code, prompt, max_tokens)
+
+    async def agenerate_many(self, prompts: Iterable[str], max_tokens: int = 2048) -> List[str]:
+        '''Sends all prompts concurrently (bounded by max_concurrency); results keep the input order.'''
+        return list(await asyncio.gather(*(self.agenerate_code(prompt, max_tokens) for prompt in prompts)))
+
+    def generate_code(self, prompt: str, max_tokens: int = 2048) -> str:
+        return run_coroutine_sync(self.agenerate_code(prompt, max_tokens))
+
+    def generate_many(self, prompts: Iterable[str], max_tokens: int = 2048) -> List[str]:
+        return run_coroutine_sync(self.agenerate_many(prompts, max_tokens))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
 class HumanFeedback:
     @staticmethod
     @log_error
@@ -289,6 +1233,7 @@ if __name__ == '__main__':
 
     env_output = llm_client_env.generate_code(test_prompt, max_tokens=50) # Short max_tokens for testing
     print(f"LLM Output (env client for '{test_prompt[:30]}...'):\n{env_output}")
+    print(f"LLM Client connection stats: {llm_client_env.connection_stats()}")
 
     # Test HumanFeedback (will require manual input)
     # print("\n--- Testing HumanFeedback (requires manual input) ---")
@@ -0,0 +1,605 @@
+import os
+import re
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterable, List, Optional, Set
+
+from .core_components import logger
+from .nuget_metadata import parse_framework, version_key
+from .project_model import ProjectModel, PACKAGES_CONFIG
+
+# Deterministic project file upgrades, so most projects never reach the LLM. rewrite_project() converts old-style
+# (non-SDK) projects to SDK style, rewrites TargetFramework(s), drops Compile/EmbeddedResource/None items that the SDK
+# default globs already include, and migrates packages.config to PackageReference items (raising versions from a
+# mapping table and dropping packages that ship with .NET). SDK-style projects are edited in place, textually, so their
+# formatting and comments survive. Constructs the rules cannot translate faithfully (web application projects, Choose
+# blocks, wildcard items, framework assemblies without a .NET equivalent) are listed in RewriteResult.unsupported; the
+# caller then asks the LLM to finish the draft. The same input always produces the same output.
+
+SDK_PROJECT = "Microsoft.NET.Sdk"
+WINDOWS_DESKTOP_SDK = "Microsoft.NET.Sdk.WindowsDesktop"
+TEST_SDK_PACKAGE = ("Microsoft.NET.Test.Sdk", "17.8.0")
+
+_COMPILE_EXTENSIONS = {".csproj": ".cs", ".vbproj": ".vb"}
+
+_WEB_PROJECT_TYPES = {"{349c5851-65df-11da-9384-00065b846f21}", "{e24c65dc-7377-472b-9aba-bc803b73c61a}"}
+_WPF_PROJECT_TYPE = "{60dc8134-eba5-43b8-bcc9-bb4bc16c2548}"
+
+# Package id (lower case) -> lowest version that supports .NET Standard 2.0 / .NET (Core). Older versions pinned in
+# packages.config are raised to these when a project moves to .NET 5+; pass package_versions to add or override entries.
+PACKAGE_VERSION_MAP = {
+    "automapper": "10.1.1",
+    "autofac": "6.5.0",
+    "castle.core": "5.1.1",
+    "dapper": "2.0.123",
+    "entityframework": "6.4.4",
+    "fluentassertions": "6.12.0",
+    "htmlagilitypack": "1.11.46",
+    "log4net": "2.0.15",
+    "microsoft.aspnet.webapi.client": "5.2.9",
+    "moq": "4.18.4",
+    "mstest.testadapter": "2.2.10",
+    "mstest.testframework": "2.2.10",
+    "newtonsoft.json": "13.0.3",
+    "nlog": "5.2.8",
+    "nunit": "3.13.3",
+    "nunit3testadapter": "4.5.0",
+    "serilog": "2.12.0",
+    "unity": "5.11.10",
+    "xunit": "2.4.2",
+    "xunit.runner.visualstudio": "2.4.5",
+}
+
+# Packages whose functionality ships with .NET 5+ or its SDK; dropped when migrating to a .NET (Core) target
+INBOX_PACKAGES = frozenset({
+    "microsoft.bcl.build", "microsoft.codedom.providers.dotnetcompilerplatform", "microsoft.net.compilers",
+    "microsoft.net.compilers.toolset", "microsoft.netframework.referenceassemblies", "system.net.http",
+    "system.runtime.interopservices.runtimeinformation", "system.valuetuple",
+})
+
+TEST_ADAPTER_PACKAGES = frozenset({"mstest.testadapter", "nunit3testadapter", "xunit.runner.visualstudio"})
+
+# Assemblies an SDK-style project targeting .NET Framework references implicitly
+IMPLICIT_FRAMEWORK_REFERENCES = frozenset({
+    "mscorlib", "system", "system.core", "system.data", "system.drawing", "system.io.compression.filesystem",
+    "system.numerics", "system.runtime.serialization", "system.xml", "system.xml.linq",
+})
+
+# .NET Framework assemblies that are part of the .NET 5+ shared framework
+NET_SHARED_FRAMEWORK_REFERENCES = frozenset({
+    "mscorlib", "netstandard", "microsoft.csharp", "microsoft.visualbasic", "system", "system.componentmodel.dataannotations",
+    "system.core", "system.data", "system.data.datasetextensions", "system.io.compression", "system.io.compression.filesystem",
+    "system.net.http", "system.numerics", "system.runtime.serialization", "system.transactions", "system.xml", "system.xml.linq",
+})
+
+WINDOWS_FORMS_REFERENCES = frozenset({"system.windows.forms", "system.design", "system.drawing.design"})
+WPF_REFERENCES = frozenset({"presentationcore", "presentationframework", "windowsbase", "system.xaml", "reachframework",
+                            "uiautomationprovider", "uiautomationtypes"})
+
+# .NET Framework assemblies shipped as packages for .NET 5+; the package version follows the target's major version
+FRAMEWORK_REFERENCE_PACKAGES = {
+    "system.configuration": "System.Configuration.ConfigurationManager",
+    "system.directoryservices": "System.DirectoryServices",
+    "system.directoryservices.accountmanagement": "System.DirectoryServices.AccountManagement",
+    "system.drawing": "System.Drawing.Common",
+    "system.management": "System.Management",
+    "system.runtime.caching": "System.Runtime.Caching",
+    "system.serviceprocess": "System.ServiceProcess.ServiceController",
+}
+
+# Old-style properties that only described the legacy project system, or that the SDK sets itself
+DROPPED_PROPERTIES = frozenset({
+    "appdesignerfolder", "applicationrevision", "applicationversion", "bootstrapperenabled", "configuration", "deterministic",
+    "filealignment", "fileupgradeflags", "install", "installfrom", "iswebbootstrapper", "mapfileextensions",
+    "nugetpackageimportstamp", "oldtoolsversion", "platform", "productversion", "projectguid", "projecttypeguids",
+    "publishurl", "restorepackages", "schemaversion", "solutiondir", "targetframeworkidentifier", "targetframeworkprofile",
+    "targetframeworkversion", "updateenabled", "updateinterval", "updateintervalunits", "updatemode", "updateperiodically",
+    "updaterequired", "upgradebackuplocation", "useapplicationtrust",
+})
+
+# Item metadata only Visual Studio used; an item carrying nothing else is fully described by the SDK default globs
+IDE_ONLY_METADATA = frozenset({"autogen", "dependentupon", "designtime", "designtimesharedinput", "generator", "subtype"})
+IDE_ONLY_METADATA_RESOURCES = frozenset({"dependentupon", "subtype"}) # Generator/LastGenOutput drive .resx code generation
+
+# Imports of the old-style project system that Microsoft.NET.Sdk provides
+_STANDARD_IMPORTS = re.compile(r"(Microsoft\.(CSharp|VisualBasic|Common)\.(targets|props)|NuGet\.targets)$", re.IGNORECASE)
+_UNSUPPORTED_IMPORTS = re.compile(r"(WebApplication|WebApplications|Web\.Publishing|TextTemplating)", re.IGNORECASE)
+_PACKAGES_FOLDER = re.compile(r"(^|[\\/])packages[\\/]", re.IGNORECASE)
+_CONFIGURATION_CONDITION = re.compile(r"^\s*'\$\(Configuration\)(\|\$\(Platform\))?'\s*==\s*'[^']*'\s*$")
+
+# Visual Basic project-level imports the SDK adds by default
+DEFAULT_VB_IMPORTS = frozenset({"microsoft.visualbasic", "system", "system.collections", "system.collections.generic", "system.data",
+                                "system.diagnostics", "system.linq", "system.xml.linq", "system.threading.tasks"})
+
+_TARGET_FRAMEWORK_ELEMENT = re.compile(r"<(TargetFrameworks?)(\s[^>]*)?>\s*([^<]*?)\s*</\1>")
+_COMPILE_INCLUDE = re.compile(r'^([ \t]*)<Compile\s+Include="([^"]+)"(\s*/>|[^>]*>)[ \t]*(\r?\n)?', re.MULTILINE)
+_EMPTY_ITEM_GROUP = re.compile(r"^[ \t]*<ItemGroup>\s*</ItemGroup>[ \t]*\r?\n?", re.MULTILINE)
+
+
+class RewriteResult:
+    '''
+    Outcome of rewrite_project(). content is the upgraded project file (None if the file could not be parsed);
+    changes describes each edit; unsupported lists the constructs left for the LLM (empty when content is final).
+    '''
+    def __init__(self, path: str, target_framework: str):
+        self.path = path
+        self.target_framework = target_framework
+        self.content: Optional[str] = None
+        self.changes: List[str] = []
+        self.unsupported: List[str] = []
+        self.converted_to_sdk_style = False
+        self.migrated_packages_config = False
+
+    @property
+    def complete(self) -> bool:
+        return self.content is not None and not self.unsupported
+
+    def to_dict(self) -> dict:
+        return {"path": self.path, "target_framework": self.target_framework, "complete": self.complete, "changes": self.changes,
+                "unsupported": self.unsupported, "converted_to_sdk_style": self.converted_to_sdk_style,
+                "migrated_packages_config": self.migrated_packages_config}
+
+
+def _local_name(tag) -> str:
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+def _strip_namespaces(element):
+    for node in element.iter():
+        if isinstance(node.tag, str):
+            node.tag = _local_name(node.tag)
+
+
+def _children(element, name: str) -> list:
+    return [child for child in element if _local_name(child.tag) == name]
+
+
+def _metadata(element) -> Dict[str, str]:
+    '''Item metadata given as attributes or child elements (Include/Update/Remove/Exclude/Condition excluded).'''
+    values = {name: value for name, value in element.attrib.items() if name not in ("Include", "Update", "Remove", "Exclude", "Condition")}
+    for child in element:
+        values[_local_name(child.tag)] = (child.text or "").strip()
+    return values
+
+
+def _framework_major(target_framework: str) -> int:
+    parsed = parse_framework(target_framework)
+    return parsed[1][0] if parsed and parsed[1] else 0
+
+
+def _is_net_core(target_framework: str) -> bool:
+    parsed = parse_framework(target_framework)
+    return bool(parsed) and parsed[0] == "netcoreapp"
+
+
+def _with_windows_platform(target_framework: str) -> str:
+    '''net8.0 -> net8.0-windows for Windows Forms/WPF projects on .NET 5+; other frameworks are returned unchanged.'''
+    parsed = parse_framework(target_framework)
+    if parsed and parsed[0] == "netcoreapp" and parsed[1][0] >= 5 and not parsed[2]:
+        return f"{target_framework}-windows"
+    return target_framework
+
+
+def rewrite_target_frameworks(frameworks: List[str], target_framework: str) -> List[str]:
+    '''
+    The new framework list: every framework of the target's family (e.g. all .NET Core/.NET 5+ entries for "net8.0") is
+    replaced by the target, other families (netstandard2.0 in "netstandard2.0;net6.0") are kept. A list with no entry of
+    the target's family gets the target added in front.
+    '''
+    target = parse_framework(target_framework)
+    rewritten = []
+    for framework in frameworks:
+        parsed = parse_framework(framework)
+        if parsed is None or target is None or parsed[0] == target[0] or (parsed[0], target[0]) == ("netframework", "netcoreapp"):
+            framework = target_framework
+        if framework not in rewritten:
+            rewritten.append(framework)
+    if target_framework not in rewritten:
+        rewritten.insert(0, target_framework)
+    return rewritten
+
+
+def _relative_item_path(include: str) -> Optional[str]:
+    '''Include as a project-relative path with "/" separators, or None if it is outside the project folder.'''
+    path = include.strip().replace("\\", "/")
+    if not path or "$(" in path or path.startswith("/") or re.match(r"^[A-Za-z]:", path):
+        return None
+    path = os.path.normpath(path).replace("\\", "/")
+    return None if path == ".." or path.startswith("../") else path
+
+
+def _in_default_glob(include: str, extensions: Optional[Iterable[str]]) -> bool:
+    '''
+    Whether the SDK's default globs already include this item: inside the project folder, not under bin/ or obj/ at the
+    project root or any dot-folder (DefaultItemExcludes), and with one of extensions (None: any file).
+    '''
+    path = _relative_item_path(include)
+    if path is None:
+        return False
+    parts = path.split("/")
+    if parts[0].lower() in ("bin", "obj") or any(part.startswith(".") for part in parts[:-1]):
+        return False
+    return extensions is None or path.lower().endswith(tuple(extensions))
+
+
+def _iter_default_compile_files(project_dir: str, extension: str) -> Iterable[str]:
+    '''Project-relative paths the SDK's default Compile glob (**/*.cs or **/*.vb) would pick up.'''
+    for directory, subdirectories, files in os.walk(project_dir):
+        relative_dir = os.path.relpath(directory, project_dir)
+        subdirectories[:] = sorted(d for d in subdirectories if not d.startswith(".")
+                                   and not (relative_dir == "." and d.lower() in ("bin", "obj")))
+        for name in sorted(files):
+            if name.lower().endswith(extension):
+                yield os.path.normpath(os.path.join(relative_dir, name)).replace("\\", "/")
+
+
+def _migrate_packages(model: ProjectModel, target_framework: str, package_versions: Dict[str, Optional[str]],
+                      result: RewriteResult) -> List[tuple]:
+    '''(name, version, private_assets) PackageReference items for the packages.config entries of the project.'''
+    net_core = _is_net_core(target_framework)
+    existing = {reference["name"].lower() for reference in model.package_references if reference["version_source"] != "packages.config"}
+    migrated = []
+    for package in model.package_references:
+        if package["version_source"] != "packages.config":
+            continue
+        key = package["name"].lower()
+        if key in existing:
+            continue
+        if key in package_versions and package_versions[key] is None:
+            result.changes.append(f"Dropped package {package['name']} (mapped to no package)")
+            continue
+        if net_core and key in INBOX_PACKAGES and key not in package_versions:
+            result.changes.append(f"Dropped package {package['name']} (part of .NET)")
+            continue
+        version = package["version"]
+        minimum = package_versions.get(key) or (PACKAGE_VERSION_MAP.get(key) if net_core else None)
+        if minimum and (not version or version_key(version) < version_key(minimum)):
+            result.changes.append(f"Raised package {package['name']} from {version} to {minimum}")
+            version = minimum
+        migrated.append((package["name"], version, package["private_assets"]))
+    if net_core and any(name.lower() in TEST_ADAPTER_PACKAGES for name, _, _ in migrated) \
+            and TEST_SDK_PACKAGE[0].lower() not in existing | {name.lower() for name, _, _ in migrated}:
+        migrated.append((TEST_SDK_PACKAGE[0], TEST_SDK_PACKAGE[1], None))
+        result.changes.append(f"Added package {TEST_SDK_PACKAGE[0]} (required by test projects on .NET)")
+    if migrated or any(p["version_source"] == "packages.config" for p in model.package_references):
+        result.migrated_packages_config = True
+        result.changes.append(f"Migrated {PACKAGES_CONFIG} to {len(migrated)} PackageReference items")
+    return migrated
+
+
+def _package_reference_element(name: str, version: Optional[str], private_assets: Optional[str]):
+    element = ET.Element("PackageReference", {"Include": name})
+    if version:
+        element.set("Version", version)
+    if private_assets:
+        ET.SubElement(element, "PrivateAssets").text = private_assets
+    return element
+
+
+def _serialize(element, level: int) -> str:
+    element.tail = None
+    ET.indent(element, space="  ", level=level)
+    return "  " * level + ET.tostring(element, encoding="unicode")
+
+
+def rewrite_project(path: str, target_framework: str, package_versions: Optional[Dict[str, Optional[str]]] = None,
+                    compile_files: Optional[Iterable[str]] = None) -> RewriteResult:
+    '''
+    Upgrades a .csproj/.vbproj to target_framework without an LLM; the file itself is not modified. package_versions
+    maps package ids to the version to migrate to (None drops the package) and takes precedence over PACKAGE_VERSION_MAP.
+    compile_files, if given, are the project-relative source files the SDK default Compile glob would include
+    (default: the project folder is walked), used to exclude files an old-style project did not compile.
+    '''
+    result = RewriteResult(path, target_framework)
+    package_versions = {name.lower(): version for name, version in (package_versions or {}).items()}
+    with open(path, "r", encoding="utf-8-sig") as f:
+        text = f.read()
+    try:
+        root = ET.fromstring(text)
+        model = ProjectModel.load(path)
+    except ET.ParseError as e:
+        result.unsupported.append(f"Project file is not well-formed XML: {e}")
+        logger.warning(f"CsprojRewriter: Cannot parse {path}: {e}")
+        return result
+
+    if model.is_sdk_style:
+        result.content = _rewrite_sdk_project(text, model, target_framework, package_versions, result)
+    else:
+        result.content = _convert_to_sdk_project(root, model, target_framework, package_versions, compile_files, result)
+        result.converted_to_sdk_style = True
+    logger.info(f"CsprojRewriter: {path} -> {target_framework}: {len(result.changes)} changes, {len(result.unsupported)} unsupported constructs")
+    return result
+
+
+def _rewrite_sdk_project(text: str, model: ProjectModel, target_framework: str,
+                         package_versions: Dict[str, Optional[str]], result: RewriteResult) -> str:
+    '''Textual edits of an SDK-style project, so that formatting and comments are preserved.'''
+    properties = {name.lower(): value for name, value in model.properties.items()}
+    windows_desktop = (properties.get("usewindowsforms") or "").lower() == "true" or (properties.get("usewpf") or "").lower() == "true" \
+        or (model.sdk or "").lower() == WINDOWS_DESKTOP_SDK.lower()
+    target = _with_windows_platform(target_framework) if windows_desktop else target_framework
+
+    found = False
+    def replace_frameworks(match):
+        nonlocal found
+        if match.group(2) and "condition" in match.group(2).lower():
+            result.unsupported.append(f"Conditional <{match.group(1)}>: {match.group(0)}")
+            return match.group(0)
+        found = True
+        old = [framework.strip() for framework in match.group(3).split(";") if framework.strip()]
+        new = [target] if match.group(1) == "TargetFramework" else rewrite_target_frameworks(old, target)
+        if new == old:
+            return match.group(0)
+        result.changes.append(f"{match.group(1)}: {';'.join(old)} -> {';'.join(new)}")
+        return f"<{match.group(1)}{match.group(2) or ''}>{';'.join(new)}</{match.group(1)}>"
+    text = _TARGET_FRAMEWORK_ELEMENT.sub(replace_frameworks, text)
+    if not found and not result.unsupported:
+        # Set by Directory.Build.props (or missing): the project's own value takes precedence
+        opening = re.search(r"<PropertyGroup\s*>", text)
+        element = f"<TargetFramework>{target}</TargetFramework>"
+        if opening:
+            indent = re.search(r"([ \t]*)<PropertyGroup", text[:opening.end()]).group(1)
+            text = f"{text[:opening.end()]}\n{indent}  {element}{text[opening.end():]}"
+        else:
+            project = re.search(r"<Project\b[^>]*>", text)
+            text = f"{text[:project.end()]}\n  <PropertyGroup>\n    {element}\n  </PropertyGroup>\n{text[project.end():]}"
+        result.changes.append(f"Added TargetFramework {target} (was {';'.join(model.target_frameworks) or 'not set'})")
+
+    if (model.sdk or "").lower() == WINDOWS_DESKTOP_SDK.lower() and _is_net_core(target_framework) and _framework_major(target_framework) >= 5:
+        text = text.replace(f'Sdk="{model.sdk}"', f'Sdk="{SDK_PROJECT}"', 1)
+        result.changes.append(f"Sdk: {model.sdk} -> {SDK_PROJECT}")
+
+    extension = _COMPILE_EXTENSIONS.get(os.path.splitext(result.path)[1].lower())
+    if extension and (properties.get("enabledefaultcompileitems") or "").lower() != "false" \
+            and (properties.get("enabledefaultitems") or "").lower() != "false":
+        def replace_compile(match):
+            indent, include, rest, newline = match.group(1), match.group(2), match.group(3), match.group(4) or ""
+            if "*" in include or not _in_default_glob(include, (extension,)):
+                return match.group(0)
+            if rest.strip() == "/>":
+                result.changes.append(f"Removed Compile item {include} (included by default)")
+                return ""
+            result.changes.append(f"Compile item {include}: Include -> Update (included by default)")
+            return f'{indent}<Compile Update="{include}"{rest}{newline}'
+        text = _COMPILE_INCLUDE.sub(replace_compile, text)
+        text = _EMPTY_ITEM_GROUP.sub("", text)
+
+    packages = _migrate_packages(model, target_framework, package_versions, result)
+    if packages:
+        item_group = ET.Element("ItemGroup")
+        item_group.extend(_package_reference_element(*package) for package in packages)
+        closing = text.rindex("</Project>")
+        text = f"{text[:closing].rstrip()}\n\n{_serialize(item_group, 1)}\n\n{text[closing:]}"
+    return text
+
+
+def _convert_to_sdk_project(root, model: ProjectModel, target_framework: str, package_versions: Dict[str, Optional[str]],
+                            compile_files: Optional[Iterable[str]], result: RewriteResult) -> str:
+    '''A new SDK-style project equivalent to an old-style one.'''
+    _strip_namespaces(root)
+    project_dir = os.path.dirname(os.path.abspath(result.path))
+    extension = _COMPILE_EXTENSIONS.get(os.path.splitext(result.path)[1].lower())
+    net_core = _is_net_core(target_framework)
+    major = _framework_major(target_framework)
+
+    project_types = {guid.strip().lower() for guid in (model.properties.get("ProjectTypeGuids") or "").split(";") if guid.strip()}
+    if project_types & _WEB_PROJECT_TYPES:
+        result.unsupported.append("ASP.NET web application project (ProjectTypeGuids); it needs porting to ASP.NET Core")
+    reference_names = {reference["name"].lower() for reference in model.references}
+    use_wpf = _WPF_PROJECT_TYPE in project_types or bool(reference_names & WPF_REFERENCES)
+    use_windows_forms = bool(reference_names & WINDOWS_FORMS_REFERENCES)
+    target = _with_windows_platform(target_framework) if use_wpf or use_windows_forms else target_framework
+
+    properties = ET.Element("PropertyGroup")
+    ET.SubElement(properties, "TargetFramework").text = target
+    result.changes.append(f"Converted to SDK-style project targeting {target} (was {';'.join(model.target_frameworks) or 'unknown'})")
+    if use_windows_forms and net_core:
+        ET.SubElement(properties, "UseWindowsForms").text = "true"
+    if use_wpf:
+        ET.SubElement(properties, "UseWPF").text = "true"
+    conditional_groups = []
+    body = [] # Items, imports and targets, in their original order
+    compiled: Set[str] = set()
+    has_assembly_info = False
+    kept_items: Dict[str, list] = {"ProjectReference": [], "Reference": [], "Other": []}
+    package_items = []
+
+    for element in root:
+        name = _local_name(element.tag)
+        condition = element.get("Condition")
+        if name == "PropertyGroup":
+            if not condition:
+                for prop in element:
+                    prop_name = _local_name(prop.tag)
+                    if prop_name.lower() in DROPPED_PROPERTIES or not (prop.text or "").strip() or prop.get("Condition"):
+                        continue
+                    if prop_name in ("TargetFramework", "TargetFrameworks"):
+                        continue
+                    properties.append(prop)
+            elif _CONFIGURATION_CONDITION.match(condition):
+                kept = [prop for prop in element if not _is_default_configuration_property(_local_name(prop.tag), prop.text or "")]
+                if kept:
+                    group = ET.Element("PropertyGroup", {"Condition": condition})
+                    group.extend(kept)
+                    conditional_groups.append(group)
+            else:
+                conditional_groups.append(element)
+        elif name == "ItemGroup":
+            if condition:
+                body.append(element)
+                continue
+            for item in element:
+                compiled_path = _convert_item(item, extension, net_core, major, use_wpf, use_windows_forms, kept_items, package_items, result)
+                if compiled_path:
+                    compiled.add(compiled_path.lower())
+                    has_assembly_info = has_assembly_info or os.path.basename(compiled_path).lower() in ("assemblyinfo.cs", "assemblyinfo.vb")
+        elif name in ("Import", "ImportGroup"):
+            imports = [element] if name == "Import" else _children(element, "Import")
+            for node in imports:
+                project = node.get("Project") or ""
+                if name == "ImportGroup" and element.get("Condition") and not node.get("Condition"):
+                    node.set("Condition", element.get("Condition"))
+                if _UNSUPPORTED_IMPORTS.search(project):
+                    result.unsupported.append(f"Import of {project}")
+                    body.append(node)
+                elif _STANDARD_IMPORTS.search(project) or _PACKAGES_FOLDER.search(project):
+                    result.changes.append(f"Removed Import {project}")
+                else:
+                    body.append(node)
+        elif name == "Target":
+            target_element = _convert_target(element, result)
+            if target_element is not None:
+                body.append(target_element)
+        elif name == "ProjectExtensions":
+            result.changes.append("Removed ProjectExtensions")
+        elif name == "Choose":
+            result.unsupported.append("<Choose> block (conditional properties/items)")
+            body.append(element)
+        else:
+            body.append(element)
+
+    if has_assembly_info:
+        ET.SubElement(properties, "GenerateAssemblyInfo").text = "false"
+        result.changes.append("Set GenerateAssemblyInfo=false (the project keeps its AssemblyInfo file)")
+
+    # Sources on disk the old project did not compile would be picked up by the default glob
+    removed = []
+    if extension:
+        files = compile_files if compile_files is not None else _iter_default_compile_files(project_dir, extension)
+        for file_path in files:
+            relative = file_path.replace("\\", "/")
+            if _in_default_glob(relative, (extension,)) and relative.lower() not in compiled:
+                removed.append(ET.Element("Compile", {"Remove": relative.replace("/", "\\")}))
+        if removed:
+            result.changes.append(f"Excluded {len(removed)} source files the project did not compile")
+
+    packages = _migrate_packages(model, target_framework, package_versions, result)
+    project = ET.Element("Project", {"Sdk": SDK_PROJECT})
+    project.append(properties)
+    project.extend(conditional_groups)
+    for items in ([_package_reference_element(*package) for package in packages] + package_items,
+                  kept_items["ProjectReference"], kept_items["Reference"], removed + kept_items["Other"]):
+        if items:
+            group = ET.SubElement(project, "ItemGroup")
+            group.extend(items)
+    project.extend(body)
+
+    ET.indent(project, space="  ")
+    project.text = "\n\n  "
+    for index, child in enumerate(project):
+        child.tail = "\n\n  " if index < len(project) - 1 else "\n\n"
+    return ET.tostring(project, encoding="unicode") + "\n"
+
+
+def _is_default_configuration_property(name: str, value: str) -> bool:
+    '''Whether a property of a Debug/Release configuration group matches what the SDK sets for that configuration.'''
+    name, value = name.lower(), value.strip()
+    if name in ("debugsymbols", "debugtype", "optimize", "errorreport", "warninglevel", "prefer32bit", "codeanalysisruleset"):
+        return True
+    if name == "outputpath":
+        return re.match(r"^bin[\\/](Debug|Release)[\\/]?$", value, re.IGNORECASE) is not None
+    if name == "defineconstants":
+        return {symbol.strip().upper() for symbol in value.split(";") if symbol.strip()} <= {"DEBUG", "TRACE"}
+    if name == "platformtarget":
+        return value.lower() == "anycpu"
+    return False
+
+
+def _convert_item(item, extension: Optional[str], net_core: bool, major: int, use_wpf: bool, use_windows_forms: bool,
+                  kept_items: Dict[str, list], package_items: list, result: RewriteResult) -> Optional[str]:
+    '''
+    Sorts one old-style item into kept_items (dropping what the SDK provides). Returns the project-relative path of
+    Compile items, so the caller knows which sources the project compiled.
+    '''
+    kind = _local_name(item.tag)
+    include = item.get("Include") or ""
+    metadata = _metadata(item)
+
+    if kind in ("Compile", "EmbeddedResource", "None", "Page", "ApplicationDefinition"):
+        globs = {"Compile": (extension,) if extension else (), "EmbeddedResource": (".resx",), "None": None,
+                 "Page": (".xaml",) if use_wpf else (), "ApplicationDefinition": (".xaml",) if use_wpf else ()}[kind]
+        compiled_path = _relative_item_path(include) if kind == "Compile" and "*" not in include else None
+        if "*" in include:
+            result.unsupported.append(f"Wildcard {kind} item: {include}")
+            kept_items["Other"].append(item)
+            return None
+        if os.path.basename(include).lower() == PACKAGES_CONFIG:
+            return None
+        if globs == () or not _in_default_glob(include, globs):
+            kept_items["Other"].append(item) # Not covered by a default glob (e.g. a linked file): keep as is
+            return compiled_path
+        ide_only = IDE_ONLY_METADATA_RESOURCES if kind == "EmbeddedResource" else IDE_ONLY_METADATA
+        significant = {name: value for name, value in metadata.items() if name.lower() not in ide_only}
+        if kind == "EmbeddedResource" and set(significant) == {"LastGenOutput"}:
+            significant = {} # Only relevant with a Generator
+        if kind in ("Page", "ApplicationDefinition"):
+            significant = {}
+        if significant:
+            updated = ET.Element(kind, {"Update": include})
+            for name, value in significant.items():
+                ET.SubElement(updated, name).text = value
+            kept_items["Other"].append(updated)
+        return compiled_path
+    if kind == "Reference":
+        _convert_reference(item, net_core, major, use_wpf, use_windows_forms, kept_items, package_items, result)
+    elif kind == "ProjectReference":
+        kept = ET.Element("ProjectReference", {"Include": include})
+        for name, value in metadata.items():
+            if name not in ("Project", "Name"):
+                ET.SubElement(kept, name).text = value
+        kept_items["ProjectReference"].append(kept)
+    elif kind == "PackageReference":
+        package_items.append(item)
+    elif kind == "Import" and include.lower() in DEFAULT_VB_IMPORTS:
+        pass
+    elif kind in ("Folder", "Service", "BootstrapperPackage"):
+        pass
+    else:
+        kept_items["Other"].append(item)
+    return None
+
+
+def _convert_reference(item, net_core: bool, major: int, use_wpf: bool, use_windows_forms: bool, kept_items: Dict[str, list],
+                       package_items: list, result: RewriteResult):
+    include = item.get("Include") or ""
+    name = include.split(",")[0].strip()
+    key = name.lower()
+    hint_path = _metadata(item).get("HintPath")
+    if hint_path:
+        if _PACKAGES_FOLDER.search(hint_path):
+            return # Assembly of a packages.config package, now a PackageReference
+        kept = ET.Element("Reference", {"Include": name})
+        ET.SubElement(kept, "HintPath").text = hint_path
+        kept_items["Reference"].append(kept)
+        return
+    if use_wpf and key in WPF_REFERENCES:
+        return # Referenced through UseWPF
+    if not net_core:
+        if key not in IMPLICIT_FRAMEWORK_REFERENCES:
+            kept_items["Reference"].append(ET.Element("Reference", {"Include": name}))
+        return
+    if key in NET_SHARED_FRAMEWORK_REFERENCES or (use_windows_forms and (key in WINDOWS_FORMS_REFERENCES or key == "system.drawing")):
+        return
+    package = FRAMEWORK_REFERENCE_PACKAGES.get(key)
+    if package:
+        package_items.append(_package_reference_element(package, f"{max(major, 5)}.0.0", None))
+        result.changes.append(f"Replaced reference {name} with package {package}")
+        return
+    result.unsupported.append(f"Reference to .NET Framework assembly {name}, which has no .NET {major} equivalent known to the rewriter")
+    kept_items["Reference"].append(ET.Element("Reference", {"Include": name}))
+
+
+def _convert_target(element, result: RewriteResult):
+    '''
+    Targets of the old project. Empty ones and NuGet's package restore check are dropped; BeforeBuild/AfterBuild are
+    renamed and hooked to Build, because the SDK's own (empty) BeforeBuild/AfterBuild are imported later and would
+    replace them.
+    '''
+    name = element.get("Name") or ""
+    if name == "EnsureNuGetPackageBuildImports" or len(element) == 0:
+        result.changes.append(f"Removed target {name}")
+        return None
+    if name in ("BeforeBuild", "AfterBuild"):
+        element.set("Name", f"Custom{name}")
+        element.set("BeforeTargets" if name == "BeforeBuild" else "AfterTargets", "Build")
+        result.changes.append(f"Renamed target {name} to Custom{name}")
+    return element
@@ -0,0 +1,309 @@
+import os
+import re
+import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .core_components import logger
+
+# Solution-wide project dependency graph. A .sln (or a single project) is resolved into every .csproj/.vbproj it
+# reaches through <ProjectReference> items, transitively, including projects referenced from outside the solution.
+# The graph answers dependency/dependent queries and gives a build (topological) order, upgrade waves, cycles and
+# strongly connected components; it is the input for scheduling upgrades and builds.
+
+PROJECT_EXTENSIONS = (".csproj", ".vbproj", ".fsproj")
+SOLUTION_FOLDER_TYPE_GUID = "2150E333-8FDC-42A3-9474-1A3956D46DE8"
+
+_SLN_PROJECT = re.compile(r'^Project\("\{(?P<type>[^}]+)\}"\)\s*=\s*"(?P<name>[^"]*)"\s*,\s*"(?P<path>[^"]*)"\s*,\s*"\{(?P<guid>[^}]+)\}"', re.MULTILINE)
+
+
+class DependencyCycleError(ValueError):
+    '''Raised when a topological order is requested for a graph with project reference cycles.'''
+    def __init__(self, cycles: List[List[str]]):
+        self.cycles = cycles
+        super().__init__("Project reference cycle(s): " + "; ".join(" -> ".join(os.path.basename(p) for p in cycle + cycle[:1]) for cycle in cycles))
+
+
+def normalize_project_path(path: str, base_dir: str = "") -> str:
+    '''Absolute, normalized path for a project path as written in a .sln or project file (Windows separators allowed).'''
+    return os.path.normpath(os.path.join(base_dir, path.replace("\\", os.sep)))
+
+
+def parse_solution(sln_path: str) -> List[dict]:
+    '''The projects listed in a .sln as [{"name", "path", "guid"}], skipping solution folders and non-project entries.'''
+    with open(sln_path, 'r', encoding='utf-8-sig') as f:
+        content = f.read()
+    base_dir = os.path.dirname(os.path.abspath(sln_path))
+    projects = []
+    for match in _SLN_PROJECT.finditer(content):
+        if match.group("type").upper() == SOLUTION_FOLDER_TYPE_GUID or not match.group("path").lower().endswith(PROJECT_EXTENSIONS):
+            continue
+        projects.append({"name": match.group("name"), "path": normalize_project_path(match.group("path"), base_dir), "guid": match.group("guid").upper()})
+    return projects
+
+
+def read_project_references(project_path: str) -> List[str]:
+    '''The <ProjectReference Include> paths of a project file, resolved against its folder. Streams the XML with iterparse.'''
+    project_dir = os.path.dirname(os.path.abspath(project_path))
+    references = []
+    for _, element in ET.iterparse(project_path, events=("end",)):
+        if element.tag.rsplit("}", 1)[-1] == "ProjectReference" and element.get("Include"):
+            references.append(normalize_project_path(element.get("Include"), project_dir))
+        element.clear() # Project files can be large (thousands of Compile items); keep memory flat
+    return references
+
+
+class ProjectNode:
+    def __init__(self, path: str, name: Optional[str] = None, in_solution: bool = False):
+        self.path = path
+        self.name = name or os.path.splitext(os.path.basename(path))[0]
+        self.language = {".csproj": "cs", ".vbproj": "vb", ".fsproj": "fs"}.get(os.path.splitext(path)[1].lower(), "unknown")
+        self.in_solution = in_solution
+        self.exists = os.path.isfile(path)
+        self.references = [] # Paths of referenced projects
+        self.error = None # Why the project file could not be read, if it could not
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "path": self.path, "language": self.language, "in_solution": self.in_solution,
+                "exists": self.exists, "references": list(self.references), "error": self.error}
+
+
+class DependencyGraph:
+    '''
+    Directed graph of projects, with an edge from each project to every project it references. Nodes are keyed by
+    normalized absolute path (os.path.normcase, so lookups are case-insensitive on Windows).
+    '''
+    def __init__(self):
+        self.nodes: Dict[str, ProjectNode] = {}
+        self._dependents: Optional[Dict[str, List[str]]] = None
+
+    @staticmethod
+    def key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    @classmethod
+    def from_solution(cls, sln_path: str, max_workers: int = 8) -> "DependencyGraph":
+        graph = cls()
+        roots = parse_solution(sln_path)
+        for project in roots:
+            graph.nodes[cls.key(project["path"])] = ProjectNode(project["path"], project["name"], in_solution=True)
+        graph._resolve([cls.key(project["path"]) for project in roots], max_workers)
+        return graph
+
+    @classmethod
+    def from_projects(cls, project_paths: Iterable[str], max_workers: int = 8) -> "DependencyGraph":
+        graph = cls()
+        keys = []
+        for path in project_paths:
+            key = cls.key(path)
+            graph.nodes.setdefault(key, ProjectNode(os.path.abspath(path), in_solution=True))
+            keys.append(key)
+        graph._resolve(keys, max_workers)
+        return graph
+
+    def _resolve(self, pending_keys: List[str], max_workers: int):
+        '''Reads the given projects and, level by level, every project they reference (project files are read in parallel).'''
+        pending = deque(pending_keys)
+        visited = set()
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="project-graph") as executor:
+            while pending:
+                level = []
+                while pending:
+                    key = pending.popleft()
+                    if key not in visited:
+                        visited.add(key)
+                        level.append(key)
+                for key, references in zip(level, executor.map(self._read_node, level)):
+                    references = list({self.key(ref): ref for ref in references}.values()) # A project referenced twice is one edge
+                    node = self.nodes[key]
+                    node.references = [self.nodes.setdefault(self.key(ref), ProjectNode(ref)).path for ref in references]
+                    pending.extend(self.key(ref) for ref in references if self.key(ref) not in visited)
+        self._dependents = None
+        logger.info(f"DependencyGraph: Resolved {len(self.nodes)} projects ({sum(len(n.references) for n in self.nodes.values())} references)")
+
+    def _read_node(self, key: str) -> List[str]:
+        node = self.nodes[key]
+        if not node.exists:
+            node.error = "Project file not found"
+            return []
+        try:
+            return read_project_references(node.path)
+        except (ET.ParseError, OSError) as e:
+            node.error = f"{type(e).__name__}: {e}"
+            logger.warning(f"DependencyGraph: Could not read {node.path}: {e}")
+            return []
+
+    # --- Queries -----------------------------------------------------------------------------------------------
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, path: str):
+        return self.key(path) in self.nodes
+
+    def node(self, path: str) -> ProjectNode:
+        return self.nodes[self.key(path)]
+
+    def dependencies(self, path: str) -> List[str]:
+        '''Projects directly referenced by path.'''
+        return list(self.node(path).references)
+
+    def dependents(self, path: str) -> List[str]:
+        '''Projects that directly reference path.'''
+        if self._dependents is None:
+            dependents = {key: [] for key in self.nodes}
+            for node in self.nodes.values():
+                for reference in node.references:
+                    dependents[self.key(reference)].append(node.path)
+            self._dependents = dependents
+        return list(self._dependents[self.key(path)])
+
+    def _reachable(self, path: str, step) -> List[str]:
+        start = self.key(path)
+        seen, order, queue = {start}, [], deque([path])
+        while queue:
+            for neighbour in step(queue.popleft()):
+                neighbour_key = self.key(neighbour)
+                if neighbour_key not in seen:
+                    seen.add(neighbour_key)
+                    order.append(neighbour)
+                    queue.append(neighbour)
+        return order
+
+    def transitive_dependencies(self, path: str) -> List[str]:
+        return self._reachable(path, self.dependencies)
+
+    def transitive_dependents(self, path: str) -> List[str]:
+        '''Every project affected by a change to path (directly or indirectly referencing it).'''
+        return self._reachable(path, self.dependents)
+
+    def strongly_connected_components(self) -> List[List[str]]:
+        '''
+        Tarjan's algorithm, iterative so deep reference chains cannot hit the recursion limit. Components are returned
+        dependencies first (reverse topological order of the condensed graph).
+        '''
+        index_of, lowlink, on_stack = {}, {}, set()
+        stack, components, counter = [], [], 0
+        for root in sorted(self.nodes):
+            if root in index_of:
+                continue
+            work = [(root, iter(self.nodes[root].references))]
+            index_of[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                key, references = work[-1]
+                advanced = False
+                for reference in references:
+                    reference_key = self.key(reference)
+                    if reference_key not in index_of:
+                        index_of[reference_key] = lowlink[reference_key] = counter
+                        counter += 1
+                        stack.append(reference_key)
+                        on_stack.add(reference_key)
+                        work.append((reference_key, iter(self.nodes[reference_key].references)))
+                        advanced = True
+                        break
+                    if reference_key in on_stack:
+                        lowlink[key] = min(lowlink[key], index_of[reference_key])
+                if advanced:
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[key])
+                if lowlink[key] == index_of[key]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(self.nodes[member].path)
+                        if member == key:
+                            break
+                    components.append(sorted(component))
+        return components
+
+    def cycles(self) -> List[List[str]]:
+        '''Strongly connected components that form reference cycles (more than one project, or a self-reference).'''
+        return [component for component in self.strongly_connected_components()
+                if len(component) > 1 or self.key(component[0]) in {self.key(r) for r in self.node(component[0]).references}]
+
+    def topological_levels(self) -> List[List[str]]:
+        '''
+        Projects grouped into waves: each project's references are all in earlier waves, so the projects of one wave
+        can be built or upgraded in parallel. Raises DependencyCycleError if the references contain a cycle.
+        '''
+        remaining = {key: len({self.key(r) for r in node.references}) for key, node in self.nodes.items()}
+        levels = []
+        ready = sorted(key for key, count in remaining.items() if count == 0)
+        while ready:
+            levels.append([self.nodes[key].path for key in ready])
+            next_ready = []
+            for key in ready:
+                del remaining[key]
+                for dependent in self.dependents(self.nodes[key].path):
+                    dependent_key = self.key(dependent)
+                    remaining[dependent_key] -= 1
+                    if remaining[dependent_key] == 0:
+                        next_ready.append(dependent_key)
+            ready = sorted(next_ready)
+        if remaining:
+            raise DependencyCycleError(self.cycles())
+        return levels
+
+    def topological_order(self) -> List[str]:
+        '''Build order: every project comes after all the projects it references.'''
+        return [path for level in self.topological_levels() for path in level]
+
+    def run_in_dependency_order(self, work: Callable[[str], dict], max_workers: int = 4) -> Dict[str, dict]:
+        '''
+        Calls work(path) for every project, each one as soon as all the projects it references have succeeded, with up
+        to max_workers at once. Independent projects therefore run in parallel and a solution takes time in proportion
+        to the depth of its graph rather than its size. work returns a dict whose "success" decides whether dependents
+        may start; an exception counts as a failure. Projects with a failed dependency are not run and get
+        {"success": False, "status": "blocked", "blocked_by": [failed dependencies]}. Raises DependencyCycleError.
+        '''
+        cycles = self.cycles()
+        if cycles:
+            raise DependencyCycleError(cycles)
+
+        def run(key):
+            try:
+                return work(self.nodes[key].path)
+            except Exception as e:
+                logger.error(f"DependencyGraph: Work for {self.nodes[key].path} failed: {e}")
+                return {"success": False, "status": "failed", "error": f"{type(e).__name__}: {e}"}
+
+        remaining = {key: len({self.key(r) for r in node.references}) for key, node in self.nodes.items()}
+        results: Dict[str, dict] = {}
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="project-work") as executor:
+            running = {executor.submit(run, key): key for key in sorted(key for key, count in remaining.items() if count == 0)}
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in sorted(done, key=lambda f: running[f]):
+                    key = running.pop(future)
+                    results[key] = future.result()
+                    if not results[key].get("success"):
+                        continue
+                    for dependent in self.dependents(self.nodes[key].path):
+                        dependent_key = self.key(dependent)
+                        remaining[dependent_key] -= 1
+                        if remaining[dependent_key] == 0:
+                            running[executor.submit(run, dependent_key)] = dependent_key
+
+        for key, node in self.nodes.items():
+            if key not in results:
+                failed = [path for path in self.transitive_dependencies(node.path) if self.key(path) in results and not results[self.key(path)].get("success")]
+                results[key] = {"success": False, "status": "blocked", "blocked_by": failed}
+        return {self.nodes[key].path: results[key] for key in self.nodes}
+
+    def to_dict(self) -> dict:
+        cycles = self.cycles()
+        return {
+            "projects": [node.to_dict() for node in self.nodes.values()],
+            "build_order": self.topological_order() if not cycles else [],
+            "upgrade_waves": self.topological_levels() if not cycles else [],
+            "cycles": cycles,
+        }
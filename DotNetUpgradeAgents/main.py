@@ -58,9 +58,13 @@ def main():
     vb_project_to_convert = os.path.join(code_checkout_dir, "MyLegacyVBApp", "MyLegacyVBApp.vbproj")
     # Path to a specific C# project/solution to analyze and upgrade (example)
     csharp_project_to_upgrade = os.path.join(code_checkout_dir, "MyMainCSharpApp", "MyMainCSharpApp.csproj")
+    # The whole solution can be upgraded instead: every project, in dependency order, independent projects in parallel
+    csharp_solution_to_upgrade = os.path.join(code_checkout_dir, "MyMainCSharpApp.sln")
     upgraded_app_build_output_dir = os.path.join(csharp_project_to_upgrade, "bin", "Release", "net6.0") # Example
 
     target_framework = HumanFeedback.get_feedback("Enter the target .NET framework (e.g., net6.0, net7.0, net48):", ["net6.0", "net7.0", "net8.0", "net48"])
+    upgrade_scope = HumanFeedback.get_feedback("Upgrade the whole solution (all projects, in dependency order) or a single project?", ["Whole solution", "Single project"])
+    project_or_solution_to_upgrade = csharp_solution_to_upgrade if upgrade_scope == "Whole solution" else csharp_project_to_upgrade
 
     # Git branch names
     vb_conversion_branch = f"feature/vb_to_csharp_{target_framework.replace('.', '')}"
@@ -94,13 +98,13 @@ def main():
 
     # Task 3: Analyze Dependencies (targets a specific C# project post-checkout/conversion)
     task_analyze_deps = task_factory.analyze_dependencies_task(
-        project_or_solution_file=csharp_project_to_upgrade # This path needs to exist
+        project_or_solution_file=project_or_solution_to_upgrade # This path needs to exist
     )
     task_analyze_deps.context = [task_retrieve_code] # Depends on code being checked out
 
     # Task 4: Upgrade Project Framework
     task_upgrade_framework = task_factory.upgrade_project_framework_task(
-        csproj_file_path=csharp_project_to_upgrade,
+        csproj_file_path=project_or_solution_to_upgrade,
         target_framework=target_framework,
         git_branch_name=framework_upgrade_branch
     )
@@ -0,0 +1,233 @@
+import difflib
+import random
+import re
+import threading
+import zlib
+from typing import Dict, List, Optional
+
+# Near-duplicate detection for VB.NET sources, so files copied between projects (differing only in namespace, a few
+# identifiers or literals) can reuse an earlier conversion instead of another LLM call. Sources are tokenized with
+# comments dropped and literals and identifiers normalized, shingled, and indexed by MinHash signatures in LSH bands; candidates are
+# confirmed by token alignment. substitution_map()/apply_substitutions() re-apply an earlier C# output with the
+# changed identifiers and literals swapped in; anything that is not a one-to-one token substitution is left to the caller.
+
+DEFAULT_MINHASH_PERMUTATIONS = 64
+DEFAULT_LSH_BANDS = 16
+DEFAULT_SIMILARITY_THRESHOLD = 0.8
+SHINGLE_SIZE = 5
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_VB_TOKEN = re.compile(r'"(?:[^"]|"")*"c?|\'[^\n]*|\bREM\b[^\n]*|&H[0-9A-Fa-f]+|\d+(?:\.\d+)?\w*|[A-Za-z_]\w*|\S', re.IGNORECASE)
+_REM_COMMENT = re.compile(r"REM\b", re.IGNORECASE)
+_IDENTIFIER = re.compile(r"^[A-Za-z_]\w*$")
+_PLAIN_NUMBER = re.compile(r"^\d+(?:\.\d+)?$")
+
+# Keywords may not be substituted: a changed keyword changes semantics, not just names
+VB_KEYWORDS = {
+    "addhandler", "addressof", "alias", "and", "andalso", "as", "boolean", "byref", "byte", "byval", "call", "case",
+    "catch", "cbool", "cbyte", "cchar", "cdate", "cdbl", "cdec", "char", "cint", "class", "clng", "cobj", "const",
+    "continue", "csbyte", "cshort", "csng", "cstr", "ctype", "cuint", "culng", "cushort", "date", "decimal", "declare",
+    "default", "delegate", "dim", "directcast", "do", "double", "each", "else", "elseif", "end", "endif", "enum",
+    "erase", "error", "event", "exit", "false", "finally", "for", "friend", "function", "get", "gettype", "global",
+    "gosub", "goto", "handles", "if", "implements", "imports", "in", "inherits", "integer", "interface", "is", "isnot",
+    "let", "lib", "like", "long", "loop", "me", "mod", "module", "mustinherit", "mustoverride", "mybase", "myclass",
+    "namespace", "narrowing", "new", "next", "not", "nothing", "notinheritable", "notoverridable", "object", "of", "on",
+    "operator", "option", "optional", "or", "orelse", "overloads", "overridable", "overrides", "paramarray", "partial",
+    "private", "property", "protected", "public", "raiseevent", "readonly", "redim", "removehandler", "resume", "return",
+    "sbyte", "select", "set", "shadows", "shared", "short", "single", "static", "step", "stop", "string", "structure",
+    "sub", "synclock", "then", "throw", "to", "true", "try", "trycast", "typeof", "uinteger", "ulong", "ushort", "using",
+    "variant", "wend", "when", "while", "widening", "with", "withevents", "writeonly", "xor", "async", "await", "iterator",
+    "yield", "strict", "explicit", "infer", "compare", "off",
+}
+
+
+def tokenize_vb(vb_code: str) -> List[str]:
+    '''VB.NET tokens with comments dropped (string literals are kept whole).'''
+    return [token for token in _VB_TOKEN.findall(vb_code) if not token.startswith("'") and not _REM_COMMENT.match(token)]
+
+
+def _is_literal(token: str) -> bool:
+    return token.startswith('"') or token[0].isdigit() or token.upper().startswith("&H")
+
+
+def _normalize(token: str) -> str:
+    if _is_literal(token):
+        return "<lit>"
+    lowered = token.lower()
+    return "<id>" if _IDENTIFIER.match(token) and lowered not in VB_KEYWORDS else lowered
+
+
+def _shingle_hashes(tokens: List[str]) -> set:
+    # Literals and identifiers are normalized so renamed copies look identical; substitution_map() checks the names
+    normalized = [_normalize(token) for token in tokens]
+    if len(normalized) < SHINGLE_SIZE:
+        return {zlib.crc32(" ".join(normalized).encode("utf-8"))}
+    return {zlib.crc32(" ".join(normalized[i:i + SHINGLE_SIZE]).encode("utf-8")) for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+
+class MinHasher:
+    '''MinHash signatures with num_permutations universal hash functions (a * x + b) mod p, seeded for reproducibility.'''
+    def __init__(self, num_permutations: int = DEFAULT_MINHASH_PERMUTATIONS, seed: int = 1):
+        rng = random.Random(seed)
+        self.permutations = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_permutations)]
+
+    def signature(self, tokens: List[str]) -> List[int]:
+        hashes = _shingle_hashes(tokens)
+        return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self.permutations]
+
+    @staticmethod
+    def similarity(signature_a: List[int], signature_b: List[int]) -> float:
+        '''Estimated Jaccard similarity of the two shingle sets.'''
+        return sum(1 for a, b in zip(signature_a, signature_b) if a == b) / len(signature_a)
+
+
+class NearDuplicateMatch:
+    def __init__(self, key: str, similarity: float, vb_code: str, tokens: List[str], cs_code: str):
+        self.key = key # Path of the earlier source file
+        self.similarity = similarity
+        self.vb_code = vb_code
+        self.tokens = tokens
+        self.cs_code = cs_code
+
+
+class NearDuplicateIndex:
+    '''
+    Thread-safe LSH index of converted VB.NET sources. With the default 64 permutations in 16 bands of 4 rows, pairs
+    above roughly 0.5 similarity become candidates; query() only returns candidates whose estimated similarity is at
+    least the threshold.
+    '''
+    def __init__(self, num_permutations: int = DEFAULT_MINHASH_PERMUTATIONS, bands: int = DEFAULT_LSH_BANDS,
+                 threshold: float = DEFAULT_SIMILARITY_THRESHOLD):
+        if num_permutations % bands:
+            raise ValueError("num_permutations must be a multiple of bands")
+        self.hasher = MinHasher(num_permutations)
+        self.bands = bands
+        self.rows = num_permutations // bands
+        self.threshold = threshold
+        self._buckets = {} # (band, band hash) -> [key, ...]
+        self._entries = {} # key -> (signature, vb_code, tokens, cs_code, version)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _band_keys(self, signature: List[int]) -> List[tuple]:
+        return [(band, hash(tuple(signature[band * self.rows:(band + 1) * self.rows]))) for band in range(self.bands)]
+
+    def add(self, key: str, vb_code: str, cs_code: str, tokens: Optional[List[str]] = None, version: str = ""):
+        tokens = tokens if tokens is not None else tokenize_vb(vb_code)
+        signature = self.hasher.signature(tokens)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (signature, vb_code, tokens, cs_code, version)
+            for band_key in self._band_keys(signature):
+                self._buckets.setdefault(band_key, []).append(key)
+
+    def _remove(self, key: str):
+        signature = self._entries.pop(key)[0]
+        for band_key in self._band_keys(signature):
+            bucket = self._buckets.get(band_key, [])
+            if key in bucket:
+                bucket.remove(key)
+
+    def candidates(self, vb_code: str, tokens: Optional[List[str]] = None, version: str = "", limit: int = 5) -> List[NearDuplicateMatch]:
+        '''Up to limit indexed sources added with the same version, at or above the threshold, most similar first.'''
+        tokens = tokens if tokens is not None else tokenize_vb(vb_code)
+        signature = self.hasher.signature(tokens)
+        matches = []
+        with self._lock:
+            keys = {key for band_key in self._band_keys(signature) for key in self._buckets.get(band_key, ())}
+            for key in keys:
+                entry = self._entries[key]
+                if entry[4] != version:
+                    continue # Converted with another prompt or model
+                similarity = MinHasher.similarity(signature, entry[0])
+                if similarity >= self.threshold:
+                    matches.append(NearDuplicateMatch(key, similarity, entry[1], entry[2], entry[3]))
+        matches.sort(key=lambda match: (-match.similarity, match.key)) # Keys break ties, so every run picks the same match
+        return matches[:limit]
+
+    def query(self, vb_code: str, tokens: Optional[List[str]] = None, version: str = "") -> Optional[NearDuplicateMatch]:
+        '''The most similar indexed source at or above the threshold that was added with the same version, or None.'''
+        matches = self.candidates(vb_code, tokens, version, limit=1)
+        return matches[0] if matches else None
+
+
+def substitution_map(old_tokens: List[str], new_tokens: List[str]) -> Optional[Dict[str, str]]:
+    '''
+    The token substitutions that turn old_tokens into new_tokens, if the two differ only by a consistent one-to-one
+    renaming of identifiers and plain string/number literals. None for any other difference (inserted or removed
+    tokens, changed keywords, an identifier renamed in some places but not others, ...).
+    '''
+    if len(old_tokens) != len(new_tokens):
+        return None
+    mapping, reverse = {}, {}
+    for old, new in zip(old_tokens, new_tokens):
+        if old == new:
+            if old in mapping or new in reverse:
+                return None # Renamed in some places only
+            continue
+        if old.lower() in VB_KEYWORDS or new.lower() in VB_KEYWORDS:
+            return None
+        old_is_name, new_is_name = bool(_IDENTIFIER.match(old)), bool(_IDENTIFIER.match(new))
+        if old_is_name != new_is_name:
+            return None
+        if not old_is_name and not all(t.startswith('"') and not t.lower().endswith('"c') or _PLAIN_NUMBER.match(t) for t in (old, new)):
+            return None # Only plain strings and numbers; suffixed/hex/char literals would need literal translation
+        if mapping.get(old, new) != new or reverse.get(new, old) != old:
+            return None
+        mapping[old] = new
+        reverse[new] = old
+    unchanged = {token for token, other in zip(old_tokens, new_tokens) if token == other}
+    if unchanged & set(mapping): # An old name also appearing unchanged elsewhere cannot be substituted safely
+        return None
+    return mapping
+
+
+def _cs_literal(vb_literal: str) -> str:
+    if not vb_literal.startswith('"'):
+        return vb_literal
+    body = vb_literal[1:-1].replace('""', '"')
+    return '"' + body.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+_CS_TOKEN = re.compile(r'@"(?:[^"]|"")*"|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'|//[^\n]*|/\*.*?\*/|[A-Za-z_]\w*|\d+(?:\.\d+)?', re.DOTALL)
+
+
+def apply_substitutions(cs_code: str, mapping: Dict[str, str]) -> Optional[str]:
+    '''
+    Re-applies a VB token substitution (see substitution_map) to its earlier C# conversion, replacing whole identifiers
+    and literals only (never text inside other literals or comments). Returns None if any substituted token cannot
+    be found in the C# output, i.e. the earlier conversion did not carry it over verbatim.
+    '''
+    cs_mapping = {_cs_literal(old): _cs_literal(new) for old, new in mapping.items()}
+    lowered_names = {old.lower() for old in mapping if _IDENTIFIER.match(old)}
+    found, case_variants = set(), set()
+
+    def replace(match):
+        token = match.group(0)
+        if token in cs_mapping:
+            found.add(token)
+            return cs_mapping[token]
+        if token.lower() in lowered_names:
+            case_variants.add(token) # VB is case-insensitive; a differently cased use may be the same symbol
+        return token
+
+    substituted = _CS_TOKEN.sub(replace, cs_code)
+    if found != set(cs_mapping) or case_variants:
+        return None
+    return substituted
+
+
+def changed_line_ratio(old_code: str, new_code: str) -> float:
+    '''Fraction of lines that differ between the two sources (0.0 for identical files).'''
+    old_lines, new_lines = old_code.splitlines(), new_code.splitlines()
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    unchanged = sum(block.size for block in matcher.get_matching_blocks())
+    return 1.0 - unchanged / max(len(old_lines), len(new_lines), 1)
+
+
+def unified_source_diff(old_code: str, new_code: str) -> str:
+    return "".join(difflib.unified_diff(old_code.splitlines(keepends=True), new_code.splitlines(keepends=True),
+                                        fromfile="previous.vb", tofile="current.vb"))
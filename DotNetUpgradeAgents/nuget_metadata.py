@@ -0,0 +1,374 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import xml.etree.ElementTree as ET
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .core_components import logger
+
+# NuGet package metadata resolver. Package IDs are deduplicated across a solution, looked up in an on-disk cache with
+# a TTL, and only the missing ones are fetched, concurrently: from a NuGet v3 feed (registration resource, which
+# carries versions, listing, target-framework groups, vulnerabilities and deprecation) or from a local folder feed
+# of .nupkg files for offline use. Outdated, vulnerable and framework-incompatible status is then computed in memory.
+
+DEFAULT_NUGET_FEED = "https://api.nuget.org/v3/index.json"
+DEFAULT_NUGET_CACHE_TTL_SECONDS = 6 * 3600
+DEFAULT_NUGET_MAX_WORKERS = 8
+DEFAULT_NUGET_REQUEST_TIMEOUT = 30
+REGISTRATION_RESOURCE_TYPES = ("RegistrationsBaseUrl/3.6.0", "RegistrationsBaseUrl/3.4.0", "RegistrationsBaseUrl")
+VULNERABILITY_SEVERITIES = {"0": "low", "1": "moderate", "2": "high", "3": "critical"}
+
+
+# --- Versions --------------------------------------------------------------------------------------------------
+
+def version_key(version: str) -> tuple:
+    '''Sort key for a NuGet (SemVer 2) version: numeric parts, then release after pre-release, labels compared per part.'''
+    version = version.split("+", 1)[0].strip()
+    release, _, prerelease = version.partition("-")
+    numbers = tuple(int(part) if part.isdigit() else 0 for part in release.split("."))
+    numbers = (numbers + (0, 0, 0, 0))[:4]
+    if not prerelease:
+        return numbers, (1,)
+    labels = tuple((0, int(label), "") if label.isdigit() else (1, 0, label.lower()) for label in prerelease.split("."))
+    return numbers, (0,) + labels
+
+
+def is_prerelease(version: str) -> bool:
+    return "-" in version.split("+", 1)[0]
+
+
+def resolve_version(spec: Optional[str], versions: List[str]) -> Optional[str]:
+    '''
+    The version NuGet restores for a PackageReference version spec: an exact version, a range ("[1.0,2.0)", "1.0"
+    meaning >= 1.0, resolved to the lowest match) or a floating version ("1.2.*", resolved to the highest match).
+    '''
+    if not spec:
+        return None
+    spec = spec.strip()
+    if "*" in spec:
+        prefix = spec.split("*", 1)[0]
+        matching = [v for v in versions if v.startswith(prefix) and (not is_prerelease(v) or "-" in prefix)]
+        return max(matching, key=version_key) if matching else None
+    if spec[0] in "[(":
+        inclusive_low, inclusive_high = spec[0] == "[", spec[-1] == "]"
+        low, _, high = spec[1:-1].partition(",") if "," in spec else (spec[1:-1], None, spec[1:-1])
+        low, high = low.strip(), (high or "").strip()
+        def in_range(v):
+            key = version_key(v)
+            if low and (key < version_key(low) or (key == version_key(low) and not inclusive_low)):
+                return False
+            if high and (key > version_key(high) or (key == version_key(high) and not inclusive_high)):
+                return False
+            return True
+        matching = sorted((v for v in versions if in_range(v)), key=version_key)
+        return matching[0] if matching else (low or None)
+    exact = [v for v in versions if version_key(v) == version_key(spec)]
+    return exact[0] if exact else spec
+
+
+# --- Target frameworks -----------------------------------------------------------------------------------------
+
+_FRAMEWORK_NAMES = (("netstandard", "netstandard"), ("netcoreapp", "netcoreapp"), (".netstandard", "netstandard"),
+                    (".netcoreapp", "netcoreapp"), (".netframework", "netframework"))
+
+
+def parse_framework(tfm: Optional[str]) -> Optional[Tuple[str, tuple, str]]:
+    '''
+    (family, version, platform) for a short ("net472", "net8.0-windows", "netstandard2.0") or long (".NETFramework4.6.1")
+    framework name. Family is netframework, netstandard or netcoreapp (.NET 5+ included); None for anything else.
+    '''
+    if not tfm:
+        return None
+    name, _, platform = tfm.strip().lower().partition("-")
+    platform = re.sub(r"[\d.]+$", "", platform)
+    for prefix, family in _FRAMEWORK_NAMES:
+        if name.startswith(prefix) and re.match(r"^[\d.]+$", name[len(prefix):] or "x"):
+            return family, tuple(int(p) for p in name[len(prefix):].split(".") if p), platform
+    match = re.match(r"^net(\d+(?:\.\d+)*)$", name)
+    if not match:
+        return None
+    digits = match.group(1)
+    if "." in digits: # net5.0 and later
+        version = tuple(int(p) for p in digits.split("."))
+        return ("netcoreapp" if version[0] >= 5 else "netframework"), version, platform
+    return "netframework", tuple(int(d) for d in digits), platform # net472 -> 4.7.2
+
+
+def _at_least(version: tuple, minimum: tuple) -> bool:
+    width = max(len(version), len(minimum))
+    return version + (0,) * (width - len(version)) >= minimum + (0,) * (width - len(minimum))
+
+
+# Minimum .NET Framework / .NET Core version implementing each .NET Standard version (netstandard2.1: Core only)
+_NETSTANDARD_FRAMEWORK = {(1, 0): (4, 5), (1, 1): (4, 5), (1, 2): (4, 5, 1), (1, 3): (4, 6), (1, 4): (4, 6, 1), (1, 5): (4, 6, 1),
+                          (1, 6): (4, 6, 1), (2, 0): (4, 6, 1)}
+_NETSTANDARD_CORE = {(2, 0): (2, 0), (2, 1): (3, 0)}
+
+
+def is_framework_compatible(project_tfm: str, package_tfm: Optional[str]) -> bool:
+    '''
+    True if a package asset built for package_tfm can be used by a project targeting project_tfm. Unknown
+    frameworks on either side are treated as compatible (the check only reports what it is sure about).
+    '''
+    project, package = parse_framework(project_tfm), parse_framework(package_tfm)
+    if project is None or package is None:
+        return True
+    (project_family, project_version, project_platform), (package_family, package_version, package_platform) = project, package
+    if package_platform and package_platform != project_platform:
+        return False
+    if package_family == project_family:
+        return _at_least(project_version, package_version)
+    if package_family == "netstandard":
+        standard = (package_version + (0,))[:2]
+        if project_family == "netcoreapp":
+            return _at_least(project_version, _NETSTANDARD_CORE.get(standard, (1, 0)))
+        minimum = _NETSTANDARD_FRAMEWORK.get(standard)
+        return minimum is not None and _at_least(project_version, minimum)
+    return False # .NET Framework assets on .NET Core / .NET 5+ (and the reverse)
+
+
+# --- Resolver --------------------------------------------------------------------------------------------------
+
+class NuGetMetadataCache:
+    '''On-disk cache of per-package metadata records, stored in a SQLite file. Entries expire after ttl_seconds.'''
+    def __init__(self, path: Optional[str] = None, ttl_seconds: Optional[float] = None):
+        self.path = path or os.getenv("NUGET_CACHE_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "nuget_cache.sqlite3")
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("NUGET_CACHE_TTL_SECONDS") or DEFAULT_NUGET_CACHE_TTL_SECONDS)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False) # Access is serialized by self._lock
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS packages ("
+                "feed TEXT NOT NULL, package_id TEXT NOT NULL, data TEXT NOT NULL, fetched_at REAL NOT NULL, "
+                "PRIMARY KEY (feed, package_id))"
+            )
+
+    def get_many(self, feed: str, package_ids: Iterable[str]) -> Dict[str, dict]:
+        '''Unexpired records for the given (lower-case) package IDs.'''
+        oldest = time.time() - self.ttl_seconds
+        records = {}
+        with self._lock:
+            for package_id in package_ids:
+                row = self._conn.execute("SELECT data, fetched_at FROM packages WHERE feed = ? AND package_id = ?", (feed, package_id)).fetchone()
+                if row and row[1] >= oldest:
+                    records[package_id] = json.loads(row[0])
+        return records
+
+    def put_many(self, feed: str, records: Dict[str, dict]):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO packages VALUES (?, ?, ?, ?)",
+                                   [(feed, package_id, json.dumps(record), now) for package_id, record in records.items()])
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM packages")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class NuGetMetadataResolver:
+    '''
+    Resolves package metadata from feed: a NuGet v3 service index URL (default: NUGET_FEED or nuget.org) or a local
+    folder of .nupkg files (flat, or <id>/<version>/ as in a global packages folder). A record is
+    {"id", "versions": [{"version", "listed", "frameworks", "vulnerabilities", "deprecated"}], "error"}.
+    '''
+    def __init__(self, feed: Optional[str] = None, cache: Optional[NuGetMetadataCache] = None, max_workers: int = DEFAULT_NUGET_MAX_WORKERS,
+                 session: Optional[requests.Session] = None, timeout: float = DEFAULT_NUGET_REQUEST_TIMEOUT):
+        self.feed = feed or os.getenv("NUGET_FEED") or DEFAULT_NUGET_FEED
+        self.is_local = not re.match(r"^https?://", self.feed, re.IGNORECASE)
+        self.cache = cache if cache is not None else (None if self.is_local else NuGetMetadataCache()) # Local feeds are cheap to re-read
+        self.max_workers = max_workers
+        self.timeout = timeout
+        if session is None and not self.is_local:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+        self._lock = threading.Lock()
+        self._registration_base: Optional[str] = None
+        self._local_packages: Optional[Dict[str, dict]] = None
+        self._stats = {"requested": 0, "unique": 0, "cache_hits": 0, "fetched": 0, "http_requests": 0, "errors": 0}
+
+    # --- Fetching ---
+
+    def _get_json(self, url: str) -> Optional[dict]:
+        '''Parsed JSON for url, or None for 404 (unknown package). Other failures raise.'''
+        with self._lock:
+            self._stats["http_requests"] += 1
+        response = self.session.get(url, timeout=self.timeout)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def _registration_url(self, package_id: str) -> str:
+        with self._lock:
+            base = self._registration_base
+        if base is None:
+            service_index = self._get_json(self.feed) or {}
+            resources = {r.get("@type"): r.get("@id") for r in service_index.get("resources", [])}
+            base = next((resources[t] for t in REGISTRATION_RESOURCE_TYPES if resources.get(t)), None)
+            if not base:
+                raise ValueError(f"NuGetMetadataResolver: {self.feed} has no registration resource")
+            with self._lock:
+                self._registration_base = base
+        return base.rstrip("/") + f"/{package_id}/index.json"
+
+    def _fetch_remote(self, package_id: str) -> dict:
+        registration = self._get_json(self._registration_url(package_id))
+        record = {"id": package_id, "versions": [], "error": None}
+        if registration is None:
+            record["error"] = "Package not found"
+            return record
+        for page in registration.get("items", []):
+            leaves = page.get("items")
+            if leaves is None: # Large packages: pages are not inlined
+                leaves = (self._get_json(page["@id"]) or {}).get("items", [])
+            for leaf in leaves:
+                entry = leaf.get("catalogEntry", {})
+                deprecation = entry.get("deprecation")
+                record["id"] = entry.get("id", record["id"])
+                record["versions"].append({
+                    "version": entry.get("version", ""),
+                    "listed": entry.get("listed", True),
+                    "frameworks": sorted({group.get("targetFramework") or "" for group in entry.get("dependencyGroups", [])} - {""}),
+                    "vulnerabilities": [{"severity": VULNERABILITY_SEVERITIES.get(str(v.get("severity")), str(v.get("severity"))),
+                                         "advisory_url": v.get("advisoryUrl")} for v in entry.get("vulnerabilities", [])],
+                    "deprecated": bool(deprecation),
+                })
+        return record
+
+    def _read_local_feed(self) -> Dict[str, dict]:
+        '''Records for every .nupkg under the local feed folder (read once per resolver).'''
+        packages: Dict[str, dict] = {}
+        for dir_path, _, file_names in os.walk(self.feed):
+            for file_name in file_names:
+                if not file_name.lower().endswith(".nupkg") or file_name.lower().endswith(".symbols.nupkg"):
+                    continue
+                path = os.path.join(dir_path, file_name)
+                try:
+                    package_id, version, frameworks = self._read_nupkg(path)
+                except (zipfile.BadZipFile, ET.ParseError, KeyError, OSError) as e:
+                    logger.warning(f"NuGetMetadataResolver: Skipping unreadable package {path}: {e}")
+                    continue
+                record = packages.setdefault(package_id.lower(), {"id": package_id, "versions": [], "error": None})
+                record["versions"].append({"version": version, "listed": True, "frameworks": frameworks, "vulnerabilities": [], "deprecated": False})
+        return packages
+
+    @staticmethod
+    def _read_nupkg(path: str) -> Tuple[str, str, List[str]]:
+        '''(id, version, target frameworks) from a .nupkg: its .nuspec dependency groups and lib/ref folders.'''
+        with zipfile.ZipFile(path) as package:
+            names = package.namelist()
+            nuspec = next(name for name in names if "/" not in name and name.lower().endswith(".nuspec"))
+            root = ET.fromstring(package.read(nuspec))
+        metadata = {el.tag.rsplit("}", 1)[-1]: el for el in root.iter()}
+        frameworks = {el.get("targetFramework") for el in root.iter() if el.tag.rsplit("}", 1)[-1] == "group" and el.get("targetFramework")}
+        frameworks |= {name.split("/")[1] for name in names if name.lower().startswith(("lib/", "ref/")) and name.count("/") >= 2}
+        return metadata["id"].text.strip(), metadata["version"].text.strip(), sorted(frameworks)
+
+    def fetch(self, package_ids: Iterable[str]) -> Dict[str, dict]:
+        '''Records for the given package IDs (case-insensitive, duplicates removed), keyed by lower-case ID.'''
+        package_ids = list(package_ids)
+        unique = sorted({package_id.lower() for package_id in package_ids if package_id})
+        with self._lock:
+            self._stats["requested"] += len(package_ids)
+            self._stats["unique"] += len(unique)
+
+        if self.is_local:
+            with self._lock:
+                if self._local_packages is None:
+                    self._local_packages = self._read_local_feed()
+                local = self._local_packages
+            return {package_id: local.get(package_id, {"id": package_id, "versions": [], "error": "Package not found"}) for package_id in unique}
+
+        records = self.cache.get_many(self.feed, unique) if self.cache else {}
+        missing = [package_id for package_id in unique if package_id not in records]
+        with self._lock:
+            self._stats["cache_hits"] += len(records)
+        if missing:
+            def fetch_one(package_id):
+                try:
+                    return package_id, self._fetch_remote(package_id), None
+                except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+                    return package_id, {"id": package_id, "versions": [], "error": f"{type(e).__name__}: {e}"}, e
+            fetched = {}
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing)), thread_name_prefix="nuget-metadata") as executor:
+                for package_id, record, error in executor.map(fetch_one, missing):
+                    records[package_id] = record
+                    if error is None:
+                        fetched[package_id] = record # Failed lookups are not cached
+                    else:
+                        logger.warning(f"NuGetMetadataResolver: Could not fetch {package_id} from {self.feed}: {error}")
+            with self._lock:
+                self._stats["fetched"] += len(fetched)
+                self._stats["errors"] += len(missing) - len(fetched)
+            if self.cache and fetched:
+                self.cache.put_many(self.feed, fetched)
+        logger.info(f"NuGetMetadataResolver: {len(unique)} packages ({len(package_ids)} references), {len(unique) - len(missing)} from cache, {len(missing)} fetched")
+        return records
+
+    # --- Status ---
+
+    def check(self, packages: List[dict], target_frameworks: Optional[List[str]] = None) -> List[dict]:
+        '''
+        Status of each package reference ({"name", "version"}, optionally "target_frameworks" overriding the argument):
+        the resolved and latest versions, outdated, vulnerabilities, deprecation, and the target frameworks the
+        resolved version does not support, plus the newest listed stable version that supports all of them.
+        All metadata is fetched in one batch first.
+        '''
+        records = self.fetch(package["name"] for package in packages)
+        return [self._status(package, records[package["name"].lower()], package.get("target_frameworks", target_frameworks) or [])
+                for package in packages if package.get("name")]
+
+    @staticmethod
+    def _status(package: dict, record: dict, target_frameworks: List[str]) -> dict:
+        status = {"name": package["name"], "version": package.get("version"), "resolved_version": None, "latest_version": None,
+                  "latest_compatible_version": None, "outdated": False, "vulnerable": False, "vulnerabilities": [],
+                  "deprecated": False, "incompatible_frameworks": [], "status": "unknown", "error": record.get("error")}
+        versions = {v["version"]: v for v in record["versions"]}
+        if not versions:
+            return status
+        listed = sorted((v for v in versions if versions[v]["listed"]), key=version_key)
+        resolved = resolve_version(package.get("version"), list(versions))
+        current_is_prerelease = bool(resolved and is_prerelease(resolved))
+        candidates = [v for v in listed if current_is_prerelease or not is_prerelease(v)] or listed
+
+        def supports_all(version: str) -> bool:
+            frameworks = versions[version]["frameworks"]
+            return not frameworks or all(any(is_framework_compatible(tfm, f) for f in frameworks) for tfm in target_frameworks)
+
+        status["latest_version"] = candidates[-1] if candidates else None
+        status["latest_compatible_version"] = next((v for v in reversed(candidates) if supports_all(v)), None)
+        status["resolved_version"] = resolved
+        details = versions.get(resolved) if resolved else None
+        if resolved and status["latest_version"]:
+            status["outdated"] = version_key(resolved) < version_key(status["latest_version"])
+        if details:
+            status["vulnerabilities"] = details["vulnerabilities"]
+            status["vulnerable"] = bool(details["vulnerabilities"])
+            status["deprecated"] = details["deprecated"]
+            status["incompatible_frameworks"] = [tfm for tfm in target_frameworks
+                                                 if details["frameworks"] and not any(is_framework_compatible(tfm, f) for f in details["frameworks"])]
+        elif resolved:
+            status["error"] = status["error"] or f"Version {resolved} not found on the feed"
+        status["status"] = ("vulnerable" if status["vulnerable"] else "incompatible" if status["incompatible_frameworks"]
+                            else "outdated" if status["outdated"] else "ok" if details else "unknown")
+        return status
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,262 @@
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+from .core_components import logger
+
+# Local application of LLM-proposed patches, so the LLM only has to output what changes instead of whole files.
+# Two formats are accepted: unified diffs ("--- a/file", "+++ b/file", "@@ -l,n +l,n @@" hunks) and edit blocks
+# (<edit file="..."><find>old text</find><replace>new text</replace></edit>). Every hunk or edit is checked against the
+# current content before anything is changed: a hunk's context and removed lines must be found (at the line it names,
+# or the nearest place the lines match exactly), and an edit's find text must occur exactly once. Anything else raises
+# PatchConflictError and leaves all files untouched.
+
+PATCH_FORMATS = ("full", "diff", "edits") # "full": the LLM returns the whole file, no patch
+MAX_PATCH_FILE_BYTES = 5 * 1024 * 1024
+
+_CODE_FENCE = re.compile(r"^\s*```[\w#+-]*\s*$")
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+_EDIT_BLOCK = re.compile(r"<edit(?:\s+file=\"([^\"]*)\")?\s*>(.*?)</edit>", re.DOTALL)
+_FIND_BLOCK = re.compile(r"<find>(.*?)</find>", re.DOTALL)
+_REPLACE_BLOCK = re.compile(r"<replace>(.*?)</replace>", re.DOTALL)
+
+
+class PatchError(ValueError):
+    '''The patch is malformed, empty, or targets a file it may not change.'''
+
+
+class PatchConflictError(PatchError):
+    '''The patch does not match the content it is applied to (e.g. it was written against other file contents).'''
+    def __init__(self, message: str, path: Optional[str] = None):
+        super().__init__(f"{path}: {message}" if path else message)
+        self.path = path
+
+
+def patch_instructions(patch_format: str, multiple_files: bool = False) -> str:
+    '''Prompt text asking the LLM for a patch in patch_format ("diff" or "edits") instead of whole files.'''
+    if patch_format == "diff":
+        paths = " Use the path relative to the project directory in the ---/+++ lines." if multiple_files else ""
+        return ("Output only a unified diff (as produced by `diff -u`) against the content supplied above: `--- a/<file>` and "
+                f"`+++ b/<file>` lines, then `@@ -line,count +line,count @@` hunks with 3 lines of unchanged context.{paths} "
+                "Copy context and removed lines exactly. Do not output the whole file.")
+    if patch_format == "edits":
+        file_attribute = ' file="<path relative to the project directory>"' if multiple_files else ""
+        return (f"Output only edit blocks against the content supplied above, one per change: <edit{file_attribute}><find>exact "
+                "existing text</find><replace>new text</replace></edit>. The find text must be copied exactly and occur exactly "
+                "once in the file; include enough surrounding lines to make it unique. Do not output the whole file.")
+    raise ValueError(f"PatchApplier: Unknown patch format: {patch_format}")
+
+
+class _Hunk:
+    def __init__(self, old_start: int, header: str):
+        self.old_start = old_start # 1-based, as in the @@ header (0 for an insertion into an empty file)
+        self.header = header
+        self.old_lines: List[str] = []
+        self.new_lines: List[str] = []
+
+
+class FilePatch:
+    '''The changes a patch makes to one file: unified diff hunks or find/replace edits. path is None if the patch named no file.'''
+    def __init__(self, path: Optional[str], patch_format: str):
+        self.path = path
+        self.patch_format = patch_format
+        self.new_file = False
+        self.hunks: List[_Hunk] = []
+        self.edits: List[Tuple[str, str]] = []
+
+    def apply(self, content: str) -> str:
+        if self.patch_format == "diff":
+            return _apply_hunks(content, self.hunks, self.path)
+        return _apply_edits(content, self.edits, self.path)
+
+
+def _strip_code_fences(text: str) -> str:
+    return "\n".join(line for line in text.splitlines() if not _CODE_FENCE.match(line))
+
+
+def _diff_path(line: str) -> Optional[str]:
+    path = line[4:].split("\t", 1)[0].strip()
+    if path == "/dev/null":
+        return None
+    return path[2:] if path[:2] in ("a/", "b/") else path
+
+
+def _parse_unified_diff(text: str) -> List[FilePatch]:
+    patches: List[FilePatch] = []
+    current: Optional[FilePatch] = None
+    hunk: Optional[_Hunk] = None
+    old_path = None
+    for line in text.splitlines():
+        if line.startswith("--- ") and (hunk is None or _looks_like_file_header(line)):
+            old_path, hunk = _diff_path(line), None
+            continue
+        if line.startswith("+++ ") and hunk is None:
+            new_path = _diff_path(line)
+            if new_path is None:
+                raise PatchError(f"PatchApplier: Deleting files is not supported ({old_path})")
+            current = FilePatch(new_path, "diff")
+            current.new_file = old_path is None
+            patches.append(current)
+            continue
+        header = _HUNK_HEADER.match(line)
+        if header:
+            if current is None: # Hunks without file headers: a patch of the single supplied document
+                current = FilePatch(None, "diff")
+                patches.append(current)
+            hunk = _Hunk(int(header.group(1)), line)
+            current.hunks.append(hunk)
+            continue
+        if hunk is None or line.startswith("\\"): # Text before the first hunk, or "\ No newline at end of file"
+            continue
+        if line.startswith("-"):
+            hunk.old_lines.append(line[1:])
+        elif line.startswith("+"):
+            hunk.new_lines.append(line[1:])
+        else: # Context; LLMs often drop the leading space of blank context lines
+            hunk.old_lines.append(line[1:] if line.startswith(" ") else line)
+            hunk.new_lines.append(line[1:] if line.startswith(" ") else line)
+    for patch in patches:
+        for hunk in patch.hunks: # Trailing blank lines after the last hunk line are separators, not context
+            while hunk.old_lines and hunk.new_lines and hunk.old_lines[-1] == hunk.new_lines[-1] == "":
+                hunk.old_lines.pop()
+                hunk.new_lines.pop()
+        if not patch.hunks:
+            raise PatchError(f"PatchApplier: No hunks for {patch.path}")
+    return patches
+
+
+def _looks_like_file_header(line: str) -> bool:
+    '''"--- a/x.cs" starts a file; inside a hunk, "--- x" may also be a removed line beginning with "-- ".'''
+    return bool(re.match(r"^--- (a/|/dev/null|\S+\.\w+(\s|$))", line))
+
+
+def _parse_edits(text: str) -> List[FilePatch]:
+    patches: Dict[Optional[str], FilePatch] = {}
+    for match in _EDIT_BLOCK.finditer(text):
+        find, replace = _FIND_BLOCK.search(match.group(2)), _REPLACE_BLOCK.search(match.group(2))
+        if find is None or replace is None:
+            raise PatchError("PatchApplier: Every <edit> needs a <find> and a <replace>")
+        old, new = _block_text(find.group(1)), _block_text(replace.group(1))
+        if not old.strip():
+            raise PatchError("PatchApplier: Empty <find> text")
+        path = match.group(1) or None
+        patches.setdefault(path, FilePatch(path, "edits")).edits.append((old, new))
+    return list(patches.values())
+
+
+def _block_text(text: str) -> str:
+    '''Edit block text without the line break right after the opening tag and before the closing tag.'''
+    text = text[2:] if text.startswith("\r\n") else text[1:] if text.startswith("\n") else text
+    return text[:-2] if text.endswith("\r\n") else text[:-1] if text.endswith("\n") else text
+
+
+def parse_patch(text: str) -> List[FilePatch]:
+    '''The file patches in an LLM response (code fences are ignored). Raises PatchError if it holds no usable patch.'''
+    if _EDIT_BLOCK.search(text):
+        patches = _parse_edits(text)
+    else:
+        patches = _parse_unified_diff(_strip_code_fences(text))
+    if not patches:
+        raise PatchError("PatchApplier: The response contains no unified diff hunks or <edit> blocks")
+    return patches
+
+
+def _split_lines(content: str) -> Tuple[List[str], str, bool]:
+    newline = "\r\n" if "\r\n" in content else "\n"
+    return content.splitlines(), newline, content.endswith(("\n", "\r"))
+
+
+def _find_block(lines: List[str], block: List[str], hint: int, start: int, loose: bool) -> Optional[int]:
+    '''Index at or after start where block occurs, nearest to hint.'''
+    if loose:
+        lines = [line.rstrip() for line in lines]
+        block = [line.rstrip() for line in block]
+    last = len(lines) - len(block)
+    hint = min(max(hint, start), max(last, start))
+    for distance in range(0, max(last - start, 0) + 1):
+        for position in (hint - distance, hint + distance):
+            if start <= position <= last and lines[position:position + len(block)] == block:
+                return position
+    return None
+
+
+def _apply_hunks(content: str, hunks: List[_Hunk], path: Optional[str]) -> str:
+    lines, newline, trailing_newline = _split_lines(content)
+    result: List[str] = []
+    position, offset = 0, 0 # Next unconsumed line; shift of the file so far against the hunk headers
+    for hunk in hunks:
+        hint = max(hunk.old_start - 1, 0) + offset
+        if hunk.old_lines:
+            found = _find_block(lines, hunk.old_lines, hint, position, loose=False)
+            if found is None:
+                found = _find_block(lines, hunk.old_lines, hint, position, loose=True) # Trailing whitespace differences only
+            if found is None:
+                raise PatchConflictError(f"PatchApplier: Hunk {hunk.header} does not match the current content", path)
+        else:
+            found = min(max(hint, position), len(lines))
+        result.extend(lines[position:found])
+        result.extend(hunk.new_lines)
+        position = found + len(hunk.old_lines)
+        offset = found - max(hunk.old_start - 1, 0)
+    result.extend(lines[position:])
+    return newline.join(result) + (newline if trailing_newline or not content else "")
+
+
+def _apply_edits(content: str, edits: List[Tuple[str, str]], path: Optional[str]) -> str:
+    for index, (old, new) in enumerate(edits, 1):
+        if "\r\n" in content and "\r\n" not in old:
+            old, new = old.replace("\n", "\r\n"), new.replace("\n", "\r\n")
+        count = content.count(old)
+        if count == 1:
+            content = content.replace(old, new, 1)
+            continue
+        if count > 1:
+            raise PatchConflictError(f"PatchApplier: Edit {index}: find text occurs {count} times; it must be unique", path)
+        # Tolerate trailing whitespace differences by matching whole lines
+        lines, newline, trailing_newline = _split_lines(content)
+        block = old.splitlines()
+        found = _find_block(lines, block, 0, 0, loose=True)
+        if found is None or _find_block(lines, block, found + 1, found + 1, loose=True) is not None:
+            raise PatchConflictError(f"PatchApplier: Edit {index}: find text not found in the current content", path)
+        lines[found:found + len(block)] = new.splitlines()
+        content = newline.join(lines) + (newline if trailing_newline else "")
+    return content
+
+
+def apply_patch(content: str, patch_text: str) -> str:
+    '''Applies a patch of one document (e.g. a project file) to content; file names in the patch are not checked.'''
+    patches = parse_patch(patch_text)
+    if len(patches) > 1:
+        raise PatchError(f"PatchApplier: Expected changes to one file, got {len(patches)}")
+    return patches[0].apply(content)
+
+
+def apply_patch_to_files(root: str, patch_text: str, default_path: Optional[str] = None) -> Dict[str, str]:
+    '''
+    Applies a patch of files under root (paths in the patch are relative to root; default_path is used for patches
+    naming no file) and returns {absolute path: new content}. Nothing is written: every file is patched in memory
+    first, so a conflict in any of them (PatchConflictError) leaves all files unchanged.
+    '''
+    root = os.path.abspath(root)
+    updated: Dict[str, str] = {}
+    for patch in parse_patch(patch_text):
+        relative = patch.path or default_path
+        if not relative:
+            raise PatchError("PatchApplier: Patch does not name the file it changes")
+        path = os.path.normpath(os.path.join(root, relative.replace("\\", os.sep)))
+        if os.path.commonpath([root, path]) != root:
+            raise PatchError(f"PatchApplier: {relative} is outside {root}")
+        if path in updated:
+            content = updated[path]
+        elif os.path.isfile(path):
+            if os.path.getsize(path) > MAX_PATCH_FILE_BYTES:
+                raise PatchError(f"PatchApplier: {relative} is too large to patch")
+            with open(path, "r", encoding="utf-8-sig") as f:
+                content = f.read()
+        elif patch.new_file:
+            content = ""
+        else:
+            raise PatchConflictError("PatchApplier: File to patch does not exist", relative)
+        updated[path] = patch.apply(content)
+    logger.info(f"PatchApplier: Patch applies cleanly to {len(updated)} files under {root}")
+    return updated
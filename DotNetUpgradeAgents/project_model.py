@@ -0,0 +1,276 @@
+import os
+import re
+import threading
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional
+
+from .core_components import logger
+
+# Streaming model of MSBuild project files (.csproj/.vbproj), built in one iterparse pass with elements dropped as
+# soon as they are consumed, so memory stays bounded however many Compile items a project has. Mirrors MSBuild evaluation
+# for the common cases: the nearest Directory.Build.props and Directory.Packages.props are applied before the project
+# body, $(Property) references are expanded, PackageReference versions come from a Version attribute or child element,
+# VersionOverride, or central package management, and packages.config is read for old-style projects. Conditions are
+# not evaluated: conditional properties only apply when no unconditional value exists, and conditional items are kept
+# with their condition.
+
+DIRECTORY_BUILD_PROPS = "Directory.Build.props"
+DIRECTORY_PACKAGES_PROPS = "Directory.Packages.props"
+PACKAGES_CONFIG = "packages.config"
+
+_PROPERTY_REFERENCE = re.compile(r"\$\(([A-Za-z_][\w.]*)\)")
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _is_true(value: Optional[str]) -> bool:
+    return (value or "").strip().lower() == "true"
+
+
+def normalize_target_framework(value: str) -> str:
+    '''"v4.7.2" (TargetFrameworkVersion) -> "net472"; SDK-style monikers such as "net8.0" are returned as-is.'''
+    value = value.strip()
+    if re.match(r"^v\d+(\.\d+)*$", value, re.IGNORECASE):
+        return "net" + value[1:].replace(".", "")
+    return value
+
+
+def find_directory_file(start_dir: str, file_name: str, stop_at: Optional[str] = None) -> Optional[str]:
+    '''The nearest file_name in start_dir or its ancestors (as MSBuild locates Directory.Build.props), or None.'''
+    current = os.path.abspath(start_dir)
+    while True:
+        candidate = os.path.join(current, file_name)
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(current)
+        if parent == current or (stop_at and os.path.normcase(current) == os.path.normcase(os.path.abspath(stop_at))):
+            return None
+        current = parent
+
+
+class _Evaluation:
+    '''Properties and items collected while reading a chain of MSBuild files (imports first, then the project).'''
+    def __init__(self):
+        self.properties: Dict[str, str] = {}
+        self.conditional_properties: Dict[str, str] = {}
+        self.package_references: List[dict] = []
+        self.package_versions: Dict[str, str] = {} # Central package management (<PackageVersion>), by lower-case package ID
+        self.references: List[dict] = []
+        self.project_references: List[dict] = []
+        self.imports: List[dict] = []
+        self.sdk: Optional[str] = None
+
+    def expand(self, value: Optional[str]) -> Optional[str]:
+        if value is None:
+            return None
+        def replace(match):
+            name = match.group(1)
+            return self.properties.get(name, self.conditional_properties.get(name, match.group(0)))
+        return _PROPERTY_REFERENCE.sub(replace, value).strip()
+
+    def property(self, name: str) -> Optional[str]:
+        value = self.properties.get(name, self.conditional_properties.get(name))
+        return self.expand(value) if value is not None else None
+
+
+def _read_msbuild_file(path: str, evaluation: _Evaluation, is_project: bool):
+    '''Adds one MSBuild file's properties and items to evaluation, streaming it with iterparse.'''
+    file_dir = os.path.dirname(os.path.abspath(path))
+    stack = [] # (element, local name, condition) of the open elements
+    for event, element in ET.iterparse(path, events=("start", "end")):
+        name = _local_name(element.tag)
+        if event == "start":
+            stack.append((element, name, element.get("Condition")))
+            if name == "Project" and len(stack) == 1 and is_project:
+                evaluation.sdk = element.get("Sdk")
+            continue
+
+        stack.pop()
+        parent_element, parent = (stack[-1][0], stack[-1][1]) if stack else (None, None)
+        condition = " and ".join(c for _, _, c in stack[1:] if c) # Conditions of enclosing groups
+        if element.get("Condition"):
+            condition = f"{condition} and {element.get('Condition')}" if condition else element.get("Condition")
+
+        if parent == "PropertyGroup":
+            value = evaluation.expand(element.text or "")
+            if condition:
+                evaluation.conditional_properties[name] = value
+            else:
+                evaluation.properties[name] = value
+        elif parent == "ItemGroup" and name in ("PackageReference", "PackageVersion", "Reference", "ProjectReference"):
+            _read_item(name, element, condition, file_dir, path, evaluation)
+        elif name == "Import" and parent in ("Project", "ImportGroup"):
+            evaluation.imports.append({"project": evaluation.expand(element.get("Project")), "condition": condition or None, "file": path})
+        elif name == "Sdk" and parent == "Project" and is_project and element.get("Name"):
+            evaluation.sdk = element.get("Name")
+
+        if parent in ("PropertyGroup", "ItemGroup", "ImportGroup", "Project"):
+            parent_element.remove(element) # Items read their children at their own end event; nothing needs them afterwards
+
+
+def _child_text(element, child_name: str) -> Optional[str]:
+    for child in element:
+        if _local_name(child.tag) == child_name:
+            return (child.text or "").strip()
+    return None
+
+
+def _read_item(kind: str, element, condition: str, file_dir: str, path: str, evaluation: _Evaluation):
+    include = evaluation.expand(element.get("Include"))
+    update = evaluation.expand(element.get("Update"))
+    def metadata(name):
+        return evaluation.expand(element.get(name) if element.get(name) is not None else _child_text(element, name))
+
+    if kind == "PackageVersion":
+        if include or update:
+            evaluation.package_versions[(include or update).lower()] = metadata("Version") # NuGet IDs are case-insensitive
+        return
+    if kind == "PackageReference":
+        if update: # <PackageReference Update="X" Version="..."> changes an existing reference (typically in Directory.Build.targets/props)
+            for reference in evaluation.package_references:
+                if reference["name"].lower() == update.lower():
+                    reference["version"] = metadata("Version") or reference["version"]
+            return
+        if not include:
+            return
+        evaluation.package_references.append({
+            "name": include,
+            "version": metadata("Version"),
+            "version_override": metadata("VersionOverride"),
+            "private_assets": metadata("PrivateAssets"),
+            "condition": condition or None,
+            "defined_in": path,
+        })
+    elif kind == "Reference" and include:
+        parts = [part.strip() for part in include.split(",")]
+        fields = dict(part.split("=", 1) for part in parts[1:] if "=" in part)
+        hint_path = metadata("HintPath")
+        evaluation.references.append({
+            "name": parts[0],
+            "version": fields.get("Version"),
+            "hint_path": os.path.normpath(os.path.join(file_dir, hint_path.replace("\\", os.sep))) if hint_path else None,
+            "condition": condition or None,
+        })
+    elif kind == "ProjectReference" and include:
+        evaluation.project_references.append({
+            "path": os.path.normpath(os.path.join(file_dir, include.replace("\\", os.sep))),
+            "condition": condition or None,
+        })
+
+
+_IMPORT_CACHE: Dict[str, tuple] = {} # path -> (mtime, _Evaluation) for Directory.*.props shared by many projects
+_IMPORT_CACHE_LOCK = threading.Lock()
+
+
+def _read_cached_import(path: str) -> _Evaluation:
+    mtime = os.path.getmtime(path)
+    with _IMPORT_CACHE_LOCK:
+        cached = _IMPORT_CACHE.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    evaluation = _Evaluation()
+    _read_msbuild_file(path, evaluation, is_project=False)
+    with _IMPORT_CACHE_LOCK:
+        _IMPORT_CACHE[path] = (mtime, evaluation)
+    return evaluation
+
+
+def _merge_import(target: _Evaluation, imported: _Evaluation):
+    target.properties.update(imported.properties)
+    target.conditional_properties.update(imported.conditional_properties)
+    target.package_references.extend(dict(reference) for reference in imported.package_references)
+    target.package_versions.update(imported.package_versions)
+    target.references.extend(imported.references)
+    target.project_references.extend(imported.project_references)
+    target.imports.extend(imported.imports)
+
+
+class ProjectModel:
+    '''
+    Evaluated view of one project file: target frameworks, package/assembly/project references, imports and the
+    Directory.*.props files that contributed to it. Use ProjectModel.load(path).
+    '''
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self.sdk: Optional[str] = None
+        self.properties: Dict[str, str] = {}
+        self.target_frameworks: List[str] = []
+        self.package_references: List[dict] = []
+        self.references: List[dict] = []
+        self.project_references: List[dict] = []
+        self.imports: List[dict] = []
+        self.directory_build_props: Optional[str] = None
+        self.directory_packages_props: Optional[str] = None
+        self.central_package_management = False
+
+    @property
+    def is_sdk_style(self) -> bool:
+        return bool(self.sdk)
+
+    @classmethod
+    def load(cls, path: str) -> "ProjectModel":
+        model = cls(path)
+        project_dir = os.path.dirname(model.path)
+        evaluation = _Evaluation()
+
+        # Imported by the SDK (or Microsoft.Common.props) before the project body, so the project can override them
+        model.directory_build_props = find_directory_file(project_dir, DIRECTORY_BUILD_PROPS)
+        if model.directory_build_props:
+            _merge_import(evaluation, _read_cached_import(model.directory_build_props))
+        model.directory_packages_props = find_directory_file(project_dir, DIRECTORY_PACKAGES_PROPS)
+        if model.directory_packages_props:
+            _merge_import(evaluation, _read_cached_import(model.directory_packages_props))
+
+        _read_msbuild_file(model.path, evaluation, is_project=True)
+
+        model.sdk = evaluation.sdk
+        model.properties = {name: evaluation.property(name) for name in {**evaluation.conditional_properties, **evaluation.properties}}
+        frameworks = evaluation.property("TargetFrameworks") or evaluation.property("TargetFramework") or evaluation.property("TargetFrameworkVersion") or ""
+        model.target_frameworks = [normalize_target_framework(tfm) for tfm in frameworks.split(";") if tfm.strip()]
+        model.central_package_management = _is_true(evaluation.property("ManagePackageVersionsCentrally"))
+        for reference in evaluation.package_references:
+            version, source = reference["version"], "project"
+            if reference["version_override"]:
+                version, source = reference["version_override"], "override"
+            elif not version and model.central_package_management:
+                version, source = evaluation.package_versions.get(reference["name"].lower()), "central"
+            model.package_references.append({"name": reference["name"], "version": version, "version_source": source if version else None,
+                                             "private_assets": reference["private_assets"], "condition": reference["condition"]})
+        model.package_references.extend(cls._read_packages_config(project_dir))
+        model.references = evaluation.references
+        model.project_references = evaluation.project_references
+        model.imports = evaluation.imports
+        return model
+
+    @staticmethod
+    def _read_packages_config(project_dir: str) -> List[dict]:
+        packages_config = os.path.join(project_dir, PACKAGES_CONFIG)
+        if not os.path.isfile(packages_config):
+            return []
+        packages = []
+        try:
+            for _, element in ET.iterparse(packages_config, events=("end",)):
+                if _local_name(element.tag) == "package" and element.get("id"):
+                    packages.append({"name": element.get("id"), "version": element.get("version"), "version_source": "packages.config",
+                                     "private_assets": "all" if _is_true(element.get("developmentDependency")) else None,
+                                     "condition": None, "target_framework": element.get("targetFramework")})
+                element.clear()
+        except ET.ParseError as e:
+            logger.warning(f"ProjectModel: Could not parse {packages_config}: {e}")
+        return packages
+
+    def to_dict(self) -> dict:
+        return {
+            "path": self.path,
+            "sdk": self.sdk,
+            "target_frameworks": self.target_frameworks,
+            "package_references": self.package_references,
+            "references": self.references,
+            "project_references": self.project_references,
+            "imports": self.imports,
+            "directory_build_props": self.directory_build_props,
+            "directory_packages_props": self.directory_packages_props,
+            "central_package_management": self.central_package_management,
+        }
@@ -0,0 +1,217 @@
+import mmap
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .core_components import logger
+
+# Parallel source scanner for namespace/API usage. The tree is walked once (bin/, obj/, .git and other build or tool
+# folders are skipped), each file is memory-mapped rather than read and decoded, and every pattern is matched in the
+# same pass. A compiled alternation of all patterns (C regex engine) finds candidate lines quickly; an Aho-Corasick
+# automaton then reports every pattern on those lines, including overlapping ones ("System" and "System.Data").
+# Large trees are split into batches scanned by a process pool, one process per core.
+
+DEFAULT_SOURCE_EXTENSIONS = (".cs", ".vb", ".cshtml", ".vbhtml", ".aspx", ".ascx", ".asax", ".xaml", ".config")
+SKIPPED_DIRECTORIES = frozenset({"bin", "obj", ".git", ".vs", ".idea", "node_modules", "packages", "testresults"})
+DEFAULT_SCAN_BATCH_SIZE = 256 # Files per process-pool task
+MIN_FILES_FOR_PROCESS_POOL = 512 # Below this, starting worker processes costs more than it saves
+MAX_HIT_TEXT_CHARS = 200
+
+_IDENTIFIER_BYTES = frozenset(b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_")
+
+
+class AhoCorasickMatcher:
+    '''
+    Multi-pattern matcher over bytes: finds every occurrence of every pattern in one left-to-right pass.
+    With case_sensitive=False, patterns and text are compared ASCII-case-insensitively (VB.NET is case-insensitive).
+    With whole_word=True, a match must not be directly preceded or followed by an identifier character.
+    '''
+    def __init__(self, patterns: Iterable[str], case_sensitive: bool = False, whole_word: bool = True):
+        self.patterns = list(dict.fromkeys(p for p in patterns if p))
+        if not self.patterns:
+            raise ValueError("AhoCorasickMatcher: At least one non-empty pattern is required")
+        if any("\n" in p or "\r" in p for p in self.patterns):
+            raise ValueError("AhoCorasickMatcher: Patterns cannot span lines")
+        self.case_sensitive = case_sensitive
+        self.whole_word = whole_word
+        self._keys = [self._fold(p.encode("utf-8")) for p in self.patterns]
+
+        # Trie (goto function), failure links and output sets, built breadth-first
+        self._goto: List[Dict[int, int]] = [{}]
+        self._output: List[List[int]] = [[]]
+        for index, key in enumerate(self._keys):
+            state = 0
+            for byte in key:
+                if byte not in self._goto[state]:
+                    self._goto.append({})
+                    self._output.append([])
+                    self._goto[state][byte] = len(self._goto) - 1
+                state = self._goto[state][byte]
+            self._output[state].append(index)
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values()) # Depth-1 states fail to the root
+        while queue:
+            state = queue.popleft()
+            for byte, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and byte not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(byte, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+        # Prefilter: one compiled alternation over the folded text, longest pattern first, used to skip text without any
+        # pattern. Folding once with bytes.lower() and matching case-sensitively is much faster than re.IGNORECASE.
+        self._prefilter = re.compile(b"|".join(re.escape(key) for key in sorted(set(self._keys), key=len, reverse=True)))
+
+    def _fold(self, data: bytes) -> bytes:
+        return data if self.case_sensitive else data.lower()
+
+    def iter_matches(self, text: bytes) -> Iterable[Tuple[int, str]]:
+        '''(start offset, pattern) for every occurrence in text, in order of their end offset.'''
+        folded = self._fold(text)
+        goto, fail, output, keys = self._goto, self._fail, self._output, self._keys
+        state = 0
+        for position, byte in enumerate(folded):
+            while state and byte not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(byte, 0)
+            for index in output[state]:
+                start = position - len(keys[index]) + 1
+                if self.whole_word and ((start > 0 and text[start - 1] in _IDENTIFIER_BYTES)
+                                        or (position + 1 < len(text) and text[position + 1] in _IDENTIFIER_BYTES)):
+                    continue
+                yield start, self.patterns[index]
+
+    def scan_buffer(self, buffer) -> List[Tuple[str, int, int, str]]:
+        '''
+        (pattern, line number, column, line text) for every match in a bytes-like buffer (bytes or mmap). Only the
+        lines the prefilter flags are run through the automaton; line numbers and columns are 1-based.
+        '''
+        hits = []
+        haystack = buffer if self.case_sensitive else buffer[:].lower() # Folding keeps offsets (ASCII-only case mapping)
+        line_number, counted_to = 1, 0
+        position, length = 0, len(buffer)
+        while position < length:
+            candidate = self._prefilter.search(haystack, position)
+            if candidate is None:
+                break
+            line_start = haystack.rfind(b"\n", 0, candidate.start()) + 1
+            line_end = haystack.find(b"\n", candidate.end())
+            if line_end == -1:
+                line_end = length
+            line_number += haystack[counted_to:line_start].count(b"\n")
+            counted_to = line_start
+            line = buffer[line_start:line_end]
+            text = line.decode("utf-8", errors="replace").strip()[:MAX_HIT_TEXT_CHARS]
+            for start, pattern in self.iter_matches(line):
+                hits.append((pattern, line_number, len(line[:start].decode("utf-8", errors="replace")) + 1, text))
+            position = line_end + 1
+        return hits
+
+
+def iter_source_files(root: str, extensions: Iterable[str] = DEFAULT_SOURCE_EXTENSIONS,
+                      skipped_directories: Iterable[str] = SKIPPED_DIRECTORIES) -> Iterable[str]:
+    '''Files under root with one of the extensions, skipping build/tool folders (case-insensitively) and symlinked dirs.'''
+    extensions = tuple(e.lower() for e in extensions)
+    skipped = {d.lower() for d in skipped_directories}
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name.lower() not in skipped:
+                            pending.append(entry.path)
+                    elif entry.name.lower().endswith(extensions) and entry.is_file():
+                        yield entry.path
+        except OSError as e:
+            logger.warning(f"SourceScanner: Cannot list {directory}: {e}")
+
+
+def _scan_file(matcher: AhoCorasickMatcher, path: str) -> Tuple[int, List[Tuple[str, int, int, str]]]:
+    '''(size in bytes, hits) for one file. Empty files cannot be memory-mapped and have no hits.'''
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return 0, []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return size, matcher.scan_buffer(buffer)
+
+
+def _scan_batch(matcher: AhoCorasickMatcher, paths: List[str]) -> Tuple[int, int, list, list]:
+    scanned, total_bytes, hits, errors = 0, 0, [], []
+    for path in paths:
+        try:
+            size, file_hits = _scan_file(matcher, path)
+        except (OSError, ValueError) as e:
+            errors.append(f"SourceScanner: {path}: {e}")
+            continue
+        scanned += 1
+        total_bytes += size
+        hits.extend((path,) + hit for hit in file_hits)
+    return scanned, total_bytes, hits, errors
+
+
+_WORKER_MATCHER: Optional[AhoCorasickMatcher] = None
+
+
+def _init_worker(patterns: List[str], case_sensitive: bool, whole_word: bool):
+    global _WORKER_MATCHER
+    _WORKER_MATCHER = AhoCorasickMatcher(patterns, case_sensitive, whole_word)
+
+
+def _scan_batch_in_worker(paths: List[str]):
+    return _scan_batch(_WORKER_MATCHER, paths)
+
+
+def scan_sources(root: str, patterns: Iterable[str], extensions: Iterable[str] = DEFAULT_SOURCE_EXTENSIONS,
+                 case_sensitive: bool = False, whole_word: bool = True, max_workers: Optional[int] = None,
+                 batch_size: int = DEFAULT_SCAN_BATCH_SIZE, max_hits_per_pattern: Optional[int] = None,
+                 files: Optional[Iterable[str]] = None) -> dict:
+    '''
+    Scans every source file under root (a directory, or a single file) for all patterns at once.
+    Returns {"hits": {pattern: [{"file", "line", "column", "text"}]}, "hit_counts": {pattern: n}, "files_with_hits": {pattern: [files]},
+    "files_scanned", "bytes_scanned", "elapsed_seconds", "errors"}. Hits are sorted by file and line; with
+    max_hits_per_pattern, only the first hits are listed but hit_counts and files_with_hits stay complete.
+    max_workers=1 scans in-process; otherwise large trees use a process pool (default: one process per core).
+    files, if given (e.g. from the code index), is scanned instead of walking root.
+    '''
+    started = time.monotonic()
+    patterns = list(dict.fromkeys(p for p in patterns if p))
+    matcher = AhoCorasickMatcher(patterns, case_sensitive, whole_word)
+    if files is not None:
+        files = list(files)
+    else:
+        files = [root] if os.path.isfile(root) else list(iter_source_files(root, extensions))
+    batches = [files[i:i + batch_size] for i in range(0, len(files), batch_size)]
+    workers = max_workers or (len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()) or 1
+
+    if workers > 1 and len(files) >= MIN_FILES_FOR_PROCESS_POOL:
+        with ProcessPoolExecutor(max_workers=min(workers, len(batches)), initializer=_init_worker,
+                                 initargs=(patterns, case_sensitive, whole_word)) as executor:
+            results = list(executor.map(_scan_batch_in_worker, batches))
+    else:
+        results = [_scan_batch(matcher, batch) for batch in batches]
+
+    report = {"hits": {p: [] for p in patterns}, "hit_counts": {p: 0 for p in patterns}, "files_with_hits": {p: [] for p in patterns},
+              "files_scanned": 0, "bytes_scanned": 0, "errors": []}
+    all_hits = []
+    for scanned, total_bytes, hits, errors in results:
+        report["files_scanned"] += scanned
+        report["bytes_scanned"] += total_bytes
+        report["errors"].extend(errors)
+        all_hits.extend(hits)
+    for path, pattern, line, column, text in sorted(all_hits, key=lambda h: (h[0], h[2], h[3])):
+        report["hit_counts"][pattern] += 1
+        if not report["files_with_hits"][pattern] or report["files_with_hits"][pattern][-1] != path:
+            report["files_with_hits"][pattern].append(path)
+        if max_hits_per_pattern is None or len(report["hits"][pattern]) < max_hits_per_pattern:
+            report["hits"][pattern].append({"file": path, "line": line, "column": column, "text": text})
+    report["elapsed_seconds"] = round(time.monotonic() - started, 3)
+    logger.info(f"SourceScanner: Scanned {report['files_scanned']} files ({report['bytes_scanned']} bytes) for {len(patterns)} patterns in {report['elapsed_seconds']}s")
+    return report
@@ -0,0 +1,315 @@
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+from .core_components import logger
+
+# Offline stand-in for an LLM endpoint. It speaks the request/response formats LLMApiClient understands
+# (Ollama /api/generate and /api/chat, and generic "choices" completions, buffered or streamed), with
+# configurable latency, throughput and injected failures, and deterministic canned outputs.
+# Start it from the command line:
+#     python -m DotNetUpgradeAgents.stub_llm_server --port 11434 --latency uniform:0.05,0.2 --tokens-per-second 200
+# or from code/tests:
+#     with StubLLMServer(StubLLMConfig(latency="fixed:0.1")) as server:
+#         client = LLMApiClient(endpoint=server.ollama_generate_url, ollama_model_name="stub")
+
+
+class LatencyDistribution:
+    '''
+    Time to first token, parsed from a spec string:
+    "fixed:S", "uniform:MIN,MAX", "normal:MEAN,STDDEV" or "lognormal:MEDIAN,SIGMA" (all in seconds).
+    '''
+    def __init__(self, spec: str = "fixed:0"):
+        self.spec = spec
+        kind, _, params = spec.partition(":")
+        self.kind = kind.strip().lower()
+        self.params = [float(p) for p in params.split(",") if p.strip()] if params else []
+        expected_params = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if self.kind not in expected_params or len(self.params) != expected_params[self.kind]:
+            raise ValueError(f"LatencyDistribution: Invalid latency spec '{spec}'. Use fixed:S, uniform:MIN,MAX, normal:MEAN,STDDEV or lognormal:MEDIAN,SIGMA.")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(self.params[0], self.params[1])
+        elif self.kind == "normal":
+            value = rng.gauss(self.params[0], self.params[1])
+        else:
+            value = self.params[0] * rng.lognormvariate(0.0, self.params[1])
+        return max(value, 0.0)
+
+
+class StubLLMConfig:
+    '''Behaviour knobs for StubLLMServer. Error rates are probabilities per request (0..1).'''
+    def __init__(self, latency: str = "fixed:0", tokens_per_second: float = 0.0, error_rate_429: float = 0.0,
+                 error_rate_500: float = 0.0, timeout_rate: float = 0.0, hang_seconds: float = 300.0,
+                 retry_after: Optional[float] = 1.0, seed: int = 0, responses: Optional[List[dict]] = None):
+        self.latency = LatencyDistribution(latency) if isinstance(latency, str) else latency
+        self.tokens_per_second = tokens_per_second # 0 means "as fast as possible"
+        self.error_rate_429 = error_rate_429
+        self.error_rate_500 = error_rate_500
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds # How long an injected timeout stalls before the connection is dropped
+        self.retry_after = retry_after
+        self.seed = seed
+        # Canned outputs, checked in order: [{"match": "<regex>", "response": "<text>"}]
+        self.responses = [(re.compile(rule["match"], re.DOTALL), rule["response"]) for rule in (responses or [])]
+
+    @classmethod
+    def from_responses_file(cls, responses_path: str, **kwargs) -> "StubLLMConfig":
+        with open(responses_path, 'r', encoding='utf-8') as f:
+            return cls(responses=json.load(f), **kwargs)
+
+
+def canned_completion(prompt: str, config: StubLLMConfig) -> str:
+    '''Deterministic output for a prompt: the first matching configured rule, otherwise a built-in shape.'''
+    for pattern, response in config.responses:
+        if pattern.search(prompt):
+            return response
+
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+    if "Final Answer" in prompt: # CrewAI agent reasoning prompt: finish the task in one step
+        return f"Thought: I now know the final answer\nFinal Answer: Task completed (stub-llm {prompt_hash})."
+    if ".csproj" in prompt or "<Project" in prompt:
+        framework_match = re.search(r"target framework\s+([\w.]+)", prompt)
+        target_framework = framework_match.group(1) if framework_match and "{" not in framework_match.group(1) else "net8.0"
+        return (
+            '<Project Sdk="Microsoft.NET.Sdk">\n'
+            '  <PropertyGroup>\n'
+            f'    <TargetFramework>{target_framework}</TargetFramework>\n'
+            '  </PropertyGroup>\n'
+            f'  <!-- stub-llm {prompt_hash} -->\n'
+            '</Project>\n'
+        )
+    if "VB.NET" in prompt and "C#" in prompt:
+        type_names = re.findall(r"^\s*(?:Public\s+|Friend\s+|Private\s+)?(?:Partial\s+)?(?:Class|Module|Structure|Interface)\s+(\w+)", prompt, re.MULTILINE | re.IGNORECASE)
+        body = "\n".join(f"public class {name}\n{{\n}}\n" for name in dict.fromkeys(type_names)) or "// No types found\n"
+        return f"// stub-llm {prompt_hash}\n{body}"
+    if "build" in prompt.lower() and "error" in prompt.lower():
+        return f"Likely cause: a package or API is not compatible with the target framework (stub-llm {prompt_hash}).\nSuggested fix: update the package reference to a compatible version."
+    return f"stub-llm response {prompt_hash}"
+
+
+def split_tokens(text: str) -> List[str]:
+    '''Splits text into word-sized tokens that concatenate back to the original text.'''
+    return re.findall(r"\s*\S+|\s+", text) or [text]
+
+
+class StubLLMServer:
+    '''Threaded HTTP server wrapping the stub handler. Use start()/stop() or a with-block.'''
+    def __init__(self, config: Optional[StubLLMConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or StubLLMConfig()
+        self._stats = {"requests": 0, "completions": 0, "injected_429": 0, "injected_500": 0, "injected_timeouts": 0, "in_flight": 0, "max_in_flight": 0}
+        self._attempts_by_prompt = {}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _StubLLMRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.stub = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def ollama_generate_url(self) -> str:
+        return f"{self.base_url}/ollama/api/generate" # "ollama" in the URL selects the Ollama request format
+
+    @property
+    def ollama_chat_url(self) -> str:
+        return f"{self.base_url}/ollama/api/chat"
+
+    @property
+    def completions_url(self) -> str:
+        return f"{self.base_url}/v1/completions"
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stub-llm-server", daemon=True)
+        self._thread.start()
+        logger.info(f"StubLLMServer: Listening on {self.base_url}")
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StubLLMServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def _begin_request(self, prompt: str) -> random.Random:
+        # Randomness is keyed on (seed, prompt, attempt number), so a run is reproducible regardless of
+        # thread scheduling, while a retry of the same prompt still gets a fresh draw.
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["in_flight"] += 1
+            self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._stats["in_flight"])
+            attempt = self._attempts_by_prompt.get(prompt, 0)
+            self._attempts_by_prompt[prompt] = attempt + 1
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return random.Random(f"{self.config.seed}:{prompt_hash}:{attempt}")
+
+    def _end_request(self, outcome: str):
+        with self._lock:
+            self._stats["in_flight"] -= 1
+            self._stats[outcome] += 1
+
+
+class _StubLLMRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive, like real endpoints
+
+    def log_message(self, format, *args):
+        pass # Keep benchmark and test output quiet
+
+    def do_GET(self):
+        stub = self.server.stub
+        if self.path.endswith("/api/tags"):
+            self._send_json(200, {"models": [{"name": "stub"}]})
+        elif self.path.endswith("/stats"):
+            self._send_json(200, stub.stats())
+        else:
+            self._send_json(200, {"status": "Stub LLM server is running"})
+
+    def do_POST(self):
+        stub = self.server.stub
+        config = stub.config
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": "invalid JSON body"})
+            return
+
+        is_chat = self.path.endswith("/api/chat") or self.path.endswith("/chat/completions")
+        if "messages" in payload:
+            prompt = "\n".join(str(message.get("content", "")) for message in payload["messages"])
+        else:
+            prompt = str(payload.get("prompt", ""))
+
+        rng = stub._begin_request(prompt)
+        roll = rng.random()
+        if roll < config.timeout_rate:
+            time.sleep(config.hang_seconds)
+            self.close_connection = True # Drop the connection without a response
+            stub._end_request("injected_timeouts")
+            return
+        if roll < config.timeout_rate + config.error_rate_429:
+            headers = {"Retry-After": str(config.retry_after)} if config.retry_after is not None else {}
+            self._send_json(429, {"error": "rate limited (stub)"}, headers)
+            stub._end_request("injected_429")
+            return
+        if roll < config.timeout_rate + config.error_rate_429 + config.error_rate_500:
+            self._send_json(500, {"error": "internal error (stub)"})
+            stub._end_request("injected_500")
+            return
+
+        tokens = split_tokens(canned_completion(prompt, config))
+        max_tokens = (payload.get("options") or {}).get("num_predict") or payload.get("max_tokens")
+        if max_tokens:
+            tokens = tokens[:int(max_tokens)]
+        time.sleep(config.latency.sample(rng))
+        token_delay = 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+
+        if payload.get("stream"):
+            self._stream(tokens, token_delay, is_chat, ollama_like="/api/" in self.path)
+        else:
+            time.sleep(token_delay * len(tokens))
+            self._send_json(200, self._completion_body("".join(tokens), is_chat, ollama_like="/api/" in self.path))
+        stub._end_request("completions")
+
+    def _completion_body(self, text: str, is_chat: bool, ollama_like: bool) -> dict:
+        if ollama_like:
+            if is_chat:
+                return {"model": "stub", "message": {"role": "assistant", "content": text}, "done": True}
+            return {"model": "stub", "response": text, "done": True}
+        usage = {"prompt_tokens": 0, "completion_tokens": len(split_tokens(text)), "total_tokens": len(split_tokens(text))}
+        if is_chat:
+            return {"id": "stub-chat", "object": "chat.completion", "created": int(time.time()), "model": "stub", "usage": usage,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}]}
+        return {"id": "stub-completion", "object": "text_completion", "created": int(time.time()), "model": "stub", "usage": usage,
+                "choices": [{"index": 0, "text": text, "finish_reason": "stop"}]}
+
+    def _stream(self, tokens: List[str], token_delay: float, is_chat: bool, ollama_like: bool):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson" if ollama_like else "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in tokens:
+            if ollama_like:
+                event = {"message": {"role": "assistant", "content": token}, "done": False} if is_chat else {"response": token, "done": False}
+                self._write_chunk(json.dumps(event) + "\n")
+            else:
+                choice = {"index": 0, "delta": {"content": token}} if is_chat else {"index": 0, "text": token}
+                self._write_chunk("data: " + json.dumps({"choices": [choice]}) + "\n\n")
+            if token_delay:
+                time.sleep(token_delay)
+        if ollama_like:
+            final_event = {"message": {"role": "assistant", "content": ""}, "done": True} if is_chat else {"response": "", "done": True}
+            self._write_chunk(json.dumps(final_event) + "\n")
+        else:
+            self._write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _write_chunk(self, text: str):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status: int, body: dict, headers: Optional[dict] = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline stand-in LLM server speaking the Ollama and generic 'choices' formats.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", default="fixed:0", help="fixed:S, uniform:MIN,MAX, normal:MEAN,STDDEV or lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--error-rate-429", type=float, default=0.0)
+    parser.add_argument("--error-rate-500", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--hang-seconds", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--responses", help="JSON file with [{\"match\": regex, \"response\": text}] canned outputs")
+    args = parser.parse_args()
+
+    config_kwargs = dict(latency=args.latency, tokens_per_second=args.tokens_per_second, error_rate_429=args.error_rate_429,
+                         error_rate_500=args.error_rate_500, timeout_rate=args.timeout_rate, hang_seconds=args.hang_seconds, seed=args.seed)
+    config = StubLLMConfig.from_responses_file(args.responses, **config_kwargs) if args.responses else StubLLMConfig(**config_kwargs)
+    server = StubLLMServer(config, host=args.host, port=args.port)
+    print(f"Stub LLM server listening on {server.base_url}")
+    print(f"  Ollama generate: {server.ollama_generate_url}")
+    print(f"  Ollama chat:     {server.ollama_chat_url}")
+    print(f"  Completions:     {server.completions_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
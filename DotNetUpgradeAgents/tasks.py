@@ -26,7 +26,7 @@ class DotNetUpgradeTasks:
     def convert_vb_to_csharp_task(self, vb_project_path_or_file: str, git_branch_name: str) -> Task:
         logger.info(f"Defining task: Convert VB.NET in {vb_project_path_or_file} on branch {git_branch_name}")
         return Task(
-            description=f"Identify all VB.NET files within the specified path '{vb_project_path_or_file}'. For each VB.NET file, convert it to C#. After conversion, create a new Git branch named '{git_branch_name}', attempt to build the converted project. If build is successful, commit changes to this branch. If build fails, report errors.",
+            description=f"Convert all VB.NET files within the specified path '{vb_project_path_or_file}' to C# by passing that path (a .vbproj or directory) to the VB.NET to C# conversion tool in a single call; it converts the files in parallel and returns a per-file manifest. After conversion, create a new Git branch named '{git_branch_name}', attempt to build the converted project. If build is successful, commit changes to this branch. If build fails, report errors.",
             expected_output=f"All VB.NET files in '{vb_project_path_or_file}' converted to C#. A new Git branch '{git_branch_name}' created with the C# code. Build status (success or failure with errors) reported. Confirmation message of successful conversion and commit, or detailed error messages.",
             agent=agent_factory.code_conversion_agent(),
             context=[] # This task might depend on the output of retrieve_code_task
@@ -43,6 +43,13 @@ class DotNetUpgradeTasks:
 
     def upgrade_project_framework_task(self, csproj_file_path: str, target_framework: str, git_branch_name: str) -> Task:
         logger.info(f"Defining task: Upgrade Framework for {csproj_file_path} to {target_framework} on branch {git_branch_name}")
+        if csproj_file_path.lower().endswith(".sln"):
+            return Task(
+                description=f"Upgrade every project of the solution at '{csproj_file_path}' to target framework '{target_framework}'. First create a new Git branch named '{git_branch_name}'. Then pass the .sln path and the target framework to the project upgrade tool in a single call; it upgrades and builds the projects in dependency order, in parallel where projects are independent, and returns a per-project report. If all projects built successfully, commit the changes. Otherwise report the failed and blocked projects with their errors.",
+                expected_output=f"All projects of '{csproj_file_path}' modified to target '{target_framework}' on a new Git branch '{git_branch_name}'. The per-project report (upgraded, build failed, blocked by a failed dependency) and confirmation of the commit, or detailed error messages.",
+                agent=agent_factory.upgrade_coordinator_agent(),
+                context=[]
+            )
         return Task(
             description=f"For the .csproj file at '{csproj_file_path}', upgrade its target framework to '{target_framework}'. This involves modifying the .csproj file content. Before modification, create a new Git branch named '{git_branch_name}'. After attempting the upgrade, build the project. If build is successful, commit changes. If build fails, report errors.",
             expected_output=f"The .csproj file '{csproj_file_path}' modified to target '{target_framework}'. A new Git branch '{git_branch_name}' created. Build status (success or failure with errors) after upgrade reported. Confirmation of successful upgrade and commit, or detailed error messages.",
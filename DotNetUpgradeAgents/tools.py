@@ -2,12 +2,114 @@ import os
 import subprocess
 import logging
 import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Optional
+from typing import Any, Dict, List, Optional, Tuple, Union
 from crewai.tools import BaseTool
 
 # Assuming core_components.py is in the same directory or accessible in PYTHONPATH
-from .core_components import log_error, LLMApiClient, HumanFeedback, logger
+from .core_components import log_error, LLMApiClient, LLMStreamError, HumanFeedback, logger, get_shared_llm_client, DEFAULT_LLM_MAX_CONCURRENCY
+from .vb_chunking import VBChunk, chunk_vb_source, stitch_cs_chunks, DEFAULT_VB_CHUNK_MAX_CHARS
+from .vb_rule_converter import convert_vb_with_rules, RULE_CONVERTER_VERSION
+from .dependency_graph import DependencyGraph, DependencyCycleError, PROJECT_EXTENSIONS
+from .project_model import ProjectModel, PACKAGES_CONFIG
+from .source_scanner import scan_sources, DEFAULT_SOURCE_EXTENSIONS
+from .code_index import get_code_index
+from .nuget_metadata import NuGetMetadataResolver
+from .csproj_rewriter import rewrite_project, RewriteResult
+from .patch_applier import apply_patch, apply_patch_to_files, patch_instructions, PatchError, PATCH_FORMATS
+from .build_diagnostics import parse_build_output, group_diagnostics, summarize_build_output, format_diagnostics_for_prompt
+from .near_duplicates import NearDuplicateIndex, tokenize_vb, substitution_map, apply_substitutions, changed_line_ratio, unified_source_diff
+
+NEAR_DUPLICATE_DIFF_MAX_CHANGED_LINES = 0.2 # Near-duplicates with at most this fraction of changed lines are converted from their VB diff
+DEFAULT_MAX_PARALLEL_PROJECTS = 4 # Projects upgraded and built at once when a whole solution is upgraded
+BUILD_OUTPUT_TAIL_CHARS = 4000 # Build output kept per project in the solution upgrade report
+ITASCA_NAMESPACE = "ITASCA" # Namespace that needs a human decision before upgrading
+NAMESPACE_SCAN_MAX_HITS = 100 # Hits listed per pattern in the dependency report (counts stay complete)
+CSPROJ_FULL_OUTPUT_INSTRUCTION = "Only output the raw XML of the modified .csproj file."
+
+
+def write_text_atomic(path: str, text: str):
+    '''Writes text to path via a temporary file in the same directory, so readers never see a half-written file.'''
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def estimate_tokens(text: str) -> int:
+    '''Rough token count (about 4 characters per token); the LLM client does not report usage.'''
+    return (len(text) + 3) // 4
+
+class ConversionManifest:
+    '''
+    Record of past VB.NET to C# conversions, kept as CONVERSION_MANIFEST_FILE in the project (or directory) root.
+    Maps each source path (relative to the root) to the source content hash and conversion version (prompt and model)
+    it was converted with, and to the produced .cs file and its hash. A file whose source, conversion version and
+    output are all unchanged does not need converting again.
+    '''
+    FILE_NAME = ".vbtocs_manifest.json"
+    FORMAT_VERSION = 1
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.path = os.path.join(self.root, self.FILE_NAME)
+        self._lock = threading.Lock()
+        self.entries = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get("version") == self.FORMAT_VERSION:
+                self.entries = data.get("files", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"ConversionManifest: Ignoring unreadable manifest {self.path}: {e}")
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _key(self, source_path: str) -> str:
+        return os.path.relpath(os.path.abspath(source_path), self.root).replace(os.sep, "/")
+
+    def is_up_to_date(self, source_path: str, source_hash: str, conversion_version: str) -> bool:
+        '''True if source_path was converted from this exact content with this prompt/model and its output is untouched.'''
+        with self._lock:
+            entry = self.entries.get(self._key(source_path))
+        if not entry or entry.get("source_hash") != source_hash or entry.get("conversion_version") != conversion_version:
+            return False
+        output_path = os.path.join(self.root, entry["output"])
+        try:
+            with open(output_path, 'r', encoding='utf-8') as f:
+                return self.hash_text(f.read()) == entry.get("output_hash")
+        except OSError:
+            return False
+
+    def record(self, source_path: str, source_hash: str, conversion_version: str, output_path: str, output_hash: str):
+        with self._lock:
+            self.entries[self._key(source_path)] = {
+                "source_hash": source_hash,
+                "conversion_version": conversion_version,
+                "output": self._key(output_path),
+                "output_hash": output_hash,
+                "converted_at": datetime.now().isoformat(),
+            }
+
+    def save(self):
+        with self._lock:
+            data = {"version": self.FORMAT_VERSION, "files": dict(sorted(self.entries.items()))}
+        write_text_atomic(self.path, json.dumps(data, indent=2))
 
 class TFSTool(BaseTool):
     name: str = "TFSTool"
@@ -105,19 +207,317 @@ class GitInitTool(BaseTool):
 
 class VBToCSTool(BaseTool):
     name: str = "VBToCSTool"
-    description: str = "Converts VB.NET code to C# using an LLM. Input should be the path to a VB.NET file."
-    llm_client: LLMApiClient #  = None
-
-    def __init__(self, llm_client: LLMApiClient, **kwargs): #] = None
+    description: str = "Converts VB.NET code to C# using an LLM. Input should be the path to a VB.NET file, or a .vbproj file or directory to convert all of its VB.NET files in one call."
+    llm_client: Optional[LLMApiClient] = None
+    stream_output: bool = False # Write the .cs file as tokens arrive instead of waiting for the full completion
+    max_concurrency: Optional[int] = None # Batch mode: files converted (LLM calls) in parallel; defaults to LLM_MAX_CONCURRENCY
+    chunk_max_chars: Optional[int] = None # Files larger than this are converted in syntax-aware chunks; defaults to VB_CHUNK_MAX_CHARS
+    use_rule_converter: bool = True # Translate files within the supported VB subset locally, without an LLM call
+    reuse_near_duplicates: bool = True # Reuse earlier conversions of near-identical sources instead of converting from scratch
+    near_duplicate_index: Optional[NearDuplicateIndex] = None # Sources converted by this tool; pass one in to share it between tools
+
+    def __init__(self, llm_client: Optional[LLMApiClient] = None, **kwargs):
         super().__init__(**kwargs)
         if llm_client:
             self.llm_client = llm_client
         else:
-            self.llm_client = LLMApiClient() # Use default if not provided
+            self.llm_client = get_shared_llm_client() # Shared default client, so all tools reuse one connection pool
+        if self.near_duplicate_index is None:
+            self.near_duplicate_index = NearDuplicateIndex()
         logger.info("VBToCSTool initialized.")
 
+    def _stream_conversion_to_file(self, prompt: str, cs_file_path: str) -> str:
+        '''
+        Streams the LLM output straight into the .cs file (via a .partial file renamed on completion).
+        Returns the first 200 characters of the output, or the "# ERROR: ..." text if the stream failed or stalled.
+        '''
+        partial_path = cs_file_path + ".partial"
+        preview = ""
+        try:
+            with open(partial_path, 'w', encoding='utf-8') as f:
+                for chunk in self.llm_client.stream_code(prompt):
+                    f.write(chunk)
+                    f.flush()
+                    if len(preview) < 200:
+                        preview += chunk[:200 - len(preview)]
+        except LLMStreamError as e:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            return e.error_text
+        os.replace(partial_path, cs_file_path)
+        return preview
+
+    @staticmethod
+    def _build_prompt(vb_code: str) -> str:
+        # Note: Prompt effectiveness can vary with the LLM. For smaller local models (e.g., via Ollama),
+        # more explicit instructions or few-shot examples might improve conversion quality.
+        # This prompt is a general starting point.
+        return f"Convert the following VB.NET code to C#: vb_file_path {vb_code}"
+
+    @staticmethod
+    def _cs_path_for(vb_file_path: str) -> str:
+        cs_file_path = vb_file_path.replace(".vb", ".cs").replace(".VB", ".cs") # Handle different extensions
+        if cs_file_path == vb_file_path: # Avoid overwriting if extension didn't change
+            cs_file_path += ".cs"
+        return cs_file_path
+
+    @staticmethod
+    def _manifest_root_for(path: str) -> str:
+        '''
+        Root whose ConversionManifest records the conversions of path: a directory itself, the folder of a .vbproj, or
+        for a single .vb file the folder of the nearest enclosing .vbproj (its own folder if there is none), so single-file
+        and batch runs share one manifest.
+        '''
+        path = os.path.abspath(path)
+        if os.path.isdir(path):
+            return path
+        if path.lower().endswith(".vbproj"):
+            return os.path.dirname(path)
+        directory = os.path.dirname(path)
+        while True:
+            try:
+                if any(name.lower().endswith(".vbproj") for name in os.listdir(directory)):
+                    return directory
+            except OSError:
+                pass
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                return os.path.dirname(path)
+            directory = parent
+
+    @staticmethod
+    def _build_chunk_prompt(vb_chunk: str, index: int, total: int) -> str:
+        return (f"Convert the following VB.NET code to C#. It is part {index + 1} of {total} of one file, converted separately: "
+                f"declare the enclosing types as partial and output only the C# for this part: {vb_chunk}")
+
+    @staticmethod
+    def _build_diff_prompt(previous_cs_code: str, vb_diff: str) -> str:
+        return ("The following C# code was converted from a VB.NET file. The VB.NET file has since changed as shown in the unified diff. "
+                f"Apply the same changes to the C# code and output the complete updated C# file.\nC# code:\n{previous_cs_code}\nVB.NET diff:\n{vb_diff}")
+
+    def _chunk_max_chars(self) -> int:
+        return self.chunk_max_chars or int(os.getenv("VB_CHUNK_MAX_CHARS") or DEFAULT_VB_CHUNK_MAX_CHARS)
+
+    def _conversion_version(self) -> str:
+        '''Identifies the prompts, chunk size and model; changing any of them invalidates earlier conversions in the manifest.'''
+        model = self.llm_client.model_identity() if self.llm_client is not None else ""
+        rules = RULE_CONVERTER_VERSION if self._rule_converter_enabled() else "off"
+        return ConversionManifest.hash_text(f"{self._build_prompt('')}|{self._build_chunk_prompt('', 0, 0)}|{self._chunk_max_chars()}|{model}|{rules}")[:16]
+
+    def _rule_converter_enabled(self) -> bool:
+        return self.use_rule_converter and os.getenv("VB_RULE_CONVERTER", "1").lower() not in ("0", "false", "no")
+
+    def _convert_by_rules(self, vb_code: str) -> Optional[str]:
+        '''C# from the local rule-based translator, or None if it is disabled or the file needs the LLM.'''
+        if not self._rule_converter_enabled():
+            return None
+        return convert_vb_with_rules(vb_code)
+
+    def _convert_from_near_duplicate(self, vb_code: str, tokens: List[str]) -> Optional[dict]:
+        '''
+        Converts vb_code from the most similar source converted earlier (see near_duplicates.py): by substituting the
+        renamed identifiers and changed literals into the earlier C# output without an LLM call ("reuse"), or, for small
+        edits, by sending only the VB diff and the earlier C# to the LLM ("diff").
+        Returns {"cs_code", "method", "reused_from", "prompt"} or None if there is no usable near-duplicate.
+        '''
+        if not self.reuse_near_duplicates or self.near_duplicate_index is None:
+            return None
+        matches = self.near_duplicate_index.candidates(vb_code, tokens, self._conversion_version())
+        if not matches:
+            return None
+        for match in matches:
+            mapping = substitution_map(match.tokens, tokens)
+            cs_code = apply_substitutions(match.cs_code, mapping) if mapping is not None else None
+            if cs_code is not None:
+                logger.info(f"VBToCSTool: Reusing the conversion of near-duplicate {match.key} ({len(mapping)} substitutions)")
+                return {"cs_code": cs_code, "method": "reuse", "reused_from": match.key, "prompt": None}
+        match = matches[0]
+        if len(vb_code) <= self._chunk_max_chars() and changed_line_ratio(match.vb_code, vb_code) <= NEAR_DUPLICATE_DIFF_MAX_CHANGED_LINES:
+            logger.info(f"VBToCSTool: Converting only the differences from near-duplicate {match.key}")
+            prompt = self._build_diff_prompt(match.cs_code, unified_source_diff(match.vb_code, vb_code))
+            return {"cs_code": self.llm_client.generate_code(prompt), "method": "diff", "reused_from": match.key, "prompt": prompt}
+        return None
+
+    def _remember_conversion(self, vb_file_path: str, vb_code: str, cs_code: str, tokens: List[str]):
+        if self.reuse_near_duplicates and self.near_duplicate_index is not None:
+            self.near_duplicate_index.add(vb_file_path, vb_code, cs_code, tokens, self._conversion_version())
+
+    def _convert_chunks(self, vb_code: str, chunks: List[VBChunk]) -> str:
+        '''
+        Converts a file given its chunks: one LLM call for a single chunk, otherwise one call per chunk in parallel
+        (up to max_concurrency), stitched back together in order. Returns the first "# ERROR: ..." if any chunk fails.
+        '''
+        if len(chunks) == 1:
+            return self.llm_client.generate_code(self._build_prompt(vb_code))
+        prompts = [self._build_chunk_prompt(chunk.text, chunk.index, len(chunks)) for chunk in chunks]
+        max_workers = self.max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY") or DEFAULT_LLM_MAX_CONCURRENCY)
+        logger.info(f"VBToCSTool: Converting {len(vb_code)} characters of VB.NET in {len(chunks)} chunks")
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks)), thread_name_prefix="vb-chunk") as executor:
+            cs_chunks = list(executor.map(self.llm_client.generate_code, prompts))
+        for cs_chunk in cs_chunks:
+            if cs_chunk.startswith("# ERROR:"):
+                return cs_chunk
+        return stitch_cs_chunks(cs_chunks)
+
+    @staticmethod
+    def find_vb_files(project_or_directory: str) -> List[str]:
+        '''
+        Lists the .vb files of a .vbproj (its <Compile Include> items, or every .vb file under the project folder for
+        SDK-style projects without explicit items) or of a directory tree, skipping bin/obj and tooling folders.
+        '''
+        if project_or_directory.lower().endswith(".vbproj"):
+            project_dir = os.path.dirname(os.path.abspath(project_or_directory))
+            vb_files = []
+            for element in ET.parse(project_or_directory).iter():
+                include = element.get("Include")
+                if element.tag.rsplit("}", 1)[-1] == "Compile" and include and include.lower().endswith(".vb"):
+                    vb_path = os.path.normpath(os.path.join(project_dir, include.replace("\\", os.sep)))
+                    if os.path.isfile(vb_path):
+                        vb_files.append(vb_path)
+            if vb_files:
+                return vb_files
+        else:
+            project_dir = project_or_directory
+
+        return get_code_index(project_dir).files((".vb",), under=project_dir)
+
+    def _convert_for_batch(self, vb_file_path: str, manifest: Optional[ConversionManifest] = None, conversion_version: str = "") -> dict:
+        '''
+        Converts one file for batch mode. Never prompts the user; failures are reported in the returned manifest entry.
+        Files the conversion manifest shows as already converted (same source, prompt and model, untouched output) are skipped.
+        '''
+        cs_file_path = self._cs_path_for(vb_file_path)
+        entry = {"source": vb_file_path, "output": cs_file_path, "status": "converted", "method": "llm", "reused_from": None,
+                 "llm_calls_saved": 0, "latency_seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0, "chunks": 0, "error": None}
+        started = time.perf_counter()
+        try:
+            with open(vb_file_path, 'r', encoding='utf-8') as f:
+                vb_code = f.read()
+            if not vb_code.strip():
+                entry["status"] = "skipped"
+                entry["error"] = "empty file"
+                return entry
+            source_hash = ConversionManifest.hash_text(vb_code)
+            if manifest is not None and manifest.is_up_to_date(vb_file_path, source_hash, conversion_version):
+                entry["status"] = "unchanged"
+                return entry
+
+            cs_code = self._convert_by_rules(vb_code)
+            streamed = False
+            tokens = tokenize_vb(vb_code) if cs_code is None and self.reuse_near_duplicates else []
+            reused = self._convert_from_near_duplicate(vb_code, tokens) if tokens else None
+            if cs_code is not None:
+                entry["method"] = "rules"
+            elif reused is not None:
+                cs_code = reused["cs_code"]
+                entry["method"] = reused["method"]
+                entry["reused_from"] = reused["reused_from"]
+                if reused["method"] == "reuse":
+                    entry["llm_calls_saved"] = len(chunk_vb_source(vb_code, self._chunk_max_chars()))
+                else:
+                    entry["prompt_tokens"] = estimate_tokens(reused["prompt"])
+                    entry["chunks"] = 1
+            else:
+                chunks = chunk_vb_source(vb_code, self._chunk_max_chars())
+                streamed = self.stream_output and len(chunks) == 1
+                entry["prompt_tokens"] = estimate_tokens(self._build_prompt(vb_code))
+                entry["chunks"] = len(chunks)
+                if streamed:
+                    cs_code = self._stream_conversion_to_file(self._build_prompt(vb_code), cs_file_path)
+                else:
+                    cs_code = self._convert_chunks(vb_code, chunks)
+            if cs_code.startswith("# ERROR:"):
+                entry["status"] = "failed"
+                entry["error"] = cs_code
+            else:
+                if streamed: # cs_code is only a preview; the full output is already on disk
+                    with open(cs_file_path, 'r', encoding='utf-8') as f:
+                        cs_code = f.read()
+                else:
+                    write_text_atomic(cs_file_path, cs_code)
+                if entry["method"] in ("llm", "diff"):
+                    entry["completion_tokens"] = estimate_tokens(cs_code)
+                    self._remember_conversion(vb_file_path, vb_code, cs_code, tokens)
+                if manifest is not None:
+                    manifest.record(vb_file_path, source_hash, conversion_version, cs_file_path, ConversionManifest.hash_text(cs_code))
+        except Exception as e:
+            entry["status"] = "failed"
+            entry["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            entry["latency_seconds"] = round(time.perf_counter() - started, 4)
+        return entry
+
+    def _plan_batch_waves(self, vb_files: List[str]) -> List[List[str]]:
+        '''
+        Orders a batch so near-duplicates can reuse a conversion made in the same run: the first wave holds one file per
+        group of near-identical sources, the second wave the rest (converted once the first wave is indexed).
+        '''
+        if not self.reuse_near_duplicates or self.near_duplicate_index is None:
+            return [vb_files]
+        leaders = NearDuplicateIndex(threshold=self.near_duplicate_index.threshold)
+        first_wave, second_wave = [], []
+        for vb_file in vb_files:
+            try:
+                with open(vb_file, 'r', encoding='utf-8') as f:
+                    vb_code = f.read()
+            except (OSError, UnicodeDecodeError):
+                first_wave.append(vb_file) # Reported as failed by _convert_for_batch
+                continue
+            tokens = tokenize_vb(vb_code)
+            if leaders.query(vb_code, tokens) is not None:
+                second_wave.append(vb_file)
+            else:
+                first_wave.append(vb_file)
+                leaders.add(vb_file, vb_code, "", tokens)
+        return [wave for wave in (first_wave, second_wave) if wave]
+
+    def convert_batch(self, project_or_directory: str) -> dict:
+        '''
+        Converts every .vb file of a .vbproj or directory on a worker pool, with at most max_concurrency LLM calls in flight.
+        Outputs are written atomically next to their sources. Returns a manifest with one entry per file
+        (source, output, status, method, reused_from, llm_calls_saved, latency_seconds, prompt_tokens, completion_tokens,
+        chunks, error) plus totals. method is "rules" for files translated locally by the rule-based converter, "reuse" for
+        files re-using the conversion of a near-duplicate, "diff" for files converted from their diff to a near-duplicate,
+        and "llm" otherwise. Near-duplicates within the batch are converted after the file they duplicate.
+        '''
+        vb_files = self.find_vb_files(project_or_directory)
+        conversion_manifest = ConversionManifest(self._manifest_root_for(project_or_directory))
+        conversion_version = self._conversion_version()
+        max_workers = self.max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY") or DEFAULT_LLM_MAX_CONCURRENCY)
+        logger.info(f"VBToCSTool: Converting {len(vb_files)} VB.NET files from {project_or_directory} with up to {max_workers} concurrent LLM calls")
+
+        started = time.perf_counter()
+        entries = {}
+        if vb_files:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(vb_files)), thread_name_prefix="vb-to-cs") as executor:
+                for wave in self._plan_batch_waves(vb_files):
+                    for vb_file, entry in zip(wave, executor.map(lambda vb_file: self._convert_for_batch(vb_file, conversion_manifest, conversion_version), wave)):
+                        entries[vb_file] = entry
+            conversion_manifest.save()
+        entries = [entries[vb_file] for vb_file in vb_files]
+
+        manifest = {
+            "source": project_or_directory,
+            "total_files": len(entries),
+            "converted": sum(1 for e in entries if e["status"] == "converted"),
+            "failed": sum(1 for e in entries if e["status"] == "failed"),
+            "skipped": sum(1 for e in entries if e["status"] == "skipped"),
+            "unchanged": sum(1 for e in entries if e["status"] == "unchanged"),
+            "rule_converted": sum(1 for e in entries if e["status"] == "converted" and e["method"] == "rules"),
+            "reused": sum(1 for e in entries if e["status"] == "converted" and e["method"] == "reuse"),
+            "diff_converted": sum(1 for e in entries if e["status"] == "converted" and e["method"] == "diff"),
+            "llm_calls_saved": sum(e["llm_calls_saved"] for e in entries if e["status"] == "converted"),
+            "elapsed_seconds": round(time.perf_counter() - started, 4),
+            "files": entries,
+        }
+        logger.info(f"VBToCSTool: Batch conversion of {project_or_directory} finished: {manifest['converted']} converted ({manifest['rule_converted']} by rules, {manifest['reused']} reused from near-duplicates saving {manifest['llm_calls_saved']} LLM calls), {manifest['unchanged']} unchanged, {manifest['failed']} failed, {manifest['skipped']} skipped in {manifest['elapsed_seconds']}s")
+        return manifest
+
     @log_error
-    def _run(self, vb_file_path: str) -> str:
+    def _run(self, vb_file_path: str) -> Union[str, dict]:
+        if os.path.isdir(vb_file_path) or (vb_file_path.lower().endswith(".vbproj") and os.path.isfile(vb_file_path)):
+            return self.convert_batch(vb_file_path)
+
         logger.info(f"Attempting to convert VB.NET file: {vb_file_path} to C#")
 
         if not os.path.isfile(vb_file_path):
@@ -130,11 +530,30 @@ class VBToCSTool(BaseTool):
             if not vb_code.strip():
                 return f"VBToCSTool: VB.NET file is empty: {vb_file_path}"
 
-            # Note: Prompt effectiveness can vary with the LLM. For smaller local models (e.g., via Ollama),
-            # more explicit instructions or few-shot examples might improve conversion quality.
-            # This prompt is a general starting point.
-            prompt = f"Convert the following VB.NET code to C#: vb_file_path {vb_code}"
-            cs_code = self.llm_client.generate_code(prompt)
+            prompt = self._build_prompt(vb_code)
+            cs_file_path = self._cs_path_for(vb_file_path)
+            conversion_manifest = ConversionManifest(self._manifest_root_for(vb_file_path)) # Shared with batch runs of the project
+            conversion_version = self._conversion_version()
+            source_hash = ConversionManifest.hash_text(vb_code)
+            if conversion_manifest.is_up_to_date(vb_file_path, source_hash, conversion_version):
+                logger.info(f"VBToCSTool: {vb_file_path} is unchanged since its last conversion; skipping.")
+                return f"VBToCSTool: {vb_file_path} is unchanged since its last conversion to {cs_file_path}; skipped."
+
+            cs_code = self._convert_by_rules(vb_code)
+            streamed = False
+            tokens = tokenize_vb(vb_code) if cs_code is None and self.reuse_near_duplicates else []
+            reused = self._convert_from_near_duplicate(vb_code, tokens) if tokens else None
+            if cs_code is not None:
+                logger.info(f"VBToCSTool: {vb_file_path} is within the rule-based subset; converted without an LLM call.")
+            elif reused is not None:
+                cs_code = reused["cs_code"]
+            else:
+                chunks = chunk_vb_source(vb_code, self._chunk_max_chars())
+                streamed = self.stream_output and len(chunks) == 1 # Large files are converted in parallel chunks instead
+                if streamed:
+                    cs_code = self._stream_conversion_to_file(prompt, cs_file_path) # Preview only; the file is already written
+                else:
+                    cs_code = self._convert_chunks(vb_code, chunks)
 
             if cs_code.startswith("# ERROR:"):
                 logger.error(f"VBToCSTool: LLM code generation failed for {vb_file_path}. LLM Client Response: {cs_code}")
@@ -155,12 +574,17 @@ class VBToCSTool(BaseTool):
                 else: # Should not happen with given options
                     return f"VBToCSTool: Unexpected choice for {vb_file_path}. Error: {cs_code}"
 
-            cs_file_path = vb_file_path.replace(".vb", ".cs").replace(".VB", ".cs") # Handle different extensions
-            if cs_file_path == vb_file_path: # Avoid overwriting if extension didn't change
-                cs_file_path += ".cs"
-
-            with open(cs_file_path, 'w', encoding='utf-8') as f:
-                f.write(cs_code)
+            if not streamed:
+                with open(cs_file_path, 'w', encoding='utf-8') as f:
+                    f.write(cs_code)
+                written_cs_code = cs_code
+            else:
+                with open(cs_file_path, 'r', encoding='utf-8') as f:
+                    written_cs_code = f.read()
+            conversion_manifest.record(vb_file_path, source_hash, conversion_version, cs_file_path, ConversionManifest.hash_text(written_cs_code))
+            conversion_manifest.save()
+            if tokens and (reused is None or reused["method"] == "diff"):
+                self._remember_conversion(vb_file_path, vb_code, written_cs_code, tokens)
 
             logger.info(f"Successfully converted {vb_file_path} to {cs_file_path}")
             return f"Successfully converted {vb_file_path} to {cs_file_path}. Output: {cs_code[:200]}..."
@@ -173,6 +597,10 @@ class VBToCSTool(BaseTool):
 class DependencyAnalyzerTool(BaseTool):
     name: str = "DependencyAnalyzerTool"
     description: str = "Analyzes .NET project dependencies from a .csproj file or a solution file. Identifies NuGet packages, custom libraries, and checks for specific namespaces like 'ITASCA'. Input should be the path to a .csproj or .sln file."
+    namespace_patterns: List[str] = [] # Namespaces/APIs reported in namespace_usage in addition to ITASCA
+    scan_max_workers: Optional[int] = None # Processes for the source scan (None: one per core)
+    package_resolver: Optional[NuGetMetadataResolver] = None # Checks packages against a NuGet feed; created from NUGET_FEED if set
+    target_framework: Optional[str] = None # Framework package compatibility is checked against (None: each project's own)
 
     @log_error
     def _run(self, project_or_solution_path: str) -> dict:
@@ -185,36 +613,88 @@ class DependencyAnalyzerTool(BaseTool):
             "project_file": project_or_solution_path,
             "nuget_packages": [],
             "custom_libraries": [],
+            "target_frameworks": [],
             "itasca_namespace_found": False,
             "itasca_action_taken": None,
             "analysis_errors": []
         }
 
-        # This is a simplified simulation. Real analysis would involve parsing XML (.csproj)
-        # or using 'dotnet list package' or MSBuild Structured Log Viewer.
+        # Project files are parsed as MSBuild XML (see project_model.py); conditions and targets are not evaluated,
+        # so 'dotnet list package' remains the authority for fully restored graphs.
         try:
             with open(project_or_solution_path, 'r', encoding='utf-8') as f:
                 content = f.read()
 
-            # Simulate finding NuGet packages (looking for PackageReference)
-            if "<PackageReference Include=" in content:
-                # A more robust parser would be needed here. This is just a placeholder.
-                import re
-                package_matches = re.findall(r'<PackageReference Include="([^"]+)" Version="([^"]+)"', content)
-                for pkg_name, pkg_version in package_matches:
-                    dependencies["nuget_packages"].append({"name": pkg_name, "version": pkg_version})
-                if not package_matches: # Fallback if regex finds nothing but tag exists
-                    dependencies["nuget_packages"].append({"name": "SimulatedPackage", "version": "1.0.0"})
-
-
-            # Simulate finding custom libraries (e.g., ProjectReference)
-            if "<ProjectReference Include=" in content:
-                dependencies["custom_libraries"].append({"name": "SimulatedCustomLib.csproj"})
-
-            # Simulate checking for ITASCA namespace
-            if "ITASCA" in content or "itasca" in content: # Case-insensitive check might be better
+            # Custom libraries: ProjectReferences, resolved transitively (for every project of a solution) into a dependency graph
+            graph = None
+            if project_or_solution_path.lower().endswith(".sln"):
+                graph = DependencyGraph.from_solution(project_or_solution_path)
+                libraries = [node.path for node in graph.nodes.values() if graph.dependents(node.path)] # Projects other projects build on
+            elif project_or_solution_path.lower().endswith(PROJECT_EXTENSIONS):
+                graph = DependencyGraph.from_projects([project_or_solution_path])
+                libraries = graph.dependencies(project_or_solution_path)
+            if graph is not None:
+                for library in libraries:
+                    node = graph.node(library)
+                    dependencies["custom_libraries"].append({"name": os.path.basename(node.path), "path": node.path, "exists": node.exists})
+                dependencies["dependency_graph"] = graph.to_dict()
+                for cycle in dependencies["dependency_graph"]["cycles"]:
+                    dependencies["analysis_errors"].append(f"DependencyAnalyzerTool: Project reference cycle: {' -> '.join(os.path.basename(p) for p in cycle)}")
+                for node in graph.nodes.values():
+                    if node.error:
+                        dependencies["analysis_errors"].append(f"DependencyAnalyzerTool: {node.path}: {node.error}")
+
+            # NuGet packages and target frameworks from the evaluated project file(s): PackageReference (Version attribute or
+            # element, VersionOverride, central package management via Directory.Packages.props) and packages.config
+            if graph is not None:
+                solution = project_or_solution_path.lower().endswith(".sln")
+                frameworks = []
+                package_checks = []
+                for node in graph.nodes.values():
+                    if not node.in_solution or not node.exists or node.error:
+                        continue
+                    try:
+                        model = ProjectModel.load(node.path)
+                    except (ET.ParseError, OSError) as e:
+                        dependencies["analysis_errors"].append(f"DependencyAnalyzerTool: {node.path}: {type(e).__name__}: {e}")
+                        continue
+                    for package in model.package_references:
+                        entry = {"name": package["name"], "version": package["version"], "version_source": package["version_source"]}
+                        if solution:
+                            entry["project"] = node.name
+                        dependencies["nuget_packages"].append(entry)
+                        package_checks.append({"name": package["name"], "version": package["version"],
+                                               "target_frameworks": [self.target_framework] if self.target_framework else model.target_frameworks})
+                        if not package["version"]:
+                            dependencies["analysis_errors"].append(f"DependencyAnalyzerTool: No version resolved for package {package['name']} in {node.path}")
+                    frameworks.extend(tfm for tfm in model.target_frameworks if tfm not in frameworks)
+                dependencies["target_frameworks"] = frameworks
+
+                # Outdated / vulnerable / incompatible packages: one batched, cached metadata lookup for all unique package IDs
+                if self.package_resolver is None and os.getenv("NUGET_FEED"):
+                    self.package_resolver = NuGetMetadataResolver()
+                if self.package_resolver is not None and package_checks:
+                    statuses = self.package_resolver.check(package_checks)
+                    for status, entry in zip(statuses, dependencies["nuget_packages"]):
+                        if "project" in entry:
+                            status["project"] = entry["project"]
+                    dependencies["package_status"] = statuses
+                    for key, flag in (("outdated_packages", "outdated"), ("vulnerable_packages", "vulnerable"), ("incompatible_packages", "incompatible_frameworks")):
+                        dependencies[key] = sorted({status["name"] for status in statuses if status[flag]})
+                    for status in statuses:
+                        if status["error"]:
+                            dependencies["analysis_errors"].append(f"DependencyAnalyzerTool: Package {status['name']}: {status['error']}")
+
+            # Namespace usage in the sources next to the project/solution (and references in the project file itself)
+            patterns = list(dict.fromkeys([ITASCA_NAMESPACE] + list(self.namespace_patterns)))
+            source_dir = os.path.dirname(os.path.abspath(project_or_solution_path))
+            scan = scan_sources(source_dir, patterns, max_workers=self.scan_max_workers, max_hits_per_pattern=NAMESPACE_SCAN_MAX_HITS,
+                                files=get_code_index(source_dir).files(DEFAULT_SOURCE_EXTENSIONS, under=source_dir))
+            dependencies["namespace_usage"] = {key: scan[key] for key in ("hits", "hit_counts", "files_with_hits", "files_scanned", "elapsed_seconds")}
+            dependencies["analysis_errors"].extend(scan["errors"])
+            if scan["hit_counts"][ITASCA_NAMESPACE] or ITASCA_NAMESPACE.lower() in content.lower():
                 dependencies["itasca_namespace_found"] = True
-                logger.warning(f"ITASCA namespace potentially found in {project_or_solution_path}.")
+                logger.warning(f"ITASCA namespace found in {project_or_solution_path} ({len(scan['files_with_hits'][ITASCA_NAMESPACE])} source files).")
 
                 # Human feedback for ITASCA
                 # This interaction should ideally be managed by the agent, not directly in the tool run,
@@ -240,48 +720,225 @@ class DependencyAnalyzerTool(BaseTool):
 
 class ProjectUpgradeTool(BaseTool):
     name: str = "ProjectUpgradeTool"
-    description: str = "Upgrades a .csproj file to a target .NET Framework version using an LLM. Input should be the .csproj file path and the target framework (e.g., 'net48', 'net6.0')."
-    llm_client: LLMApiClient #] = None
-
-    def __init__(self, llm_client: LLMApiClient, **kwargs): #]  = None
+    description: str = "Upgrades a .csproj file to a target .NET Framework version, with local rewrite rules (SDK-style conversion, TargetFramework, packages.config migration) and an LLM for anything the rules cannot handle. Input should be the .csproj file path and the target framework (e.g., 'net48', 'net6.0'). Given a .sln file, upgrades and builds every project of the solution in dependency order, in parallel where projects are independent, and returns a per-project report."
+    llm_client: Optional[LLMApiClient] = None
+    max_parallel_projects: int = DEFAULT_MAX_PARALLEL_PROJECTS # Projects upgraded/built at once in solution mode
+    build_after_upgrade: bool = True # In solution mode, build each upgraded project before its dependents start
+    use_rewrite_rules: bool = True # Upgrade project files with csproj_rewriter, calling the LLM only for unsupported constructs
+    package_versions: Optional[Dict[str, Optional[str]]] = None # Package id -> version for packages.config migration (None drops it)
+    patch_format: Optional[str] = None # "full" (default), "diff" or "edits": how the LLM returns the upgraded file (see patch_applier.py)
+
+    def __init__(self, llm_client: Optional[LLMApiClient] = None, **kwargs):
         super().__init__(**kwargs)
         if llm_client:
             self.llm_client = llm_client
         else:
-            self.llm_client = LLMApiClient() # Use default if not provided
+            self.llm_client = get_shared_llm_client() # Shared default client, so all tools reuse one connection pool
         logger.info("ProjectUpgradeTool initialized.")
 
-    @log_error
-    def _run(self, csproj_path: str, target_framework: str) -> str| Any:
-        logger.info(f"Attempting to upgrade {csproj_path} to target framework: {target_framework}")
-
-        if not os.path.isfile(csproj_path):
-            return f"ProjectUpgradeTool: .csproj file not found: {csproj_path}"
-
-        try:
-            with open(csproj_path, 'r', encoding='utf-8') as f:
-                original_csproj_content = f.read()
+    def _patch_format(self) -> str:
+        patch_format = (self.patch_format or os.getenv("LLM_PATCH_FORMAT") or "full").lower()
+        if patch_format not in PATCH_FORMATS:
+            raise ValueError(f"ProjectUpgradeTool: Unknown patch format '{patch_format}'; expected one of {', '.join(PATCH_FORMATS)}")
+        return patch_format
+
+    @staticmethod
+    def _build_prompt(original_csproj_content: str, target_framework: str, output_instruction: str = CSPROJ_FULL_OUTPUT_INSTRUCTION) -> str:
+        # Note: This is a detailed prompt. Ensure your chosen LLM (especially local models via Ollama)
+        # can handle long contexts and complex instructions effectively.
+        # The instruction "Only output the raw XML..." is crucial for this tool to work correctly.
+        # If the LLM struggles, simplifying the request or breaking it down might be necessary.
+        return f"""
+            Upgrade the following .NET .csproj content to target framework {target_framework}. Ensure all necessary changes for compatibility are made, including updating SDK style if appropriate, and framework-specific package versions if known. {output_instruction}
 
-            if not original_csproj_content.strip():
-                return f"ProjectUpgradeTool: .csproj file is empty: {csproj_path}"
+                        Original .csproj content:
+                        {original_csproj_content}
+            """
 
+    @staticmethod
+    def _build_completion_prompt(original_csproj_content: str, draft_csproj_content: str, unsupported: List[str], target_framework: str,
+                                 output_instruction: str = CSPROJ_FULL_OUTPUT_INSTRUCTION) -> str:
+        constructs = "\n".join(f"- {construct}" for construct in unsupported)
+        return f"""
+            The following .NET project file was upgraded to target framework {target_framework} by automatic rules, but the rules could not handle these constructs of the original project:
+{constructs}
 
-            # Note: This is a detailed prompt. Ensure your chosen LLM (especially local models via Ollama)
-            # can handle long contexts and complex instructions effectively.
-            # The instruction "Only output the raw XML..." is crucial for this tool to work correctly.
-            # If the LLM struggles, simplifying the request or breaking it down might be necessary.
-            prompt = """
-            Upgrade the following .NET .csproj content to target framework {target_framework}. Ensure all necessary changes for compatibility are made, including updating SDK style if appropriate, and framework-specific package versions if known. Only output the raw XML of the modified .csproj file.
+            Complete the upgraded project so that these constructs are handled correctly for {target_framework}. Keep every other part of the upgraded project unchanged. {output_instruction}
 
-                        Original .csproj content:
+                        Original project file:
                         {original_csproj_content}
+
+                        Upgraded project file (draft):
+                        {draft_csproj_content}
             """
 
-            upgraded_csproj_content = self.llm_client.generate_code(prompt)
+    def _rewrite_rules_enabled(self) -> bool:
+        return self.use_rewrite_rules and os.getenv("CSPROJ_REWRITE_RULES", "1").lower() not in ("0", "false", "no")
+
+    def _rewrite_by_rules(self, csproj_path: str, target_framework: str, update_code_index: bool = True) -> Optional[RewriteResult]:
+        '''
+        The rule-based rewrite of the project, or None if rules are disabled. update_code_index=False skips bringing the
+        shared code index up to date, for callers that already did (once per solution instead of once per project).
+        '''
+        if not self._rewrite_rules_enabled():
+            return None
+        # Sources the default Compile glob would pick up, from the shared index instead of another walk of the project
+        project_dir = os.path.dirname(os.path.abspath(csproj_path))
+        extension = ".vb" if csproj_path.lower().endswith(".vbproj") else ".cs"
+        code_index = get_code_index(project_dir, update=update_code_index)
+        compile_files = [os.path.relpath(path, project_dir).replace(os.sep, "/") for path in code_index.files((extension,), under=project_dir)]
+        return rewrite_project(csproj_path, target_framework, package_versions=self.package_versions, compile_files=compile_files)
+
+    def _generate_upgraded_content(self, base_content: str, build_prompt) -> Tuple[str, Optional[str]]:
+        '''
+        Asks the LLM for the upgraded project file; build_prompt(output_instruction) returns the prompt. With a patch format,
+        the LLM returns a patch against base_content that is applied locally; if the patch does not apply (conflict or
+        malformed), the whole file is requested instead. Returns (content or LLM error, patch outcome or None).
+        '''
+        patch_format = self._patch_format()
+        if patch_format == "full":
+            return self.llm_client.generate_code(build_prompt(CSPROJ_FULL_OUTPUT_INSTRUCTION)), None
+        response = self.llm_client.generate_code(build_prompt(patch_instructions(patch_format)))
+        if response.startswith("# ERROR:") or self._is_project_xml(response): # A whole file despite the patch request is fine too
+            return response, None
+        try:
+            return apply_patch(base_content, response), "applied"
+        except PatchError as e:
+            logger.warning(f"ProjectUpgradeTool: LLM patch did not apply ({e}); requesting the whole project file instead")
+            return self.llm_client.generate_code(build_prompt(CSPROJ_FULL_OUTPUT_INSTRUCTION)), f"rejected: {e}"
+
+    @staticmethod
+    def _is_project_xml(content: str) -> bool:
+        try:
+            return ET.fromstring(content.strip()).tag.rsplit("}", 1)[-1] == "Project"
+        except ET.ParseError:
+            return False
 
-            if upgraded_csproj_content.startswith("# ERROR:"): # Check specifically for LLM client errors
-                logger.error(f"ProjectUpgradeTool: LLM .csproj upgrade failed for {csproj_path}. LLM Client Response: {upgraded_csproj_content}") # Log full error
+    def _upgrade_project(self, csproj_path: str, target_framework: str, update_code_index: bool = True) -> dict:
+        '''
+        Upgrades one project file, backing up the original to .bak. Local rewrite rules are tried first; the LLM is asked
+        to finish the rules' draft when it contains unsupported constructs, or to do the whole upgrade when the rules are
+        disabled or cannot read the file. Never prompts the user; the outcome is returned as {"project", "success",
+        "status", "method" ("rules", "rules+llm" or "llm"), "patch" (outcome of a patch-format LLM response), "changes",
+        "unsupported", "error", "llm_error", "backup", "content"}. update_code_index is passed to _rewrite_by_rules.
+        '''
+        result = {"project": csproj_path, "success": False, "status": "failed", "method": None, "patch": None, "changes": [], "unsupported": [],
+                  "error": None, "llm_error": False, "backup": None, "content": None}
+        with open(csproj_path, 'r', encoding='utf-8') as f:
+            original_csproj_content = f.read()
+        if not original_csproj_content.strip():
+            result["error"] = f"ProjectUpgradeTool: .csproj file is empty: {csproj_path}"
+            return result
+
+        rewrite = self._rewrite_by_rules(csproj_path, target_framework, update_code_index)
+        if rewrite is not None:
+            result.update(changes=rewrite.changes, unsupported=rewrite.unsupported)
+        if rewrite is not None and rewrite.complete:
+            result["method"] = "rules"
+            upgraded_csproj_content = rewrite.content
+        else:
+            if rewrite is not None and rewrite.content is not None:
+                result["method"] = "rules+llm"
+                base_content = rewrite.content # The LLM patches the rules' draft
+                build_prompt = lambda instruction: self._build_completion_prompt(original_csproj_content, rewrite.content, rewrite.unsupported,
+                                                                                 target_framework, instruction)
+            else:
+                result["method"] = "llm"
+                base_content = original_csproj_content
+                build_prompt = lambda instruction: self._build_prompt(original_csproj_content, target_framework, instruction)
+            upgraded_csproj_content, result["patch"] = self._generate_upgraded_content(base_content, build_prompt)
+        if upgraded_csproj_content.startswith("# ERROR:"): # Check specifically for LLM client errors
+            logger.error(f"ProjectUpgradeTool: LLM .csproj upgrade failed for {csproj_path}. LLM Client Response: {upgraded_csproj_content}") # Log full error
+            result.update(error=upgraded_csproj_content, llm_error=True)
+            return result
+        if not self._is_project_xml(upgraded_csproj_content): # Handle invalid XML that wasn't an LLM error
+            logger.error(f"""ProjectUpgradeTool: LLM output for {csproj_path} was not valid XML: {upgraded_csproj_content[:200]}... Ensure the LLM is configured to output only raw XML for .csproj.""")
+            result["error"] = f"""ProjectUpgradeTool: Failed to upgrade {csproj_path} due to invalid XML response from LLM (but not an API error): {upgraded_csproj_content[:200]}..."""
+            return result
+
+        # It's good practice to backup the original file before overwriting
+        backup_path = csproj_path + ".bak"
+        logger.info(f"""Backing up original {csproj_path} to {backup_path}""")
+        shutil.copy(csproj_path, backup_path)
+        write_text_atomic(csproj_path, upgraded_csproj_content)
+        packages_config = os.path.join(os.path.dirname(csproj_path), PACKAGES_CONFIG)
+        if rewrite is not None and rewrite.migrated_packages_config and os.path.isfile(packages_config):
+            os.replace(packages_config, packages_config + ".bak") # Now PackageReference items; NuGet would otherwise keep using it
+        logger.info(f"Successfully upgraded {csproj_path} to {target_framework} ({result['method']}). Backup created at {backup_path}")
+        result.update(success=True, status="upgraded", backup=backup_path, content=upgraded_csproj_content)
+        return result
+
+    def upgrade_solution(self, sln_path: str, target_framework: str) -> dict:
+        '''
+        Upgrades every project of a solution, in dependency order. A project is upgraded (and, with build_after_upgrade,
+        built) only once all the projects it references have been upgraded and built cleanly; independent projects are
+        handled in parallel, up to max_parallel_projects at once. Never prompts the user. Projects referenced from
+        outside the solution are not upgraded. Dependents of a failed project are reported as "blocked".
+        '''
+        started = time.monotonic()
+        report = {"solution": sln_path, "target_framework": target_framework, "upgrade_waves": [], "projects": {},
+                  "totals": {"upgraded": 0, "failed": 0, "build_failed": 0, "blocked": 0, "external": 0}, "errors": []}
+        graph = DependencyGraph.from_solution(sln_path)
+        try:
+            report["upgrade_waves"] = graph.topological_levels()
+        except DependencyCycleError as e:
+            report["errors"].append(f"ProjectUpgradeTool: {e}")
+            logger.error(f"ProjectUpgradeTool: Cannot order the projects of {sln_path}: {e}")
+            return report
+        wave_of = {graph.key(path): index for index, wave in enumerate(report["upgrade_waves"]) for path in wave}
+        if self._rewrite_rules_enabled():
+            get_code_index(os.path.dirname(os.path.abspath(sln_path))) # Updated once here; the projects under it reuse it as is
+
+        def upgrade_and_build(project_path: str) -> dict:
+            node = graph.node(project_path)
+            if not node.in_solution:
+                return {"project": project_path, "success": node.exists, "status": "external", "error": None if node.exists else "Project file not found"}
+            if not node.exists:
+                return {"project": project_path, "success": False, "status": "failed", "error": f"ProjectUpgradeTool: .csproj file not found: {project_path}"}
+            entry = self._upgrade_project(project_path, target_framework, update_code_index=False)
+            entry.pop("content")
+            if entry["success"] and self.build_after_upgrade:
+                # References upgraded in this run are already built; only external ones still need building
+                build_references = any(not graph.node(reference).in_solution for reference in node.references)
+                try:
+                    process = run_dotnet_build(project_path, build_project_references=build_references)
+                    entry["build_output"] = (process.stderr or process.stdout or "")[-BUILD_OUTPUT_TAIL_CHARS:]
+                    build_failed = process.returncode != 0
+                    if build_failed: # Distinct errors by root cause, for the report
+                        entry["build_diagnostics"] = summarize_build_output(f"{process.stdout or ''}\n{process.stderr or ''}", os.path.dirname(project_path))
+                except (OSError, subprocess.TimeoutExpired) as e:
+                    entry["build_output"] = f"{type(e).__name__}: {e}"
+                    build_failed = True
+                if build_failed:
+                    entry.update(success=False, status="build_failed", error=f"ProjectUpgradeTool: Build failed for {project_path} after upgrade.")
+            return entry
+
+        results = graph.run_in_dependency_order(upgrade_and_build, max_workers=self.max_parallel_projects)
+        for project_path, entry in results.items():
+            entry.setdefault("project", project_path)
+            entry["wave"] = wave_of.get(graph.key(project_path))
+            report["projects"][project_path] = entry
+            report["totals"][entry["status"]] = report["totals"].get(entry["status"], 0) + 1
+            if entry.get("error"):
+                report["errors"].append(entry["error"])
+        report["elapsed_seconds"] = round(time.monotonic() - started, 3)
+        logger.info(f"ProjectUpgradeTool: Solution upgrade of {sln_path} to {target_framework} finished in {report['elapsed_seconds']}s: {report['totals']}")
+        return report
+
+    @log_error
+    def _run(self, csproj_path: str, target_framework: str) -> Union[str, Any]:
+        logger.info(f"Attempting to upgrade {csproj_path} to target framework: {target_framework}")
 
+        if not os.path.isfile(csproj_path):
+            return f"ProjectUpgradeTool: .csproj file not found: {csproj_path}"
+        if csproj_path.lower().endswith(".sln"):
+            return self.upgrade_solution(csproj_path, target_framework)
+
+        try:
+            result = self._upgrade_project(csproj_path, target_framework)
+
+            if result["llm_error"]:
+                upgraded_csproj_content = result["error"]
                 prompt_text = f"LLM failed to upgrade .csproj file '{csproj_path}'. Error: {upgraded_csproj_content}\nHow would you like to proceed?"
                 options = ["Retry upgrade", "Skip this project", "Mark for manual upgrade"]
                 choice = HumanFeedback.get_feedback(prompt_text, options)
@@ -295,60 +952,108 @@ class ProjectUpgradeTool(BaseTool):
                 elif choice == "Mark for manual upgrade":
                     logger.warn(f"ProjectUpgradeTool: {csproj_path} marked for manual upgrade by user.")
                     return f"ProjectUpgradeTool: {csproj_path} marked for manual upgrade. Original error: {upgraded_csproj_content}"
-            elif not upgraded_csproj_content.strip().startswith("<Project"): # Handle invalid XML that wasn't an LLM error
-                logger.error(f"""ProjectUpgradeTool: LLM output for {csproj_path} was not valid XML: {upgraded_csproj_content[:200]}... Ensure the LLM is configured to output only raw XML for .csproj.""")
-                return f"""ProjectUpgradeTool: Failed to upgrade {csproj_path} due to invalid XML response from LLM (but not an API error): {upgraded_csproj_content[:200]}..."""
+            elif not result["success"]:
+                return result["error"]
 
-            # It's good practice to backup the original file before overwriting
-            backup_path = csproj_path + ".bak"
-            logger.info(f"""Backing up original {csproj_path} to {backup_path}""")
-            import shutil
-            shutil.copy(csproj_path, backup_path)
-
-            with open(csproj_path, 'w', encoding='utf-8') as f:
-                f.write(upgraded_csproj_content)
-
-            logger.info(f"Successfully upgraded {csproj_path} to {target_framework}. Backup created at {backup_path}")
-            return f"""Successfully upgraded {csproj_path} to {target_framework}. Backup: {backup_path}. Upgraded content (first 200 chars): {upgraded_csproj_content[:200]}..."""
+            return f"""Successfully upgraded {csproj_path} to {target_framework} ({result['method']}). Backup: {result['backup']}. Upgraded content (first 200 chars): {result['content'][:200]}..."""
 
         except Exception as e:
             error_message = f"ProjectUpgradeTool: An unexpected error occurred during upgrade of {csproj_path}: {e}"
             logger.error(error_message)
             return error_message
 
+def run_dotnet_build(project_or_solution_path: str, build_project_references: bool = True) -> subprocess.CompletedProcess:
+    '''Runs `dotnet build` in the project's directory. build_project_references=False builds only this project, against the existing outputs of the projects it references.'''
+    command = ['dotnet', 'build', project_or_solution_path, '-nologo']
+    if not build_project_references:
+        command.append('-p:BuildProjectReferences=false')
+    return subprocess.run(
+        command,
+        cwd=os.path.dirname(os.path.abspath(project_or_solution_path)), # Run in the project's directory context
+        capture_output=True,
+        text=True,
+        check=False # Do not throw exception on non-zero exit code initially
+    )
+
 class BuildTool(BaseTool):
     name: str = "BuildTool"
-    description: str = "Builds a .NET project or solution using 'dotnet build'. If errors occur, it can optionally use an LLM to suggest fixes. Input is the path to the .csproj or .sln file."
-    llm_client: LLMApiClient #= None
+    description: str = "Builds a .NET project or solution using 'dotnet build'. If errors occur, it can optionally use an LLM to suggest fixes, which are applied as checked patches. Input is the path to the .csproj or .sln file."
+    llm_client: Optional[LLMApiClient] = None
+    patch_format: Optional[str] = None # "edits" (default) or "diff": how the LLM returns fixes (see patch_applier.py)
+    rebuild_after_fix: bool = True # Build again after applying an LLM fix
 
-    def __init__(self, llm_client: LLMApiClient, **kwargs):
+    def __init__(self, llm_client: Optional[LLMApiClient] = None, **kwargs):
         super().__init__(**kwargs)
         if llm_client:
             self.llm_client = llm_client
         else:
-            self.llm_client = LLMApiClient() # Use default if not provided
+            self.llm_client = get_shared_llm_client() # Shared default client, so all tools reuse one connection pool
         logger.info("BuildTool initialized.")
 
+    def _build_fix_prompt(self, project_or_solution_path: str, error_output: str, code_context: str) -> str:
+        return f"""The .NET build for project '{project_or_solution_path}' failed with the following errors:
+                                {error_output}
+
+                                Here is some code context from the project (first 2000 characters of .cs/.vb files, by path relative to the project directory):
+                                {code_context}
+
+                        Please briefly explain the likely cause, then give the fix as a patch of the files above (or of the project file). Focus on common issues related to framework upgrades or package incompatibilities. Only change lines that are shown above. {patch_instructions(self._patch_format(), multiple_files=True)}"""
+
+    def _build_diagnostics_fix_prompt(self, project_or_solution_path: str, diagnostics_text: str) -> str:
+        return f"""The .NET build for project '{project_or_solution_path}' failed. These are its distinct errors, grouped by root cause, with their locations (paths relative to the project directory) and the source lines around them:
+{diagnostics_text}
+
+                        Please briefly explain the likely cause of each numbered root cause, then give one fix per root cause as a patch of the files above (or of the project file); one change, such as a package or reference in the project file, often fixes every location of a cause. Focus on common issues related to framework upgrades or package incompatibilities. Line numbers are for reference only and are not part of the files; only change lines that are shown above. {patch_instructions(self._patch_format(), multiple_files=True)}"""
+
+    def _patch_format(self) -> str:
+        patch_format = (self.patch_format or os.getenv("LLM_PATCH_FORMAT") or "edits").lower()
+        if patch_format == "full":
+            patch_format = "edits" # A free-text fix cannot be applied; fixes are always requested as patches
+        if patch_format not in PATCH_FORMATS:
+            raise ValueError(f"BuildTool: Unknown patch format '{patch_format}'; expected one of {', '.join(PATCH_FORMATS)}")
+        return patch_format
+
+    def apply_suggested_fix(self, project_or_solution_path: str, suggested_fix: str) -> dict:
+        '''
+        Applies an LLM-suggested fix (a unified diff or edit blocks, with paths relative to the project directory). Every
+        hunk/edit is checked against the current files first; if any does not match, nothing is written. Changed files
+        are backed up to .bak, and with rebuild_after_fix the project is built again. Returns {"files", "backups",
+        "error", "build_succeeded" (None if not rebuilt), "build_output"}.
+        '''
+        outcome = {"files": [], "backups": [], "error": None, "build_succeeded": None, "build_output": None}
+        project_dir = os.path.dirname(os.path.abspath(project_or_solution_path))
+        try:
+            updated = apply_patch_to_files(project_dir, suggested_fix, default_path=os.path.basename(project_or_solution_path))
+        except PatchError as e:
+            logger.error(f"BuildTool: LLM fix for {project_or_solution_path} was not applied: {e}")
+            outcome["error"] = str(e)
+            return outcome
+        for path, content in updated.items():
+            if os.path.exists(path):
+                shutil.copy(path, path + ".bak")
+                outcome["backups"].append(path + ".bak")
+            write_text_atomic(path, content)
+            outcome["files"].append(path)
+        logger.info(f"BuildTool: Applied LLM fix to {len(outcome['files'])} files for {project_or_solution_path}")
+        if self.rebuild_after_fix:
+            process = run_dotnet_build(project_or_solution_path)
+            outcome["build_succeeded"] = process.returncode == 0
+            outcome["build_output"] = (process.stderr or process.stdout or "")[-BUILD_OUTPUT_TAIL_CHARS:]
+            if not outcome["build_succeeded"]:
+                outcome["diagnostics"] = summarize_build_output(f"{process.stdout or ''}\n{process.stderr or ''}", project_dir)
+        return outcome
+
     @log_error
-    def _run(self, project_or_solution_path: str) -> str | Any:
+    def _run(self, project_or_solution_path: str) -> Union[str, Any]:
         logger.info(f"Attempting to build: {project_or_solution_path}")
 
         if not os.path.isfile(project_or_solution_path):
             return f"BuildTool: Project or solution file not found: {project_or_solution_path}"
 
-        project_dir = os.path.dirname(project_or_solution_path) if os.path.isfile(project_or_solution_path) else project_or_solution_path
-
-
         try:
             # First attempt to build
             # Using -v q for quiet, -nologo. Adjust verbosity as needed.
-            process = subprocess.run(
-                ['dotnet', 'build', project_or_solution_path, '-nologo'],
-                cwd=project_dir, # Run in the project's directory context
-                capture_output=True,
-                text=True,
-                check=False # Do not throw exception on non-zero exit code initially
-            )
+            process = run_dotnet_build(project_or_solution_path)
 
             if process.returncode == 0:
                 success_message = f"""BuildTool: Build successful for {project_or_solution_path}.
@@ -358,49 +1063,48 @@ class BuildTool(BaseTool):
                 return success_message
             else:
                 error_output = process.stderr if process.stderr else process.stdout
+                project_files_dir = os.path.dirname(os.path.abspath(project_or_solution_path))
+                # dotnet build reports diagnostics on stdout; each appears once per target framework and again in the summary
+                groups = group_diagnostics(parse_build_output(f"{process.stdout or ''}\n{process.stderr or ''}", project_files_dir))
+                error_groups = [group for group in groups if group["severity"] == "error"]
+                if error_groups:
+                    error_output = format_diagnostics_for_prompt(groups, project_files_dir, max_spans_per_group=0) # Distinct errors, no source
                 logger.error(f"""BuildTool: Build failed for {project_or_solution_path}. Return code: {process.returncode}
                                     Errors:
                                     {error_output}""")
 
                 # Ask user if they want to attempt LLM fix
                 # In a real agent flow, this decision might be pre-configured or made by an agent
+                causes = f" {sum(g['count'] for g in error_groups)} distinct errors from {len(error_groups)} root causes:\n{error_output}\n" if error_groups else ""
                 choice = HumanFeedback.get_feedback(
-                    f"""Build failed for {project_or_solution_path}. Do you want to attempt an LLM-based fix for the errors?""",
+                    f"""Build failed for {project_or_solution_path}.{causes} Do you want to attempt an LLM-based fix for the errors?""",
                     options=["Yes, attempt LLM fix", "No, log error and continue"]
                 )
 
                 if choice == "Yes, attempt LLM fix":
                     logger.info("Attempting to use LLM to find a fix for build errors.")
-                    # This requires project context, so we might need to read file contents
-                    # For simplicity, we just send the error log to LLM
-                    # A more advanced implementation would send relevant code snippets.
-
-                    # Try to find the relevant .cs or .vb files to provide context
-                    # This is a very basic attempt, could be improved
-                    code_context = ""
-                    project_files_dir = os.path.dirname(project_or_solution_path)
-                    for root, _, files in os.walk(project_files_dir):
-                        for file_name in files:
-                            if file_name.endswith((".cs", ".vb")): # Add other relevant extensions if needed
-                                try:
-                                    with open(os.path.join(root, file_name), 'r', encoding='utf-8') as f_code:
-                                        code_context += f"\n--- Content of {file_name} ---\n{f_code.read(2000)}" # Read first 2000 chars
-                                except Exception as e_read:
-                                    logger.warning(f"Could not read file {file_name} for LLM context: {e_read}")
-                        if len(code_context) > 8000: # Limit context size
-                            break
-
-                    # Note: Providing build errors and code context to an LLM for bug fixing is complex.
-                    # The quality of the suggested fix will heavily depend on the LLM's coding and reasoning capabilities.
-                    # For local models (Ollama), larger, more capable models are recommended for this task.
-                    # The instruction "Output the suggested fix clearly" is important.
-                    prompt = f"""The .NET build for project '{project_or_solution_path}' failed with the following errors:
-                                {error_output}
-
-                                Here is some code context from the project (first 2000 characters of .cs/.vb files):
-                                {code_context}
-
-                        Please provide a detailed explanation of the likely cause and a specific suggested code modification or .csproj file change to fix these errors. Focus on common issues related to framework upgrades or package incompatibilities. Output the suggested fix clearly."""
+                    if error_groups:
+                        # Only the distinct errors, grouped by root cause, with the source lines around them
+                        prompt = self._build_diagnostics_fix_prompt(project_or_solution_path, format_diagnostics_for_prompt(groups, project_files_dir))
+                    else:
+                        # No diagnostics in MSBuild's format (e.g. the build did not get to compiling): send the output,
+                        # with the start of each .cs/.vb file as context
+                        code_context = ""
+                        for code_file in get_code_index(project_files_dir).files((".cs", ".vb"), under=project_files_dir): # Indexed, so bin/obj are skipped and the tree is not re-walked
+                            file_name = os.path.relpath(code_file, project_files_dir) # Relative paths, so patches can name the files
+                            try:
+                                with open(code_file, 'r', encoding='utf-8') as f_code:
+                                    code_context += f"\n--- Content of {file_name} ---\n{f_code.read(2000)}" # Read first 2000 chars
+                            except Exception as e_read:
+                                logger.warning(f"Could not read file {file_name} for LLM context: {e_read}")
+                            if len(code_context) > 8000: # Limit context size
+                                break
+
+                        # Note: Providing build errors and code context to an LLM for bug fixing is complex.
+                        # The quality of the suggested fix will heavily depend on the LLM's coding and reasoning capabilities.
+                        # For local models (Ollama), larger, more capable models are recommended for this task.
+                        # The fix is requested as a patch, so that it can be checked against the files and applied locally.
+                        prompt = self._build_fix_prompt(project_or_solution_path, error_output, code_context)
 
                     suggested_fix = self.llm_client.generate_code(prompt)
 
@@ -422,23 +1126,27 @@ class BuildTool(BaseTool):
                             return f"BuildTool: Build failed for {project_or_solution_path}. LLM failed to provide fix: {suggested_fix}. Errors logged."
 
                     apply_choice = HumanFeedback.get_feedback(
-                        f"LLM suggested the following fix for '{project_or_solution_path}'. Should the system attempt to apply it (simulated - this is risky)?\n\n{suggested_fix[:500]}...\n",
-                        options=["Yes, attempt to apply (simulated)", "No, just log the suggestion"]
+                        f"LLM suggested the following fix for '{project_or_solution_path}'. Should the system apply it? The patch is checked against the current files first, and changed files are backed up to .bak.\n\n{suggested_fix[:500]}...\n",
+                        options=["Yes, apply the fix", "No, just log the suggestion"]
                     )
 
-                    if apply_choice == "Yes, attempt to apply (simulated)":
-                        # In a real scenario, applying fixes is highly complex and risky.
-                        # It would involve parsing the LLM output, identifying file paths, and making precise code changes.
-                        # This is a placeholder for that complex logic.
-                        logger.warning("Simulating application of LLM fix. In a real system, this would be a complex operation.")
-                        # Here you might try to re-run the build after a simulated fix or a simple file touch.
-                        return f"""BuildTool: Build failed. LLM suggested a fix (simulated application):
-                                {suggested_fix}"
-                                    else:
-                                        return f"BuildTool: Build failed. LLM suggested a fix (not applied):
-                                {suggested_fix}"
-                                    else:
-                                        return f"BuildTool: Build failed for {project_or_solution_path}. No LLM fix attempted.
+                    if apply_choice == "Yes, apply the fix":
+                        outcome = self.apply_suggested_fix(project_or_solution_path, suggested_fix)
+                        if outcome["error"]:
+                            return f"""BuildTool: Build failed. The LLM suggested fix could not be applied ({outcome['error']}):
+                                {suggested_fix}"""
+                        changed = ", ".join(os.path.relpath(path, project_files_dir) for path in outcome["files"])
+                        if outcome["build_succeeded"] is None:
+                            return f"BuildTool: LLM fix applied to {changed} (not rebuilt). Backups: {', '.join(outcome['backups'])}"
+                        if outcome["build_succeeded"]:
+                            return f"BuildTool: Build successful for {project_or_solution_path} after applying the LLM fix to {changed}. Backups: {', '.join(outcome['backups'])}"
+                        return f"""BuildTool: Build failed. LLM fix applied to {changed}, but the build still fails:
+                                {outcome['build_output']}"""
+                    else:
+                        return f"""BuildTool: Build failed. LLM suggested a fix (not applied):
+                                {suggested_fix}"""
+                else:
+                    return f"""BuildTool: Build failed for {project_or_solution_path}. No LLM fix attempted.
                                 Errors:
                                     {error_output}"""
 
@@ -534,7 +1242,7 @@ class ReportTool(BaseTool):
     description: str = "Generates an upgrade report from collected details. Input should be a dictionary of details."
 
     @log_error
-    def _run(self, upgrade_details: dict, report_format: str = "json") -> str | Any:
+    def _run(self, upgrade_details: dict, report_format: str = "json") -> Union[str, Any]:
         timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
         report_file_name = f"upgrade_report_{timestamp_str}.{report_format.lower()}"
         report_path = os.path.join(os.getcwd(), report_file_name) # Save in current working directory or specify a path
@@ -0,0 +1,229 @@
+import re
+from typing import List, Optional
+
+# Syntax-aware chunking of large VB.NET files for conversion. The source is split on Namespace/Class/Module/
+# Structure/Interface and member (Sub/Function/Property/...) boundaries; every chunk repeats the file header
+# (Option/Imports lines) and the declarations of its enclosing namespace and types, so the LLM sees valid,
+# self-contained code. The C# outputs are stitched back together in order (see stitch_cs_chunks).
+
+DEFAULT_VB_CHUNK_MAX_CHARS = 12000
+
+_MODIFIERS = (r"(?:(?:Public|Private|Friend|Protected|Shared|Overrides|Overridable|MustOverride|NotOverridable|Overloads|"
+              r"Shadows|Partial|ReadOnly|WriteOnly|MustInherit|NotInheritable|Async|Iterator|Default|Static|Widening|"
+              r"Narrowing|WithEvents|Custom|Declare)\s+)*")
+_BLOCK_START = re.compile(r"^\s*(?:<[^>]*>\s*)*(?P<modifiers>" + _MODIFIERS + r")(?P<kind>Namespace|Class|Module|Structure|Interface|Enum|Sub|Function|Property|Operator|Event)\b", re.IGNORECASE)
+_BLOCK_END = re.compile(r"^\s*End\s+(?P<kind>Namespace|Class|Module|Structure|Interface|Enum|Sub|Function|Property|Operator|Event)\b", re.IGNORECASE)
+_INLINE_LAMBDA = re.compile(r"\b(?P<kind>Sub|Function)\s*\(", re.IGNORECASE)
+_ACCESSOR = re.compile(r"^\s*(?:<[^>]*>\s*)*(?:(?:Public|Private|Friend|Protected)\s+)*(?:Get|Set|AddHandler|RemoveHandler|RaiseEvent)\b", re.IGNORECASE)
+_HEADER_LINE = re.compile(r"^\s*(?:Option\s|Imports\s|<Assembly:|<Module:|'|REM\s|$)", re.IGNORECASE)
+_LEADING_LINE = re.compile(r"^\s*(?:<[^>]*>\s*_?\s*$|''')")
+_REGION_LINE = re.compile(r"^\s*#(?:Region|End\s+Region)\b", re.IGNORECASE)
+_TYPE_CONTINUATION = re.compile(r"^\s*(?:Inherits|Implements)\b", re.IGNORECASE)
+
+CONTAINER_KINDS = {"namespace", "class", "module", "structure", "interface"}
+
+
+class VBChunk:
+    '''One self-contained piece of a VB file: shared header + enclosing declarations + a run of members.'''
+    def __init__(self, index: int, text: str, body_chars: int):
+        self.index = index
+        self.text = text
+        self.body_chars = body_chars
+
+    def __repr__(self):
+        return f"VBChunk(index={self.index}, chars={len(self.text)})"
+
+
+class _Block:
+    def __init__(self, kind: Optional[str], header: List[str]):
+        self.kind = kind # None for the file root
+        self.leading = [] # Attribute and doc-comment lines directly above the declaration
+        self.header = header # Opening line(s), including Inherits/Implements for types
+        self.children = [] # _Block or str lines
+        self.footer = None
+
+    def size(self) -> int:
+        return sum(len(line) for line in self.lines())
+
+    def lines(self) -> List[str]:
+        result = self.leading + self.header
+        for child in self.children:
+            result.extend(child.lines() if isinstance(child, _Block) else [child])
+        if self.footer is not None:
+            result.append(self.footer)
+        return result
+
+
+def _has_body(kind: str, modifiers: str, line: str, following: List[str], parent_kind: Optional[str]) -> bool:
+    modifiers = modifiers.lower()
+    if kind in CONTAINER_KINDS or kind == "enum":
+        return True
+    if parent_kind == "interface" or "mustoverride" in modifiers or "declare" in modifiers:
+        return False
+    if kind == "event":
+        return "custom" in modifiers
+    if kind == "property": # Auto-properties have no Get/Set block
+        for next_line in following:
+            if next_line.strip() and not next_line.strip().startswith("'"):
+                return bool(_ACCESSOR.match(next_line))
+        return False
+    return True
+
+
+def _multiline_lambda_kind(code: str) -> Optional[str]:
+    '''"sub"/"function" if the line opens a lambda whose body continues on the following lines (nothing after its parameters).'''
+    for match in _INLINE_LAMBDA.finditer(code):
+        depth = 0
+        for position in range(match.end() - 1, len(code)):
+            if code[position] == "(":
+                depth += 1
+            elif code[position] == ")":
+                depth -= 1
+                if depth == 0:
+                    rest = re.sub(r"^\s*As\s+[\w.]+(?:\(Of[^)]*\))?", "", code[position + 1:], flags=re.IGNORECASE)
+                    if not rest.strip():
+                        return match.group("kind").lower()
+                    break
+    return None
+
+def _parse(lines: List[str]) -> Optional[_Block]:
+    '''Builds the block tree, or returns None if the structure could not be followed (the caller then does not chunk).'''
+    root = _Block(None, [])
+    stack = [root]
+    lambdas = [] # Multi-line lambdas currently open inside the member being read
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        code = line.split("'", 1)[0] # Good enough for block keywords; string literals rarely start with them
+        end_match = _BLOCK_END.match(code)
+        start_match = _BLOCK_START.match(code) if not end_match else None
+        current = stack[-1]
+
+        if end_match:
+            kind = end_match.group("kind").lower()
+            if lambdas and lambdas[-1] == kind:
+                lambdas.pop()
+                current.children.append(line)
+            elif current.kind == kind:
+                current.footer = line
+                stack.pop()
+            else:
+                return None
+        elif start_match and not lambdas and (current.kind is None or current.kind in CONTAINER_KINDS):
+            kind = start_match.group("kind").lower()
+            if _has_body(kind, start_match.group("modifiers"), line, lines[index + 1:index + 6], current.kind):
+                block = _Block(kind, [line])
+                while current.children and isinstance(current.children[-1], str) and _LEADING_LINE.match(current.children[-1]):
+                    block.leading.insert(0, current.children.pop())
+                if kind in CONTAINER_KINDS - {"namespace"}:
+                    while index + 1 < len(lines) and _TYPE_CONTINUATION.match(lines[index + 1]):
+                        index += 1
+                        block.header.append(lines[index])
+                current.children.append(block)
+                stack.append(block)
+            else:
+                current.children.append(line)
+        else:
+            if current.kind not in CONTAINER_KINDS and current.kind is not None:
+                lambda_kind = _multiline_lambda_kind(code)
+                if lambda_kind:
+                    lambdas.append(lambda_kind)
+            current.children.append(line)
+        index += 1
+
+    if len(stack) != 1 or lambdas:
+        return None
+    return root
+
+
+def _segments(block: _Block, context: List[_Block], max_chars: int, segments: list):
+    '''Flattens the tree into (context, lines) segments no larger than max_chars where the structure allows it.'''
+    loose = []
+    for child in block.children:
+        if isinstance(child, str):
+            loose.append(child)
+            continue
+        if loose:
+            segments.append((context, loose))
+            loose = []
+        if child.kind in CONTAINER_KINDS and child.size() > max_chars:
+            _segments(child, context + [child], max_chars, segments)
+        else:
+            segments.append((context, child.lines()))
+    if loose:
+        segments.append((context, loose))
+
+
+def chunk_vb_source(vb_code: str, max_chars: int = DEFAULT_VB_CHUNK_MAX_CHARS) -> List[VBChunk]:
+    '''
+    Splits VB.NET source into chunks of roughly max_chars (a single member larger than that stays whole).
+    Returns a single chunk holding the whole file when it is small enough, or when its block structure cannot be
+    followed reliably.
+    '''
+    if len(vb_code) <= max_chars:
+        return [VBChunk(0, vb_code, len(vb_code))]
+    # #Region blocks often span several members; they are cosmetic, so drop them rather than split them unbalanced
+    lines = [line for line in vb_code.splitlines(keepends=True) if not _REGION_LINE.match(line)]
+    header_end = 0
+    while header_end < len(lines) and _HEADER_LINE.match(lines[header_end]):
+        header_end += 1
+    header = "".join(lines[:header_end])
+
+    root = _parse(lines[header_end:])
+    if root is None:
+        return [VBChunk(0, vb_code, len(vb_code))]
+    segments = []
+    _segments(root, [], max_chars, segments)
+
+    # Pack consecutive segments that share the same enclosing declarations
+    packed = []
+    for context, segment_lines in segments:
+        segment_text = "".join(segment_lines)
+        if packed and packed[-1][0] == context and packed[-1][1] and len(packed[-1][1]) + len(segment_text) <= max_chars:
+            packed[-1][1] += segment_text
+        elif not segment_text.strip() and packed and packed[-1][0] == context:
+            packed[-1][1] += segment_text # Keep blank separator lines with the previous piece
+        else:
+            packed.append([context, segment_text])
+
+    chunks = []
+    opened = set()
+    for context, body in packed:
+        if not body.strip():
+            continue
+        opening = ""
+        for enclosing in context:
+            if id(enclosing) not in opened: # Type attributes go on one part only; C# rejects duplicates across partial declarations
+                opening += "".join(enclosing.leading)
+                opened.add(id(enclosing))
+            opening += "".join(enclosing.header)
+        closing = "".join(enclosing.footer if enclosing.footer.endswith("\n") else enclosing.footer + "\n" for enclosing in reversed(context))
+        chunks.append(VBChunk(len(chunks), header + opening + body + closing, len(body)))
+    return chunks or [VBChunk(0, vb_code, len(vb_code))]
+
+
+_USING_LINE = re.compile(r"^\s*using\s+[\w.=\s]+;\s*$")
+_CODE_FENCE = re.compile(r"^\s*```[\w#+-]*\s*$")
+
+
+def stitch_cs_chunks(cs_chunks: List[str]) -> str:
+    '''Joins converted chunks in order, hoisting their (de-duplicated) using directives to the top of the file.'''
+    usings = []
+    bodies = []
+    for cs_code in cs_chunks:
+        body_lines = []
+        in_preamble = True
+        for line in cs_code.splitlines():
+            if _CODE_FENCE.match(line):
+                continue
+            if in_preamble and _USING_LINE.match(line):
+                if line.strip() not in usings:
+                    usings.append(line.strip())
+                continue
+            if in_preamble and not line.strip():
+                continue
+            in_preamble = False
+            body_lines.append(line)
+        bodies.append("\n".join(body_lines).rstrip())
+    stitched = "\n\n".join(body for body in bodies if body)
+    return ("\n".join(usings) + "\n\n" + stitched if usings else stitched) + "\n"
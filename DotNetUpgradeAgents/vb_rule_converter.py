@@ -0,0 +1,1283 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from .core_components import logger
+
+# Deterministic VB.NET to C# translation for a well-defined subset of the language: Option/Imports, Namespace,
+# Class/Structure/Module/Interface/Enum, attributes (including <Assembly: ...>), fields, constants, auto and simple
+# expanded properties, events, and Subs/Functions whose bodies only return, assign, declare locals or call methods.
+# Names are resolved against the declarations in the file (VB is case-insensitive, C# is not, and only a declaration
+# tells whether a parenthesis-less "x.Name" is a property or a method call), and operators are only translated for
+# operand types whose C# meaning is the same. convert_vb_with_rules() either translates the whole file or returns None
+# (anything outside the subset, any name it cannot resolve, or any ambiguity such as "x(1)" being a call or an array
+# index), in which case the caller falls back to the LLM.
+
+RULE_CONVERTER_VERSION = "2" # Bump when the translation changes, so conversion manifests re-convert rule-based outputs
+
+
+class _Unsupported(Exception):
+    pass
+
+
+TYPE_KEYWORDS = {
+    "string": "string", "integer": "int", "long": "long", "short": "short", "byte": "byte", "sbyte": "sbyte",
+    "uinteger": "uint", "ulong": "ulong", "ushort": "ushort", "boolean": "bool", "double": "double", "single": "float",
+    "decimal": "decimal", "object": "object", "char": "char", "date": "DateTime",
+}
+
+ACCESS_MODIFIERS = {"public": "public", "private": "private", "friend": "internal", "protected": "protected"}
+MEMBER_MODIFIERS = {"shared": "static", "overridable": "virtual", "overrides": "override", "mustoverride": "abstract",
+                    "notoverridable": "sealed", "shadows": "new", "readonly": "readonly", "overloads": None}
+TYPE_MODIFIERS = {"mustinherit": "abstract", "notinheritable": "sealed", "shadows": "new", "partial": "partial"}
+
+# Reserved words that must never appear in an expression we translate (they imply constructs outside the subset)
+UNSUPPORTED_WORDS = {
+    "addhandler", "addressof", "and", "andalso", "call", "case", "catch", "cbool", "cbyte", "cchar", "cdate", "cdbl",
+    "cdec", "cint", "clng", "cobj", "csbyte", "cshort", "csng", "cstr", "ctype", "cuint", "culng", "cushort", "directcast",
+    "do", "each", "else", "elseif", "end", "erase", "error", "exit", "finally", "for", "from", "function", "get",
+    "gettype", "getxmlnamespace", "global", "goto", "handles", "if", "in", "is", "isnot", "let", "lib", "like", "loop",
+    "mod", "myclass", "namespace", "narrowing", "next", "not", "of", "on", "operator", "option", "or", "orelse",
+    "raiseevent", "redim", "removehandler", "resume", "select", "set", "step", "stop", "sub", "synclock", "then", "throw",
+    "to", "try", "trycast", "typeof", "until", "using", "when", "where", "while", "with", "withevents", "xor", "yield",
+    "await", "aggregate",
+}
+
+# Operand types (see _type_key) arithmetic and comparisons are translated for, by widening rank. Narrower integers
+# are left out: Byte + Byte is a Byte in VB but an int in C#.
+_NUMERIC_RANK = {"integer": 0, "long": 1, "decimal": 2, "single": 3, "double": 4}
+# Conversions C# applies implicitly, so a VB assignment between these types needs no cast
+_IMPLICIT_WIDENING = {("byte", "short"), ("byte", "integer"), ("byte", "long"), ("short", "integer"), ("short", "long"),
+                      ("integer", "long"), ("integer", "single"), ("integer", "double"), ("integer", "decimal"),
+                      ("long", "single"), ("long", "double"), ("long", "decimal"), ("single", "double")}
+# Operand types "&" is translated for: C# + formats them the way VB's string conversion does (Date does not)
+_CONCAT_TYPES = {"string", "char", "boolean", "short", "byte"} | set(_NUMERIC_RANK)
+_VALUE_TYPES = set(TYPE_KEYWORDS) - {"string", "object"}
+# Members of built-in types that are known to be properties (so "s.Length" needs no parentheses): name -> (C#, type)
+_BUILTIN_MEMBERS = {"string": {"length": ("Length", "integer")}, "array": {"length": ("Length", "integer")}}
+
+_TOKEN = re.compile(r'\s*(?:(?P<string>"(?:[^"]|"")*"(?P<char>c)?)|(?P<hex>&H[0-9A-Fa-f]+)|'
+                    r'(?P<number>\d+(?:\.\d+)?(?P<suffix>UI|UL|[DFRL])?(?![\w.]))|'
+                    r'(?P<name>\[?[A-Za-z_]\w*\]?)|(?P<op><>|<=|>=|\+=|-=|&=|[-+*&(),.=<>]))', re.IGNORECASE)
+
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if not match or match.end() == position:
+            raise _Unsupported(f"cannot tokenize: {text[position:position + 20]!r}")
+        kind = match.lastgroup if match.lastgroup not in ("char", "suffix") else ("string" if match.group("string") else "number")
+        tokens.append((kind, match.group(kind).strip()))
+        position = match.end()
+    return tokens
+
+
+def _string_literal(vb_literal: str) -> str:
+    is_char = vb_literal.lower().endswith("c") and not vb_literal.endswith('"')
+    body = vb_literal[1:-2] if is_char else vb_literal[1:-1]
+    body = body.replace('""', '"')
+    escaped = body.replace("\\", "\\\\").replace('"', '\\"')
+    if is_char:
+        if len(body) != 1:
+            raise _Unsupported("multi-character char literal")
+        return "'\\''" if body == "'" else f"'{escaped}'"
+    return f'"{escaped}"'
+
+
+def _number_literal(vb_number: str) -> str:
+    suffix_map = {"d": "m", "f": "f", "r": "d", "l": "L", "ui": "u", "ul": "UL"}
+    match = re.match(r"(\d+(?:\.\d+)?)(UI|UL|[DFRL])?$", vb_number, re.IGNORECASE)
+    return match.group(1) + (suffix_map[match.group(2).lower()] if match.group(2) else "")
+
+
+class _TypeParser:
+    '''Translates VB type names: Integer -> int, List(Of String) -> List<string>, String() -> string[], Integer? -> int?.'''
+    @staticmethod
+    def translate(text: str, types: Optional[Dict[str, Optional["_TypeInfo"]]] = None) -> str:
+        text = text.strip()
+        if not text:
+            raise _Unsupported("missing type")
+        suffix = ""
+        while text.endswith("()") or text.endswith("?"):
+            if text.endswith("()"):
+                suffix = "[]" + suffix
+                text = text[:-2].rstrip()
+            else:
+                suffix = "?" + suffix
+                text = text[:-1].rstrip()
+        generic_match = re.match(r"^([\w.\[\]]+)\s*\(\s*Of\s+(.*)\)$", text, re.IGNORECASE)
+        if generic_match:
+            arguments = [_TypeParser.translate(argument, types) for argument in _split_top_level(generic_match.group(2))]
+            return f"{_TypeParser._name(generic_match.group(1), types)}<{', '.join(arguments)}>{suffix}"
+        if not re.match(r"^[\w.\[\]]+$", text):
+            raise _Unsupported(f"unsupported type: {text}")
+        return _TypeParser._name(text, types) + suffix
+
+    @staticmethod
+    def _name(name: str, types: Optional[Dict[str, Optional["_TypeInfo"]]]) -> str:
+        name = name.replace("[", "").replace("]", "")
+        if name.lower().startswith("global."):
+            name = "global::" + name[len("global."):]
+        declared = types.get(name.lower()) if types else None
+        if declared is not None:
+            return declared.name # Spelled as declared, since C# is case-sensitive
+        return TYPE_KEYWORDS.get(name.lower(), name)
+
+
+def _type_key(type_text: Optional[str]) -> Optional[str]:
+    '''Normalizes a VB type for type checks: "Integer" -> "integer", "String()" -> "string()"; None if unknown.'''
+    if not type_text:
+        return None
+    return re.sub(r"[\s\[\]]", "", type_text).lower()
+
+
+def _split_top_level(text: str, separator: str = ",") -> List[str]:
+    '''Splits on separator outside parentheses, brackets and string literals.'''
+    parts, depth, current, in_string = [], 0, "", False
+    for char in text:
+        if char == '"':
+            in_string = not in_string
+        elif not in_string and char in "([{":
+            depth += 1
+        elif not in_string and char in ")]}":
+            depth -= 1
+        if char == separator and depth == 0 and not in_string:
+            parts.append(current.strip())
+            current = ""
+        else:
+            current += char
+    if depth != 0 or in_string:
+        raise _Unsupported("unbalanced parentheses")
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+def _find_matching_paren(text: str, open_index: int) -> int:
+    depth, in_string = 0, False
+    for index in range(open_index, len(text)):
+        char = text[index]
+        if char == '"':
+            in_string = not in_string
+        elif not in_string and char == "(":
+            depth += 1
+        elif not in_string and char == ")":
+            depth -= 1
+            if depth == 0:
+                return index
+    raise _Unsupported("unbalanced parentheses")
+
+
+def _split_signature(rest: str) -> Tuple[str, str, str]:
+    '''"Sub Name(params) As T Implements X.Y" -> (name, params, remainder).'''
+    match = re.match(r"^\w+\s+(\w+)\s*", rest)
+    if not match:
+        raise _Unsupported(f"unsupported signature {rest}")
+    name = match.group(1)
+    remainder = rest[match.end():]
+    params = ""
+    if remainder.startswith("("):
+        close = _find_matching_paren(remainder, 0)
+        params = remainder[1:close]
+        if re.match(r"^\s*Of\b", params, re.IGNORECASE):
+            raise _Unsupported("generic method")
+        remainder = remainder[close + 1:].strip()
+    return name, params, remainder
+
+
+def _constructed_type(type_text: str) -> str:
+    '''"List(Of String)()" / "Point(1, 2)" -> "List(Of String)" / "Point": the type an As New clause creates.'''
+    text = type_text.strip()
+    paren = text.find("(")
+    if paren < 0:
+        return text
+    if re.match(r"^\(\s*Of\b", text[paren:], re.IGNORECASE):
+        return text[:_find_matching_paren(text, paren) + 1]
+    return text[:paren].rstrip()
+
+
+def _next_is_accessor(lines: List[str], index: int) -> bool:
+    for line in lines[index:]:
+        code, _ = _split_comment(line)
+        if code.strip():
+            _, rest = _split_leading_attributes(code)
+            return bool(re.match(r"^(?:(?:Public|Private|Friend|Protected)\s+)*(Get|Set)\b", rest, re.IGNORECASE))
+    return False
+
+
+class _Symbol:
+    '''A declared name: a local, parameter, member of a type declared in the file, or that type itself.'''
+    def __init__(self, name: str, kind: str, type_text: str = "", shared: bool = False):
+        self.name = name # Spelled as declared
+        self.kind = kind # local, parameter, field, const, property, method, event, enum_member, type
+        self.type_text = type_text # VB type (a Function's return type; "" for a Sub)
+        self.shared = shared
+        self.signatures: List[Tuple[str, int, float, bool]] = [] # Methods, per overload: (return type, required, maximum arguments, has ByRef)
+
+    def accepts(self, count: int) -> bool:
+        return any(required <= count <= maximum for _, required, maximum, _ in self.signatures)
+
+    def return_type(self) -> Optional[str]:
+        types = {_type_key(returns) for returns, _, _, _ in self.signatures}
+        return types.pop() if len(types) == 1 else None
+
+
+class _TypeInfo:
+    '''A type declared in the file being converted, with the members declared in its body.'''
+    def __init__(self, name: str, kind: str):
+        self.name = name
+        self.kind = kind # class, structure, module, interface, enum
+        self.bases: List[str] = []
+        self.members: Dict[str, _Symbol] = {}
+
+    def add(self, symbol: _Symbol):
+        existing = self.members.get(symbol.name.lower())
+        if existing is None:
+            self.members[symbol.name.lower()] = symbol
+        elif existing.kind == "method" and symbol.kind == "method":
+            existing.signatures.extend(symbol.signatures) # Overloads
+            existing.shared = existing.shared and symbol.shared
+        else:
+            existing.kind = "ambiguous"
+
+
+def _method_symbol(keyword: str, rest: str, shared: bool) -> Optional[_Symbol]:
+    name, params, remainder = _split_signature(rest)
+    if name.lower() == "new":
+        return None
+    returns = re.match(r"^(?:As\s+(.+?))?\s*(?:(?:Implements|Handles)\s+.+)?$", remainder, re.IGNORECASE)
+    symbol = _Symbol(name, "method", (returns.group(1) or "") if returns and keyword == "function" else "", shared)
+    parameters = _split_top_level(params) if params.strip() else []
+    lowered = [parameter.lower().split() for parameter in parameters]
+    required = sum(1 for words in lowered if words[0] not in ("optional", "paramarray"))
+    maximum = float("inf") if any(words[0] == "paramarray" for words in lowered) else len(parameters)
+    symbol.signatures.append((symbol.type_text, required, maximum, any("byref" in words for words in lowered)))
+    return symbol
+
+
+def _collect_declarations(lines: List[str]) -> Dict[str, Optional[_TypeInfo]]:
+    '''
+    Collects the types declared in the file and the members they declare, keyed by lower-case name, so that names can
+    be resolved before their declaration is reached. A name declared twice maps to None. Lines this cannot parse are
+    skipped: the conversion itself rejects them.
+    '''
+    types: Dict[str, Optional[_TypeInfo]] = {}
+    stack: List[_TypeInfo] = []
+    body_end = None # Keyword of the "End ..." closing the member body being skipped
+    for index, line in enumerate(lines):
+        try:
+            _, code = _split_leading_attributes(_split_comment(line)[0])
+        except _Unsupported:
+            continue
+        lowered = code.lower()
+        if not code:
+            continue
+        if body_end:
+            if re.match(rf"^end\s+{body_end}$", lowered):
+                body_end = None
+            continue
+        modifiers, rest = _split_modifiers(code)
+        type_match = re.match(r"^(class|structure|module|interface|enum)\s+(\w+)", rest, re.IGNORECASE)
+        if type_match:
+            info = _TypeInfo(type_match.group(2), type_match.group(1).lower())
+            types[info.name.lower()] = None if info.name.lower() in types else info
+            if stack:
+                stack[-1].add(_Symbol(info.name, "type", info.name, shared=True))
+            stack.append(info)
+            continue
+        if re.match(r"^end\s+(class|structure|module|interface|enum)$", lowered):
+            if stack:
+                stack.pop()
+            continue
+        if not stack:
+            continue
+        info = stack[-1]
+        shared = info.kind == "module" or "shared" in modifiers or "const" in modifiers
+        keyword = rest.split(" ", 1)[0].lower() if rest else ""
+        try:
+            if info.kind == "enum":
+                member = re.match(r"^\[?(\w+)\]?", code)
+                if member:
+                    info.add(_Symbol(member.group(1), "enum_member", info.name, shared=True))
+            elif not modifiers and keyword == "inherits":
+                info.bases.extend(_split_top_level(rest[len("inherits"):]))
+            elif keyword in ("sub", "function"):
+                symbol = _method_symbol(keyword, rest, shared)
+                if symbol:
+                    info.add(symbol)
+                if info.kind != "interface" and "mustoverride" not in modifiers:
+                    body_end = keyword
+            elif keyword == "property":
+                match = re.match(r"^Property\s+(\w+)(?:\s*\(\s*\))?\s+As\s+(New\s+)?(.+?)(?:\s*=\s*.+?)?(?:\s+Implements\s+.+)?$", rest, re.IGNORECASE)
+                if match:
+                    type_text = _constructed_type(match.group(3)) if match.group(2) else match.group(3)
+                    info.add(_Symbol(match.group(1), "property", type_text, shared))
+                if info.kind != "interface" and "mustoverride" not in modifiers and _next_is_accessor(lines, index + 1):
+                    body_end = "property"
+            elif keyword == "event":
+                match = re.match(r"^Event\s+(\w+)", rest, re.IGNORECASE)
+                if match:
+                    info.add(_Symbol(match.group(1), "event", shared=shared))
+            elif modifiers: # Fields, including "Dim x As T"
+                match = re.match(r"^(\w+)(\(\))?\s+As\s+(New\s+)?(.+?)(?:\s*=\s*.+)?$", rest, re.IGNORECASE)
+                if match:
+                    type_text = _constructed_type(match.group(4)) if match.group(3) else match.group(4)
+                    info.add(_Symbol(match.group(1), "const" if "const" in modifiers else "field", type_text + (match.group(2) or ""), shared))
+        except _Unsupported:
+            continue
+    return types
+
+
+class _Value:
+    '''A translated (sub)expression with its VB type key (None if unknown) and what it denotes.'''
+    def __init__(self, code: str, type_key: Optional[str] = None, kind: str = "value", symbol: Optional[_Symbol] = None, compound: bool = False):
+        self.code = code
+        self.type = type_key
+        self.kind = kind # value, call, comparison, type (a type name), method (a declared method not called yet), external (a member of a type not declared in the file, not called yet)
+        self.symbol = symbol
+        self.compound = compound # A binary operation, parenthesized when it becomes an operand of &
+
+
+def _arithmetic_type(left: Optional[str], right: Optional[str], operator: str) -> str:
+    if operator == "+" and left == right == "string":
+        return "string"
+    if left not in _NUMERIC_RANK or right not in _NUMERIC_RANK or ("decimal" in (left, right) and {"single", "double"} & {left, right}):
+        raise _Unsupported(f"{operator} on {left} and {right}") # Unknown operands may be strings, which VB would convert to numbers
+    return max((left, right), key=_NUMERIC_RANK.get)
+
+
+class _ExpressionTranslator:
+    '''
+    Recursive-descent translation of a small expression grammar: literals, names, member access, New, GetType,
+    arithmetic (+ - *), string concatenation (&) and comparisons. Names are resolved through the scope (the converter)
+    and spelled as declared; a member without parentheses is only accepted where a declaration says whether it is a
+    property or a method. Calls with arguments are only accepted where they are known to be calls (a method declared in
+    the file, the callee of a call statement, or after New), never "x(1)" on anything else.
+    '''
+    def __init__(self, text: str, scope: "_RuleConverter"):
+        self.tokens = _tokenize(text)
+        self.position = 0
+        self.scope = scope
+
+    def peek(self, offset: int = 0) -> Optional[Tuple[str, str]]:
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def take(self) -> Tuple[str, str]:
+        token = self.peek()
+        if token is None:
+            raise _Unsupported("unexpected end of expression")
+        self.position += 1
+        return token
+
+    def expect(self, value: str):
+        token = self.take()
+        if token[1].lower() != value.lower():
+            raise _Unsupported(f"expected {value}, got {token[1]}")
+
+    def at_end(self) -> bool:
+        return self.position >= len(self.tokens)
+
+    def _peek_operator(self, operators) -> Optional[str]:
+        token = self.peek()
+        return token[1] if token and token[0] == "op" and token[1] in operators else None
+
+    def expression(self) -> _Value:
+        operators = {"=": "==", "<>": "!=", "<": "<", ">": ">", "<=": "<=", ">=": ">="}
+        result = self.concatenation()
+        while self._peek_operator(operators):
+            operator = operators[self.take()[1]]
+            right = self.concatenation()
+            if not self._comparable(result.type, right.type, operator):
+                raise _Unsupported(f"{operator} on {result.type} and {right.type}") # e.g. String comparison follows Option Compare
+            left = f"({result.code})" if result.kind == "comparison" else result.code
+            result = _Value(f"{left} {operator} {right.code}", "boolean", kind="comparison", compound=True)
+        return result
+
+    def _comparable(self, left: Optional[str], right: Optional[str], operator: str) -> bool:
+        if left in _NUMERIC_RANK and right in _NUMERIC_RANK:
+            return not ("decimal" in (left, right) and {"single", "double"} & {left, right})
+        if left != right or left is None:
+            return False
+        info = self.scope.types.get(left)
+        return left == "char" or (info is not None and info.kind == "enum") or (left == "boolean" and operator in ("==", "!="))
+
+    def concatenation(self) -> _Value:
+        operands = [self.additive()]
+        while self._peek_operator("&"):
+            self.take()
+            operands.append(self.additive())
+        if len(operands) == 1:
+            return operands[0]
+        # C# + only concatenates once a string is involved: "1" & 2 & 3 is "123", but 1 + 2 + "3" is "33"
+        if any(operand.type not in _CONCAT_TYPES for operand in operands) or "string" not in (operands[0].type, operands[1].type):
+            raise _Unsupported("& on operands C# + would not concatenate")
+        # & binds looser than + in VB, so compound operands keep their grouping: "x" & 1 + 2 is "x3"
+        return _Value(" + ".join(f"({operand.code})" if operand.compound else operand.code for operand in operands), "string", compound=True)
+
+    def additive(self) -> _Value:
+        result = self.multiplicative()
+        while self._peek_operator(("+", "-")):
+            operator = self.take()[1]
+            right = self.multiplicative()
+            result = _Value(f"{result.code} {operator} {right.code}", _arithmetic_type(result.type, right.type, operator), compound=True)
+        return result
+
+    def multiplicative(self) -> _Value:
+        result = self.unary()
+        while self._peek_operator("*"):
+            self.take()
+            right = self.unary()
+            result = _Value(f"{result.code} * {right.code}", _arithmetic_type(result.type, right.type, "*"), compound=True)
+        return result
+
+    def unary(self) -> _Value:
+        operator = self._peek_operator(("-", "+"))
+        if operator:
+            self.take()
+            operand = self.unary()
+            if operand.type not in _NUMERIC_RANK:
+                raise _Unsupported(f"unary {operator} on {operand.type}")
+            return _Value(operator + operand.code, operand.type)
+        return self.complete(self.postfix())
+
+    def arguments(self) -> List[str]:
+        '''Parses "(a, b)" starting at "(".'''
+        self.expect("(")
+        arguments = []
+        if self.peek() and self.peek()[1] == ")":
+            self.take()
+            return arguments
+        while True:
+            if self.peek() and self.peek()[1] == ",":
+                raise _Unsupported("omitted argument")
+            named = self.peek(1)
+            if named and named[1] == ":=":
+                raise _Unsupported("named argument")
+            arguments.append(self.expression().code)
+            token = self.take()
+            if token[1] == ")":
+                return arguments
+            if token[1] != ",":
+                raise _Unsupported(f"unexpected {token[1]} in arguments")
+
+    def type_name(self) -> Tuple[str, str]:
+        '''Reads a (possibly generic, dotted) type name from the token stream, returning it in VB and in C#.'''
+        parts = [self._name(self.take())]
+        text = parts[0]
+        while self.peek() and self.peek()[1] == ".":
+            self.take()
+            text += "." + self._name(self.take())
+        if self.peek() and self.peek()[1] == "(" and self.peek(1) and self.peek(1)[1].lower() == "of":
+            self.take()
+            self.take()
+            depth, inner = 1, []
+            while depth:
+                token = self.take()
+                depth += {"(": 1, ")": -1}.get(token[1], 0)
+                if depth:
+                    inner.append(token[1])
+            text += "(Of " + " ".join(inner).replace(" ( ", "(").replace(" )", ")").replace(" , ", ", ") + ")"
+        return text, _TypeParser.translate(text, self.scope.types)
+
+    @staticmethod
+    def _name(token: Tuple[str, str]) -> str:
+        if token[0] != "name":
+            raise _Unsupported(f"expected a name, got {token[1]}")
+        return token[1].replace("[", "").replace("]", "")
+
+    def primary(self) -> _Value:
+        kind, value = self.take()
+        lowered = value.lower()
+        if kind == "string":
+            return _Value(_string_literal(value), "char" if lowered.endswith("c") and not value.endswith('"') else "string")
+        if kind == "number":
+            suffix = re.match(r"[\d.]+(\D*)$", lowered).group(1)
+            number_type = {"": "double" if "." in value else "integer", "d": "decimal", "f": "single", "r": "double", "l": "long", "ui": "uinteger", "ul": "ulong"}[suffix]
+            if number_type == "integer" and int(value) > 2147483647:
+                number_type = "long"
+            return _Value(_number_literal(value), number_type)
+        if kind == "hex":
+            return _Value("0x" + value[2:], "integer" if len(value) <= 10 else None)
+        if kind == "op" and value == "(":
+            inner = self.expression()
+            self.expect(")")
+            return _Value(f"({inner.code})", inner.type)
+        if kind != "name":
+            raise _Unsupported(f"unexpected {value}")
+        if lowered in ("true", "false"):
+            return _Value(lowered, "boolean")
+        if lowered == "nothing":
+            return _Value("null", "nothing")
+        if lowered == "me":
+            return _Value("this", self.scope.me_type())
+        if lowered == "mybase":
+            return _Value("base", self.scope.base_type())
+        if lowered == "new":
+            vb_type, type_name = self.type_name()
+            arguments = self.arguments() if self.peek() and self.peek()[1] == "(" else []
+            if self.peek() and self.peek()[1] in ("{",) or (self.peek() and self.peek()[1].lower() in ("with", "from")):
+                raise _Unsupported("object/collection initializer")
+            return _Value(f"new {type_name}({', '.join(arguments)})", _type_key(vb_type), kind="call")
+        if lowered == "gettype":
+            self.expect("(")
+            _, type_name = self.type_name()
+            self.expect(")")
+            return _Value(f"typeof({type_name})")
+        if lowered in UNSUPPORTED_WORDS:
+            raise _Unsupported(f"unsupported keyword {value}")
+        name = self._name((kind, value))
+        symbol = self.scope.resolve_name(name.lower())
+        if symbol is None:
+            raise _Unsupported(f"unresolved name {name}")
+        return self._from_symbol(symbol, "")
+
+    def _from_symbol(self, symbol: _Symbol, qualifier: str) -> _Value:
+        if symbol.kind == "type":
+            return _Value(qualifier + symbol.name, _type_key(symbol.name), kind="type", symbol=symbol)
+        if symbol.kind == "method":
+            return _Value(qualifier + symbol.name, kind="method", symbol=symbol)
+        if symbol.kind not in ("local", "parameter", "field", "const", "property", "enum_member"):
+            raise _Unsupported(f"{symbol.kind} {symbol.name} in an expression")
+        return _Value(qualifier + symbol.name, _type_key(symbol.type_text), symbol=symbol)
+
+    def member(self, value: _Value, name: str) -> _Value:
+        value = self.complete(value) if value.kind != "type" else value
+        key = name.lower()
+        if key in UNSUPPORTED_WORDS:
+            raise _Unsupported(f"unsupported member {name}")
+        info = self.scope.types.get(value.type) if value.type else None
+        if info is not None:
+            symbol = self.scope.member(info, key)
+            # Shared members through an instance, or instance members through the type, do not compile in C#
+            if symbol is None or symbol.shared != (value.kind == "type"):
+                raise _Unsupported(f"unresolved member {name} of {info.name}")
+            return self._from_symbol(symbol, value.code + ".")
+        if value.kind == "type":
+            raise _Unsupported(f"unresolved member {name} of {value.code}")
+        builtin = _BUILTIN_MEMBERS.get("array" if (value.type or "").endswith("()") else value.type or "", {}).get(key)
+        if builtin:
+            return _Value(f"{value.code}.{builtin[0]}", builtin[1])
+        return _Value(f"{value.code}.{name}", kind="external")
+
+    def complete(self, value: _Value, statement: bool = False) -> _Value:
+        '''Turns a method not followed by an argument list into a call, as VB does; rejects what cannot be a value.'''
+        if value.kind == "method":
+            if not value.symbol.accepts(0):
+                raise _Unsupported(f"{value.code} called without its arguments")
+            return self._call(value, [], statement)
+        if value.kind == "external":
+            if not statement:
+                raise _Unsupported(f"{value.code} without parentheses could be a property or a method")
+            return _Value(value.code + "()", kind="call") # Only a method can be a statement
+        if value.kind == "type":
+            raise _Unsupported(f"type {value.code} used as a value")
+        return value
+
+    def _call(self, value: _Value, arguments: List[str], statement: bool) -> _Value:
+        symbol = value.symbol
+        if any(by_ref for _, _, _, by_ref in symbol.signatures):
+            raise _Unsupported(f"{symbol.name} has ByRef parameters") # C# needs "ref" at the call site
+        if not statement and not any(returns for returns, _, _, _ in symbol.signatures):
+            raise _Unsupported(f"Sub {symbol.name} used as a value")
+        return _Value(f"{value.code}({', '.join(arguments)})", symbol.return_type(), kind="call")
+
+    def invoke(self, value: _Value, call_statement: bool) -> _Value:
+        if self.peek(1) and self.peek(1)[1].lower() == "of":
+            raise _Unsupported("generic method call")
+        if self.peek(1) and self.peek(1)[1] == ")":
+            self.take()
+            self.take()
+            if value.kind == "method":
+                return self.complete(value, call_statement and self.at_end())
+            if value.kind == "external":
+                return _Value(value.code + "()", kind="call")
+            if value.symbol is not None and value.symbol.kind == "property":
+                return value # VB allows "Name()" for a property
+            raise _Unsupported(f"{value.code}() is not a call")
+        if value.kind == "method":
+            arguments = self.arguments()
+            if not value.symbol.accepts(len(arguments)):
+                raise _Unsupported(f"{value.code} does not take {len(arguments)} arguments") # e.g. an index into the result
+            return self._call(value, arguments, call_statement and self.at_end())
+        if value.kind == "external" and call_statement:
+            arguments = self.arguments()
+            if not self.at_end():
+                raise _Unsupported("call followed by more tokens") # "a(1).b" could be an index
+            return _Value(f"{value.code}({', '.join(arguments)})", kind="call")
+        raise _Unsupported("call or index with arguments inside an expression")
+
+    def postfix(self, call_statement: bool = False) -> _Value:
+        result = self.primary()
+        while self.peek():
+            token = self.peek()
+            if token[1] == ".":
+                self.take()
+                result = self.member(result, self._name(self.take()))
+            elif token[1] == "(":
+                result = self.invoke(result, call_statement)
+            else:
+                break
+        return result
+
+    def call_statement(self) -> _Value:
+        result = self.postfix(call_statement=True)
+        if not self.at_end():
+            raise _Unsupported("unexpected tokens after a call")
+        result = self.complete(result, statement=True)
+        if result.kind != "call":
+            raise _Unsupported(f"{result.code} is not a call")
+        return result
+
+    def assignment_target(self) -> _Value:
+        result = self.postfix()
+        if not self.at_end() or result.kind != "value" or result.symbol is None or result.symbol.kind not in ("local", "parameter", "field", "property"):
+            raise _Unsupported("unsupported assignment target")
+        return result
+
+
+def translate_expression(text: str, scope: "_RuleConverter") -> _Value:
+    translator = _ExpressionTranslator(text, scope)
+    result = translator.expression()
+    if not translator.at_end():
+        raise _Unsupported(f"unexpected trailing tokens in {text!r}")
+    return result
+
+
+def _translate_attribute_list(text: str, scope: "_RuleConverter") -> str:
+    '''"<A, B(1, Name:=2)>" or "<Assembly: C>" -> "[A, B(1, Name = 2)]" / "[assembly: C]".'''
+    inner = text.strip()[1:-1].strip()
+    target = ""
+    target_match = re.match(r"^(Assembly|Module)\s*:\s*", inner, re.IGNORECASE)
+    if target_match:
+        target = target_match.group(1).lower() + ": "
+        inner = inner[target_match.end():]
+    attributes = []
+    for attribute in _split_top_level(inner):
+        name_match = re.match(r"^([\w.]+)\s*(\(.*\))?$", attribute, re.DOTALL)
+        if not name_match:
+            raise _Unsupported(f"unsupported attribute {attribute}")
+        translated = name_match.group(1)
+        if name_match.group(2) is not None:
+            arguments = []
+            for argument in _split_top_level(name_match.group(2)[1:-1]):
+                named = re.match(r"^(\w+)\s*:=\s*(.+)$", argument, re.DOTALL)
+                arguments.append(f"{named.group(1)} = {translate_expression(named.group(2), scope).code}" if named else translate_expression(argument, scope).code)
+            translated += f"({', '.join(arguments)})"
+        attributes.append(translated)
+    return f"[{target}{', '.join(attributes)}]"
+
+
+def _split_leading_attributes(line: str) -> Tuple[List[str], str]:
+    '''Separates "<Attr> <Other(1)> Public Sub X()" into (["<Attr>", "<Other(1)>"], "Public Sub X()").'''
+    attributes = []
+    rest = line.strip()
+    while rest.startswith("<"):
+        depth, in_string, end = 0, False, -1
+        for index, char in enumerate(rest):
+            if char == '"':
+                in_string = not in_string
+            elif not in_string and char == "<":
+                depth += 1
+            elif not in_string and char == ">":
+                depth -= 1
+                if depth == 0:
+                    end = index
+                    break
+        if end < 0:
+            raise _Unsupported("unterminated attribute")
+        attributes.append(rest[:end + 1])
+        rest = rest[end + 1:].strip()
+    return attributes, rest
+
+
+def _split_comment(line: str) -> Tuple[str, Optional[str]]:
+    '''Splits off a trailing ' comment that is not inside a string literal.'''
+    in_string = False
+    for index, char in enumerate(line):
+        if char == '"':
+            in_string = not in_string
+        elif char in "'‘’" and not in_string:
+            return line[:index].rstrip(), line[index + 1:]
+    return line.rstrip(), None
+
+
+def _split_modifiers(text: str) -> Tuple[List[str], str]:
+    words = text.split()
+    known = set(ACCESS_MODIFIERS) | set(MEMBER_MODIFIERS) | set(TYPE_MODIFIERS) | {"dim", "const", "default", "writeonly", "widening", "narrowing", "withevents", "static", "custom", "async", "iterator", "partial", "overloads"}
+    modifiers = []
+    while words and words[0].lower() in known:
+        modifiers.append(words.pop(0).lower())
+    return modifiers, " ".join(words)
+
+
+class _Frame:
+    def __init__(self, kind: str, name: str = "", type_name: str = "", return_type: str = "", info: Optional[_TypeInfo] = None):
+        self.kind = kind # namespace, class, structure, module, interface, enum, sub, function, property, get, set
+        self.name = name
+        self.type_name = type_name # Enclosing type name (for constructors)
+        self.return_type = return_type # VB type of a Function or property
+        self.info = info # Declarations of a type frame (None if the name is declared twice)
+        self.symbols: Dict[str, _Symbol] = {} # Parameters and locals of a method or accessor
+        self.returned = False # Whether the last statement of a method body was a Return
+
+
+class _RuleConverter:
+    def __init__(self, vb_code: str):
+        self.lines = self._logical_lines(vb_code)
+        self.types = _collect_declarations(self.lines)
+        self.infer = True # Option Infer
+        self.output = []
+        self.stack = [_Frame("file")]
+        self.pending_attributes = []
+        self.index = 0
+
+    @staticmethod
+    def _logical_lines(vb_code: str) -> List[str]:
+        '''Joins explicit " _" line continuations; implicit continuations are left to the parser (and rejected).'''
+        logical, current = [], ""
+        for raw_line in vb_code.replace("\r\n", "\n").split("\n"):
+            code, comment = _split_comment(raw_line)
+            if code.endswith(" _") or code == "_":
+                if comment is not None:
+                    raise _Unsupported("comment after line continuation")
+                current += code[:-1] + " "
+                continue
+            logical.append(current + raw_line if current else raw_line)
+            current = ""
+        if current:
+            raise _Unsupported("dangling line continuation")
+        return logical
+
+    def emit(self, text: str = "", comment: Optional[str] = None):
+        depth = sum(1 for frame in self.stack if frame.kind not in ("file",))
+        if comment is not None:
+            text = f"{text} //{comment}" if text else f"//{comment}"
+        self.output.append(("    " * depth + text) if text else "")
+
+    @property
+    def frame(self) -> _Frame:
+        return self.stack[-1]
+
+    def enclosing_type(self) -> Optional[_Frame]:
+        for frame in reversed(self.stack):
+            if frame.kind in ("class", "structure", "module", "interface"):
+                return frame
+        return None
+
+    # --- Name resolution (the scope of _ExpressionTranslator) ----------------------------------------------------
+
+    def resolve_name(self, key: str) -> Optional[_Symbol]:
+        '''Resolves an unqualified name the way VB binds it: locals and parameters, members, then declared types.'''
+        method = next((frame for frame in reversed(self.stack) if frame.kind in ("sub", "function", "get", "set")), None)
+        if method is not None:
+            if key in method.symbols:
+                return method.symbols[key]
+            if method.kind in ("function", "get") and key == method.name.lower():
+                raise _Unsupported("implicit return variable") # Not a recursive call
+        innermost = True
+        for frame in reversed(self.stack):
+            if frame.kind in ("class", "structure", "module", "interface", "enum"):
+                symbol = self.member(frame.info, key) if frame.info is not None else None
+                if symbol is not None and (innermost or symbol.shared):
+                    return symbol
+                innermost = False
+        info = self.types.get(key)
+        return _Symbol(info.name, "type", info.name, shared=True) if info is not None else None
+
+    def member(self, info: _TypeInfo, key: str, seen: Optional[set] = None) -> Optional[_Symbol]:
+        '''Looks a member up in a declared type and the base types declared in the file.'''
+        if key in info.members:
+            return info.members[key]
+        seen = (seen or set()) | {info.name.lower()}
+        for base in info.bases:
+            base_info = self.types.get(_type_key(base).split(".")[-1])
+            if base_info is not None and base_info.name.lower() not in seen:
+                symbol = self.member(base_info, key, seen)
+                if symbol is not None:
+                    return symbol
+        return None
+
+    def me_type(self) -> Optional[str]:
+        enclosing = self.enclosing_type()
+        return enclosing.name.lower() if enclosing is not None and enclosing.info is not None else None
+
+    def base_type(self) -> Optional[str]:
+        enclosing = self.enclosing_type()
+        if enclosing is None or enclosing.info is None or not enclosing.info.bases:
+            return None
+        base = _type_key(enclosing.info.bases[0]).split(".")[-1]
+        return base if self.types.get(base) is not None else None
+
+    def type_name(self, type_text: str) -> str:
+        return _TypeParser.translate(type_text, self.types)
+
+    def check_assignable(self, target: Optional[str], value: _Value):
+        '''Rejects assignments (and returns) C# would need a conversion for, including Nothing to a value type.'''
+        if value.type == "nothing":
+            info = self.types.get(target) if target else None
+            if target is None or target in _VALUE_TYPES or (info is not None and info.kind in ("structure", "enum")):
+                raise _Unsupported(f"Nothing as {target}") # The type's default value in VB
+            return
+        if target is None or value.type is None or target in (value.type, "object") or (value.type, target) in _IMPLICIT_WIDENING:
+            return
+        if target in TYPE_KEYWORDS or value.type in TYPE_KEYWORDS:
+            raise _Unsupported(f"{value.type} assigned to {target}")
+
+    def flush_attributes(self):
+        for attribute in self.pending_attributes:
+            self.emit(attribute)
+        self.pending_attributes = []
+
+    def convert(self) -> str:
+        while self.index < len(self.lines):
+            line = self.lines[self.index]
+            self.index += 1
+            code, comment = _split_comment(line)
+            stripped = code.strip()
+            if not stripped:
+                if comment is not None:
+                    self.emit(comment=("/" + comment[2:]) if comment.startswith("''") else comment)
+                else:
+                    self.emit()
+                continue
+            if comment is not None and self.pending_attributes:
+                raise _Unsupported("comment between attribute and declaration")
+            self.convert_line(stripped, comment)
+        if len(self.stack) != 1 or self.pending_attributes:
+            raise _Unsupported("unterminated block")
+        return "\n".join(self.output).rstrip() + "\n"
+
+    def convert_line(self, code: str, comment: Optional[str]):
+        lowered = code.lower()
+        if re.match(r"^rem(\s|$)", lowered):
+            self.emit(comment=code[3:])
+            return
+        if lowered.startswith("option "):
+            if re.match(r"^option\s+infer\s+off$", lowered):
+                self.infer = False # "Dim x = 1" declares an Object
+            return # Option Strict/Explicit/Infer/Compare have no C# counterpart
+        if lowered.startswith("#region"):
+            self.emit("#region " + code[len("#region"):].strip().strip('"'), comment)
+            return
+        if re.match(r"^#end\s+region$", lowered):
+            self.emit("#endregion", comment)
+            return
+        if lowered.startswith("imports "):
+            if self.frame.kind != "file":
+                raise _Unsupported("Imports inside a block")
+            target = code[len("imports "):].strip()
+            alias = re.match(r"^(\w+)\s*=\s*([\w.]+)$", target)
+            if alias:
+                self.emit(f"using {alias.group(1)} = {alias.group(2)};", comment)
+            elif re.match(r"^[\w.]+$", target):
+                self.emit(f"using {target};", comment)
+            else:
+                raise _Unsupported("XML namespace or generic import")
+            return
+
+        attributes, rest = _split_leading_attributes(code)
+        if attributes:
+            for attribute in attributes:
+                translated = _translate_attribute_list(attribute, self)
+                if translated.startswith("[assembly:") or translated.startswith("[module:"):
+                    if rest or self.frame.kind != "file":
+                        raise _Unsupported("assembly attribute in an unexpected place")
+                    self.emit(translated, comment)
+                else:
+                    self.pending_attributes.append(translated)
+            if not rest:
+                if comment is not None:
+                    raise _Unsupported("comment after attribute")
+                return
+            code = rest
+            lowered = code.lower()
+
+        end_match = re.match(r"^end\s+(namespace|class|structure|module|interface|enum|sub|function|property|get|set|event)$", lowered)
+        if end_match:
+            self.end_block(end_match.group(1), comment)
+            return
+
+        if self.frame.kind in ("sub", "function", "get", "set"):
+            if self.pending_attributes:
+                raise _Unsupported("attribute inside a method body")
+            translated = self.statement(code)
+            self.frame.returned = translated.startswith("return")
+            self.emit(translated, comment)
+            return
+        if self.frame.kind == "enum":
+            self.enum_member(code, comment)
+            return
+        if self.frame.kind == "property":
+            self.accessor(code, comment)
+            return
+        self.declaration(code, comment)
+
+    # --- Declarations -------------------------------------------------------------------------------------------
+
+    def declaration(self, code: str, comment: Optional[str]):
+        namespace_match = re.match(r"^Namespace\s+([\w.]+)$", code, re.IGNORECASE)
+        if namespace_match:
+            if self.frame.kind not in ("file", "namespace") or self.pending_attributes:
+                raise _Unsupported("namespace in an unexpected place")
+            self.emit(f"namespace {namespace_match.group(1)}", comment)
+            self.emit("{")
+            self.stack.append(_Frame("namespace"))
+            return
+
+        modifiers, rest = _split_modifiers(code)
+        keyword = rest.split(" ", 1)[0].lower() if rest else ""
+        if keyword in ("class", "structure", "module", "interface", "enum"):
+            self.type_declaration(modifiers, keyword, rest, comment)
+        elif keyword in ("sub", "function"):
+            self.method_declaration(modifiers, keyword, rest, comment)
+        elif keyword == "property":
+            self.property_declaration(modifiers, rest, comment)
+        elif keyword == "event":
+            self.event_declaration(modifiers, rest, comment)
+        elif self.frame.kind in ("class", "structure", "module") and rest and (modifiers or keyword == "dim"):
+            self.field_declaration(modifiers, rest, comment)
+        else:
+            raise _Unsupported(f"unsupported declaration: {code}")
+
+    def access_modifier(self, modifiers: List[str], default: str) -> str:
+        access = [ACCESS_MODIFIERS[m] for m in modifiers if m in ACCESS_MODIFIERS]
+        if access == ["protected", "internal"] or access == ["internal", "protected"]:
+            return "protected internal"
+        if len(access) > 1:
+            raise _Unsupported("combined access modifiers")
+        return access[0] if access else default
+
+    def type_declaration(self, modifiers: List[str], keyword: str, rest: str, comment: Optional[str]):
+        if self.frame.kind not in ("file", "namespace", "class", "structure", "module"):
+            raise _Unsupported("type declared in an unexpected place")
+        match = re.match(r"^\w+\s+(\w+)(?:\s*\(\s*Of\s+([\w\s,]+)\))?(?:\s+As\s+(\w+))?$", rest, re.IGNORECASE)
+        if not match:
+            raise _Unsupported(f"unsupported type declaration: {rest}")
+        name, generics, enum_base = match.groups()
+        unknown = [m for m in modifiers if m not in ACCESS_MODIFIERS and m not in TYPE_MODIFIERS]
+        if unknown:
+            raise _Unsupported(f"unsupported type modifiers {unknown}")
+        parts = []
+        # Nested types are Public by default in VB but private in C#; a Partial part without one takes the other parts' access
+        nested = self.frame.kind in ("class", "structure", "module") and "partial" not in modifiers
+        access = self.access_modifier(modifiers, "public" if nested else "")
+        if access:
+            parts.append(access)
+        parts.extend(TYPE_MODIFIERS[m] for m in modifiers if m in TYPE_MODIFIERS and m != "partial")
+        if keyword == "module":
+            parts.append("static")
+        if "partial" in modifiers:
+            parts.append("partial")
+        parts.append({"class": "class", "module": "class", "structure": "struct", "interface": "interface", "enum": "enum"}[keyword])
+        header = " ".join(parts) + " " + name
+        if generics:
+            header += "<" + ", ".join(g.strip() for g in generics.split(",")) + ">"
+
+        bases = []
+        if enum_base:
+            if keyword != "enum":
+                raise _Unsupported("As clause on a non-enum type")
+            bases.append(self.type_name(enum_base))
+        while self.index < len(self.lines) and keyword != "enum":
+            next_code, next_comment = _split_comment(self.lines[self.index])
+            inherits = re.match(r"^\s*(Inherits|Implements)\s+(.+)$", next_code, re.IGNORECASE)
+            if not inherits:
+                break
+            if next_comment is not None:
+                raise _Unsupported("comment on Inherits/Implements")
+            if inherits.group(1).lower() == "inherits" and keyword not in ("class", "interface"):
+                raise _Unsupported("Inherits on a non-class type")
+            bases.extend(self.type_name(base) for base in _split_top_level(inherits.group(2)))
+            self.index += 1
+        if bases:
+            header += " : " + ", ".join(bases)
+
+        self.flush_attributes()
+        self.emit(header, comment)
+        self.emit("{")
+        self.stack.append(_Frame(keyword, name=name, info=self.types.get(name.lower())))
+
+    def member_modifiers(self, modifiers: List[str], allowed: set, default_access: str) -> List[str]:
+        unknown = [m for m in modifiers if m not in ACCESS_MODIFIERS and m not in allowed]
+        if unknown:
+            raise _Unsupported(f"unsupported member modifiers {unknown}")
+        enclosing = self.enclosing_type()
+        if enclosing.kind == "interface":
+            if set(modifiers) - {"readonly", "writeonly", "overloads"}:
+                raise _Unsupported("modifiers on interface members")
+            return [m for m in modifiers if m == "readonly"] # Only used to pick the accessors
+        parts = [self.access_modifier(modifiers, default_access)]
+        for modifier in modifiers:
+            translated = MEMBER_MODIFIERS.get(modifier) if modifier in MEMBER_MODIFIERS else None
+            if modifier == "const":
+                translated = "const"
+            if translated and translated not in parts:
+                parts.append(translated)
+        if enclosing.kind == "module" and "static" not in parts and "const" not in parts:
+            parts.append("static") # Module members are implicitly Shared
+        return parts
+
+    def parameters(self, text: str, symbols: Dict[str, _Symbol]) -> str:
+        translated = []
+        for parameter in _split_top_level(text) if text.strip() else []:
+            match = re.match(r"^(?:(Optional)\s+)?(?:(ByVal|ByRef|ParamArray)\s+)?(\w+)(\(\))?\s+As\s+(.+?)(?:\s*=\s*(.+))?$", parameter, re.IGNORECASE)
+            if not match or parameter.startswith("<"):
+                raise _Unsupported(f"unsupported parameter {parameter}")
+            optional, passing, name, is_array, type_text, default = match.groups()
+            if bool(optional) != bool(default):
+                raise _Unsupported("Optional parameter without default (or default without Optional)")
+            type_name = self.type_name(type_text + ("()" if is_array else ""))
+            prefix = {"byref": "ref ", "paramarray": "params "}.get((passing or "").lower(), "")
+            if default:
+                default_value = translate_expression(default, self)
+                self.check_assignable(_type_key(type_text + ("()" if is_array else "")), default_value)
+            translated.append(f"{prefix}{type_name} {name}" + (f" = {default_value.code}" if default else ""))
+            symbols[name.lower()] = _Symbol(name, "parameter", type_text + ("()" if is_array else ""))
+        return ", ".join(translated)
+
+    def _check_implements(self, name: str, clause: Optional[str], access: str):
+        if not clause:
+            return
+        if access != "public":
+            raise _Unsupported("non-public interface implementation")
+        for target in _split_top_level(clause):
+            if target.split(".")[-1].lower() != name.lower():
+                raise _Unsupported("interface member implemented under a different name")
+
+    def method_declaration(self, modifiers: List[str], keyword: str, rest: str, comment: Optional[str]):
+        enclosing = self.enclosing_type()
+        if enclosing is None or self.frame is not enclosing:
+            raise _Unsupported("method outside a type")
+        name, params, remainder = _split_signature(rest)
+        clause_match = re.match(r"^(?:As\s+(.+?))?\s*(?:(Implements|Handles)\s+(.+))?$", remainder, re.IGNORECASE)
+        if not clause_match or (clause_match.group(2) or "").lower() == "handles":
+            raise _Unsupported(f"unsupported method clause {remainder}")
+        return_type = clause_match.group(1)
+        if (keyword == "function") != bool(return_type):
+            raise _Unsupported("Function without As clause (or Sub with one)")
+        parts = self.member_modifiers(modifiers, {"shared", "overridable", "overrides", "mustoverride", "notoverridable", "shadows", "overloads"}, "public")
+        self._check_implements(name, clause_match.group(3), parts[0] if parts else "public")
+        is_constructor = name.lower() == "new"
+        symbols = {}
+        if is_constructor:
+            if keyword != "sub" or enclosing.kind in ("interface", "module") or "shared" in modifiers:
+                raise _Unsupported("unsupported constructor")
+            signature = f"{enclosing.name}({self.parameters(params, symbols)})"
+        else:
+            returns = self.type_name(return_type) if return_type else "void"
+            signature = f"{returns} {name}({self.parameters(params, symbols)})"
+        declaration = " ".join(parts + [signature])
+
+        self.flush_attributes()
+        if enclosing.kind == "interface" or "mustoverride" in modifiers:
+            self.emit(declaration + ";", comment)
+            return
+        self.emit(declaration, comment)
+        self.emit("{")
+        self.stack.append(_Frame(keyword, name=name, type_name=enclosing.name, return_type=return_type or ""))
+        self.frame.symbols = symbols
+
+    def property_declaration(self, modifiers: List[str], rest: str, comment: Optional[str]):
+        enclosing = self.enclosing_type()
+        if enclosing is None or self.frame is not enclosing:
+            raise _Unsupported("property outside a type")
+        match = re.match(r"^Property\s+(\w+)(?:\s*\(\s*\))?\s+As\s+(New\s+)?(.+?)(?:\s*=\s*(.+?))?(?:\s+Implements\s+(.+))?$", rest, re.IGNORECASE)
+        if not match:
+            raise _Unsupported(f"unsupported property {rest}")
+        name, as_new, type_text, initializer, implements = match.groups()
+        if as_new:
+            type_text, arguments = (type_text, "()")
+            paren = type_text.find("(")
+            if paren >= 0 and not re.match(r"^\s*Of\b", type_text[paren + 1:], re.IGNORECASE):
+                close = _find_matching_paren(type_text, paren)
+                arguments = translate_expression("New Object" + type_text[paren:close + 1], self).code[len("new object"):]
+                type_text = type_text[:paren] + type_text[close + 1:]
+            initializer_code = f"new {self.type_name(type_text.strip())}{arguments}"
+        else:
+            initializer_value = translate_expression(initializer, self) if initializer else None
+            if initializer_value:
+                self.check_assignable(_type_key(type_text), initializer_value)
+            initializer_code = initializer_value.code if initializer_value else None
+        type_name = self.type_name(type_text)
+        parts = self.member_modifiers(modifiers, {"shared", "overridable", "overrides", "mustoverride", "notoverridable", "shadows", "readonly", "writeonly", "overloads", "default"}, "public")
+        if "default" in modifiers:
+            raise _Unsupported("default property")
+        self._check_implements(name, implements, parts[0] if parts else "public")
+        parts = [p for p in parts if p != "readonly"]
+
+        has_body = enclosing.kind != "interface" and "mustoverride" not in modifiers and _next_is_accessor(self.lines, self.index)
+        self.flush_attributes()
+        declaration = " ".join(parts + [f"{type_name} {name}"])
+        if has_body:
+            if initializer_code:
+                raise _Unsupported("initializer on an expanded property")
+            self.emit(declaration, comment)
+            self.emit("{")
+            self.stack.append(_Frame("property", name=name, return_type=type_text))
+            return
+        if "writeonly" in modifiers:
+            raise _Unsupported("WriteOnly auto-property")
+        accessors = "{ get; }" if "readonly" in modifiers else "{ get; set; }"
+        if initializer_code and enclosing.kind != "interface":
+            self.emit(f"{declaration} {accessors} = {initializer_code};", comment)
+        else:
+            self.emit(f"{declaration} {accessors}", comment)
+
+    def accessor(self, code: str, comment: Optional[str]):
+        match = re.match(r"^((?:(?:Public|Private|Friend|Protected)\s+)*)(Get|Set)(?:\s*\(\s*(?:ByVal\s+)?(\w+)\s+As\s+[^)]+\))?$", code, re.IGNORECASE)
+        if not match or self.pending_attributes:
+            raise _Unsupported(f"unsupported property accessor {code}")
+        access_words, kind, value_name = match.groups()
+        if value_name and value_name.lower() != "value":
+            raise _Unsupported("Set parameter not named value")
+        access = self.access_modifier(access_words.lower().split(), "") if access_words.strip() else ""
+        self.emit(f"{access + ' ' if access else ''}{kind.lower()}", comment)
+        self.emit("{")
+        self.stack.append(_Frame(kind.lower(), name=self.frame.name, return_type=self.frame.return_type))
+        if kind.lower() == "set":
+            self.frame.symbols["value"] = _Symbol("value", "parameter", self.frame.return_type)
+
+    def event_declaration(self, modifiers: List[str], rest: str, comment: Optional[str]):
+        match = re.match(r"^Event\s+(\w+)\s+As\s+(.+?)(?:\s+Implements\s+(.+))?$", rest, re.IGNORECASE)
+        if not match or self.frame is not self.enclosing_type():
+            raise _Unsupported(f"unsupported event {rest}")
+        parts = self.member_modifiers(modifiers, {"shared", "shadows"}, "public")
+        self._check_implements(match.group(1), match.group(3), parts[0] if parts else "public")
+        self.flush_attributes()
+        self.emit(" ".join(parts + [f"event {self.type_name(match.group(2))} {match.group(1)};"]), comment)
+
+    def field_declaration(self, modifiers: List[str], rest: str, comment: Optional[str]):
+        match = re.match(r"^(\w+)(\(\))?\s+As\s+(New\s+)?(.+?)(?:\s*=\s*(.+))?$", rest, re.IGNORECASE)
+        if not match or "," in rest.split(" As ", 1)[0]:
+            raise _Unsupported(f"unsupported field {rest}")
+        name, is_array, as_new, type_text, initializer = match.groups()
+        if as_new:
+            if initializer:
+                raise _Unsupported("As New with an initializer")
+            new_expression = translate_expression("New " + type_text, self).code
+            type_text = re.sub(r"\(\s*\)$", "", type_text) if not re.search(r"\(\s*Of\b[^)]*\)$", type_text, re.IGNORECASE) else type_text
+            paren = type_text.find("(")
+            if paren >= 0 and not re.match(r"^\(\s*Of\b", type_text[paren:], re.IGNORECASE):
+                type_text = type_text[:paren]
+            initializer_code = new_expression
+        else:
+            initializer_value = translate_expression(initializer, self) if initializer else None
+            if initializer_value:
+                self.check_assignable(_type_key(type_text + ("()" if is_array else "")), initializer_value)
+            initializer_code = initializer_value.code if initializer_value else None
+        type_name = self.type_name(type_text + ("()" if is_array else ""))
+        default_access = "public" if self.enclosing_type().kind == "structure" else "private"
+        parts = self.member_modifiers([m for m in modifiers if m != "dim"], {"shared", "readonly", "const", "shadows"}, default_access)
+        if "const" in parts and not initializer_code:
+            raise _Unsupported("Const without a value")
+        self.flush_attributes()
+        declaration = " ".join(parts + [f"{type_name} {name}"])
+        self.emit(f"{declaration} = {initializer_code};" if initializer_code else f"{declaration};", comment)
+
+    def enum_member(self, code: str, comment: Optional[str]):
+        match = re.match(r"^(\[?\w+\]?)(?:\s*=\s*(.+))?$", code)
+        if not match:
+            raise _Unsupported(f"unsupported enum member {code}")
+        value = match.group(2)
+        if value is not None and not re.match(r"^-?(\d+|&H[0-9A-Fa-f]+)$", value.strip(), re.IGNORECASE):
+            raise _Unsupported("computed enum value")
+        self.flush_attributes()
+        name = match.group(1).strip("[]")
+        translated_value = (" = " + translate_expression(value.strip(), self).code) if value is not None else ""
+        self.emit(f"{name}{translated_value},", comment)
+
+    # --- Statements ---------------------------------------------------------------------------------------------
+
+    def statement(self, code: str) -> str:
+        lowered = code.lower()
+        frame = self.frame
+        if lowered == "return" or lowered.startswith("return "):
+            expression = code[len("return"):].strip()
+            if frame.kind in ("sub", "set"):
+                if expression:
+                    raise _Unsupported("Return with a value in a Sub")
+                return "return;"
+            if not expression:
+                raise _Unsupported("Return without a value in a Function")
+            value = translate_expression(expression, self)
+            self.check_assignable(_type_key(frame.return_type), value)
+            return f"return {value.code};"
+
+        local = re.match(r"^Dim\s+(\w+)(?:\s+As\s+(New\s+)?(.+?))?(?:\s*=\s*(.+))?$", code, re.IGNORECASE)
+        if local:
+            name, as_new, type_text, initializer = local.groups()
+            if name.lower() in frame.symbols:
+                raise _Unsupported(f"{name} declared twice")
+            value = translate_expression("New " + type_text if as_new else initializer, self) if as_new or initializer else None
+            if as_new:
+                if initializer:
+                    raise _Unsupported("As New with an initializer")
+                translated = f"var {name} = {value.code};"
+                type_text = _constructed_type(type_text)
+            elif type_text and initializer:
+                self.check_assignable(_type_key(type_text), value)
+                translated = f"{self.type_name(type_text)} {name} = {value.code};"
+            elif initializer:
+                if not self.infer or value.type == "nothing":
+                    raise _Unsupported("Dim without a type that is an Object in VB") # Option Infer Off, or "Dim x = Nothing"
+                translated = f"var {name} = {value.code};"
+                type_text = value.type
+            elif type_text:
+                translated = f"{self.type_name(type_text)} {name} = default;"
+            else:
+                raise _Unsupported("Dim without type or value")
+            frame.symbols[name.lower()] = _Symbol(name, "local", type_text or "")
+            return translated
+
+        assignment = re.match(r"^([\w.\[\]]+)\s*(=|\+=|-=|&=)\s*(.+)$", code)
+        if assignment:
+            target, operator, value_text = assignment.groups()
+            if target.split(".")[-1].lower() == frame.name.lower() and frame.kind == "function":
+                raise _Unsupported("assignment to the function's implicit return variable")
+            if target.lower().split(".")[0] in UNSUPPORTED_WORDS:
+                raise _Unsupported(f"unsupported statement {code}")
+            target_value = _ExpressionTranslator(target, self).assignment_target()
+            value = translate_expression(value_text, self)
+            if operator == "=":
+                self.check_assignable(target_value.type, value)
+            elif operator == "&=":
+                if target_value.type != "string" or value.type not in _CONCAT_TYPES:
+                    raise _Unsupported(f"&= on {target_value.type} and {value.type}")
+                operator = "+="
+            elif _arithmetic_type(target_value.type, value.type, operator[0]) != target_value.type:
+                raise _Unsupported(f"{operator} would narrow {value.type} to {target_value.type}")
+            return f"{target_value.code} {operator} {value.code};"
+
+        # Anything else must be a call statement; in statement position "a.B(x)" is always a call, never an index
+        translator = _ExpressionTranslator(code, self)
+        first = translator.peek()
+        if first is None or first[0] != "name" or first[1].lower() in UNSUPPORTED_WORDS | {"new", "gettype", "nothing", "true", "false"}:
+            raise _Unsupported(f"unsupported statement {code}")
+        call = translator.call_statement().code
+        if call.startswith("base.New(") or call.startswith("this.New("):
+            raise _Unsupported("constructor chaining")
+        return call + ";"
+
+    def end_block(self, kind: str, comment: Optional[str]):
+        frame = self.frame
+        if frame.kind != kind or self.pending_attributes:
+            raise _Unsupported(f"End {kind} does not match {frame.kind}")
+        if kind in ("function", "get") and not frame.returned:
+            raise _Unsupported(f"{kind} does not end with Return") # VB would return a default value here; C# would not compile
+        self.stack.pop()
+        self.emit("}", comment)
+
+
+def convert_vb_with_rules(vb_code: str) -> Optional[str]:
+    '''
+    Translates VB.NET source to C# without an LLM if every construct in it is within the supported subset.
+    Returns None otherwise, so the caller can fall back to LLM conversion.
+    '''
+    try:
+        return _RuleConverter(vb_code).convert()
+    except _Unsupported as e:
+        logger.debug(f"vb_rule_converter: Falling back to the LLM: {e}")
+        return None
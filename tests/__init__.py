@@ -0,0 +1,12 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+# Keep the LLM interaction log and the code index of test runs out of the checkout; set before the package is imported.
+_temp_dir = tempfile.mkdtemp(prefix="dotnet_upgrade_tests_")
+atexit.register(shutil.rmtree, _temp_dir, ignore_errors=True) # Runs after the log listener has been stopped
+if not os.getenv("LLM_INTERACTION_LOG_PATH"):
+    os.environ["LLM_INTERACTION_LOG_PATH"] = os.path.join(_temp_dir, "llm_interactions.log")
+if not os.getenv("CODE_INDEX_DIR"):
+    os.environ["CODE_INDEX_DIR"] = os.path.join(_temp_dir, "code_index")
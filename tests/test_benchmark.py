@@ -0,0 +1,46 @@
+import unittest
+import os
+import tempfile
+import logging
+
+import sys
+# Add the parent directory of 'DotNetUpgradeAgents' to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from DotNetUpgradeAgents.core_components import logger
+from DotNetUpgradeAgents.benchmark import generate_synthetic_solution, run_benchmark, compare_results
+
+# Disable most logging during tests for cleaner output, can be enabled for debugging.
+logger.setLevel(logging.WARNING)
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_generate_synthetic_solution(self):
+        with tempfile.TemporaryDirectory() as root:
+            solution = generate_synthetic_solution(root, projects=6, files_per_project=4, vb_ratio=0.5, reference_fanout=2, packages_per_project=3, seed=1)
+            self.assertEqual(len(solution["projects"]), 6)
+            self.assertEqual(len(solution["vb_files"]) + len(solution["cs_files"]), 24)
+            self.assertTrue(os.path.isfile(solution["solution_path"]))
+            with open(solution["projects"][-1]["path"], 'r', encoding='utf-8') as f:
+                content = f.read()
+            self.assertEqual(content.count("<PackageReference "), 3)
+            self.assertEqual(content.count("<ProjectReference "), 2)
+
+    def test_run_benchmark_reports_every_stage(self):
+        results = run_benchmark(projects=3, files_per_project=2, vb_ratio=1.0, seed=1)
+        stages = {stage["stage"]: stage for stage in results["stages"]}
+        self.assertEqual(list(stages), ["DependencyAnalyzerTool", "VBToCSTool", "VBToCSTool.batch", "VBToCSTool.incremental", "ProjectUpgradeTool", "ReportTool"])
+        self.assertEqual(stages["VBToCSTool"]["files"], 6)
+        self.assertEqual(stages["VBToCSTool"]["llm_calls"], 3) # The synthetic files are near-duplicates; half re-use a conversion
+        self.assertEqual(stages["VBToCSTool"]["errors"], 0)
+        self.assertEqual(stages["VBToCSTool.batch"]["llm_calls"], 3)
+        self.assertEqual(stages["VBToCSTool.incremental"]["llm_calls"], 0)
+        self.assertEqual(stages["ProjectUpgradeTool"]["errors"], 0)
+        self.assertEqual(stages["ProjectUpgradeTool"]["llm_calls"], 0) # Old-style projects are converted by the rewrite rules
+        self.assertEqual(results["total_llm_calls"], 6)
+        self.assertEqual(len(compare_results(results, results)), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import os
+import tempfile
+import logging
+
+import sys
+# Add the parent directory of 'DotNetUpgradeAgents' to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from DotNetUpgradeAgents.core_components import logger
+from DotNetUpgradeAgents.build_diagnostics import parse_build_output, group_diagnostics, summarize_build_output, format_diagnostics_for_prompt
+
+# Disable most logging during tests for cleaner output, can be enabled for debugging.
+logger.setLevel(logging.WARNING)
+
+BUILD_OUTPUT = """  Determining projects to restore...
+/src/App/App.csproj : error NU1202: Package Legacy.Lib 1.0.0 is not compatible with net8.0 (.NETCoreApp,Version=v8.0). [/src/App/App.csproj]
+/src/App/Models/Order.cs(1,14): error CS0234: The type or namespace name 'Web' does not exist in the namespace 'System' (are you missing an assembly reference?) [/src/App/App.csproj::TargetFramework=net8.0]
+/src/App/Models/Order.cs(1,14): error CS0234: The type or namespace name 'Web' does not exist in the namespace 'System' (are you missing an assembly reference?) [/src/App/App.csproj::TargetFramework=net6.0]
+/src/Lib/Cart.cs(3,7): error CS0234: The type or namespace name 'Web' does not exist in the namespace 'System' (are you missing an assembly reference?) [/src/Lib/Lib.csproj]
+C:\\Program Files\\dotnet\\sdk\\8.0.100\\Microsoft.Common.CurrentVersion.targets(2352,5): warning MSB3277: Found conflicts between different versions of "System.Net.Http" that could not be resolved. [C:\\src\\App\\App.csproj]
+CSC : error CS5001: Program does not contain a static 'Main' method suitable for an entry point [/src/App/App.csproj]
+
+Build FAILED.
+
+/src/App/Models/Order.cs(1,14): error CS0234: The type or namespace name 'Web' does not exist in the namespace 'System' (are you missing an assembly reference?) [/src/App/App.csproj::TargetFramework=net8.0]
+    1 Warning(s)
+    4 Error(s)
+"""
+
+
+class TestBuildDiagnostics(unittest.TestCase):
+
+    def test_parse_deduplicates_across_target_frameworks(self):
+        diagnostics = parse_build_output(BUILD_OUTPUT)
+
+        self.assertEqual([(d.code, d.severity) for d in diagnostics],
+                         [("NU1202", "error"), ("CS0234", "error"), ("CS0234", "error"), ("MSB3277", "warning"), ("CS5001", "error")])
+        order = diagnostics[1]
+        self.assertEqual((order.file, order.line, order.column, order.project), ("/src/App/Models/Order.cs", 1, 14, "/src/App/App.csproj"))
+        self.assertEqual(order.target_frameworks, ["net8.0", "net6.0"])
+        self.assertEqual(order.occurrences, 3) # Two target frameworks, plus the closing summary
+        self.assertIsNone(diagnostics[4].file)
+        self.assertEqual(diagnostics[4].origin, "CSC")
+
+    def test_group_by_root_cause(self):
+        groups = group_diagnostics(parse_build_output(BUILD_OUTPUT))
+
+        self.assertEqual([(g["root_cause"], g["count"]) for g in groups], [
+            ("Missing type or namespace 'System.Web'", 2),
+            ("CS5001: Program does not contain a static 'Main' method suitable for an entry point", 1),
+            ("NU1202 package 'Legacy.Lib'", 1),
+            ("Assembly version conflict 'System.Net.Http'", 1),
+        ])
+        self.assertEqual(groups[0]["projects"], ["/src/App/App.csproj", "/src/Lib/Lib.csproj"])
+        summary = summarize_build_output(BUILD_OUTPUT)
+        self.assertEqual((summary["errors"], summary["warnings"]), (4, 1))
+
+    def test_prompt_contains_distinct_errors_and_source_spans(self):
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(os.path.join(root, "Models"))
+            with open(os.path.join(root, "Models", "Order.cs"), "w", encoding="utf-8") as f:
+                f.write("".join(f"// line {n}\n" for n in range(1, 10)))
+            output = "\n".join(f"Models/Order.cs(5,1): error CS0246: The type or namespace name 'HttpContext' could not be found [{root}/App.csproj::TargetFramework={tfm}]"
+                               for tfm in ("net8.0", "net6.0"))
+
+            text = format_diagnostics_for_prompt(group_diagnostics(parse_build_output(output, root)), root)
+
+            self.assertIn("1. Missing type or namespace 'HttpContext' (1 location)", text)
+            self.assertIn(f"at {os.path.join('Models', 'Order.cs')}(5,1) [net8.0, net6.0]", text)
+            self.assertIn("2: // line 2\n3: // line 3\n4: // line 4\n5: // line 5\n6: // line 6\n7: // line 7\n8: // line 8", text)
+            self.assertNotIn("// line 1\n", text)
+            self.assertEqual(text.count("CS0246"), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+import os
+import subprocess
+import tempfile
+import logging
+from unittest.mock import ANY, patch
+
+import sys
+# Add the parent directory of 'DotNetUpgradeAgents' to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from DotNetUpgradeAgents.core_components import logger
+from DotNetUpgradeAgents.code_index import CodeIndex, get_code_index, parse_declarations
+
+# Disable most logging during tests for cleaner output, can be enabled for debugging.
+logger.setLevel(logging.WARNING)
+
+
+class TestCodeIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write(self, relative_path, content):
+        path = os.path.join(self.root, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def _git(self, *args):
+        subprocess.run(["git", *args], cwd=self.root, check=True, capture_output=True)
+
+    def test_parse_declarations(self):
+        cs = "using System;\nusing static System.Math;\nusing Json = Newtonsoft.Json;\nnamespace Shop.Orders\n{\n    // class Commented\n    public sealed partial class Order<T> where T : class\n    {\n    }\n    public record struct Line(int Qty);\n}\n"
+        self.assertEqual(parse_declarations(cs, "csharp"), (["Shop.Orders"], ["Order", "Line"], ["System", "System.Math", "Newtonsoft.Json"]))
+        vb = "Imports System.Data\nNamespace Legacy\n    Partial Public NotInheritable Class Report\n    End Class\n    Public Module Helpers\n    End Module\nEnd Namespace\n"
+        self.assertEqual(parse_declarations(vb, "vb"), (["Legacy"], ["Report", "Helpers"], ["System.Data"]))
+
+    def test_incremental_updates_without_git(self):
+        self._write("App/Program.cs", "using ITASCA.Core;\nnamespace App { class Program { } }\n")
+        self._write("App/Model.vb", "Imports System.Data\nNamespace App\nPublic Class Model\nEnd Class\nEnd Namespace\n")
+        self._write("App/App.csproj", "<Project Sdk=\"Microsoft.NET.Sdk\" />")
+        self._write("App/obj/Generated.cs", "class Generated { }")
+        self._write("App/notes.txt", "not indexed")
+        index = CodeIndex(self.root, use_git=False)
+
+        self.assertEqual(index.update(), {"mode": "scan", "checked": 3, "read": 3, "removed": 0, "elapsed_seconds": ANY})
+        self.assertEqual(index.update()["read"], 0)
+        self.assertEqual(index.files_using("ITASCA"), [os.path.join(self.root, "App", "Program.cs")])
+        self.assertEqual(index.files((".cs", ".vb"), under=os.path.join(self.root, "App")),
+                         [os.path.join(self.root, "App", "Model.vb"), os.path.join(self.root, "App", "Program.cs")])
+
+        self._write("App/Program.cs", "namespace App { class Program { } }\n")
+        os.remove(os.path.join(self.root, "App", "Model.vb"))
+        stats = index.update()
+        self.assertEqual((stats["read"], stats["removed"]), (1, 1))
+        self.assertEqual(index.files_using("ITASCA"), [])
+        self.assertEqual(index.entry(os.path.join(self.root, "App", "Program.cs"))["types"], ["Program"])
+        index.close()
+
+        reopened = CodeIndex(self.root, use_git=False) # The index persists across processes
+        self.assertEqual(reopened.stats()["files"], 2)
+        reopened.close()
+
+    def test_shared_index_is_kept_outside_the_checkout(self):
+        self._write("Shop/Web/Web.csproj", "<Project Sdk=\"Microsoft.NET.Sdk\" />")
+        self._write("Shop/Web/Home.cs", "namespace Web { class Home { } }\n")
+        solution_index = get_code_index(os.path.join(self.root, "Shop"))
+
+        self.assertEqual([name for _, _, names in os.walk(self.root) for name in names if name.endswith(".sqlite3")], [])
+        with patch.object(CodeIndex, "update") as update:
+            project_index = get_code_index(os.path.join(self.root, "Shop", "Web"), update=False)
+        update.assert_not_called()
+        self.assertIs(project_index, solution_index) # Projects share the solution's index rather than building their own
+        self.assertEqual(project_index.files((".cs",)), [os.path.join(self.root, "Shop", "Web", "Home.cs")])
+
+    def test_git_updates_only_check_changed_files(self):
+        try:
+            self._git("init", "-q")
+        except (OSError, subprocess.CalledProcessError):
+            self.skipTest("git is not available")
+        self._git("config", "user.email", "test@example.com")
+        self._git("config", "user.name", "Test")
+        for i in range(20):
+            self._write(f"src/File{i}.cs", f"namespace Src {{ class File{i} {{ }} }}\n")
+        self._git("add", "src")
+        self._git("commit", "-q", "-m", "initial")
+        index = CodeIndex(self.root)
+        self.assertEqual(index.update()["mode"], "scan")
+
+        self._write("src/File3.cs", "using System.Data;\nnamespace Src { class File3 { } }\n")
+        self._write("src/New.cs", "namespace Src { class New { } }\n")
+        self._git("add", "src/File3.cs")
+        self._git("commit", "-q", "-m", "change")
+        stats = index.update()
+
+        self.assertEqual(stats["mode"], "git")
+        self.assertEqual((stats["checked"], stats["read"]), (2, 2))
+        self.assertEqual(index.files_using("System"), [os.path.join(self.root, "src", "File3.cs")])
+        self.assertEqual(index.stats()["files"], 21)
+
+        # An uncommitted edit that is reverted later no longer shows in the diff, but is still re-checked
+        self._write("src/File5.cs", "namespace BarBaz { class File5 { } }\n")
+        self.assertEqual(index.update()["read"], 1)
+        self.assertEqual(index.files_declaring("BarBaz"), [os.path.join(self.root, "src", "File5.cs")])
+        self._git("checkout", "--", "src/File5.cs")
+        stats = index.update()
+        self.assertEqual((stats["mode"], stats["checked"], stats["read"]), ("git", 2, 1)) # File5.cs and the untracked New.cs
+        self.assertEqual(index.files_declaring("BarBaz"), [])
+        self.assertEqual(index.entry(os.path.join(self.root, "src", "File5.cs"))["namespaces"], ["Src"])
+        self.assertEqual(index.update()["checked"], 1) # Once clean, File5.cs is no longer a candidate
+        index.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
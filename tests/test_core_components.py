@@ -0,0 +1,485 @@
+import unittest
+from unittest.mock import patch
+import os
+import tempfile
+import json
+import socket
+import time
+import threading
+import logging
+import logging.handlers
+import gzip
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import sys
+# Add the parent directory of 'DotNetUpgradeAgents' to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from DotNetUpgradeAgents import core_components
+from DotNetUpgradeAgents.core_components import (
+    LLMApiClient, AsyncLLMApiClient, LLMCompletionCache, LLMStreamError, AdaptiveRateLimiter, CircuitBreaker,
+    parse_retry_after, get_shared_llm_client, log_error, logger, llm_interaction_logger
+)
+from DotNetUpgradeAgents.tools import VBToCSTool, ProjectUpgradeTool, BuildTool
+
+# Disable most logging during tests for cleaner output, can be enabled for debugging.
+logger.setLevel(logging.WARNING)
+
+
+class _OllamaGenerateHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive, so the client can reuse the connection
+    delay_seconds = 0.0
+    in_flight = 0
+    max_in_flight = 0
+    requests_received = 0
+    hits_by_port = {}
+    stream_stall_seconds = 0.0
+    fail_statuses = [] # Statuses returned (in order) before requests start succeeding
+    lock = threading.Lock()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        cls = type(self)
+        with cls.lock:
+            cls.requests_received += 1
+            port = self.server.server_address[1]
+            cls.hits_by_port[port] = cls.hits_by_port.get(port, 0) + 1
+            fail_status = cls.fail_statuses.pop(0) if cls.fail_statuses else None
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        time.sleep(cls.delay_seconds)
+        with cls.lock:
+            cls.in_flight -= 1
+        if fail_status is not None:
+            body = b'{"error": "busy"}'
+            self.send_response(fail_status)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if payload.get("stream"):
+            try:
+                self._stream_tokens(payload)
+            except (BrokenPipeError, ConnectionResetError):
+                pass # The client gave up on a stalled stream and closed the connection
+            return
+        body = json.dumps({"response": f"echo: {payload.get('prompt', '')}"}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        body = b'{"models": []}' # Ollama's /api/tags, used for health checks
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_tokens(self, payload):
+        # Chunked transfer encoding with one event per chunk, like Ollama and OpenAI-style servers
+        tokens = ["public ", "class ", "A { }"]
+        ollama_like = "ollama" in self.path
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson" if ollama_like else "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for index, token in enumerate(tokens):
+            if ollama_like:
+                line = json.dumps({"response": token, "done": False}) + "\n"
+            else:
+                line = "data: " + json.dumps({"choices": [{"delta": {"content": token}}]}) + "\n\n"
+            self._write_chunk(line)
+            if index == 0:
+                time.sleep(type(self).stream_stall_seconds)
+        self._write_chunk(json.dumps({"response": "", "done": True}) + "\n" if ollama_like else "data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestLLMApiClient(unittest.TestCase):
+
+    def setUp(self):
+        _OllamaGenerateHandler.delay_seconds = 0.0
+        _OllamaGenerateHandler.max_in_flight = 0
+        _OllamaGenerateHandler.requests_received = 0
+        _OllamaGenerateHandler.stream_stall_seconds = 0.0
+        _OllamaGenerateHandler.fail_statuses = []
+        _OllamaGenerateHandler.hits_by_port = {}
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _OllamaGenerateHandler)
+        self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.server_thread.start()
+        # "ollama" in the path makes the client use the Ollama request structure
+        self.endpoint = f"http://127.0.0.1:{self.server.server_address[1]}/ollama/api/generate"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_session_pool_size_is_configurable(self):
+        client = LLMApiClient(endpoint=self.endpoint, ollama_model_name="mistral", pool_size=4)
+        self.assertEqual(client.session.get_adapter(self.endpoint)._pool_maxsize, 4)
+        self.assertEqual(client.connection_stats()["pool_size"], 4)
+        client.close()
+
+    def test_consecutive_calls_reuse_connection(self):
+        client = LLMApiClient(endpoint=self.endpoint, ollama_model_name="mistral")
+        self.assertEqual(client.generate_code("first"), "echo: first")
+        self.assertEqual(client.generate_code("second"), "echo: second")
+        self.assertEqual(client.generate_code("third"), "echo: third")
+
+        stats = client.connection_stats()
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["new_connections"], 1)
+        self.assertEqual(stats["reused_connections"], 2)
+        client.close()
+
+    def test_async_client_bounds_concurrency(self):
+        _OllamaGenerateHandler.delay_seconds = 0.2
+        async_client = AsyncLLMApiClient(LLMApiClient(endpoint=self.endpoint, ollama_model_name="mistral"), max_concurrency=4)
+        prompts = [f"file {i}" for i in range(8)]
+
+        started = time.monotonic()
+        results = async_client.generate_many(prompts)
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(results, [f"echo: {prompt}" for prompt in prompts])
+        self.assertEqual(_OllamaGenerateHandler.max_in_flight, 4)
+        self.assertLess(elapsed, 8 * 0.2) # Two batches of four, not eight sequential calls
+        async_client.close()
+
+    def test_async_client_sync_wrapper(self):
+        async_client = AsyncLLMApiClient(LLMApiClient(endpoint=self.endpoint, ollama_model_name="mistral"), max_concurrency=2)
+        self.assertEqual(async_client.generate_code("one"), "echo: one")
+        self.assertEqual(async_client.generate_code("two"), "echo: two") # Second event loop gets its own semaphore
+        async_client.close()
+
+    def test_concurrent_identical_prompts_share_one_call(self):
+        _OllamaGenerateHandler.delay_seconds = 0.3
+        client = LLMApiClient(endpoint=self.endpoint, ollama_model_name="mistral")
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(client.generate_code("AssemblyInfo.vb"))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ["echo: AssemblyInfo.vb"] * 5)
+        self.assertEqual(_OllamaGenerateHandler.requests_received, 1)
+        self.assertEqual(client.coalescing_stats()["executed"], 1)
+        self.assertEqual(client.coalescing_stats()["coalesced"], 4)
+        client.close()
+
+    def test_stream_code_yields_ollama_chunks(self):
+        client = LLMApiClient(endpoint=self.endpoint, ollama_model_name="mistral")
+        self.assertEqual(list(client.stream_code("Convert A")), ["public ", "class ", "A { }"])
+        client.close()
+
+    def test_stream_code_yields_choices_chunks(self):
+        generic_endpoint = f"http://127.0.0.1:{self.server.server_address[1]}/v1/completions"
+        client = LLMApiClient(api_key="test-key", endpoint=generic_endpoint)
+        self.assertEqual("".join(client.stream_code("Convert A")), "public class A { }")
+        client.close()
+
+    def test_stream_code_cancels_stalled_stream(self):
+        _OllamaGenerateHandler.stream_stall_seconds = 1.0
+        client = LLMApiClient(endpoint=self.endpoint, ollama_model_name="mistral")
+        received = []
+        with self.assertRaises(LLMStreamError) as context:
+            for chunk in client.stream_code("Convert A", stall_timeout=0.3):
+                received.append(chunk)
+        self.assertEqual(received, ["public "])
+        self.assertTrue(context.exception.error_text.startswith("# ERROR: LLM_STREAM_STALLED"))
+        client.close()
+
+    def test_retries_throttled_and_unavailable_responses(self):
+        _OllamaGenerateHandler.fail_statuses = [429, 503]
+        client = LLMApiClient(endpoint=self.endpoint, ollama_model_name="mistral")
+        client.backoff_base = 0.01
+        self.assertEqual(client.generate_code("retry me"), "echo: retry me")
+        self.assertEqual(_OllamaGenerateHandler.requests_received, 3)
+        self.assertEqual(client.resilience_stats()[self.endpoint]["circuit_state"], "closed")
+        client.close()
+
+    def test_gives_up_after_max_retries(self):
+        _OllamaGenerateHandler.fail_statuses = [503] * 10
+        client = LLMApiClient(endpoint=self.endpoint, ollama_model_name="mistral")
+        client.backoff_base = 0.01
+        client.max_retries = 2
+        self.assertTrue(client.generate_code("never works").startswith("# ERROR: LLM_API_CALL_FAILED"))
+        self.assertEqual(_OllamaGenerateHandler.requests_received, 3)
+        client.close()
+
+    def test_circuit_breaker_fails_fast_when_endpoint_is_down(self):
+        _OllamaGenerateHandler.fail_statuses = [503] * 10
+        client = LLMApiClient(endpoint=self.endpoint, ollama_model_name="mistral", coalesce_requests=False)
+        client.max_retries = 0
+        client.circuit_failure_threshold = 2
+        client.generate_code("first")
+        client.generate_code("second")
+        self.assertTrue(client.generate_code("third").startswith("# ERROR: LLM_CIRCUIT_OPEN"))
+        self.assertEqual(_OllamaGenerateHandler.requests_received, 2)
+        client.close()
+
+    def test_failed_attempts_release_the_endpoint_and_probe(self):
+        client = LLMApiClient(endpoint=self.endpoint, ollama_model_name="mistral", coalesce_requests=False)
+        client.max_retries = 0
+        client.circuit_failure_threshold = 1
+        client.circuit_reset_seconds = 0.0 # Half-open straight away
+        breaker = client._circuit_breaker_for(self.endpoint)
+        breaker.record_failure()
+
+        # The probe is admitted, then the rate limiter cannot serve it before the deadline
+        with patch.object(AdaptiveRateLimiter, "acquire", return_value=False):
+            with self.assertRaises(requests.exceptions.Timeout):
+                client._post_with_retries("probe", 16)
+        self.assertEqual(breaker.state, "half_open")
+        self.assertTrue(breaker.allow_request()) # The probe slot was given back
+        breaker.cancel_probe()
+
+        # A non-transient request error is raised as-is, but still counted and released
+        with patch.object(client.session, "post", side_effect=requests.exceptions.InvalidURL("bad url")):
+            with self.assertRaises(requests.exceptions.InvalidURL):
+                client._post_with_retries("probe", 16)
+        self.assertEqual(breaker.state, "open")
+        self.assertEqual(client.endpoints[0].outstanding, 0)
+        self.assertEqual(client.endpoints[0].failures, 1)
+        client.close()
+
+    def _start_extra_server(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _OllamaGenerateHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server.server_address[1]
+
+    def test_requests_are_spread_across_endpoints(self):
+        _OllamaGenerateHandler.delay_seconds = 0.2
+        second_port = self._start_extra_server()
+        client = LLMApiClient(endpoints=[self.endpoint, f"http://127.0.0.1:{second_port}/ollama/api/generate|1|codellama"],
+                              ollama_model_name="mistral", routing="least_outstanding", health_check_interval=0)
+        async_client = AsyncLLMApiClient(client, max_concurrency=4)
+        results = async_client.generate_many([f"file {i}" for i in range(4)])
+
+        self.assertEqual(results, [f"echo: file {i}" for i in range(4)])
+        self.assertEqual(sorted(_OllamaGenerateHandler.hits_by_port.values()), [2, 2])
+        stats = {entry["url"]: entry for entry in client.endpoint_stats()}
+        self.assertEqual(stats[self.endpoint]["requests"], 2)
+        self.assertEqual(stats[self.endpoint]["outstanding"], 0)
+        self.assertIsNotNone(stats[self.endpoint]["latency_ewma_ms"])
+        async_client.close()
+        client.close()
+
+    def test_fails_over_to_healthy_endpoint(self):
+        with socket.socket() as probe: # Reserve and release a port so nothing listens on it
+            probe.bind(("127.0.0.1", 0))
+            dead_port = probe.getsockname()[1]
+        dead_endpoint = f"http://127.0.0.1:{dead_port}/ollama/api/generate"
+        # The dead endpoint's higher weight makes it the first choice, so the first call has to fail over
+        client = LLMApiClient(endpoints=[f"{dead_endpoint}|10", self.endpoint], ollama_model_name="mistral", routing="least_outstanding", health_check_interval=0)
+        client.max_retries = 0
+
+        for i in range(3):
+            self.assertEqual(client.generate_code(f"prompt {i}"), f"echo: prompt {i}")
+        client.check_endpoint_health()
+
+        stats = {entry["url"]: entry for entry in client.endpoint_stats()}
+        self.assertFalse(stats[dead_endpoint]["healthy"])
+        self.assertTrue(stats[self.endpoint]["healthy"])
+        self.assertEqual(stats[dead_endpoint]["failures"], 1) # Not retried once it failed
+        self.assertEqual(stats[self.endpoint]["requests"], 3)
+        client.close()
+
+    def test_tools_share_default_client(self):
+        shared_client = get_shared_llm_client()
+        self.assertIs(VBToCSTool().llm_client, shared_client)
+        self.assertIs(ProjectUpgradeTool().llm_client, shared_client)
+        self.assertIs(BuildTool().llm_client, shared_client)
+
+
+class TestLLMInteractionLogging(unittest.TestCase):
+
+    def test_payloads_are_not_serialized_unless_debug_is_enabled(self):
+        self.assertEqual(llm_interaction_logger.getEffectiveLevel(), logging.INFO)
+        client = LLMApiClient(endpoint="http://127.0.0.1:1/ollama/api/generate", ollama_model_name="mistral")
+        with patch.object(core_components._LazyJSON, "__str__", side_effect=AssertionError("serialized")) as lazy_str:
+            client._build_request("Convert A", 10)
+            lazy_str.assert_not_called()
+        client.close()
+
+    def test_records_are_queued_unformatted(self):
+        queue_handler = next(h for h in llm_interaction_logger.handlers if isinstance(h, core_components._DeferredQueueHandler))
+        record = llm_interaction_logger.makeRecord("LLMInteractions", logging.DEBUG, __file__, 0, "Payload: %s", (core_components._LazyJSON({"a": 1}),), None)
+        with patch.object(core_components._LazyJSON, "__str__", side_effect=AssertionError("serialized")) as lazy_str:
+            self.assertIs(queue_handler.prepare(record), record)
+            lazy_str.assert_not_called()
+        self.assertEqual(record.getMessage(), 'Payload: {"a": 1}') # Formatted later, on the listener thread
+
+    def test_rotated_logs_are_compressed(self):
+        with tempfile.TemporaryDirectory() as log_dir:
+            handler = logging.handlers.RotatingFileHandler(os.path.join(log_dir, "llm.log"), maxBytes=200, backupCount=2, encoding='utf-8')
+            handler.namer = lambda name: name + ".gz"
+            handler.rotator = core_components._gzip_rotator
+            test_logger = logging.getLogger("LLMInteractionsRotationTest")
+            test_logger.addHandler(handler)
+            try:
+                for i in range(20):
+                    test_logger.warning("line %d %s", i, "x" * 40)
+            finally:
+                test_logger.removeHandler(handler)
+                handler.close()
+            with gzip.open(os.path.join(log_dir, "llm.log.1.gz"), 'rt', encoding='utf-8') as f:
+                self.assertIn("line", f.read())
+
+
+class TestLogError(unittest.TestCase):
+
+    def test_arguments_and_result_are_truncated(self):
+        @log_error
+        def echo(text):
+            return text
+
+        with self.assertLogs(logger, level=logging.INFO) as logs:
+            echo("x" * 100000)
+        self.assertEqual(len(logs.records), 2)
+        self.assertLess(len(logs.records[0].getMessage()), 500)
+        self.assertLess(len(logs.records[1].getMessage()), 500)
+        self.assertEqual(logs.records[1].status, "ok")
+        self.assertGreaterEqual(logs.records[1].elapsed_ms, 0)
+
+    def test_nothing_is_formatted_when_level_is_disabled(self):
+        class Unprintable:
+            def __repr__(self):
+                raise AssertionError("formatted")
+
+        @log_error
+        def identity(value):
+            return value
+
+        self.assertFalse(logger.isEnabledFor(logging.INFO))
+        self.assertIsInstance(identity(Unprintable()), Unprintable)
+
+    def test_sampling_skips_successes_but_not_errors(self):
+        @log_error(sample_rate=0.0)
+        def fail():
+            raise ValueError("boom")
+
+        @log_error(sample_rate=0.0)
+        def succeed():
+            return 1
+
+        with self.assertLogs(logger, level=logging.INFO) as logs:
+            succeed()
+            with self.assertRaises(ValueError):
+                fail()
+        self.assertEqual(len(logs.records), 1)
+        record = logs.records[0]
+        self.assertEqual(record.levelno, logging.ERROR)
+        self.assertEqual(record.status, "error")
+        self.assertEqual(record.exception_type, "ValueError")
+        self.assertIn("fail", record.function)
+
+
+class TestLLMCompletionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.cache_dir.name, "cache.sqlite3")
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def test_cached_completion_skips_network_call(self):
+        cache = LLMCompletionCache(self.cache_path)
+        client = LLMApiClient(endpoint="http://localhost:11434/api/generate", ollama_model_name="mistral", cache=cache)
+        with patch.object(client, "_request_completion", return_value="public class A { }") as mock_request:
+            self.assertEqual(client.generate_code("Convert A"), "public class A { }")
+            self.assertEqual(client.generate_code("Convert A"), "public class A { }")
+            self.assertEqual(client.generate_code("Convert A", max_tokens=10), "public class A { }")
+        self.assertEqual(mock_request.call_count, 2) # max_tokens is part of the key
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 2)
+        cache.close()
+
+        # A fresh process (new cache object on the same file) still hits
+        reopened = LLMCompletionCache(self.cache_path)
+        key = LLMCompletionCache.make_key("http://localhost:11434/api/generate", "mistral", 2048, "Convert A")
+        self.assertEqual(reopened.get(key), "public class A { }")
+        reopened.close()
+
+    def test_endpoint_model_override_is_part_of_the_key(self):
+        default = LLMApiClient(endpoint="http://localhost:11434/api/generate", ollama_model_name="mistral", health_check_interval=0)
+        override = LLMApiClient(endpoints=["http://localhost:11434/api/generate|1|codellama"], ollama_model_name="mistral", health_check_interval=0)
+        self.assertEqual(default.model_identity(), "mistral")
+        self.assertEqual(override.model_identity(), "codellama")
+        self.assertNotEqual(LLMCompletionCache.make_key(*default._cache_identity(), 2048, "Convert A"),
+                            LLMCompletionCache.make_key(*override._cache_identity(), 2048, "Convert A"))
+
+    def test_error_responses_are_not_cached(self):
+        cache = LLMCompletionCache(self.cache_path)
+        cache.put("k", "# ERROR: LLM_API_CALL_FAILED. Timeout")
+        self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.stats()["entries"], 0)
+        cache.close()
+
+    def test_lru_eviction_and_ttl(self):
+        cache = LLMCompletionCache(self.cache_path, max_entries=2, ttl_seconds=60)
+        with patch("DotNetUpgradeAgents.core_components.time.time", side_effect=[100.0, 101.0, 102.0, 103.0]):
+            cache.put("a", "A")
+            cache.put("b", "B")
+            cache.get("a") # "b" is now least recently used
+            cache.put("c", "C")
+        self.assertEqual(cache.stats()["evictions"], 1)
+        with patch("DotNetUpgradeAgents.core_components.time.time", return_value=110.0):
+            self.assertIsNone(cache.get("b"))
+            self.assertEqual(cache.get("a"), "A")
+        with patch("DotNetUpgradeAgents.core_components.time.time", return_value=200.0):
+            self.assertIsNone(cache.get("c")) # Older than the TTL
+        self.assertEqual(cache.stats()["expired"], 1)
+        cache.close()
+
+
+class TestResilienceHelpers(unittest.TestCase):
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("3"), 3.0)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0) # Date in the past
+
+    def test_rate_limiter_halves_rate_and_honours_retry_after(self):
+        limiter = AdaptiveRateLimiter(rate=100.0, burst=1)
+        self.assertTrue(limiter.acquire())
+        limiter.record_throttle(retry_after=0.2)
+        self.assertEqual(limiter.rate, 50.0)
+        started = time.monotonic()
+        self.assertTrue(limiter.acquire())
+        self.assertGreaterEqual(time.monotonic() - started, 0.19)
+        self.assertFalse(limiter.acquire(deadline=time.monotonic())) # Bucket is empty again
+        limiter.record_success()
+        self.assertEqual(limiter.rate, 55.0)
+
+    def test_circuit_breaker_half_open_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        self.assertFalse(breaker.allow_request())
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow_request()) # Single probe
+        self.assertFalse(breaker.allow_request())
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+
+
+if __name__ == '__main__':
+    unittest.main()
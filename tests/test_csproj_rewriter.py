@@ -0,0 +1,211 @@
+import unittest
+import os
+import tempfile
+import logging
+import xml.etree.ElementTree as ET
+
+import sys
+# Add the parent directory of 'DotNetUpgradeAgents' to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from DotNetUpgradeAgents.core_components import logger
+from DotNetUpgradeAgents.csproj_rewriter import rewrite_project, rewrite_target_frameworks
+
+# Disable most logging during tests for cleaner output, can be enabled for debugging.
+logger.setLevel(logging.WARNING)
+
+OLD_STYLE_PROJECT = """<?xml version="1.0" encoding="utf-8"?>
+<Project ToolsVersion="15.0" xmlns="http://schemas.microsoft.com/developer/msbuild/2003">
+  <Import Project="$(MSBuildExtensionsPath)\\$(MSBuildToolsVersion)\\Microsoft.Common.props" Condition="Exists('$(MSBuildExtensionsPath)\\$(MSBuildToolsVersion)\\Microsoft.Common.props')" />
+  <PropertyGroup>
+    <Configuration Condition=" '$(Configuration)' == '' ">Debug</Configuration>
+    <ProjectGuid>{6A1E2B4C-1111-2222-3333-444455556666}</ProjectGuid>
+    <OutputType>Exe</OutputType>
+    <RootNamespace>Legacy.App</RootNamespace>
+    <AssemblyName>Legacy.App</AssemblyName>
+    <TargetFrameworkVersion>v4.7.2</TargetFrameworkVersion>
+    <FileAlignment>512</FileAlignment>
+  </PropertyGroup>
+  <PropertyGroup Condition=" '$(Configuration)|$(Platform)' == 'Debug|AnyCPU' ">
+    <DebugSymbols>true</DebugSymbols>
+    <OutputPath>bin\\Debug\\</OutputPath>
+    <DefineConstants>DEBUG;TRACE</DefineConstants>
+    <PlatformTarget>x86</PlatformTarget>
+  </PropertyGroup>
+  <ItemGroup>
+    <Reference Include="System" />
+    <Reference Include="System.Configuration" />
+    <Reference Include="System.Core" />
+    <Reference Include="Newtonsoft.Json, Version=9.0.0.0, Culture=neutral, PublicKeyToken=30ad4fe6b2a6aeed, processorArchitecture=MSIL">
+      <HintPath>..\\packages\\Newtonsoft.Json.9.0.1\\lib\\net45\\Newtonsoft.Json.dll</HintPath>
+    </Reference>
+    <Reference Include="Vendor.Sdk">
+      <HintPath>..\\lib\\Vendor.Sdk.dll</HintPath>
+    </Reference>
+  </ItemGroup>
+  <ItemGroup>
+    <Compile Include="Program.cs" />
+    <Compile Include="Properties\\AssemblyInfo.cs" />
+    <Compile Include="..\\Shared\\Version.cs">
+      <Link>Properties\\Version.cs</Link>
+    </Compile>
+  </ItemGroup>
+  <ItemGroup>
+    <None Include="App.config" />
+    <None Include="packages.config" />
+    <None Include="settings.json">
+      <CopyToOutputDirectory>PreserveNewest</CopyToOutputDirectory>
+    </None>
+  </ItemGroup>
+  <ItemGroup>
+    <ProjectReference Include="..\\Core\\Core.csproj">
+      <Project>{0F0F0F0F-AAAA-BBBB-CCCC-DDDDEEEEFFFF}</Project>
+      <Name>Core</Name>
+    </ProjectReference>
+  </ItemGroup>
+  <Import Project="$(MSBuildToolsPath)\\Microsoft.CSharp.targets" />
+  <Target Name="EnsureNuGetPackageBuildImports" BeforeTargets="PrepareForBuild">
+    <Error Condition="!Exists('..\\packages\\x')" Text="missing" />
+  </Target>
+  <Target Name="AfterBuild">
+    <Message Text="Built" />
+  </Target>
+</Project>
+"""
+
+PACKAGES_CONFIG = """<?xml version="1.0" encoding="utf-8"?>
+<packages>
+  <package id="Newtonsoft.Json" version="9.0.1" targetFramework="net472" />
+  <package id="System.ValueTuple" version="4.5.0" targetFramework="net472" />
+  <package id="Serilog" version="2.10.0" targetFramework="net472" />
+</packages>
+"""
+
+
+class TestCsprojRewriter(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write(self, relative_path, content):
+        path = os.path.join(self.root, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def _items(self, project, kind):
+        return [item for group in project.findall("ItemGroup") for item in group.findall(kind)]
+
+    def test_old_style_project_converted_to_sdk_style(self):
+        path = self._write("App/App.csproj", OLD_STYLE_PROJECT)
+        self._write("App/packages.config", PACKAGES_CONFIG)
+        for source in ("Program.cs", "Properties/AssemblyInfo.cs", "Unused.cs", "bin/Debug/Generated.cs"):
+            self._write(f"App/{source}", "// source")
+
+        result = rewrite_project(path, "net8.0")
+
+        self.assertTrue(result.complete, result.unsupported)
+        self.assertTrue(result.converted_to_sdk_style)
+        self.assertTrue(result.migrated_packages_config)
+        project = ET.fromstring(result.content)
+        self.assertEqual(project.get("Sdk"), "Microsoft.NET.Sdk")
+        properties = project.find("PropertyGroup")
+        self.assertEqual(properties.findtext("TargetFramework"), "net8.0")
+        self.assertEqual(properties.findtext("OutputType"), "Exe")
+        self.assertEqual(properties.findtext("RootNamespace"), "Legacy.App")
+        self.assertEqual(properties.findtext("GenerateAssemblyInfo"), "false")
+        self.assertIsNone(properties.find("ProjectGuid"))
+        self.assertIsNone(properties.find("TargetFrameworkVersion"))
+        # Only the non-default setting of the Debug configuration is carried over
+        debug = [group for group in project.findall("PropertyGroup") if group.get("Condition")]
+        self.assertEqual([child.tag for child in debug[0]], ["PlatformTarget"])
+
+        packages = {item.get("Include"): item.get("Version") for item in self._items(project, "PackageReference")}
+        self.assertEqual(packages, {"Newtonsoft.Json": "13.0.3", "Serilog": "2.12.0",
+                                    "System.Configuration.ConfigurationManager": "8.0.0"})
+        self.assertEqual([item.get("Include") for item in self._items(project, "Reference")], ["Vendor.Sdk"])
+        project_references = self._items(project, "ProjectReference")
+        self.assertEqual(project_references[0].get("Include"), "..\\Core\\Core.csproj")
+        self.assertEqual(len(project_references[0]), 0)
+
+        self.assertEqual([item.get("Include") for item in self._items(project, "Compile") if item.get("Include")], ["..\\Shared\\Version.cs"])
+        self.assertEqual([item.get("Remove") for item in self._items(project, "Compile") if item.get("Remove")], ["Unused.cs"])
+        self.assertEqual([item.get("Update") for item in self._items(project, "None")], ["settings.json"])
+        self.assertIsNone(project.find("Import"))
+        self.assertEqual([(t.get("Name"), t.get("AfterTargets")) for t in project.findall("Target")], [("CustomAfterBuild", "Build")])
+
+        # Deterministic: the same input gives byte-identical output
+        self.assertEqual(rewrite_project(path, "net8.0").content, result.content)
+
+    def test_old_style_project_to_net_framework_keeps_framework_references(self):
+        path = self._write("App/App.csproj", OLD_STYLE_PROJECT)
+        self._write("App/packages.config", PACKAGES_CONFIG)
+
+        result = rewrite_project(path, "net48", package_versions={"Serilog": None})
+
+        project = ET.fromstring(result.content)
+        self.assertEqual(project.find("PropertyGroup").findtext("TargetFramework"), "net48")
+        packages = {item.get("Include"): item.get("Version") for item in self._items(project, "PackageReference")}
+        self.assertEqual(packages, {"Newtonsoft.Json": "9.0.1", "System.ValueTuple": "4.5.0"}) # No .NET 5+ mapping for net48
+        self.assertEqual([item.get("Include") for item in self._items(project, "Reference")], ["System.Configuration", "Vendor.Sdk"])
+
+    def test_sdk_style_project_edited_in_place(self):
+        path = self._write("Lib/Lib.csproj", """<Project Sdk="Microsoft.NET.Sdk">
+  <!-- Shared library -->
+  <PropertyGroup>
+    <TargetFrameworks>netstandard2.0;net6.0</TargetFrameworks>
+  </PropertyGroup>
+  <ItemGroup>
+    <Compile Include="Helpers.cs" />
+    <Compile Include="Strings.Designer.cs">
+      <AutoGen>True</AutoGen>
+    </Compile>
+    <Compile Include="..\\Shared\\Common.cs" />
+  </ItemGroup>
+</Project>
+""")
+
+        result = rewrite_project(path, "net8.0")
+
+        self.assertTrue(result.complete, result.unsupported)
+        self.assertFalse(result.converted_to_sdk_style)
+        self.assertIn("<!-- Shared library -->", result.content)
+        self.assertIn("<TargetFrameworks>netstandard2.0;net8.0</TargetFrameworks>", result.content)
+        self.assertNotIn('Include="Helpers.cs"', result.content)
+        self.assertIn('<Compile Update="Strings.Designer.cs">', result.content)
+        self.assertIn('<Compile Include="..\\Shared\\Common.cs" />', result.content)
+
+    def test_unsupported_constructs_are_reported(self):
+        path = self._write("Web/Web.csproj", """<Project ToolsVersion="15.0" xmlns="http://schemas.microsoft.com/developer/msbuild/2003">
+  <PropertyGroup>
+    <ProjectTypeGuids>{349c5851-65df-11da-9384-00065b846f21};{fae04ec0-301f-11d3-bf4b-00c04f79efbc}</ProjectTypeGuids>
+    <TargetFrameworkVersion>v4.8</TargetFrameworkVersion>
+  </PropertyGroup>
+  <ItemGroup>
+    <Reference Include="System.Web" />
+    <Compile Include="Controllers\\*.cs" />
+  </ItemGroup>
+  <Import Project="$(VSToolsPath)\\WebApplications\\Microsoft.WebApplication.targets" />
+</Project>
+""")
+
+        result = rewrite_project(path, "net8.0")
+
+        self.assertFalse(result.complete)
+        self.assertIsNotNone(result.content) # The draft is still produced for the LLM to finish
+        self.assertEqual(len(result.unsupported), 4)
+        self.assertTrue(any("System.Web" in reason for reason in result.unsupported))
+
+    def test_rewrite_target_frameworks(self):
+        self.assertEqual(rewrite_target_frameworks(["net472"], "net8.0"), ["net8.0"])
+        self.assertEqual(rewrite_target_frameworks(["net6.0", "net7.0"], "net8.0"), ["net8.0"])
+        self.assertEqual(rewrite_target_frameworks(["netstandard2.0", "net461"], "net48"), ["netstandard2.0", "net48"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+import os
+import tempfile
+import logging
+import threading
+
+import sys
+# Add the parent directory of 'DotNetUpgradeAgents' to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from DotNetUpgradeAgents.core_components import logger
+from DotNetUpgradeAgents.dependency_graph import DependencyGraph, DependencyCycleError, parse_solution
+from DotNetUpgradeAgents.benchmark import generate_synthetic_solution
+
+# Disable most logging during tests for cleaner output, can be enabled for debugging.
+logger.setLevel(logging.WARNING)
+
+PROJECT_XML = '<Project xmlns="http://schemas.microsoft.com/developer/msbuild/2003"><ItemGroup>{references}</ItemGroup></Project>'
+
+
+class TestDependencyGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write_project(self, relative_path, references=()):
+        path = os.path.join(self.root, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(PROJECT_XML.format(references="".join(f'<ProjectReference Include="{r}" />' for r in references)))
+        return path
+
+    def _write_solution(self, projects):
+        lines = ["Microsoft Visual Studio Solution File, Format Version 12.00",
+                 'Project("{2150E333-8FDC-42A3-9474-1A3956D46DE8}") = "Libraries", "Libraries", "{00000000-0000-0000-0000-000000000001}"', "EndProject"]
+        for i, relative_path in enumerate(projects):
+            name = os.path.splitext(relative_path.split("\\")[-1])[0]
+            lines += [f'Project("{{FAE04EC0-301F-11D3-BF4B-00C04F79EFBC}}") = "{name}", "{relative_path}", "{{00000000-0000-0000-0000-0000000001{i:02d}}}"', "EndProject"]
+        sln_path = os.path.join(self.root, "App.sln")
+        with open(sln_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return sln_path
+
+    def test_solution_graph_order_and_dependents(self):
+        web = self._write_project("Web/Web.csproj", ["..\\Core\\Core.vbproj", "..\\Data\\Data.csproj"])
+        data = self._write_project("Data/Data.csproj", ["..\\Core\\Core.vbproj", "..\\..\\Shared\\Shared.csproj", "..\\Core\\Core.vbproj"])
+        core = self._write_project("Core/Core.vbproj")
+        sln_path = self._write_solution(["Web\\Web.csproj", "Data\\Data.csproj", "Core\\Core.vbproj"])
+
+        self.assertEqual([p["name"] for p in parse_solution(sln_path)], ["Web", "Data", "Core"])
+        graph = DependencyGraph.from_solution(sln_path)
+        shared_path = os.path.normpath(os.path.join(self.root, "..", "Shared", "Shared.csproj")) # Referenced, but neither listed nor on disk
+        self.assertEqual(len(graph), 4)
+        self.assertFalse(graph.node(shared_path).exists)
+        self.assertEqual(graph.node(core).language, "vb")
+        self.assertEqual(graph.dependencies(data), [core, shared_path]) # The duplicate reference is one edge
+        self.assertEqual(sorted(graph.dependents(core)), sorted([web, data]))
+        self.assertEqual(graph.transitive_dependents(shared_path), [data, web])
+        self.assertEqual(set(graph.transitive_dependencies(web)), {core, data, shared_path})
+
+        order = graph.topological_order()
+        self.assertLess(order.index(core), order.index(data))
+        self.assertLess(order.index(data), order.index(web))
+        self.assertEqual(graph.topological_levels(), [sorted([core, shared_path], key=DependencyGraph.key), [data], [web]])
+        self.assertEqual(graph.cycles(), [])
+
+    def test_cycles_and_strongly_connected_components(self):
+        a = self._write_project("A/A.csproj", ["..\\B\\B.csproj"])
+        b = self._write_project("B/B.csproj", ["..\\C\\C.csproj"])
+        c = self._write_project("C/C.csproj", ["..\\A\\A.csproj", "..\\D\\D.csproj"])
+        d = self._write_project("D/D.csproj")
+        graph = DependencyGraph.from_projects([a])
+
+        components = graph.strongly_connected_components()
+        self.assertEqual(components, [[d], sorted([a, b, c])]) # Dependencies first
+        self.assertEqual(graph.cycles(), [sorted([a, b, c])])
+        with self.assertRaises(DependencyCycleError):
+            graph.topological_order()
+        self.assertEqual(graph.to_dict()["build_order"], [])
+
+    def test_run_in_dependency_order(self):
+        core = self._write_project("Core/Core.csproj")
+        left = self._write_project("Left/Left.csproj", ["..\\Core\\Core.csproj"])
+        right = self._write_project("Right/Right.csproj", ["..\\Core\\Core.csproj"])
+        app = self._write_project("App/App.csproj", ["..\\Left\\Left.csproj", "..\\Right\\Right.csproj"])
+        tool = self._write_project("Tool/Tool.csproj", ["..\\Right\\Right.csproj"])
+        graph = DependencyGraph.from_projects([app, tool])
+        finished, running, overlap = [], set(), threading.Event()
+        lock = threading.Lock()
+
+        def work(path):
+            with lock:
+                self.assertTrue(all(dependency in finished for dependency in graph.dependencies(path)))
+                running.add(path)
+                if {left, right} <= running:
+                    overlap.set()
+            if path in (left, right):
+                overlap.wait(5) # Independent projects of one wave run at the same time
+            with lock:
+                running.discard(path)
+                finished.append(path)
+            return {"success": path != right}
+
+        results = graph.run_in_dependency_order(work, max_workers=4)
+
+        self.assertTrue(overlap.is_set())
+        self.assertEqual(finished[0], core)
+        self.assertEqual((results[left]["success"], results[right]["success"]), (True, False))
+        self.assertEqual(results[app], {"success": False, "status": "blocked", "blocked_by": [right]})
+        self.assertEqual(results[tool]["blocked_by"], [right])
+        self.assertNotIn(app, finished)
+
+    def test_large_solution(self):
+        solution = generate_synthetic_solution(os.path.join(self.root, "Large"), projects=600, files_per_project=0, reference_fanout=3, packages_per_project=0, seed=3)
+        graph = DependencyGraph.from_solution(solution["solution_path"])
+        self.assertEqual(len(graph), 600)
+        position = {DependencyGraph.key(path): i for i, path in enumerate(graph.topological_order())}
+        for node in graph.nodes.values():
+            for reference in node.references:
+                self.assertLess(position[DependencyGraph.key(reference)], position[DependencyGraph.key(node.path)])
+        self.assertEqual(len(graph.strongly_connected_components()), 600)
+
+
+if __name__ == '__main__':
+    unittest.main()
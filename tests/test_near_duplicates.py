@@ -0,0 +1,78 @@
+import unittest
+import os
+
+import sys
+# Add the parent directory of 'DotNetUpgradeAgents' to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from DotNetUpgradeAgents.near_duplicates import (NearDuplicateIndex, tokenize_vb, substitution_map, apply_substitutions,
+                                                 changed_line_ratio)
+
+CUSTOMER_VB = """Imports System
+
+Namespace Sales
+    Public Class CustomerService
+        ' Loads customers
+        Public Function Load(id As Integer) As Customer
+            If id > 0 Then
+                Return _repository.Find(id, "customers")
+            End If
+            Return Nothing
+        End Function
+    End Class
+End Namespace
+"""
+
+CUSTOMER_CS = """using System;
+
+namespace Sales
+{
+    public class CustomerService
+    {
+        // Loads customers
+        public Customer Load(int id)
+        {
+            if (id > 0)
+                return _repository.Find(id, "customers");
+            return null;
+        }
+    }
+}
+"""
+
+
+class TestNearDuplicates(unittest.TestCase):
+
+    def test_index_finds_near_duplicates_only(self):
+        index = NearDuplicateIndex()
+        index.add("Sales/CustomerService.vb", CUSTOMER_VB, CUSTOMER_CS)
+        renamed = CUSTOMER_VB.replace("Sales", "Billing").replace("' Loads customers", "' Copied")
+        match = index.query(renamed)
+        self.assertEqual(match.key, "Sales/CustomerService.vb")
+        self.assertGreaterEqual(match.similarity, 0.8)
+        self.assertIsNone(index.query(renamed, version="other-model"))
+        self.assertIsNone(index.query("Public Module Unrelated\n    Sub Main()\n        Console.WriteLine(1)\n    End Sub\nEnd Module\n"))
+
+    def test_substitutes_renamed_identifiers_and_literals(self):
+        copy = CUSTOMER_VB.replace("Sales", "Billing").replace('"customers"', '"clients"')
+        mapping = substitution_map(tokenize_vb(CUSTOMER_VB), tokenize_vb(copy))
+        self.assertEqual(mapping, {"Sales": "Billing", '"customers"': '"clients"'})
+        cs_code = apply_substitutions(CUSTOMER_CS, mapping)
+        self.assertEqual(cs_code, CUSTOMER_CS.replace("namespace Sales", "namespace Billing").replace('"customers"', '"clients"'))
+
+    def test_rejects_differences_that_are_not_substitutions(self):
+        old_tokens = tokenize_vb(CUSTOMER_VB)
+        self.assertIsNone(substitution_map(old_tokens, tokenize_vb(CUSTOMER_VB.replace("id > 0", "id >= 0"))))
+        self.assertIsNone(substitution_map(old_tokens, tokenize_vb(CUSTOMER_VB.replace("Public Function", "Private Function"))))
+        self.assertIsNone(substitution_map(old_tokens, tokenize_vb(CUSTOMER_VB.replace("Find(id", "Find(key")))) # id renamed in one place only
+        # A name the C# does not carry over verbatim (here: differently cased) cannot be substituted
+        self.assertIsNone(apply_substitutions(CUSTOMER_CS.replace("CustomerService", "customerService"), {"CustomerService": "ClientService"}))
+
+    def test_changed_line_ratio(self):
+        self.assertEqual(changed_line_ratio(CUSTOMER_VB, CUSTOMER_VB), 0.0)
+        edited = CUSTOMER_VB.replace("Return Nothing", "Throw New ArgumentException()")
+        self.assertAlmostEqual(changed_line_ratio(CUSTOMER_VB, edited), 1 / 13, places=3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import unittest
+import os
+import tempfile
+import zipfile
+import logging
+from unittest.mock import MagicMock
+
+import sys
+# Add the parent directory of 'DotNetUpgradeAgents' to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from DotNetUpgradeAgents.core_components import logger
+from DotNetUpgradeAgents.nuget_metadata import (NuGetMetadataCache, NuGetMetadataResolver, is_framework_compatible,
+                                                resolve_version, version_key)
+
+# Disable most logging during tests for cleaner output, can be enabled for debugging.
+logger.setLevel(logging.WARNING)
+
+FEED_URL = "https://feed.example/v3/index.json"
+REGISTRATION_BASE = "https://feed.example/v3/registration/"
+
+
+def _leaf(package_id, version, frameworks, vulnerabilities=(), listed=True):
+    return {"catalogEntry": {"id": package_id, "version": version, "listed": listed,
+                             "dependencyGroups": [{"targetFramework": f} for f in frameworks],
+                             "vulnerabilities": [{"advisoryUrl": f"https://advisories.example/{v}", "severity": v} for v in vulnerabilities]}}
+
+
+def _response(status_code, payload=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = payload
+    return response
+
+
+class TestNuGetVersionsAndFrameworks(unittest.TestCase):
+
+    def test_version_ordering_and_resolution(self):
+        versions = ["1.0.0", "1.10.0", "1.2.0", "2.0.0-beta.2", "2.0.0-beta.10", "2.0.0", "2.1.0-rc.1"]
+        self.assertEqual(sorted(versions, key=version_key), ["1.0.0", "1.2.0", "1.10.0", "2.0.0-beta.2", "2.0.0-beta.10", "2.0.0", "2.1.0-rc.1"])
+        self.assertEqual(version_key("1.2"), version_key("1.2.0.0"))
+        self.assertEqual(resolve_version("1.2", versions), "1.2.0")
+        self.assertEqual(resolve_version("[1.1,2.0)", versions), "1.2.0")
+        self.assertEqual(resolve_version("1.*", versions), "1.10.0")
+        self.assertEqual(resolve_version("3.0.0", versions), "3.0.0")
+
+    def test_framework_compatibility(self):
+        self.assertTrue(is_framework_compatible("net8.0", "netstandard2.0"))
+        self.assertTrue(is_framework_compatible("net472", ".NETStandard2.0"))
+        self.assertFalse(is_framework_compatible("net472", "netstandard2.1"))
+        self.assertFalse(is_framework_compatible("net45", ".NETStandard2.0"))
+        self.assertTrue(is_framework_compatible("net48", ".NETFramework4.6.1"))
+        self.assertFalse(is_framework_compatible("net8.0", ".NETFramework4.8"))
+        self.assertFalse(is_framework_compatible("net6.0", "net8.0"))
+        self.assertTrue(is_framework_compatible("net8.0-windows", "net6.0-windows7.0"))
+        self.assertFalse(is_framework_compatible("net8.0", "net6.0-windows7.0"))
+        self.assertTrue(is_framework_compatible("net8.0", "portable-net45+win8")) # Unknown frameworks are not reported
+
+
+class TestNuGetMetadataResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.temp_dir.name, "nuget_cache.sqlite3")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _session(self):
+        registrations = {
+            "legacy.lib": {"items": [{"items": [_leaf("Legacy.Lib", "1.0.0", [".NETFramework4.5"]), _leaf("Legacy.Lib", "1.5.0", [".NETFramework4.5"])]}]},
+            "modern.lib": {"items": [{"@id": REGISTRATION_BASE + "modern.lib/page1.json"}]}, # Page not inlined
+        }
+        pages = {REGISTRATION_BASE + "modern.lib/page1.json": {"items": [
+            _leaf("Modern.Lib", "2.0.0", [".NETStandard2.0"], vulnerabilities=["2"]),
+            _leaf("Modern.Lib", "2.1.0", [".NETStandard2.0"]),
+            _leaf("Modern.Lib", "3.0.0", ["net8.0"]),
+            _leaf("Modern.Lib", "3.1.0-preview.1", ["net8.0"]),
+        ]}}
+
+        def get(url, timeout=None):
+            if url == FEED_URL:
+                return _response(200, {"resources": [{"@type": "RegistrationsBaseUrl/3.6.0", "@id": REGISTRATION_BASE}]})
+            if url in pages:
+                return _response(200, pages[url])
+            package_id = url[len(REGISTRATION_BASE):].split("/")[0]
+            return _response(200, registrations[package_id]) if package_id in registrations else _response(404)
+        session = MagicMock()
+        session.get.side_effect = get
+        return session
+
+    def test_remote_feed_batches_dedupes_and_caches(self):
+        packages = [{"name": "Modern.Lib", "version": "2.0.0"}, {"name": "modern.lib", "version": "2.0.0"},
+                    {"name": "Legacy.Lib", "version": "1.0.0"}, {"name": "Missing.Lib", "version": "1.0.0"}]
+        session = self._session()
+        resolver = NuGetMetadataResolver(FEED_URL, cache=NuGetMetadataCache(self.cache_path, ttl_seconds=3600), session=session)
+
+        statuses = resolver.check(packages, target_frameworks=["net472"])
+
+        modern, _, legacy, missing = statuses
+        self.assertEqual((modern["status"], modern["latest_version"], modern["latest_compatible_version"]), ("vulnerable", "3.0.0", "2.1.0"))
+        self.assertEqual(modern["vulnerabilities"], [{"severity": "high", "advisory_url": "https://advisories.example/2"}])
+        self.assertTrue(modern["outdated"])
+        self.assertEqual((legacy["status"], legacy["latest_version"]), ("outdated", "1.5.0"))
+        self.assertEqual((missing["status"], missing["error"]), ("unknown", "Package not found"))
+        self.assertEqual(session.get.call_count, 5) # Service index, 3 registrations (deduplicated), 1 page
+        self.assertEqual(resolver.stats()["unique"], 3)
+
+        net8 = resolver.check([{"name": "Legacy.Lib", "version": "1.5.0"}], target_frameworks=["net8.0"])[0]
+        self.assertEqual((net8["status"], net8["incompatible_frameworks"], net8["latest_compatible_version"]), ("incompatible", ["net8.0"], None))
+
+        cached = NuGetMetadataResolver(FEED_URL, cache=NuGetMetadataCache(self.cache_path, ttl_seconds=3600), session=self._session())
+        cached.check(packages[:3], target_frameworks=["net8.0"])
+        self.assertEqual(cached.stats()["http_requests"], 0)
+        self.assertEqual(cached.stats()["cache_hits"], 2)
+
+    def test_local_folder_feed(self):
+        feed_dir = os.path.join(self.temp_dir.name, "feed")
+        for package_id, version, lib_frameworks in (("Local.Lib", "1.0.0", ["net45"]), ("Local.Lib", "2.0.0", ["netstandard2.0", "net8.0"])):
+            package_dir = os.path.join(feed_dir, package_id.lower(), version)
+            os.makedirs(package_dir)
+            with zipfile.ZipFile(os.path.join(package_dir, f"{package_id.lower()}.{version}.nupkg"), "w") as package:
+                package.writestr(f"{package_id}.nuspec", f'<package xmlns="http://schemas.microsoft.com/packaging/2013/05/nuspec.xsd"><metadata><id>{package_id}</id><version>{version}</version></metadata></package>')
+                for framework in lib_frameworks:
+                    package.writestr(f"lib/{framework}/{package_id}.dll", b"")
+
+        status = NuGetMetadataResolver(feed_dir).check([{"name": "local.lib", "version": "1.0.0"}], target_frameworks=["net8.0"])[0]
+
+        self.assertEqual((status["status"], status["incompatible_frameworks"]), ("incompatible", ["net8.0"]))
+        self.assertEqual((status["latest_version"], status["latest_compatible_version"]), ("2.0.0", "2.0.0"))
+
+
+if __name__ == '__main__':
+    unittest.main()
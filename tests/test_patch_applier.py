@@ -0,0 +1,100 @@
+import unittest
+import os
+import tempfile
+import logging
+
+import sys
+# Add the parent directory of 'DotNetUpgradeAgents' to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from DotNetUpgradeAgents.core_components import logger
+from DotNetUpgradeAgents.patch_applier import apply_patch, apply_patch_to_files, parse_patch, PatchConflictError, PatchError
+
+# Disable most logging during tests for cleaner output, can be enabled for debugging.
+logger.setLevel(logging.WARNING)
+
+PROJECT = """<Project Sdk="Microsoft.NET.Sdk">
+  <PropertyGroup>
+    <TargetFramework>net472</TargetFramework>
+    <OutputType>Exe</OutputType>
+  </PropertyGroup>
+  <ItemGroup>
+    <PackageReference Include="Newtonsoft.Json" Version="9.0.1" />
+  </ItemGroup>
+</Project>
+"""
+
+
+class TestPatchApplier(unittest.TestCase):
+
+    def test_unified_diff_applies_at_shifted_position(self):
+        diff = """```diff
+--- a/App.csproj
++++ b/App.csproj
+@@ -1,4 +1,4 @@
+ <Project Sdk="Microsoft.NET.Sdk">
+   <PropertyGroup>
+-    <TargetFramework>net472</TargetFramework>
++    <TargetFramework>net8.0</TargetFramework>
+     <OutputType>Exe</OutputType>
+@@ -6,3 +6,3 @@
+   <ItemGroup>
+-    <PackageReference Include="Newtonsoft.Json" Version="9.0.1" />
++    <PackageReference Include="Newtonsoft.Json" Version="13.0.3" />
+   </ItemGroup>
+```"""
+        self.assertEqual(parse_patch(diff)[0].path, "App.csproj")
+        expected = PROJECT.replace("net472", "net8.0").replace("9.0.1", "13.0.3")
+        self.assertEqual(apply_patch(PROJECT, diff), expected)
+        # Two lines inserted above the hunks: they are found at their new position
+        shifted = "<!-- generated -->\n<!-- header -->\n" + PROJECT
+        self.assertEqual(apply_patch(shifted, diff), "<!-- generated -->\n<!-- header -->\n" + expected)
+
+    def test_edit_blocks_apply_and_must_be_unique(self):
+        edits = """<edit>
+<find>
+    <TargetFramework>net472</TargetFramework>
+</find>
+<replace>
+    <TargetFramework>net8.0</TargetFramework>
+    <Nullable>enable</Nullable>
+</replace>
+</edit>"""
+        self.assertEqual(apply_patch(PROJECT, edits), PROJECT.replace("    <TargetFramework>net472</TargetFramework>\n",
+                                                                      "    <TargetFramework>net8.0</TargetFramework>\n    <Nullable>enable</Nullable>\n"))
+        with self.assertRaises(PatchConflictError):
+            apply_patch(PROJECT, "<edit><find>Group></find><replace>Group ></replace></edit>") # Ambiguous: occurs four times
+        with self.assertRaises(PatchConflictError):
+            apply_patch(PROJECT, "<edit><find>net48</find><replace>net8.0</replace></edit>")
+
+    def test_conflicting_hunk_is_rejected(self):
+        diff = """@@ -3,1 +3,1 @@
+-    <TargetFramework>net461</TargetFramework>
++    <TargetFramework>net8.0</TargetFramework>
+"""
+        with self.assertRaises(PatchConflictError):
+            apply_patch(PROJECT, diff)
+        with self.assertRaises(PatchError):
+            apply_patch(PROJECT, "Change the target framework to net8.0.")
+
+    def test_multi_file_patch_is_all_or_nothing(self):
+        with tempfile.TemporaryDirectory() as root:
+            with open(os.path.join(root, "Program.cs"), "w", encoding="utf-8") as f:
+                f.write("using System;\nclass Program\n{\n    static void Main() { }\n}\n")
+            patch = """<edit file="Program.cs"><find>using System;</find><replace>using System;
+using System.Linq;</replace></edit>
+<edit file="Models/Order.cs"><find>class Order</find><replace>public class Order</replace></edit>"""
+            with self.assertRaises(PatchConflictError) as context:
+                apply_patch_to_files(root, patch)
+            self.assertEqual(context.exception.path, "Models/Order.cs")
+
+            updated = apply_patch_to_files(root, patch.split("\n<edit file=\"Models")[0])
+            self.assertEqual(list(updated), [os.path.join(root, "Program.cs")])
+            self.assertTrue(updated[os.path.join(root, "Program.cs")].startswith("using System;\nusing System.Linq;\nclass Program"))
+
+            with self.assertRaises(PatchError):
+                apply_patch_to_files(root, '<edit file="../outside.cs"><find>a</find><replace>b</replace></edit>')
+
+
+if __name__ == '__main__':
+    unittest.main()
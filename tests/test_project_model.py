@@ -0,0 +1,129 @@
+import unittest
+import os
+import tempfile
+import logging
+
+import sys
+# Add the parent directory of 'DotNetUpgradeAgents' to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from DotNetUpgradeAgents.core_components import logger
+from DotNetUpgradeAgents.project_model import ProjectModel, normalize_target_framework
+
+# Disable most logging during tests for cleaner output, can be enabled for debugging.
+logger.setLevel(logging.WARNING)
+
+
+class TestProjectModel(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write(self, relative_path, content):
+        path = os.path.join(self.root, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def _packages(self, model):
+        return {p["name"]: (p["version"], p["version_source"]) for p in model.package_references}
+
+    def test_sdk_style_project_with_directory_build_props(self):
+        self._write("Directory.Build.props", """<Project>
+  <PropertyGroup><SerilogVersion>3.1.1</SerilogVersion><LangVersion>latest</LangVersion></PropertyGroup>
+</Project>""")
+        path = self._write("src/App/App.csproj", """<Project Sdk="Microsoft.NET.Sdk">
+  <PropertyGroup>
+    <TargetFrameworks>net6.0;net8.0</TargetFrameworks>
+  </PropertyGroup>
+  <ItemGroup>
+    <PackageReference Version="13.0.3" Include="Newtonsoft.Json" />
+    <PackageReference Include="Serilog">
+      <Version>$(SerilogVersion)</Version>
+    </PackageReference>
+    <PackageReference
+        Include="xunit"
+        Version="2.6.1" PrivateAssets="all" />
+    <ProjectReference Include="..\\Core\\Core.csproj" />
+  </ItemGroup>
+  <Import Project="..\\shared.targets" Condition="Exists('..\\shared.targets')" />
+</Project>""")
+
+        model = ProjectModel.load(path)
+
+        self.assertTrue(model.is_sdk_style)
+        self.assertEqual(model.target_frameworks, ["net6.0", "net8.0"])
+        self.assertEqual(model.properties["LangVersion"], "latest")
+        self.assertEqual(self._packages(model), {"Newtonsoft.Json": ("13.0.3", "project"), "Serilog": ("3.1.1", "project"), "xunit": ("2.6.1", "project")})
+        self.assertEqual(model.project_references[0]["path"], os.path.join(self.root, "src", "Core", "Core.csproj"))
+        self.assertEqual(model.imports[0]["project"], "..\\shared.targets")
+        self.assertEqual(model.directory_build_props, os.path.join(self.root, "Directory.Build.props"))
+
+    def test_central_package_management_and_version_override(self):
+        self._write("Directory.Packages.props", """<Project>
+  <PropertyGroup><ManagePackageVersionsCentrally>true</ManagePackageVersionsCentrally></PropertyGroup>
+  <ItemGroup>
+    <PackageVersion Include="Dapper" Version="2.1.24" />
+    <PackageVersion Include="Polly" Version="8.2.0" />
+    <PackageVersion Include="Newtonsoft.Json" Version="13.0.3" />
+  </ItemGroup>
+</Project>""")
+        path = self._write("Lib/Lib.csproj", """<Project Sdk="Microsoft.NET.Sdk">
+  <PropertyGroup><TargetFramework>net8.0</TargetFramework></PropertyGroup>
+  <ItemGroup>
+    <PackageReference Include="Dapper" />
+    <PackageReference Include="Polly" VersionOverride="7.2.4" />
+    <PackageReference Include="Unlisted" />
+    <PackageReference Include="newtonsoft.json" />
+  </ItemGroup>
+</Project>""")
+
+        model = ProjectModel.load(path)
+
+        self.assertTrue(model.central_package_management)
+        self.assertEqual(self._packages(model), {"Dapper": ("2.1.24", "central"), "Polly": ("7.2.4", "override"), "Unlisted": (None, None),
+                                                 "newtonsoft.json": ("13.0.3", "central")}) # Package IDs match case-insensitively
+
+    def test_legacy_project_with_packages_config(self):
+        self._write("Legacy/packages.config", """<?xml version="1.0" encoding="utf-8"?>
+<packages>
+  <package id="log4net" version="2.0.15" targetFramework="net472" />
+</packages>""")
+        path = self._write("Legacy/Legacy.vbproj", """<?xml version="1.0" encoding="utf-8"?>
+<Project ToolsVersion="15.0" xmlns="http://schemas.microsoft.com/developer/msbuild/2003">
+  <PropertyGroup>
+    <TargetFrameworkVersion>v4.7.2</TargetFrameworkVersion>
+  </PropertyGroup>
+  <ItemGroup>
+    <Reference Include="log4net, Version=2.0.15.0, Culture=neutral, PublicKeyToken=669e0ddf0bb1aa2a">
+      <HintPath>..\\packages\\log4net.2.0.15\\lib\\net45\\log4net.dll</HintPath>
+    </Reference>
+    <Reference Include="System.Data" />
+  </ItemGroup>
+  <Import Project="$(MSBuildToolsPath)\\Microsoft.VisualBasic.targets" />
+</Project>""")
+
+        model = ProjectModel.load(path)
+
+        self.assertFalse(model.is_sdk_style)
+        self.assertEqual(model.target_frameworks, ["net472"])
+        self.assertEqual(self._packages(model), {"log4net": ("2.0.15", "packages.config")})
+        log4net = model.references[0]
+        self.assertEqual((log4net["name"], log4net["version"]), ("log4net", "2.0.15.0"))
+        self.assertEqual(log4net["hint_path"], os.path.join(self.root, "packages", "log4net.2.0.15", "lib", "net45", "log4net.dll"))
+        self.assertEqual(model.references[1]["name"], "System.Data")
+        self.assertEqual(len(model.imports), 1)
+
+    def test_normalize_target_framework(self):
+        self.assertEqual(normalize_target_framework("v4.8"), "net48")
+        self.assertEqual(normalize_target_framework("v4.6.1"), "net461")
+        self.assertEqual(normalize_target_framework("net8.0-windows"), "net8.0-windows")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import os
+import tempfile
+import logging
+from unittest.mock import patch
+
+import sys
+# Add the parent directory of 'DotNetUpgradeAgents' to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from DotNetUpgradeAgents.core_components import logger
+from DotNetUpgradeAgents import source_scanner
+from DotNetUpgradeAgents.source_scanner import AhoCorasickMatcher, scan_sources
+
+# Disable most logging during tests for cleaner output, can be enabled for debugging.
+logger.setLevel(logging.WARNING)
+
+
+class TestAhoCorasickMatcher(unittest.TestCase):
+
+    def test_reports_overlapping_patterns(self):
+        matcher = AhoCorasickMatcher(["he", "she", "his", "hers"], whole_word=False)
+        self.assertEqual(list(matcher.iter_matches(b"ushers")), [(1, "she"), (2, "he"), (2, "hers")])
+
+    def test_whole_word_and_case_insensitive_matching(self):
+        matcher = AhoCorasickMatcher(["System", "System.Data"])
+        self.assertEqual(list(matcher.iter_matches(b"Imports SYSTEM.Data.SqlClient ' SystemX")), [(8, "System"), (8, "System.Data")])
+        self.assertEqual(list(AhoCorasickMatcher(["System"], case_sensitive=True).iter_matches(b"SYSTEM system")), [])
+
+
+class TestScanSources(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write(self, relative_path, content):
+        path = os.path.join(self.root, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def test_scan_reports_file_line_hits_and_skips_build_folders(self):
+        app = self._write("App/Program.cs", "using System;\nusing ITASCA.Core;\n\nclass P { ITASCA.Core.Model m; }\n")
+        module = self._write("Lib/Module1.vb", "Imports Itasca.Geometry\nModule Module1\nEnd Module\n")
+        self._write("Lib/Empty.vb", "")
+        self._write("App/bin/Debug/Generated.cs", "using ITASCA;\n")
+        self._write("App/obj/AssemblyInfo.cs", "using ITASCA;\n")
+        self._write(".git/hooks/x.cs", "using ITASCA;\n")
+        self._write("App/readme.txt", "ITASCA\n")
+
+        result = scan_sources(self.root, ["ITASCA", "System.Data"], max_workers=1)
+
+        self.assertEqual(result["files_scanned"], 3)
+        self.assertEqual(result["hit_counts"], {"ITASCA": 3, "System.Data": 0})
+        self.assertEqual(sorted(result["files_with_hits"]["ITASCA"]), sorted([app, module]))
+        app_hits = [(h["line"], h["column"], h["text"]) for h in result["hits"]["ITASCA"] if h["file"] == app]
+        self.assertEqual(app_hits, [(2, 7, "using ITASCA.Core;"), (4, 11, "class P { ITASCA.Core.Model m; }")])
+        self.assertEqual(result["errors"], [])
+
+    def test_process_pool_matches_in_process_scan(self):
+        for i in range(40):
+            self._write(f"P{i % 4}/File{i}.cs", "namespace N {\n" + ("    // filler\n" * i) + ("    using ITASCA.Core;\n" if i % 3 == 0 else "") + "}\n")
+
+        in_process = scan_sources(self.root, ["ITASCA"], max_workers=1)
+        with patch.object(source_scanner, "MIN_FILES_FOR_PROCESS_POOL", 1):
+            pooled = scan_sources(self.root, ["ITASCA"], max_workers=2, batch_size=7)
+
+        self.assertEqual(pooled["hits"], in_process["hits"])
+        self.assertEqual(pooled["hit_counts"]["ITASCA"], 14)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import os
+import logging
+
+import sys
+# Add the parent directory of 'DotNetUpgradeAgents' to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from DotNetUpgradeAgents.core_components import LLMApiClient, logger
+from DotNetUpgradeAgents.stub_llm_server import StubLLMServer, StubLLMConfig, LatencyDistribution, canned_completion
+
+# Disable most logging during tests for cleaner output, can be enabled for debugging.
+logger.setLevel(logging.WARNING)
+
+
+class TestStubLLMServer(unittest.TestCase):
+
+    def setUp(self):
+        os.environ["LLM_BACKOFF_BASE"] = "0"
+        self.clients = []
+
+    def tearDown(self):
+        os.environ.pop("LLM_BACKOFF_BASE", None)
+        for client in self.clients:
+            client.close()
+
+    def _client(self, endpoint: str, **kwargs) -> LLMApiClient:
+        client = LLMApiClient(endpoint=endpoint, ollama_model_name="stub", **kwargs)
+        self.clients.append(client)
+        return client
+
+    def test_ollama_generate_and_chat_return_canned_output(self):
+        config = StubLLMConfig(responses=[{"match": "Convert A", "response": "public class A { }"}])
+        with StubLLMServer(config) as server:
+            self.assertEqual(self._client(server.ollama_generate_url).generate_code("Convert A"), "public class A { }")
+            self.assertEqual(self._client(server.ollama_chat_url).generate_code("Convert A"), "public class A { }")
+            self.assertEqual("".join(self._client(server.ollama_chat_url).stream_code("Convert A")), "public class A { }")
+            self.assertEqual(server.stats()["completions"], 3)
+
+    def test_choices_format_streams_and_buffers(self):
+        config = StubLLMConfig(responses=[{"match": ".*", "response": "public class A { }"}])
+        with StubLLMServer(config) as server:
+            client = self._client(server.completions_url, api_key="test-key")
+            self.assertEqual(client.generate_code("Convert A"), "public class A { }")
+            self.assertEqual(list(client.stream_code("Convert A")), ["public", " class", " A", " {", " }"])
+
+    def test_default_outputs_are_deterministic(self):
+        config = StubLLMConfig()
+        prompt = "Convert the following VB.NET code to C#:\nPublic Class Invoice\nEnd Class"
+        output = canned_completion(prompt, config)
+        self.assertEqual(output, canned_completion(prompt, config))
+        self.assertIn("public class Invoice", output)
+        self.assertTrue(canned_completion("Upgrade this .csproj", config).startswith("<Project"))
+
+    def test_injected_throttling_is_retried_by_client(self):
+        config = StubLLMConfig(error_rate_429=0.3, retry_after=0, seed=7)
+        with StubLLMServer(config) as server:
+            client = self._client(server.ollama_generate_url)
+            for i in range(10):
+                self.assertFalse(client.generate_code(f"prompt {i}").startswith("# ERROR"))
+            stats = server.stats()
+            self.assertGreater(stats["injected_429"], 0)
+            self.assertEqual(stats["completions"], 10)
+
+    def test_injected_timeouts_surface_as_client_errors(self):
+        os.environ["LLM_REQUEST_TIMEOUT"] = "0.2"
+        os.environ["LLM_MAX_RETRIES"] = "0"
+        try:
+            with StubLLMServer(StubLLMConfig(timeout_rate=1.0, hang_seconds=0.5)) as server:
+                result = self._client(server.ollama_generate_url).generate_code("Convert A")
+        finally:
+            os.environ.pop("LLM_REQUEST_TIMEOUT", None)
+            os.environ.pop("LLM_MAX_RETRIES", None)
+        self.assertTrue(result.startswith("# ERROR: LLM_API_CALL_FAILED"))
+
+    def test_latency_spec_parsing(self):
+        self.assertEqual(LatencyDistribution("fixed:0.25").params, [0.25])
+        self.assertEqual(LatencyDistribution("uniform:0.1,0.2").kind, "uniform")
+        with self.assertRaises(ValueError):
+            LatencyDistribution("uniform:0.1")
+        with self.assertRaises(ValueError):
+            LatencyDistribution("gamma:1,2")
+
+
+if __name__ == '__main__':
+    unittest.main()
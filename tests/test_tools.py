@@ -3,6 +3,8 @@ from unittest.mock import patch, MagicMock, mock_open
 import os
 import shutil
 import subprocess
+import threading
+import time
 import logging # Added for logger.setLevel
 
 # Adjust path to import tools from DotNetUpgradeAgents package
@@ -13,8 +15,9 @@ import sys
 # Assumes script is run from repository root or 'tests' dir.
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from DotNetUpgradeAgents.tools import TFSTool, GitInitTool, VBToCSTool, ReportTool
+from DotNetUpgradeAgents.tools import TFSTool, GitInitTool, VBToCSTool, ReportTool, ConversionManifest, DependencyAnalyzerTool, ProjectUpgradeTool, BuildTool
 from DotNetUpgradeAgents.core_components import LLMApiClient, HumanFeedback, logger
+from DotNetUpgradeAgents.nuget_metadata import NuGetMetadataResolver
 
 # Disable most logging during tests for cleaner output, can be enabled for debugging.
 logger.setLevel(logging.WARNING)
@@ -93,39 +96,403 @@ class TestAgentTools(unittest.TestCase):
         )
 
     @patch('DotNetUpgradeAgents.tools.LLMApiClient.generate_code')
-    @patch('DotNetUpgradeAgents.tools.open', new_callable=mock_open, read_data="Public Class Test\nEnd Class")
-    def test_vb_to_cs_tool_success(self, mock_file_open, mock_generate_code):
+    def test_vb_to_cs_tool_success(self, mock_generate_code):
         vb_file = os.path.join(self.test_dir, "test.vb")
-        # mock_open doesn't create the file, so we don't need to write it for this test.
-        # It will mock the read.
+        with open(vb_file, "w", encoding="utf-8") as f:
+            f.write("Public Class Test\nEnd Class")
 
         mock_generate_code.return_value = "public class Test { }"
 
-        # Instantiate LLMApiClient mock explicitly if VBToCSTool expects one,
-        # or ensure the default instantiation within VBToCSTool uses the patched one.
-        # The current VBToCSTool creates its own if not provided.
-        # So, patching at DotNetUpgradeAgents.tools.LLMApiClient will affect the default one.
-
-        vb_tool = VBToCSTool() # Uses the patched LLMApiClient
+        # Without an llm_client the tool uses the shared default LLMApiClient, whose generate_code is patched.
+        # The rule-based converter is off so that the file goes to the LLM.
+        vb_tool = VBToCSTool(use_rule_converter=False, reuse_near_duplicates=False)
         result = vb_tool._run(vb_file_path=vb_file)
 
         self.assertTrue("Successfully converted" in result)
-        mock_file_open.assert_any_call(vb_file, 'r', encoding='utf-8') # Check read
+        self.assertIn("Public Class Test", mock_generate_code.call_args[0][0])
         cs_file_path = vb_file.replace(".vb", ".cs")
-        mock_file_open.assert_any_call(cs_file_path, 'w', encoding='utf-8') # Check write
-        # Check if write was called with the correct C# code
-        # mock_file_open().write.assert_called_once_with("public class Test { }") # This is more complex with multiple open calls
+        with open(cs_file_path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "public class Test { }", "LLM generated C# code was not written to file.")
+        # The conversion is recorded, so an unchanged file is not sent to the LLM again
+        self.assertTrue(os.path.isfile(os.path.join(self.test_dir, ConversionManifest.FILE_NAME)))
+        self.assertIn("unchanged", vb_tool._run(vb_file_path=vb_file))
+        mock_generate_code.assert_called_once()
 
-        # A simpler check for the write content with mock_open:
-        handle = mock_file_open()
-        # Find the call that wrote the C# code
-        write_call_args = None
-        for call in handle.write.call_args_list:
-            if call[0][0] == "public class Test { }":
-                write_call_args = call
-                break
-        self.assertIsNotNone(write_call_args, "LLM generated C# code was not written to file.")
 
+    def test_vb_to_cs_tool_streams_output_to_file(self):
+        vb_file = os.path.join(self.test_dir, "Streamed.vb")
+        with open(vb_file, "w", encoding="utf-8") as f:
+            f.write("Public Class Streamed\nEnd Class")
+
+        mock_llm_client = MagicMock(spec=LLMApiClient)
+        mock_llm_client.stream_code.return_value = iter(["public class ", "Streamed { }"])
+
+        vb_tool = VBToCSTool(llm_client=mock_llm_client, stream_output=True, use_rule_converter=False)
+        result = vb_tool._run(vb_file_path=vb_file)
+
+        self.assertIn("Successfully converted", result)
+        mock_llm_client.generate_code.assert_not_called()
+        with open(os.path.join(self.test_dir, "Streamed.cs"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), "public class Streamed { }")
+        self.assertFalse(os.path.exists(os.path.join(self.test_dir, "Streamed.cs.partial")))
+
+
+    def _write_vb_files(self, directory, names):
+        os.makedirs(directory, exist_ok=True)
+        for name in names:
+            os.makedirs(os.path.dirname(os.path.join(directory, name)), exist_ok=True)
+            with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+                f.write(f"Public Class {os.path.splitext(os.path.basename(name))[0]}\nEnd Class")
+
+    def test_vb_to_cs_tool_converts_directory_in_parallel(self):
+        project_dir = os.path.join(self.test_dir, "VbApp")
+        self._write_vb_files(project_dir, [f"Type{i}.vb" for i in range(6)] + ["Broken.vb", os.path.join("obj", "Generated.vb")])
+
+        lock = threading.Lock()
+        in_flight = {"now": 0, "max": 0}
+        def fake_generate_code(prompt):
+            with lock:
+                in_flight["now"] += 1
+                in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            time.sleep(0.05)
+            with lock:
+                in_flight["now"] -= 1
+            return "# ERROR: LLM_API_CALL_FAILED. boom" if "Broken" in prompt else "public class Converted { }"
+
+        mock_llm_client = MagicMock(spec=LLMApiClient)
+        mock_llm_client.generate_code.side_effect = fake_generate_code
+        manifest = VBToCSTool(llm_client=mock_llm_client, max_concurrency=3, use_rule_converter=False)._run(vb_file_path=project_dir)
+
+        self.assertEqual(manifest["total_files"], 7) # obj/ is skipped
+        self.assertEqual(manifest["converted"], 6)
+        self.assertEqual(manifest["failed"], 1)
+        self.assertEqual(in_flight["max"], 3)
+        failed = [e for e in manifest["files"] if e["status"] == "failed"]
+        self.assertTrue(failed[0]["error"].startswith("# ERROR:"))
+        self.assertFalse(os.path.exists(os.path.join(project_dir, "Broken.cs")))
+        with open(os.path.join(project_dir, "Type0.cs"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), "public class Converted { }")
+        self.assertEqual([f for f in os.listdir(project_dir) if f.endswith(".tmp")], [])
+        self.assertGreater(manifest["files"][0]["prompt_tokens"], 0)
+
+    def test_vb_to_cs_tool_skips_unchanged_files(self):
+        project_dir = os.path.join(self.test_dir, "Incremental")
+        self._write_vb_files(project_dir, ["A.vb", "B.vb"])
+        mock_llm_client = MagicMock(spec=LLMApiClient)
+        mock_llm_client.generate_code.return_value = "public class Converted { }"
+        mock_llm_client.model_identity.return_value = "mistral"
+        vb_tool = VBToCSTool(llm_client=mock_llm_client, use_rule_converter=False, reuse_near_duplicates=False)
+
+        self.assertEqual(vb_tool._run(vb_file_path=project_dir)["converted"], 2)
+        self.assertTrue(os.path.isfile(os.path.join(project_dir, ConversionManifest.FILE_NAME)))
+        manifest = vb_tool._run(vb_file_path=project_dir)
+        self.assertEqual(manifest["unchanged"], 2)
+        self.assertEqual(mock_llm_client.generate_code.call_count, 2)
+
+        with open(os.path.join(project_dir, "B.vb"), "a", encoding="utf-8") as f:
+            f.write("\n' changed")
+        os.remove(os.path.join(project_dir, "A.cs")) # A missing output is converted again too
+        manifest = vb_tool._run(vb_file_path=project_dir)
+        self.assertEqual((manifest["converted"], manifest["unchanged"]), (2, 0))
+
+        mock_llm_client.model_identity.return_value = "codellama" # A different model invalidates earlier conversions
+        self.assertEqual(vb_tool._run(vb_file_path=project_dir)["converted"], 2)
+        self.assertEqual(mock_llm_client.generate_code.call_count, 6)
+
+    def test_vb_to_cs_tool_single_file_shares_project_manifest(self):
+        project_dir = os.path.join(self.test_dir, "Shared")
+        self._write_vb_files(os.path.join(project_dir, "Models"), ["Order.vb"])
+        with open(os.path.join(project_dir, "Shared.vbproj"), "w", encoding="utf-8") as f:
+            f.write('<Project Sdk="Microsoft.NET.Sdk"><PropertyGroup><TargetFramework>net8.0</TargetFramework></PropertyGroup></Project>')
+        mock_llm_client = MagicMock(spec=LLMApiClient)
+        mock_llm_client.generate_code.return_value = "public class Converted { }"
+        mock_llm_client.model_identity.return_value = "mistral"
+        vb_tool = VBToCSTool(llm_client=mock_llm_client, use_rule_converter=False, reuse_near_duplicates=False)
+
+        self.assertIn("Successfully converted", vb_tool._run(vb_file_path=os.path.join(project_dir, "Models", "Order.vb")))
+        self.assertTrue(os.path.isfile(os.path.join(project_dir, ConversionManifest.FILE_NAME)))
+        self.assertFalse(os.path.exists(os.path.join(project_dir, "Models", ConversionManifest.FILE_NAME)))
+        self.assertEqual(vb_tool._run(vb_file_path=os.path.join(project_dir, "Shared.vbproj"))["unchanged"], 1)
+        self.assertEqual(mock_llm_client.generate_code.call_count, 1)
+
+    def test_vb_to_cs_tool_converts_large_files_in_chunks(self):
+        vb_file = os.path.join(self.test_dir, "Large.vb")
+        members = "".join(f"        Public Sub Method{i}()\n            Console.WriteLine({i})\n        End Sub\n\n" for i in range(20))
+        with open(vb_file, "w", encoding="utf-8") as f:
+            f.write(f"Imports System\n\nNamespace Big\n    Public Class Large\n{members}    End Class\nEnd Namespace\n")
+
+        def fake_generate_code(prompt):
+            methods = [line.split("Sub ")[1].split("(")[0] for line in prompt.splitlines() if "Public Sub" in line]
+            return "using System;\n\n" + "\n".join(f"partial class Large {{ void {m}() {{ }} }}" for m in methods)
+
+        mock_llm_client = MagicMock(spec=LLMApiClient)
+        mock_llm_client.generate_code.side_effect = fake_generate_code
+        result = VBToCSTool(llm_client=mock_llm_client, chunk_max_chars=400, use_rule_converter=False)._run(vb_file_path=vb_file)
+
+        self.assertIn("Successfully converted", result)
+        self.assertGreater(mock_llm_client.generate_code.call_count, 3)
+        for call in mock_llm_client.generate_code.call_args_list:
+            self.assertIn("Imports System", call[0][0])
+            self.assertIn("Public Class Large", call[0][0])
+        with open(os.path.join(self.test_dir, "Large.cs"), encoding="utf-8") as f:
+            cs_code = f.read()
+        self.assertEqual(cs_code.count("using System;"), 1)
+        self.assertEqual([f"Method{i}" for i in range(20)], [line.split("void ")[1].split("(")[0] for line in cs_code.splitlines() if "void " in line])
+
+    def test_vb_to_cs_tool_converts_simple_files_by_rules(self):
+        project_dir = os.path.join(self.test_dir, "Mixed")
+        os.makedirs(project_dir)
+        with open(os.path.join(project_dir, "AssemblyInfo.vb"), "w", encoding="utf-8") as f:
+            f.write('Imports System.Reflection\n\n<Assembly: AssemblyTitle("Mixed")>\n<Assembly: ComVisible(False)>\n')
+        with open(os.path.join(project_dir, "Logic.vb"), "w", encoding="utf-8") as f:
+            f.write("Public Class Logic\n    Sub Run()\n        If Ready Then\n            Go()\n        End If\n    End Sub\nEnd Class\n")
+        mock_llm_client = MagicMock(spec=LLMApiClient)
+        mock_llm_client.generate_code.return_value = "public class Logic { }"
+
+        manifest = VBToCSTool(llm_client=mock_llm_client)._run(vb_file_path=project_dir)
+
+        self.assertEqual((manifest["converted"], manifest["rule_converted"]), (2, 1))
+        mock_llm_client.generate_code.assert_called_once()
+        self.assertIn("If Ready Then", mock_llm_client.generate_code.call_args[0][0])
+        with open(os.path.join(project_dir, "AssemblyInfo.cs"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), 'using System.Reflection;\n\n[assembly: AssemblyTitle("Mixed")]\n[assembly: ComVisible(false)]\n')
+
+    def test_vb_to_cs_tool_reuses_near_duplicate_conversions(self):
+        logic = "Namespace {ns}\n    Public Class {name}\n        Sub Run()\n            If Ready Then\n                Log(\"{name} ran\")\n            End If\n        End Sub\n    End Class\nEnd Namespace\n"
+        for project, names in (("First", ["Orders", "Invoices"]), ("Second", ["Orders"])):
+            os.makedirs(os.path.join(self.test_dir, project))
+            for name in names:
+                with open(os.path.join(self.test_dir, project, f"{name}.vb"), "w", encoding="utf-8") as f:
+                    f.write(logic.format(ns=project, name=name))
+
+        def fake_generate_code(prompt):
+            name = prompt.split("Public Class ")[1].split()[0]
+            return f"namespace First\n{{\n    public class {name}\n    {{\n        void Run() {{ if (Ready) Log(\"{name} ran\"); }}\n    }}\n}}\n"
+
+        mock_llm_client = MagicMock(spec=LLMApiClient)
+        mock_llm_client.generate_code.side_effect = fake_generate_code
+        vb_tool = VBToCSTool(llm_client=mock_llm_client)
+
+        manifest = vb_tool._run(vb_file_path=os.path.join(self.test_dir, "First"))
+        self.assertEqual((manifest["converted"], manifest["reused"], manifest["llm_calls_saved"]), (2, 1, 1))
+        self.assertEqual(mock_llm_client.generate_code.call_count, 1)
+        with open(os.path.join(self.test_dir, "First", "Orders.cs"), encoding="utf-8") as f:
+            cs_code = f.read()
+        self.assertIn("public class Orders", cs_code)
+        self.assertIn('Log("Orders ran")', cs_code)
+
+        # Another project's copy differs by namespace only; that name is in the C#, so it is substituted too
+        manifest = vb_tool._run(vb_file_path=os.path.join(self.test_dir, "Second"))
+        self.assertEqual(manifest["reused"], 1)
+        self.assertEqual(mock_llm_client.generate_code.call_count, 1)
+        with open(os.path.join(self.test_dir, "Second", "Orders.cs"), encoding="utf-8") as f:
+            self.assertTrue(f.read().startswith("namespace Second\n"))
+
+    def test_vb_to_cs_tool_uses_vbproj_compile_items(self):
+        project_dir = os.path.join(self.test_dir, "VbProj")
+        self._write_vb_files(project_dir, ["Included.vb", os.path.join("Sub", "Nested.vb"), "Excluded.vb"])
+        vbproj_path = os.path.join(project_dir, "VbProj.vbproj")
+        with open(vbproj_path, "w", encoding="utf-8") as f:
+            f.write('<Project xmlns="http://schemas.microsoft.com/developer/msbuild/2003"><ItemGroup>'
+                    '<Compile Include="Included.vb" /><Compile Include="Sub\\Nested.vb" /></ItemGroup></Project>')
+
+        self.assertEqual(VBToCSTool.find_vb_files(vbproj_path),
+                         [os.path.join(os.path.abspath(project_dir), "Included.vb"), os.path.join(os.path.abspath(project_dir), "Sub", "Nested.vb")])
+
+    def test_dependency_analyzer_tool_resolves_solution_graph(self):
+        solution_dir = os.path.join(self.test_dir, "Solution")
+        for name, references in (("App", ["..\\Core\\Core.csproj"]), ("Core", [])):
+            os.makedirs(os.path.join(solution_dir, name))
+            with open(os.path.join(solution_dir, name, f"{name}.csproj"), "w", encoding="utf-8") as f:
+                f.write('<Project Sdk="Microsoft.NET.Sdk"><PropertyGroup><TargetFramework>net8.0</TargetFramework></PropertyGroup><ItemGroup>'
+                        + "".join(f'<ProjectReference Include="{r}" />' for r in references)
+                        + '<PackageReference Include="Serilog"><Version>3.1.1</Version></PackageReference></ItemGroup></Project>')
+        sln_path = os.path.join(solution_dir, "App.sln")
+        with open(sln_path, "w", encoding="utf-8") as f:
+            for name in ("App", "Core"):
+                f.write(f'Project("{{FAE04EC0-301F-11D3-BF4B-00C04F79EFBC}}") = "{name}", "{name}\\{name}.csproj", "{{{name.upper():0>8}-0000-0000-0000-000000000000}}"\nEndProject\n')
+
+        resolver = MagicMock(spec=NuGetMetadataResolver)
+        resolver.check.side_effect = lambda packages: [{"name": p["name"], "outdated": True, "vulnerable": False, "incompatible_frameworks": [], "error": None} for p in packages]
+        result = DependencyAnalyzerTool(package_resolver=resolver, target_framework="net8.0")._run(sln_path)
+
+        core_path = os.path.normpath(os.path.join(os.path.abspath(solution_dir), "Core", "Core.csproj"))
+        self.assertEqual(result["custom_libraries"], [{"name": "Core.csproj", "path": core_path, "exists": True}])
+        self.assertEqual([os.path.basename(p) for p in result["dependency_graph"]["build_order"]], ["Core.csproj", "App.csproj"])
+        self.assertEqual(sorted(result["nuget_packages"], key=lambda p: p["project"]),
+                         [{"name": "Serilog", "version": "3.1.1", "version_source": "project", "project": "App"},
+                          {"name": "Serilog", "version": "3.1.1", "version_source": "project", "project": "Core"}])
+        self.assertEqual(result["target_frameworks"], ["net8.0"])
+        resolver.check.assert_called_once() # One batched lookup for the whole solution
+        self.assertEqual([p["target_frameworks"] for p in resolver.check.call_args[0][0]], [["net8.0"], ["net8.0"]])
+        self.assertEqual(result["outdated_packages"], ["Serilog"])
+        self.assertEqual(sorted(status["project"] for status in result["package_status"]), ["App", "Core"])
+        self.assertEqual(result["analysis_errors"], [])
+
+    @patch('DotNetUpgradeAgents.tools.run_dotnet_build')
+    def test_project_upgrade_tool_upgrades_solution_in_dependency_order(self, mock_build):
+        solution_dir = os.path.join(self.test_dir, "UpgradeSolution")
+        for name, references in (("App", ["..\\Core\\Core.csproj", "..\\Data\\Data.csproj"]), ("Data", ["..\\Core\\Core.csproj"]), ("Core", []), ("Reports", ["..\\Data\\Data.csproj"])):
+            os.makedirs(os.path.join(solution_dir, name))
+            with open(os.path.join(solution_dir, name, f"{name}.csproj"), "w", encoding="utf-8") as f:
+                f.write('<Project Sdk="Microsoft.NET.Sdk"><ItemGroup>' + "".join(f'<ProjectReference Include="{r}" />' for r in references) + '</ItemGroup></Project>')
+        sln_path = os.path.join(solution_dir, "Upgrade.sln")
+        with open(sln_path, "w", encoding="utf-8") as f:
+            for i, name in enumerate(("App", "Data", "Core", "Reports")):
+                f.write(f'Project("{{FAE04EC0-301F-11D3-BF4B-00C04F79EFBC}}") = "{name}", "{name}\\{name}.csproj", "{{00000000-0000-0000-0000-00000000000{i}}}"\nEndProject\n')
+        built = []
+        def build(project_path, build_project_references=True):
+            built.append(os.path.basename(project_path))
+            return subprocess.CompletedProcess([], 1 if project_path.endswith("Data.csproj") else 0, stdout="", stderr="error CS0246")
+        mock_build.side_effect = build
+        mock_llm_client = MagicMock(spec=LLMApiClient)
+        mock_llm_client.generate_code.return_value = '<Project Sdk="Microsoft.NET.Sdk"><PropertyGroup><TargetFramework>net8.0</TargetFramework></PropertyGroup></Project>'
+
+        tool = ProjectUpgradeTool(llm_client=mock_llm_client, max_parallel_projects=2, use_rewrite_rules=False)
+        report = tool._run(sln_path, "net8.0")
+
+        projects = {os.path.basename(path): entry for path, entry in report["projects"].items()}
+        self.assertEqual(built, ["Core.csproj", "Data.csproj"]) # App and Reports wait for Data, which fails to build
+        self.assertEqual((projects["Core.csproj"]["status"], projects["Core.csproj"]["wave"]), ("upgraded", 0))
+        self.assertEqual(projects["Data.csproj"]["status"], "build_failed")
+        self.assertEqual(projects["App.csproj"]["status"], "blocked")
+        self.assertEqual(projects["Reports.csproj"]["blocked_by"], [os.path.normpath(os.path.join(os.path.abspath(solution_dir), "Data", "Data.csproj"))])
+        self.assertEqual(report["totals"], {"upgraded": 1, "failed": 0, "build_failed": 1, "blocked": 2, "external": 0})
+        self.assertIn("net8.0", mock_llm_client.generate_code.call_args[0][0])
+        self.assertEqual(mock_llm_client.generate_code.call_count, 2)
+
+    def test_project_upgrade_tool_uses_rewrite_rules_before_llm(self):
+        project_dir = os.path.join(self.test_dir, "RulesUpgrade")
+        os.makedirs(project_dir)
+        project_path = os.path.join(project_dir, "Legacy.csproj")
+        with open(project_path, "w", encoding="utf-8") as f:
+            f.write('<Project ToolsVersion="15.0" xmlns="http://schemas.microsoft.com/developer/msbuild/2003"><PropertyGroup>'
+                    '<TargetFrameworkVersion>v4.7.2</TargetFrameworkVersion><OutputType>Library</OutputType></PropertyGroup>'
+                    '<ItemGroup><Compile Include="Class1.cs" /></ItemGroup></Project>')
+        with open(os.path.join(project_dir, "packages.config"), "w", encoding="utf-8") as f:
+            f.write('<packages><package id="Newtonsoft.Json" version="12.0.1" targetFramework="net472" /></packages>')
+        for source in ("Class1.cs", "Unused.cs"):
+            with open(os.path.join(project_dir, source), "w", encoding="utf-8") as f:
+                f.write("public class C { }")
+        mock_llm_client = MagicMock(spec=LLMApiClient)
+        tool = ProjectUpgradeTool(llm_client=mock_llm_client)
+
+        with patch('DotNetUpgradeAgents.csproj_rewriter._iter_default_compile_files') as mock_walk: # Sources come from the code index
+            result = tool._upgrade_project(project_path, "net8.0")
+        mock_walk.assert_not_called()
+
+        self.assertTrue(result["success"])
+        self.assertEqual(result["method"], "rules")
+        mock_llm_client.generate_code.assert_not_called()
+        with open(project_path, encoding="utf-8") as f:
+            upgraded = f.read()
+        self.assertIn("<TargetFramework>net8.0</TargetFramework>", upgraded)
+        self.assertIn('<PackageReference Include="Newtonsoft.Json" Version="13.0.3" />', upgraded)
+        self.assertIn('<Compile Remove="Unused.cs" />', upgraded)
+        self.assertTrue(os.path.exists(project_path + ".bak"))
+        self.assertFalse(os.path.exists(os.path.join(project_dir, "packages.config")))
+
+        # A construct the rules cannot translate sends their draft to the LLM to finish
+        with open(project_path, "w", encoding="utf-8") as f:
+            f.write('<Project Sdk="Microsoft.NET.Sdk"><PropertyGroup><TargetFramework Condition="\'$(OS)\' == \'Windows_NT\'">net472</TargetFramework></PropertyGroup></Project>')
+        mock_llm_client.generate_code.return_value = '<Project Sdk="Microsoft.NET.Sdk"><PropertyGroup><TargetFramework>net8.0</TargetFramework></PropertyGroup></Project>'
+
+        result = tool._upgrade_project(project_path, "net8.0")
+
+        self.assertEqual(result["method"], "rules+llm")
+        self.assertIn("Conditional <TargetFramework>", mock_llm_client.generate_code.call_args[0][0])
+
+    def test_project_upgrade_tool_applies_llm_patch(self):
+        project_dir = os.path.join(self.test_dir, "PatchUpgrade")
+        os.makedirs(project_dir)
+        project_path = os.path.join(project_dir, "App.csproj")
+        original = '<Project Sdk="Microsoft.NET.Sdk">\n  <PropertyGroup>\n    <TargetFramework>net472</TargetFramework>\n  </PropertyGroup>\n</Project>\n'
+        with open(project_path, "w", encoding="utf-8") as f:
+            f.write(original)
+        mock_llm_client = MagicMock(spec=LLMApiClient)
+        mock_llm_client.generate_code.side_effect = [
+            "<edit><find><TargetFramework>net461</TargetFramework></find><replace><TargetFramework>net8.0</TargetFramework></replace></edit>", # Conflicts
+            original.replace("net472", "net8.0"),
+        ]
+        tool = ProjectUpgradeTool(llm_client=mock_llm_client, use_rewrite_rules=False, patch_format="edits")
+
+        result = tool._upgrade_project(project_path, "net8.0")
+
+        # The conflicting patch is rejected and the whole file is requested instead
+        self.assertTrue(result["success"])
+        self.assertTrue(result["patch"].startswith("rejected"))
+        self.assertIn("<edit", mock_llm_client.generate_code.call_args_list[0][0][0])
+        self.assertIn("raw XML", mock_llm_client.generate_code.call_args_list[1][0][0])
+        shutil.copy(project_path + ".bak", project_path)
+
+        mock_llm_client.generate_code.side_effect = None
+        mock_llm_client.generate_code.return_value = "<edit><find><TargetFramework>net472</TargetFramework></find><replace><TargetFramework>net8.0</TargetFramework></replace></edit>"
+        result = tool._upgrade_project(project_path, "net8.0")
+
+        self.assertTrue(result["success"])
+        self.assertEqual(result["patch"], "applied")
+        with open(project_path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), original.replace("net472", "net8.0"))
+
+    @patch('DotNetUpgradeAgents.tools.run_dotnet_build')
+    @patch.object(HumanFeedback, 'get_feedback', side_effect=["Yes, attempt LLM fix", "Yes, apply the fix"])
+    def test_build_tool_applies_llm_fix_and_rebuilds(self, mock_feedback, mock_build):
+        project_dir = os.path.join(self.test_dir, "BuildFix")
+        os.makedirs(os.path.join(project_dir, "Models"))
+        project_path = os.path.join(project_dir, "BuildFix.csproj")
+        with open(project_path, "w", encoding="utf-8") as f:
+            f.write('<Project Sdk="Microsoft.NET.Sdk"><PropertyGroup><TargetFramework>net8.0</TargetFramework></PropertyGroup></Project>')
+        order_path = os.path.join(project_dir, "Models", "Order.cs")
+        with open(order_path, "w", encoding="utf-8") as f:
+            f.write("using System.Web;\n\nnamespace Shop.Models\n{\n    public class Order { }\n}\n")
+        mock_build.side_effect = [
+            subprocess.CompletedProcess([], 1, stdout="\n".join(
+                f"Models/Order.cs(1,14): error CS0234: The type or namespace name 'Web' does not exist in the namespace 'System' [{project_path}::TargetFramework={tfm}]"
+                for tfm in ("net8.0", "net6.0", "net8.0")), stderr=""),
+            subprocess.CompletedProcess([], 0, stdout="Build succeeded.", stderr=""),
+        ]
+        mock_llm_client = MagicMock(spec=LLMApiClient)
+        mock_llm_client.generate_code.return_value = """System.Web is not available on .NET 8.
+--- a/Models/Order.cs
++++ b/Models/Order.cs
+@@ -1,3 +1,2 @@
+-using System.Web;
+ 
+ namespace Shop.Models
+"""
+
+        result = BuildTool(llm_client=mock_llm_client)._run(project_path)
+
+        self.assertIn("Build successful", result)
+        prompt = mock_llm_client.generate_code.call_args[0][0]
+        self.assertIn(os.path.join("Models", "Order.cs"), prompt)
+        self.assertEqual(prompt.count("CS0234"), 1) # One distinct error for both target frameworks
+        self.assertIn("Missing type or namespace 'System.Web'", prompt)
+        self.assertIn("1: using System.Web;", prompt)
+        with open(order_path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "\nnamespace Shop.Models\n{\n    public class Order { }\n}\n")
+        self.assertTrue(os.path.exists(order_path + ".bak"))
+        self.assertEqual(mock_build.call_count, 2)
+
+    @patch.object(HumanFeedback, 'get_feedback', return_value="Flag for manual review and skip for now")
+    def test_dependency_analyzer_tool_scans_sources_for_itasca(self, mock_feedback):
+        project_dir = os.path.join(self.test_dir, "Itasca")
+        os.makedirs(os.path.join(project_dir, "bin"))
+        project_path = os.path.join(project_dir, "Itasca.csproj")
+        with open(project_path, "w", encoding="utf-8") as f:
+            f.write('<Project Sdk="Microsoft.NET.Sdk"><PropertyGroup><TargetFramework>net48</TargetFramework></PropertyGroup></Project>')
+        with open(os.path.join(project_dir, "Model.cs"), "w", encoding="utf-8") as f:
+            f.write("using System;\nusing ITASCA.Core;\n")
+        with open(os.path.join(project_dir, "bin", "Stale.cs"), "w", encoding="utf-8") as f:
+            f.write("using ITASCA.Legacy;\n")
+
+        result = DependencyAnalyzerTool(namespace_patterns=["System.Data"], scan_max_workers=1)._run(project_path)
+
+        self.assertTrue(result["itasca_namespace_found"])
+        self.assertEqual(result["itasca_action_taken"], "Flag for manual review and skip for now")
+        self.assertEqual(result["namespace_usage"]["hit_counts"], {"ITASCA": 1, "System.Data": 0})
+        self.assertEqual(result["namespace_usage"]["hits"]["ITASCA"][0]["line"], 2)
+        mock_feedback.assert_called_once()
 
     @patch('DotNetUpgradeAgents.tools.open', new_callable=mock_open)
     def test_report_tool_json(self, mock_file_open):
@@ -0,0 +1,97 @@
+import unittest
+import os
+
+import sys
+# Add the parent directory of 'DotNetUpgradeAgents' to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from DotNetUpgradeAgents.vb_chunking import chunk_vb_source, stitch_cs_chunks
+
+LARGE_VB_FILE = """Option Strict On
+Imports System
+Imports System.Linq
+
+Namespace Billing
+    <Serializable>
+    Public Class Invoice
+        Inherits DocumentBase
+
+        Private _lines As New List(Of String)()
+        Public Property Number As String
+
+        Public Property Total As Decimal
+            Get
+                Return _total
+            End Get
+            Set(value As Decimal)
+                _total = value
+            End Set
+        End Property
+
+        Public Sub Print()
+            _lines.ForEach(Sub(line)
+                               Console.WriteLine(line)
+                           End Sub)
+            Dim doubled = Function(x As Integer) x * 2
+        End Sub
+
+#Region "Helpers"
+        Public Function LineCount() As Integer
+            Return _lines.Count
+        End Function
+#End Region
+    End Class
+
+    Public Interface IPrintable
+        Sub Print()
+        Property Number As String
+    End Interface
+End Namespace
+"""
+
+
+class TestVBChunking(unittest.TestCase):
+
+    def test_small_file_is_a_single_chunk(self):
+        chunks = chunk_vb_source(LARGE_VB_FILE, max_chars=len(LARGE_VB_FILE))
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunks[0].text, LARGE_VB_FILE)
+
+    def test_splits_on_member_boundaries_with_shared_context(self):
+        chunks = chunk_vb_source(LARGE_VB_FILE, max_chars=300)
+        self.assertGreater(len(chunks), 2)
+        for chunk in chunks:
+            self.assertTrue(chunk.text.startswith("Option Strict On\nImports System\nImports System.Linq\n"))
+            self.assertIn("Namespace Billing", chunk.text)
+            self.assertTrue(chunk.text.rstrip().endswith("End Namespace"))
+            self.assertNotIn("#Region", chunk.text)
+            self.assertEqual(chunk.text.count("Public Class Invoice"), chunk.text.count("End Class"))
+            self.assertEqual(chunk.text.count("Public Function"), chunk.text.count("End Function"))
+            self.assertEqual(chunk.text.count("Public Property Total"), chunk.text.count("End Property"))
+        # The class attribute goes on one partial declaration only; Inherits is repeated
+        self.assertEqual(sum(chunk.text.count("<Serializable>") for chunk in chunks), 1)
+        self.assertEqual(sum("Inherits DocumentBase" in chunk.text for chunk in chunks), sum("Public Class Invoice" in chunk.text for chunk in chunks))
+        # The multi-line lambda stays inside its Sub
+        print_chunk = next(chunk for chunk in chunks if "Public Sub Print()" in chunk.text and "Public Class" in chunk.text)
+        self.assertIn("Console.WriteLine(line)", print_chunk.text)
+        self.assertEqual(print_chunk.text.count("End Sub"), 2)
+
+    def test_unbalanced_source_is_not_split(self):
+        broken = LARGE_VB_FILE.replace("        End Function\n", "", 1)
+        chunks = chunk_vb_source(broken, max_chars=300)
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunks[0].text, broken)
+
+    def test_stitch_hoists_and_dedupes_usings(self):
+        stitched = stitch_cs_chunks([
+            "```csharp\nusing System;\nusing System.Linq;\n\nnamespace Billing\n{\n    public partial class Invoice { }\n}\n```",
+            "using System;\n\nnamespace Billing\n{\n    public partial class Invoice { void Print() { } }\n}",
+        ])
+        self.assertEqual(stitched.count("using System;"), 1)
+        self.assertTrue(stitched.startswith("using System;\nusing System.Linq;\n\nnamespace Billing"))
+        self.assertNotIn("```", stitched)
+        self.assertLess(stitched.index("public partial class Invoice { }"), stitched.index("void Print()"))
+
+
+if __name__ == '__main__':
+    unittest.main()
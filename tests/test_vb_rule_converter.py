@@ -0,0 +1,172 @@
+import unittest
+import os
+
+import sys
+# Add the parent directory of 'DotNetUpgradeAgents' to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from DotNetUpgradeAgents.vb_rule_converter import convert_vb_with_rules
+
+DTO_VB_FILE = """Option Strict On
+Imports System.Collections.Generic
+
+Namespace Billing
+    ''' <summary>An invoice line.</summary>
+    <Serializable()> _
+    Public Class InvoiceLine
+        Inherits EntityBase
+        Implements ILine
+
+        Private _amount As Decimal
+        Private ReadOnly _tags As New List(Of String)()
+        Public Const MaxQuantity As Integer = 100
+
+        <DataMember(Order:=1)>
+        Public Property Sku As String Implements ILine.Sku
+        Public ReadOnly Property Notes As List(Of String) = New List(Of String)()
+
+        Public Property Amount() As Decimal
+            Get
+                Return _amount
+            End Get
+            Set(ByVal value As Decimal)
+                _amount = value
+            End Set
+        End Property
+
+        Public Sub New(ByVal sku As String)
+            Me.Sku = sku
+        End Sub
+
+        Public Function Describe(Optional prefix As String = "") As String
+            Return prefix & "Line " & Sku ' For display
+        End Function
+
+        Public Sub Tag(tag As String)
+            _tags.Add(tag)
+        End Sub
+    End Class
+End Namespace
+"""
+
+DTO_CS_FILE = """using System.Collections.Generic;
+
+namespace Billing
+{
+    /// <summary>An invoice line.</summary>
+    [Serializable()]
+    public class InvoiceLine : EntityBase, ILine
+    {
+
+        private decimal _amount;
+        private readonly List<string> _tags = new List<string>();
+        public const int MaxQuantity = 100;
+
+        [DataMember(Order = 1)]
+        public string Sku { get; set; }
+        public List<string> Notes { get; } = new List<string>();
+
+        public decimal Amount
+        {
+            get
+            {
+                return _amount;
+            }
+            set
+            {
+                _amount = value;
+            }
+        }
+
+        public InvoiceLine(string sku)
+        {
+            this.Sku = sku;
+        }
+
+        public string Describe(string prefix = "")
+        {
+            return prefix + "Line " + Sku; // For display
+        }
+
+        public void Tag(string tag)
+        {
+            _tags.Add(tag);
+        }
+    }
+}
+"""
+
+
+class TestVBRuleConverter(unittest.TestCase):
+
+    def test_converts_dto_class(self):
+        self.assertEqual(convert_vb_with_rules(DTO_VB_FILE), DTO_CS_FILE)
+
+    def test_converts_assembly_info_enums_interfaces_and_modules(self):
+        vb_code = ('Imports System.Runtime.InteropServices\n<Assembly: Guid("A1")>\n'
+                   'Public Enum Status As Byte\n    Active = 1\n    Closed = &H2\nEnd Enum\n'
+                   'Public Interface ILine\n    ReadOnly Property Sku As String\n    Sub Reset(ByRef count As Integer)\n    Event Changed As EventHandler\nEnd Interface\n'
+                   'Friend Module Helpers\n    Public Function Twice(ByVal values() As Integer) As Integer\n        Return values.Length * 2\n    End Function\nEnd Module\n')
+        cs_code = convert_vb_with_rules(vb_code)
+        self.assertIn('[assembly: Guid("A1")]', cs_code)
+        self.assertIn("public enum Status : byte\n{\n    Active = 1,\n    Closed = 0x2,\n}", cs_code)
+        self.assertIn("    string Sku { get; }\n    void Reset(ref int count);\n    event EventHandler Changed;", cs_code)
+        self.assertIn("internal static class Helpers", cs_code)
+        self.assertIn("public static int Twice(int[] values)", cs_code)
+
+    def test_falls_back_for_unsupported_constructs(self):
+        unsupported = [
+            "Public Class A\n    Sub Run()\n        If Ready Then\n            Go()\n        End If\n    End Sub\nEnd Class",
+            "Public Class A\n    Function First() As Integer\n        Return items(0)\n    End Function\nEnd Class", # Call or array index?
+            "Public Class A\n    Function Half(x As Integer) As Integer\n        Return x / 2\n    End Function\nEnd Class", # Division semantics differ
+            "Public Class A\n    Function Value() As Integer\n        Value = 1\n    End Function\nEnd Class", # Implicit return variable
+            "Public Class A\n    Private WithEvents _timer As Timer\nEnd Class",
+            "Public Class A\n    Sub OnClick(sender As Object, e As EventArgs) Handles Button1.Click\n    End Sub\nEnd Class",
+            "Public Class A\n", # Unterminated
+        ]
+        for vb_code in unsupported:
+            self.assertIsNone(convert_vb_with_rules(vb_code), vb_code)
+
+    def test_nested_types_default_to_public(self):
+        vb_code = ("Public Class Outer\n    Class Inner\n    End Class\n    Private Enum Hidden\n        One\n    End Enum\nEnd Class\n"
+                   "Class TopLevel\nEnd Class\n")
+        cs_code = convert_vb_with_rules(vb_code)
+        self.assertIn("\n    public class Inner\n", cs_code)
+        self.assertIn("\n    private enum Hidden\n", cs_code)
+        self.assertIn("\nclass TopLevel\n", cs_code) # Friend, which is also C#'s default for top-level types
+
+    def test_names_are_spelled_as_declared(self):
+        vb_code = ('Public Class Counter\n    Private name As String\n'
+                   '    Public Function Current() As Integer\n        Return 1\n    End Function\n'
+                   '    Public Function Describe(Count As Integer) As String\n        NAME = "a"\n        Return "x" & count + CURRENT\n    End Function\nEnd Class\n')
+        cs_code = convert_vb_with_rules(vb_code)
+        self.assertIn('        name = "a";\n', cs_code)
+        self.assertIn('        return "x" + (Count + Current());\n', cs_code) # & binds looser than + in VB
+
+    def test_falls_back_when_names_or_operators_are_ambiguous(self):
+        def function(body, parameters="s As String, t As String", returns="String"):
+            return f"Public Class A\n    Public Property Title As String\n    Function F({parameters}) As {returns}\n        {body}\n    End Function\nEnd Class\n"
+        unsupported = [
+            function("Return s.Trim"), # Property or method?
+            function("Return Title.ToUpper"),
+            function("Return Me.ToString.Length", returns="Integer"), # Not declared in the file
+            function("Return missing"), # Unresolved name
+            function("Return s < t", returns="Boolean"), # String comparison follows Option Compare
+            function("Return s = t", returns="Boolean"),
+            function("Return 1 & 2"), # C# + would add
+            function("Return s + 1"), # VB + converts the string to a number
+            function("Return Nothing", returns="Integer"), # VB returns 0
+            "Public Class A\n    Sub Bump(ByRef x As Integer)\n    End Sub\n    Sub Run(y As Integer)\n        Bump(y)\n    End Sub\nEnd Class\n", # C# needs ref
+        ]
+        for vb_code in unsupported:
+            self.assertIsNone(convert_vb_with_rules(vb_code), vb_code)
+
+    def test_string_and_char_literals_are_escaped(self):
+        vb_code = 'Public Class Paths\n    Public Const Root As String = "C:\\Data ""x"""\n    Public Const Sep As Char = "/"c\nEnd Class\n'
+        cs_code = convert_vb_with_rules(vb_code)
+        self.assertIn('public const string Root = "C:\\\\Data \\"x\\"";', cs_code)
+        self.assertIn("public const char Sep = '/';", cs_code)
+
+
+if __name__ == '__main__':
+    unittest.main()